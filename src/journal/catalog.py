@@ -0,0 +1,278 @@
+'''
+The catalog of the journal. Every day directory found with the directory naming scheme (by
+default _{Year}{month}_{MONTH}/_{month}{day}_{DAY}/) is a row of journal_days in
+structjour.sqlite and its artifacts, the input statements, the positions file, the xlsx files,
+the saved summaries and the chart images in it and in its out directory, are rows of
+journal_files. The journal is walked once with scandir. An update lists again only the day
+directories whose own or out directory changed since the last update. Cross-day tools ask the
+catalog for a range of dates instead of probing the filesystem for each day.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import os
+import re
+
+import pandas as pd
+
+from journal.database import getPool
+from journalfiles import statementType
+
+# pylint: disable = C0103
+
+DEFAULTSCHEME = '_{Year}{month}_{MONTH}/_{month}{day}_{DAY}/'
+OUTDIR = 'out'
+CHARTEXT = ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
+KINDS = ['statement', 'positions', 'xlsx', 'summary', 'chart']
+
+
+def schemeRegex(scheme):
+    '''
+    Return a compiled regex that matches the relative path of a day directory made with scheme.
+    The groups Year, month and day give the date.
+    '''
+    fields = {'Year': r'\d{4}', 'month': r'\d{2}', 'day': r'\d{2}', 'MONTH': r'[A-Za-z]+',
+              'DAY': r'[A-Za-z]+'}
+    seen = set()
+    pattern = ''
+    for part in re.split(r'(\{\w+\})', scheme.strip('/\\')):
+        name = part[1:-1]
+        if part.startswith('{') and name in fields:
+            if name in seen:
+                pattern += f'(?P={name})'
+            else:
+                pattern += f'(?P<{name}>{fields[name]})'
+                seen.add(name)
+        else:
+            pattern += r'[/\\]'.join(re.escape(p) for p in re.split(r'[/\\]', part))
+    return re.compile(pattern + '$')
+
+
+def schemeDate(regex, relpath):
+    '''Return the date of the day directory at relpath or None if it is not a day directory'''
+    m = regex.match(relpath.strip('/\\'))
+    if not m:
+        return None
+    try:
+        return pd.Timestamp(int(m.group('Year')), int(m.group('month')), int(m.group('day')))
+    except (IndexError, ValueError):
+        return None
+
+
+def schemeDepth(scheme):
+    '''The number of directories from the journal directory to a day directory'''
+    return len([p for p in re.split(r'[/\\]', scheme) if p])
+
+
+def schemePath(journal, scheme, theDate):
+    '''Return the day directory of theDate under journal'''
+    theDate = pd.Timestamp(theDate)
+    fields = {'Year': '%Y', 'month': '%m', 'day': '%d', 'MONTH': '%B', 'DAY': '%A'}
+    fmt = re.sub(r'\{(\w+)\}', lambda m: fields.get(m.group(1), m.group(0)),
+                 scheme.replace('%', '%%').strip('/\\'))
+    return os.path.join(journal, os.path.normpath(theDate.strftime(fmt)))
+
+
+def walkDays(journal, scheme=DEFAULTSCHEME):
+    '''
+    Yield (DirEntry, theDate) for each day directory under journal. Only the directories above
+    the depth of the day directories are listed.
+    '''
+    regex = schemeRegex(scheme)
+    depth = schemeDepth(scheme)
+    stack = [('', journal, 0)]
+    while stack:
+        rel, path, level = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                relpath = f'{rel}/{entry.name}' if rel else entry.name
+                if level + 1 < depth:
+                    stack.append((relpath, entry.path, level + 1))
+                    continue
+                theDate = schemeDate(regex, relpath)
+                if theDate is not None:
+                    yield entry, theDate
+
+
+def artifactKind(name, inOut=False):
+    '''
+    Return the kind of the journal artifact name or None if it is not one.
+    :params inOut: True if the file is in the out directory. The statements and the positions
+            file are in the day directory.
+    '''
+    lname = name.lower()
+    ext = os.path.splitext(lname)[1]
+    if ext == '.xlsx':
+        return 'xlsx'
+    if ext == '.zst':
+        return 'summary'
+    if ext in CHARTEXT:
+        return 'chart'
+    if inOut:
+        return None
+    if lname.startswith('positions') and ext == '.csv':
+        return 'positions'
+    if lname != 'tradesbyticket.csv' and statementType(name):
+        return 'statement'
+    return None
+
+
+def _stamp(entry):
+    '''The modification times of the day directory and its out directory'''
+    try:
+        outStamp = os.stat(os.path.join(entry.path, OUTDIR)).st_mtime_ns
+    except OSError:
+        outStamp = 0
+    return f'{entry.stat().st_mtime_ns}:{outStamp}'
+
+
+def _listDay(path):
+    '''Return (kind, name, path, mtime, size) for the artifacts of the day directory path'''
+    files = []
+    for d, inOut in ((path, False), (os.path.join(path, OUTDIR), True)):
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                kind = artifactKind(entry.name, inOut)
+                if kind and entry.is_file():
+                    st = entry.stat()
+                    files.append((kind, entry.name, entry.path, st.st_mtime, st.st_size))
+    return files
+
+
+class Catalog:
+    '''
+    The day directories of a journal in the table journal_days and their artifacts in the
+    table journal_files of the sqlite db.
+    '''
+
+    def __init__(self, journal, scheme=DEFAULTSCHEME, db=None):
+        self.journal = os.path.normpath(journal)
+        self.scheme = scheme
+        self.db = db if db else os.path.join(journal, 'structjour.sqlite')
+        self.createTables()
+
+    def createTables(self):
+        with getPool(self.db).connection() as conn:
+            conn.executescript('''
+            CREATE TABLE if not exists journal_days (
+            id	INTEGER PRIMARY KEY AUTOINCREMENT,
+            journal	TEXT NOT NULL,
+            path	TEXT NOT NULL UNIQUE,
+            theDate	TEXT NOT NULL,
+            stamp	TEXT NOT NULL);
+
+            CREATE INDEX if not exists journal_days_date ON journal_days(journal, theDate);
+
+            CREATE TABLE if not exists journal_files (
+            id	INTEGER PRIMARY KEY AUTOINCREMENT,
+            day_id	INTEGER NOT NULL REFERENCES journal_days(id) ON DELETE CASCADE,
+            kind	TEXT NOT NULL,
+            name	TEXT NOT NULL,
+            path	TEXT NOT NULL UNIQUE,
+            mtime	REAL,
+            size	INTEGER);
+
+            CREATE INDEX if not exists journal_files_day ON journal_files(day_id);''')
+
+    def update(self):
+        '''
+        Walk the journal and catalog the new and changed day directories. The days that are gone
+        are removed.
+        :return: The number of day directories listed again or removed
+        '''
+        with getPool(self.db).connection() as conn:
+            conn.execute('PRAGMA foreign_keys = ON')
+            try:
+                changed, gone = self._update(conn.cursor())
+                conn.commit()
+            finally:
+                # The pragma only changes outside a transaction. Reset it before the connection
+                # goes back to the pool.
+                conn.rollback()
+                conn.execute('PRAGMA foreign_keys = OFF')
+        return changed + len(gone)
+
+    def _update(self, cur):
+        '''Catalog the changed days with cur. Return (changed, gone).'''
+        cur.execute('SELECT path, id, stamp FROM journal_days WHERE journal = ?',
+                    (self.journal,))
+        stored = {path: (dayid, stamp) for path, dayid, stamp in cur.fetchall()}
+        seen = set()
+        changed = 0
+        for entry, theDate in walkDays(self.journal, self.scheme):
+            path = os.path.normpath(entry.path)
+            seen.add(path)
+            stamp = _stamp(entry)
+            if path in stored and stored[path][1] == stamp:
+                continue
+            if path in stored:
+                dayid = stored[path][0]
+                cur.execute('UPDATE journal_days SET theDate = ?, stamp = ? WHERE id = ?',
+                            (theDate.strftime('%Y-%m-%d'), stamp, dayid))
+                cur.execute('DELETE FROM journal_files WHERE day_id = ?', (dayid,))
+            else:
+                cur.execute('''INSERT INTO journal_days (journal, path, theDate, stamp)
+                               VALUES(?, ?, ?, ?)''',
+                            (self.journal, path, theDate.strftime('%Y-%m-%d'), stamp))
+                dayid = cur.lastrowid
+            cur.executemany('''INSERT OR REPLACE INTO journal_files
+                                   (day_id, kind, name, path, mtime, size)
+                               VALUES(?, ?, ?, ?, ?, ?)''',
+                            [(dayid,) + f for f in _listDay(path)])
+            changed += 1
+        gone = [(stored[p][0],) for p in stored if p not in seen]
+        cur.executemany('DELETE FROM journal_days WHERE id = ?', gone)
+        return changed, gone
+
+    def _range(self, start, end):
+        where = ['d.journal = ?']
+        params = [self.journal]
+        if start is not None:
+            where.append('d.theDate >= ?')
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            where.append('d.theDate <= ?')
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        return where, params
+
+    def _query(self, sql, params):
+        with getPool(self.db).connection() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        df['theDate'] = pd.to_datetime(df['theDate'])
+        return df
+
+    def days(self, start=None, end=None):
+        '''Return the day directories from start to end (inclusive) with the columns theDate
+        and path'''
+        where, params = self._range(start, end)
+        return self._query(f'''
+            SELECT d.theDate, d.path FROM journal_days d
+            WHERE {' AND '.join(where)} ORDER BY d.theDate, d.path''', params)
+
+    def files(self, start=None, end=None, kind=None):
+        '''
+        Return the artifacts of the days from start to end (inclusive) with the columns theDate,
+        kind, name, path, mtime and size.
+        :params kind: One of KINDS or None for all of them
+        '''
+        where, params = self._range(start, end)
+        if kind:
+            assert kind in KINDS
+            where.append('f.kind = ?')
+            params.append(kind)
+        return self._query(f'''
+            SELECT d.theDate, f.kind, f.name, f.path, f.mtime, f.size
+            FROM journal_files f JOIN journal_days d ON d.id = f.day_id
+            WHERE {' AND '.join(where)} ORDER BY d.theDate, f.path''', params)
@@ -0,0 +1,114 @@
+'''
+The statistics of a trading day for the daily summary form in Excel and in Qt. They are computed
+once from the table of the day's trade summaries.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import numpy as np
+import pandas as pd
+
+from journal.thetradeobject import SumReqFields
+
+# pylint: disable = C0103
+
+
+def toMoney(values):
+    '''
+    Convert a column of P/L values to float. Blank cells and non numbers are 0.
+    '''
+    values = pd.Series(values).replace('', 0)
+    return pd.to_numeric(values, errors='coerce').fillna(0.0).astype(np.float64)
+
+
+def summaryTable(tradeSummaries):
+    '''
+    Return one row for each trade summary with the columns Trade (the number of the trade in the
+    day), Name, Account, PL and Mistake.
+    :params tradeSummaries: A list of TheTrade DataFrames or a dict of them as in LayoutForms.ts
+    '''
+    srf = SumReqFields()
+    if isinstance(tradeSummaries, dict):
+        tradeSummaries = list(tradeSummaries.values())
+    rows = [[t[srf.name].unique()[0], t[srf.acct].unique()[0], t[srf.pl].unique()[0],
+             t[srf.mstkval].unique()[0] if srf.mstkval in t.columns else 0]
+            for t in tradeSummaries]
+    df = pd.DataFrame(rows, columns=['Name', 'Account', 'PL', 'Mistake'])
+    df.insert(0, 'Trade', np.arange(1, len(df) + 1))
+    df['PL'] = toMoney(df['PL'])
+    df['Mistake'] = toMoney(df['Mistake'])
+    return df
+
+
+def tradesNote(numWins, numLosses):
+    '''Return a note like: 4 Trades, 1 Winner, 3, Losers'''
+    numt = numWins + numLosses
+    if numt == 0:
+        return "0 Trades"
+    note = "{0} Trade{1}, {2} Winner{3}, {4}, Loser{5}"
+    return note.format(numt, "" if numt == 1 else "s", numWins, "" if numWins == 1 else "s",
+                       numLosses, "" if numLosses == 1 else "s")
+
+
+class DailyStats:
+    '''
+    The daily P/L statistics. A trade with a P/L of 0 counts as a loss.
+    :attribute table: The DataFrame from summaryTable
+    '''
+
+    def __init__(self, tradeSummaries):
+        self.table = summaryTable(tradeSummaries)
+        pl = self.table['PL']
+        live = self.table['Account'] == 'Live'
+        wins = pl > 0
+
+        self.liveTotal = float(pl[live].sum())
+        self.liveWins = int((live & wins).sum())
+        self.liveLosses = int((live & ~wins).sum())
+        self.simTotal = float(pl[~live].sum())
+        self.simWins = int((~live & wins).sum())
+        self.simLosses = int((~live & ~wins).sum())
+
+        self.numWins = int(wins.sum())
+        self.winTotal = float(pl[wins].sum())
+        self.avgWin = self.winTotal / self.numWins if self.numWins else 0.0
+        self.numLosses = int((~wins).sum())
+        self.lossTotal = float(pl[~wins].sum())
+        self.avgLoss = self.lossTotal / self.numLosses if self.numLosses else 0.0
+
+        self.highest, self.highestNote = self.extreme(pl.idxmax() if len(pl) else None, 1)
+        self.lowest, self.lowestNote = self.extreme(pl.idxmin() if len(pl) else None, -1)
+
+        self.plTotal = float(pl.sum())
+        self.mistakeTotal = float(self.table['Mistake'].sum())
+
+    def extreme(self, i, sign):
+        '''Return (pl, note) of the trade at i if it is a win (sign 1) or a loss (sign -1)'''
+        if i is None or self.table.at[i, 'PL'] * sign <= 0:
+            return 0.0, "notrade"
+        row = self.table.loc[i]
+        return float(row.PL), "Trade{0}, {1}, {2}".format(row.Trade, row.Account, row.Name)
+
+    def dailySumData(self, fmt=None):
+        '''
+        Return the values of the daily summary form. The keys are the keys of
+        MistakeSummary.dailySummaryFields.
+        :params fmt: A function to format the money values or None to leave them float
+        '''
+        fmt = fmt if fmt else (lambda x: x)
+        d = dict()
+        d['livetot'] = fmt(self.liveTotal)
+        d['livetotnote'] = tradesNote(self.liveWins, self.liveLosses)
+        d['simtot'] = fmt(self.simTotal)
+        d['simtotnote'] = tradesNote(self.simWins, self.simLosses)
+        d['highest'] = fmt(self.highest)
+        d['highestnote'] = self.highestNote
+        d['lowest'] = fmt(self.lowest)
+        d['lowestnote'] = self.lowestNote
+        d['avgwin'] = fmt(self.avgWin)
+        d['avgwinnote'] = "X {} =  ${:.2f}".format(self.numWins, self.winTotal)
+        d['avgloss'] = fmt(self.avgLoss)
+        d['avglossnote'] = "X {} =  (${:.2f})".format(self.numLosses, abs(self.lossTotal))
+        return d
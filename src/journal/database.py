@@ -0,0 +1,192 @@
+'''
+Shared access to structjour.sqlite. getPool(db) returns the one Pool of db in this process. A
+Pool lends out connections that stay open between uses, so sqlite keeps their prepared
+statements. The connections are in WAL mode, which lets the charts and the strategy browser
+read while the watcher or the prefetch job writes. A Pool also holds a read-through cache of
+small tables (the api keys, the strategy list). Each write through the owner of a table
+invalidates its entries. The cache does not see writes made by other processes.
+
+    with getPool(db).connection() as conn:
+        conn.execute('UPDATE api_keys SET key = ? WHERE api = ?', (key, api))
+
+The block commits on success and rolls back on an exception.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import contextlib
+import os
+import sqlite3
+import threading
+
+# pylint: disable = C0103
+
+# Idle connections kept for each db
+POOLSIZE = 4
+
+# Seconds to wait for a lock held by another connection
+TIMEOUT = 10.0
+
+# Prepared statements kept by each connection
+STATEMENTS = 256
+
+_pools = dict()
+_lock = threading.Lock()
+
+
+def getPool(db):
+    '''Return the Pool for the sqlite file db, created on first use'''
+    key = os.path.abspath(db)
+    with _lock:
+        pool = _pools.get(key)
+        # A forked process must not use the connections of its parent
+        if pool is None or pool.pid != os.getpid():
+            pool = Pool(key)
+            _pools[key] = pool
+        return pool
+
+
+def closePools():
+    '''Close the idle connections of every Pool and forget the pools'''
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def removeDB(db):
+    '''
+    Close the Pool of db and delete db with its WAL files. Deleting a db whose connections are
+    still open leaves its -wal and -shm files behind.
+    '''
+    key = os.path.abspath(db)
+    with _lock:
+        pool = _pools.pop(key, None)
+    if pool is not None:
+        pool.close()
+    for name in [key, key + '-wal', key + '-shm']:
+        if os.path.exists(name):
+            os.remove(name)
+
+
+class Pool:
+    '''
+    Connections to one sqlite file and a cache of values read from it. If the file is deleted or
+    replaced, the connections and the cache are dropped.
+    :params db: The sqlite file
+    :params size: The number of idle connections to keep
+    :params wal: Put the db in WAL mode
+    '''
+
+    def __init__(self, db, size=POOLSIZE, wal=True):
+        self.db = db
+        self.size = size
+        self.wal = wal
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.idle = list()
+        self.identity = None
+        self.generation = 0
+        self.cache = dict()
+        self.cacheGeneration = 0
+
+    def fileIdentity(self):
+        try:
+            st = os.stat(self.db)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def connect(self):
+        '''Return a new connection set up like the pooled ones. The caller closes it.'''
+        conn = sqlite3.connect(self.db, timeout=TIMEOUT, check_same_thread=False,
+                               cached_statements=STATEMENTS)
+        if self.wal:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def acquire(self):
+        '''Return (generation, connection) from the idle connections or a new one'''
+        identity = self.fileIdentity()
+        stale = []
+        with self.lock:
+            if identity != self.identity:
+                stale, self.idle = self.idle, list()
+                self.generation += 1
+                self.cache.clear()
+                self.cacheGeneration += 1
+            conn = self.idle.pop() if self.idle else None
+            generation = self.generation
+        for c in stale:
+            c.close()
+        if conn is None:
+            conn = self.connect()
+            with self.lock:
+                if generation == self.generation:
+                    self.identity = self.fileIdentity()
+        return generation, conn
+
+    def release(self, generation, conn):
+        with self.lock:
+            if generation == self.generation and len(self.idle) < self.size:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        '''Lend a connection. Commit when the block ends or roll back if it raises.'''
+        generation, conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(generation, conn)
+
+    def cached(self, key, load):
+        '''
+        Return the cached value of key or call load() to read it. load reads the db with its own
+        connection.
+        '''
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+            generation = self.cacheGeneration
+        value = load()
+        with self.lock:
+            # A write during load invalidated what was read
+            if generation == self.cacheGeneration:
+                self.cache[key] = value
+        return value
+
+    def invalidate(self, *names):
+        '''
+        Drop the cached values of names. A name matches the key itself or the first item of a
+        tuple key. With no names drop the whole cache.
+        '''
+        with self.lock:
+            self.cacheGeneration += 1
+            if not names:
+                self.cache.clear()
+                return
+            for key in list(self.cache):
+                if key in names or (isinstance(key, tuple) and key and key[0] in names):
+                    del self.cache[key]
+
+    def close(self):
+        '''Close the idle connections. Connections lent out are closed when returned.'''
+        with self.lock:
+            idle, self.idle = self.idle, list()
+            self.generation += 1
+            self.cache.clear()
+            self.cacheGeneration += 1
+            self.identity = None
+        for conn in idle:
+            conn.close()
@@ -5,10 +5,15 @@ Created on Sep 5, 2018
 '''
 import sys
 import datetime
+import logging
+import numpy as np
 import pandas as pd
 from journal.dfutil import DataFrameUtil
+from journal.instrument import span, timed
 # pylint: disable = C0103
 
+logger = logging.getLogger('structjour.definetrades')
+
 class FinReqCol(object):
     '''
     Intended to serve as the adapter class for multiple input files. FinReqCol manages the column
@@ -86,6 +91,19 @@ class ReqCol(object):
         self.columns = list(rc.values())
 
 
+def formatTimes(dframe, fmt='%H:%M:%S'):
+    '''
+    Return a copy of the trades dframe with the Start and Time columns as text for the sheet and
+    the forms. HOLD rows and blank rows have no time.
+    '''
+    frc = FinReqCol()
+    dframe = dframe.copy()
+    for col in [frc.start, frc.time]:
+        if col in dframe.columns:
+            dframe[col] = DataFrameUtil.timeStrings(dframe[col], fmt)
+    return dframe
+
+
 class DefineTrades(object):
     '''
     DefineTrades moves the data from DataFrame representing the input file transactions to a
@@ -110,22 +128,33 @@ class DefineTrades(object):
         '''
         c = self._frc
 
-        # Process the output file DataFrame
-        trades = self.addFinReqCol(trades)
-        newTrades = trades[c.columns]
-        newTrades.copy()
-        nt = newTrades.sort_values([c.ticker, c.acct, c.time])
-        nt = self.writeShareBalance(nt)
-        nt = self.addStartTime(nt)
-        nt.Date = pd.to_datetime(nt.Date)
-        nt = nt.sort_values([c.ticker, c.acct, c.start, c.date, c.time], ascending=True)
-        nt = self.addTradeIndex(nt)
-        nt = self.addTradePL(nt)
-        nt = self.addTradeDuration(nt)
-        nt = self.addTradeName(nt)
-        # ldf is a list of DataFrames, one per trade
-        ldf = self.getTradeList(nt)
-        ldf, nt = self.postProcessing(ldf)
+        with span('DefineTrades.processOutputDframe', rows=len(trades)) as s:
+            # Process the output file DataFrame
+            trades = self.addFinReqCol(trades)
+            newTrades = trades[c.columns]
+            newTrades.copy()
+            nt = self.sortTrades(newTrades, [c.ticker, c.acct])
+            nt = self.writeShareBalance(nt)
+            nt = self.addStartTime(nt)
+            nt.Date = pd.to_datetime(nt.Date)
+            nt = self.sortTrades(nt, [c.ticker, c.acct, c.start])
+            nt = self.addTradeIndex(nt)
+            nt = self.addTradePL(nt)
+            nt = self.addTradeDuration(nt)
+            nt = self.addTradeName(nt)
+            # ldf is a list of DataFrames, one per trade
+            ldf = self.getTradeList(nt)
+            ldf, nt = self.postProcessing(ldf)
+            inputlen, dframe = self.summarizeTrades(nt)
+            s.set(trades=len(ldf))
+        return inputlen, dframe, ldf
+
+    def summarizeTrades(self, nt):
+        '''
+        Add the rows with the daily P/L summary to the DataFrame of all the trades.
+        :params nt: The trades from the list of trade DataFrames, in order.
+        :return (inputlen, dframe): The length before the last 2 blank rows, and the DataFrame.
+        '''
         nt = DataFrameUtil.addRows(nt, 2)
         nt = self.addSummaryPL(nt)
 
@@ -133,8 +162,22 @@ class DefineTrades(object):
         # later (?move this out a level)
         inputlen = len(nt)
         dframe = DataFrameUtil.addRows(nt, 2)
-        return inputlen, dframe, ldf
+        return inputlen, dframe
+
+    def sortTrades(self, dframe, by):
+        '''
+        Sort the transactions by the columns in by and then by time. HOLD rows have no time. The
+        shares held before the trades of a ticker sort ahead of them and the shares held after
+        sort last.
+        '''
+        c = self._frc
+        side = dframe[c.side]
+        hold = np.select([side.isin(['HOLD+B', 'HOLD-B']), side.isin(['HOLD+', 'HOLD-'])],
+                         [-1, 1], 0)
+        return dframe.assign(holdOrder=hold).sort_values(
+            by + ['holdOrder', c.time]).drop(columns='holdOrder')
 
+    @timed('DefineTrades.writeShareBalance')
     def writeShareBalance(self, dframe):
         '''
         Create the data for share balance for a ticker. Note that for overnight holds after, the
@@ -160,6 +203,7 @@ class DefineTrades(object):
             prevBal = newBalance
         return dframe
 
+    @timed('DefineTrades.addStartTime')
     def addStartTime(self, dframe):
         '''
         Add the start time to the new column labeled Start or frc.start. Each transaction in each
@@ -188,8 +232,10 @@ class DefineTrades(object):
                 dframe.at[i, c.start] = oldTime
             if row[c.bal] == 0:
                 newTrade = True
+        dframe[c.start] = DataFrameUtil.toDatetime(dframe[c.start])
         return dframe
 
+    @timed('DefineTrades.addTradeIndex')
     def addTradeIndex(self, dframe):
         '''
         Labels and numbers the trades by populating the TIndex column. 'Trade 1' for example includes the transactions 
@@ -215,6 +261,7 @@ class DefineTrades(object):
                 prevEndTrade = 0
         return dframe
 
+    @timed('DefineTrades.addTradePL')
     def addTradePL(self, dframe):
         ''' Add a trade summary P/L. That is total the transaction P/L and write a summary P/L for the trade in the c.sum column '''
 
@@ -230,25 +277,21 @@ class DefineTrades(object):
                 tradeTotal = 0
         return dframe
 
+    @timed('DefineTrades.addTradeDuration')
     def addTradeDuration(self, dframe):
         ''' Get a time delta beween the time of the first and last transaction. Place it in the c.dur column'''
 
         c = self._frc
 
-        for i, row in dframe.iterrows():
-            if row[c.bal] == 0:
-                timeEnd = pd.Timestamp(row[c.time])
-                timeStart = pd.Timestamp(row[c.start])
-                assert timeEnd.date() == timeStart.date()
-                diff = timeEnd - timeStart
-
-                # end = timeEnd.split(":")
-                # start = timeStart.split(":")
-                # diff = datetime.datetime(1, 1, 1, int(end[0]), int(end[1]), int(
-                #     end[2])) - datetime.datetime(1, 1, 1, int(start[0]), int(start[1]), int(start[2]))
-                dframe.at[i, c.dur] = diff
+        closed = dframe[c.bal] == 0
+        # An after HOLD has no time. Its trade ends with the transaction before it.
+        timeEnd = DataFrameUtil.toDatetime(dframe[c.time]).ffill()[closed]
+        timeStart = DataFrameUtil.toDatetime(dframe[c.start][closed])
+        assert (timeEnd.dt.normalize() == timeStart.dt.normalize()).all()
+        dframe.loc[closed, c.dur] = timeEnd - timeStart
         return dframe
 
+    @timed('DefineTrades.addTradeName')
     def addTradeName(self, dframe):
         '''
         Create a name for this trade like 'AMD Short'. Place it in the c.name column. If this is
@@ -269,6 +312,7 @@ class DefineTrades(object):
                 dframe.at[i, c.name] = row[c.ticker] + longShort
         return dframe
 
+    @timed('DefineTrades.addSummaryPL')
     def addSummaryPL(self, dframe):
         ''' 
         Create a summary of the P/L for the day, place it in new row. 
@@ -309,6 +353,7 @@ class DefineTrades(object):
 
 
 
+    @timed('DefineTrades.getTradeList')
     def getTradeList(self, dframe):
         '''
         Creates a python list of DataFrames for each trade. It relies on addTradeIndex successfully creating the 
@@ -342,6 +387,7 @@ class DefineTrades(object):
         # print("Got {0} trades".format(len(ldf)))
         return ldf
 
+    @timed('DefineTrades.postProcessing')
     def postProcessing(self, ldf):
         '''
         A few items that need fixing up in names and initial HOLD entries. This method is called
@@ -393,21 +439,15 @@ class DefineTrades(object):
                     # TODO: Get a an IB Statement with a flipped position 
                     tdf.at[xl, c.name] = tdf.at[xl, c.name] + " FLIPPED"
 
-                    msg = '\nFound a flipper long to short.\n'
-                    msg = msg + "Use this file for devel and testing if this is an IB statement\n"
-                    print(msg)
-                    for i, row in tdf.iterrows():
-                        print(i, row)
-                        print()
+                    logger.info('Found a flipper long to short in %s. Use this file for devel '
+                                'and testing if this is an IB statement', tdf.at[xl, c.name])
+                    logger.debug('%s', tdf)
                 elif not tdf.at[x0, c.side].startswith('B') and not tdf.at[xl, c.side].startswith('B'):
                     # print("found a flipper short to long")
                     tdf.iloc[-1][c.name] = tdf.iloc[-1][c.name] + " FLIPPED"
-                    msg = '\nFound a flipper short to long.\n'
-                    msg = msg + "Use this file for devel and testing if this is an IB statement\n"
-                    print(msg)
-                    for i, row in tdf.iterrows():
-                        print(i, row)
-                        print()
+                    logger.info('Found a flipper short to long in %s. Use this file for devel '
+                                'and testing if this is an IB statement', tdf.iloc[-1][c.name])
+                    logger.debug('%s', tdf)
 
 
 
@@ -428,6 +468,7 @@ class DefineTrades(object):
                 dframe = dframe.append(tdf)
         return ldf, dframe
 
+    @timed('DefineTrades.addFinReqCol')
     def addFinReqCol(self, dframe):
         '''
         Add the columns from FinReqCol that are not already in dframe. These are columns to determine the
@@ -80,3 +80,58 @@ class DataFrameUtil(object):
         dframe = dframe.append(newdf, ignore_index=True, sort=False)
 
         return dframe
+
+    @classmethod
+    def toDatetime(cls, series):
+        '''
+        Convert a column of times to datetime64. Time strings like 09:30:00 with no date are
+        placed on 1970-01-01. Datetimes and date time strings keep their date. Blank cells are NaT.
+        :params series: A Series of time strings, Timestamps or datetimes.
+        :return: A datetime64[ns] Series
+        '''
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        try:
+            return pd.Timestamp(0) + pd.to_timedelta(series)
+        except (TypeError, ValueError):
+            # A mix of times of day and datetimes
+            deltas = pd.to_timedelta(series.where(series.map(type) == str), errors='coerce')
+            dated = pd.to_datetime(series.where(deltas.isna()), errors='coerce')
+            return (pd.Timestamp(0) + deltas).fillna(dated)
+
+    @classmethod
+    def timeOfDay(cls, series):
+        '''
+        Get the time since midnight of a column of times.
+        :params series: A Series of time strings, Timestamps or datetimes.
+        :return: A timedelta64[ns] Series
+        '''
+        times = cls.toDatetime(series)
+        return times - times.dt.normalize()
+
+    @classmethod
+    def tradeTimes(cls, times, dates):
+        '''
+        Get the datetime64 of each transaction. Times with no date, like 09:30:00, are placed on
+        their trade date. Times that have a date keep it.
+        :params times: A Series of time strings, Timestamps or datetimes.
+        :params dates: A Series of the trade dates or a single date.
+        :return: A datetime64[ns] Series
+        '''
+        times = cls.toDatetime(times)
+        if not isinstance(dates, pd.Series):
+            dates = pd.Series(pd.Timestamp(dates), index=times.index)
+        day = pd.to_datetime(dates, errors='coerce').dt.normalize()
+        undated = times.dt.normalize() == pd.Timestamp(0)
+        return times.where(~undated, day + (times - times.dt.normalize()))
+
+    @classmethod
+    def timeStrings(cls, series, fmt='%H:%M:%S'):
+        '''
+        Format a column of times as text for the sheet and the forms. NaT and blank cells are ''.
+        :params series: A Series of datetimes. Blank rows may be empty strings.
+        :params fmt: The strftime format
+        :return: A Series of str
+        '''
+        times = pd.to_datetime(series.where(series != '', None), errors='coerce')
+        return times.dt.strftime(fmt).fillna('')
@@ -3,7 +3,9 @@ import os
 from openpyxl import load_workbook
 
 
+from journal.catalog import DEFAULTSCHEME, Catalog
 from journal.dfutil import DataFrameUtil
+from journal.filltable import loadFillTables
 from journal.thetradeobject import SumReqFields
 from journal.tradestyle import c as tcell
 
@@ -101,13 +103,15 @@ def getTradeSummaryFormLocations(ws):
     return loc
 
 
-def getAvgExit(trade):
+def getAvgExit(trade, fills=None):
     '''We want to display jut one exit in the Trade log. It might as well be the average
-    exit when we scale out. If there are more than 8 combined entries and exits--could be
-    a problem
-    TODO: track down the note for more entrances/exits than 8 -- It may be complicated-- 
-    entered a bug--classic procrastination
+    exit when we scale out. The trade summary form has the first 8 entries and exits. If the
+    journal has a Fills sheet, the average is of all the exits.
+    :params trade: The trade summary DataFrame
+    :params fills: The FillTable of the trade or None
     '''
+    if fills is not None:
+        return fills.avgExit()
     product = 0
     exits = list()
     positions = list()
@@ -163,44 +167,23 @@ def getWeekCount(theDate):
     return weekCount
 
 
-def getDevelDailyJournalList(prefix, begin):
+def getDevelDailyJournalList(prefix, begin, scheme=DEFAULTSCHEME):
     '''
-    Gets a list of Daily trade files as created by Structjour in the MyDevel directories.
+    Gets a list of Daily trade files as created by Structjour in the day directories of the
+    journal. The days come from the journal catalog, which is brought up to date first.
     :params:prefix: The directory that holds all the journal files.
     :params:date: A datetime.date object identifying the earliest file. All files up to today 
                     are in the list with the date of the file 
+    :params scheme: The day directory naming scheme
     :return: A list of filenames with dates[[filename, date], [filename2, date2]]...
     '''
+    catalog = Catalog(prefix, scheme)
+    catalog.update()
+    df = catalog.files(begin, datetime.date.today(), 'xlsx')
     thelist = list()
-    # prefix=prefix
-    weekCount = getWeekCount(begin)
-    now = datetime.date.today()
-    theDate = begin
-    delt = datetime.timedelta(1)
-    oldmonth = theDate.month
-
-    while now >= theDate:
-        newmonth = theDate.month
-        if theDate.weekday() == 6:
-            weekCount = weekCount + 1
-        if newmonth != oldmonth:
-            weekCount = 1
-        oldmonth = newmonth
-
-        filename = "{}{}/Week_{}/{}".format(prefix,
-                                            theDate.strftime("_%m_%B"),
-                                            weekCount,
-                                            theDate.strftime(
-                                                "_%m%d_%A/out/Trades_%A_%m%d.xlsx")
-                                            )
-        filename = os.path.normpath(filename)
-        if theDate.weekday() < 5:
-            if not os.path.exists(filename):
-                print("no file for ", filename)
-            else:
-                thelist.append([filename, theDate])
-        theDate = theDate+delt
-
+    for fname, path, theDate in zip(df.name, df.path, df.theDate):
+        if theDate.weekday() < 5 and fname.endswith(theDate.strftime('%A_%m%d.xlsx')):
+            thelist.append([path, theDate.date()])
     return thelist
 
 
@@ -211,6 +194,7 @@ def registerTrades(tsList, wb):
         trades = wb2["Sheet"]
 
         tradeLocation = getTradeSummaryFormLocations(trades)
+        fillTables = loadFillTables(wb2)
 
         ldf = loadTradeSummaries(tradeLocation, trades)
         drc = DisReqCol(theDate)
@@ -293,7 +277,7 @@ def registerTrades(tsList, wb):
 
                 #avgExit
                 cell = tcell(cols['avgexit'][0], anchor=anchor)
-                tlog[cell] = getAvgExit(tdf)
+                tlog[cell] = getAvgExit(tdf, fillTables.get(ix + 1))
 
                 # P/L
                 cell = tcell(cols['pl'][0], anchor=anchor)
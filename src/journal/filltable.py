@@ -0,0 +1,133 @@
+'''
+The fills of one trade. The trade summary form has room for 8 entries and exits. A scalping
+trade can have many more. The FillTable keeps all of them in a numpy record array next to the
+summary. The forms show the first 8 and read the rest from the table.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import numpy as np
+import pandas as pd
+
+# pylint: disable = C0103
+
+FILLDTYPE = np.dtype([('price', 'f8'), ('time', 'M8[ns]'), ('shares', 'f8'), ('pl', 'f8'),
+                      ('diff', 'f8'), ('side', 'U5')])
+
+# The number of entries and exits in the trade summary form
+FORMSLOTS = 8
+
+# The worksheet in the journal with the fills of every trade
+FILLSHEET = 'Fills'
+
+FILLCOLUMNS = ['Trade', 'Name', 'Account', 'Side', 'Price', 'Time', 'Shares', 'P / L', 'Diff']
+
+
+class FillTable:
+    '''
+    The fills of one trade, in order. Iterating gives each fill in the list form of
+    TheTradeObject.entries: [price, time, shares, pl, diff, 'Entry' or 'Exit'].
+    :attribute fills: The numpy record array with FILLDTYPE
+    '''
+
+    def __init__(self, entries=None):
+        entries = entries if entries is not None else list()
+        if isinstance(entries, FillTable):
+            entries = entries.fills
+        if isinstance(entries, np.ndarray):
+            self.fills = entries.astype(FILLDTYPE)
+            return
+        self.fills = np.zeros(len(entries), dtype=FILLDTYPE)
+        for i, (price, tm, shares, pl, diff, side) in enumerate(entries):
+            self.fills[i] = (price, pd.Timestamp(tm).to_datetime64(), shares, pl, diff, side)
+
+    def __len__(self):
+        return len(self.fills)
+
+    def __getitem__(self, i):
+        f = self.fills[i]
+        return [float(f['price']), pd.Timestamp(f['time']), float(f['shares']), float(f['pl']),
+                float(f['diff']), str(f['side'])]
+
+    def __iter__(self):
+        for i in range(len(self.fills)):
+            yield self[i]
+
+    def exits(self):
+        '''Return a boolean array, True for the exits'''
+        return self.fills['side'] == 'Exit'
+
+    def avgExit(self):
+        '''
+        Return the average exit price weighted by the shares of each exit or 0 if there are no
+        exits.
+        '''
+        exits = self.fills[self.exits()]
+        shares = exits['shares'].sum()
+        return 0 if shares == 0 else float((exits['price'] * exits['shares']).sum() / shares)
+
+    def toFrame(self):
+        '''Return the fills as a DataFrame with the columns Side, Price, Time, Shares, P / L, Diff'''
+        return pd.DataFrame({'Side': self.fills['side'], 'Price': self.fills['price'],
+                             'Time': self.fills['time'], 'Shares': self.fills['shares'],
+                             'P / L': self.fills['pl'], 'Diff': self.fills['diff']})
+
+    @classmethod
+    def fromFrame(cls, df):
+        '''Create the FillTable from a DataFrame made by toFrame'''
+        fills = np.zeros(len(df), dtype=FILLDTYPE)
+        fills['side'] = df['Side'].astype(str).values
+        fills['price'] = pd.to_numeric(df['Price']).values
+        fills['time'] = pd.to_datetime(df['Time']).values
+        fills['shares'] = pd.to_numeric(df['Shares']).values
+        fills['pl'] = pd.to_numeric(df['P / L']).values
+        fills['diff'] = pd.to_numeric(df['Diff']).values
+        return cls(fills)
+
+    def describe(self, start=FORMSLOTS, timeFormat='%H:%M:%S'):
+        '''Return one line of text for each fill from start on'''
+        lines = list()
+        for price, tm, shares, pl, dummy, side in list(self)[start:]:
+            tm = tm.strftime(timeFormat) if not pd.isnull(tm) else ''
+            line = f'{side:5} {tm:>8} {shares:>8.0f} @ {price:.2f}'
+            lines.append(line + (f'  P/L {pl:.2f}' if side == 'Exit' else ''))
+        return '\n'.join(lines)
+
+
+def fillsFrame(tradeSummaries, fillTables):
+    '''
+    Return the fills of every trade as one DataFrame with FILLCOLUMNS. Trade is the number of the
+    trade in the day, starting with 1.
+    :params tradeSummaries: The list of TheTrade DataFrames
+    :params fillTables: The list of FillTables parallel to tradeSummaries
+    '''
+    frames = list()
+    for i, (theTrade, fills) in enumerate(zip(tradeSummaries, fillTables)):
+        df = fills.toFrame()
+        df.insert(0, 'Account', theTrade['Account'].unique()[0])
+        df.insert(0, 'Name', theTrade['Name'].unique()[0])
+        df.insert(0, 'Trade', i + 1)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=FILLCOLUMNS)
+    return pd.concat(frames, ignore_index=True)[FILLCOLUMNS]
+
+
+def fillTablesFromFrame(df):
+    '''Return {trade number: FillTable} from the DataFrame made by fillsFrame'''
+    return {int(trade): FillTable.fromFrame(tdf) for trade, tdf in df.groupby('Trade')}
+
+
+def loadFillTables(wb):
+    '''
+    Return {trade number: FillTable} from the Fills worksheet of a journal workbook. Return an
+    empty dict if it has none.
+    '''
+    if FILLSHEET not in wb.sheetnames:
+        return dict()
+    rows = list(wb[FILLSHEET].values)
+    if len(rows) < 2:
+        return dict()
+    return fillTablesFromFrame(pd.DataFrame(rows[1:], columns=rows[0]))
@@ -0,0 +1,193 @@
+'''
+Incremental reprocessing of a day of trades. The fills of each (ticker, account) group are hashed.
+When the day is run again (a late fill was added or the positions file was fixed) only the
+groups whose fills changed go through DefineTrades. The trades and summaries of the unchanged
+groups are kept, including the strategy, notes, stops and other values the user entered.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import collections
+import hashlib
+import os
+
+import pandas as pd
+
+from journal.definetrades import DefineTrades, FinReqCol, ReqCol
+from journal.instrument import span
+from journal.thetradeobject import SumReqFields, TheTradeObject, renameCharts
+
+# pylint: disable = C0103
+
+# The stored summary of a trade: the TheTradeObject DataFrame, its entries and the generic image
+# name it was made with
+Summary = collections.namedtuple('Summary', ['theTrade', 'entries', 'imageName'])
+
+
+def groupHashes(trades):
+    '''
+    Hash the fills of each (ticker, account) group.
+    :params trades: The DataFrame from InputDataFrame.processInputFile
+    :return: A dict of (ticker, account): hex digest
+    '''
+    rc = ReqCol()
+    cols = [col for col in rc.columns if col in trades.columns]
+    hashes = dict()
+    for key, group in trades.groupby([rc.ticker, rc.acct], sort=False):
+        h = pd.util.hash_pandas_object(group[cols], index=False)
+        hashes[key] = hashlib.sha1(h.values.tobytes()).hexdigest()
+    return hashes
+
+
+def imageNames(ldf):
+    '''
+    Create the generic image name of each trade. Structjour adds the interval to make the names
+    of specific images. Up to three images can be saved for each trade.
+    '''
+    frq = FinReqCol()
+    names = list()
+    for tdf in ldf:
+        start = pd.Timestamp(tdf[frq.start].unique()[-1])
+        dur = tdf[frq.dur].unique()[-1]
+        if isinstance(dur, pd.Timedelta):
+            dur = dur.__str__()
+        dur = dur.replace(' ', '_')
+        imageName = '{0}_{1}_{2}_{3}.{4}'.format(tdf[frq.tix].unique()[-1].replace(' ', ''),
+                                                 tdf[frq.name].unique()[-1].replace(' ', '-'),
+                                                 start.strftime('%H:%M:%S'), dur, 'png')
+        names.append(imageName.replace(':', ''))
+    return names
+
+
+def summarize(ldf, names, reuse=None):
+    '''
+    Return a Summary for each trade in ldf. A trade with a stored Summary in reuse keeps it, the
+    user entries included, and its chart names follow the trade to its current position.
+    :params ldf: The list of trade DataFrames
+    :params names: The generic image names from imageNames(ldf)
+    :params reuse: A list parallel to ldf of Summary or None, as from IncrementalTrades.summaries
+    '''
+    srf = SumReqFields()
+    reuse = reuse if reuse else [None] * len(ldf)
+    assert len(reuse) == len(ldf) == len(names)
+    summaries = list()
+    for imageName, tdf, prev in zip(names, ldf, reuse):
+        if prev is None:
+            tto = TheTradeObject(tdf, False, srf)
+            tto.runSummary(imageName)
+            summaries.append(Summary(tto.TheTrade, tto.entries, imageName))
+            continue
+        if not isinstance(prev, Summary):
+            raise TypeError(f'A stored summary must be a Summary, not {type(prev).__name__}')
+        if prev.imageName != imageName:
+            prev = Summary(renameCharts(prev.theTrade, prev.imageName, imageName),
+                           prev.entries, imageName)
+        summaries.append(prev)
+    return summaries
+
+
+def dayKey(indir, infile, theDate, source):
+    '''
+    Identify a run of a statement by the file the user picked. The JournalFiles returned by
+    loadStatement is not used because the DAS parser resets its infile to tradesByTicket.csv.
+    '''
+    path = os.path.normpath(os.path.join(indir, infile)) if infile else indir
+    return (path, pd.Timestamp(theDate).strftime('%Y-%m-%d'), source)
+
+
+def incrementalFor(incremental, indir, infile, theDate, source):
+    '''
+    Return incremental if it holds the trades of the same statement, else a new
+    IncrementalTrades for it.
+    '''
+    day = dayKey(indir, infile, theDate, source)
+    if incremental is None or incremental.day != day:
+        return IncrementalTrades(source, day)
+    return incremental
+
+
+class IncrementalTrades:
+    '''
+    Keep the trades of a day by (ticker, account) group and recompute only the changed groups.
+    :attribute day: The dayKey of the statement the trades came from
+    :attribute groups: dict of (ticker, account): {'hash': str, 'trades': list of trade
+            DataFrames, 'summaries': list of the callers summaries for the trades or None}
+    '''
+
+    def __init__(self, source='DAS', day=None):
+        self.source = source
+        self.day = day
+        self.groups = dict()
+        self.changed = list()
+
+    def update(self, trades):
+        '''
+        Define the trades for the changed groups and combine them with the unchanged groups. The
+        result is the same as DefineTrades.processOutputDframe for all of trades.
+        :params trades: The DataFrame from InputDataFrame.processInputFile
+        :return (inputlen, dframe, ldf): As returned by DefineTrades.processOutputDframe
+        '''
+        rc = ReqCol()
+        c = FinReqCol(self.source)
+        hashes = groupHashes(trades)
+        self.changed = [k for k, h in hashes.items()
+                        if k not in self.groups or self.groups[k]['hash'] != h]
+
+        with span('IncrementalTrades.update', groups=len(hashes), changed=len(self.changed)):
+            groups = {k: self.groups[k] for k in hashes if k not in self.changed}
+            if self.changed:
+                keys = set(self.changed)
+                mask = [k in keys for k in zip(trades[rc.ticker], trades[rc.acct])]
+                dummy, dummy, ldf = DefineTrades(self.source).processOutputDframe(
+                    trades[mask].copy())
+                for key in self.changed:
+                    groups[key] = {'hash': hashes[key], 'trades': list(), 'summaries': None}
+                for tdf in ldf:
+                    key = (tdf[c.ticker].iloc[-1], tdf[c.acct].iloc[-1])
+                    groups[key]['trades'].append(tdf)
+
+            # DefineTrades orders the trades by ticker and account and numbers them in that order
+            self.groups = {k: groups[k] for k in sorted(groups)}
+            return self.combine()
+
+    def combine(self):
+        '''
+        Number the trades of all the groups in order and add the summary rows.
+        :return (inputlen, dframe, ldf): As returned by DefineTrades.processOutputDframe
+        '''
+        c = FinReqCol(self.source)
+        ldf = self.tradeList()
+        for i, tdf in enumerate(ldf):
+            tdf[c.tix] = f'Trade {i + 1}'
+        inputlen, dframe = DefineTrades(self.source).summarizeTrades(pd.concat(ldf))
+        return inputlen, dframe, ldf
+
+    def tradeList(self):
+        '''Return the list of trade DataFrames for all the groups'''
+        return [tdf for group in self.groups.values() for tdf in group['trades']]
+
+    def summaries(self):
+        '''
+        Return a list parallel to tradeList with the stored summary for each trade, None for the
+        trades in changed groups.
+        '''
+        summaries = list()
+        for group in self.groups.values():
+            if group['summaries'] is None:
+                summaries.extend([None] * len(group['trades']))
+            else:
+                summaries.extend(group['summaries'])
+        return summaries
+
+    def setSummaries(self, summaries):
+        '''
+        Store the summaries for the trades.
+        :params summaries: A list of Summary parallel to tradeList, as from summarize
+        '''
+        assert len(summaries) == len(self.tradeList())
+        i = 0
+        for group in self.groups.values():
+            group['summaries'] = summaries[i:i + len(group['trades'])]
+            i += len(group['trades'])
@@ -0,0 +1,177 @@
+'''
+Timing spans for the stages of the structjour pipeline. Each span is logged as one line of json
+to the 'structjour.stages' logger with the elapsed time and any counts (rows, trades) given to
+it. Optionally a span is profiled with cProfile or measured with tracemalloc.
+
+    with span('DefineTrades', rows=len(trades)) as s:
+        ...
+        s.set(trades=len(ldf))
+
+    @timed('DefineTrades.addTradeIndex')
+    def addTradeIndex(self, dframe):
+
+Nothing is written until configure is called or these environment variables are set:
+    STRUCTJOUR_STAGELOG: A file for the json lines or '-' for stderr.
+    STRUCTJOUR_PROFILE: 'cprofile', 'tracemalloc' or 'cprofile,tracemalloc'.
+    STRUCTJOUR_PROFILEDIR: The directory for the cProfile stats files.
+
+A span inside a profiled span is not profiled separately. Its time is part of the outer
+profile.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# pylint: disable = C0103
+
+logger = logging.getLogger('structjour.stages')
+
+_config = {'cprofile': False, 'tracemalloc': False,
+           'profileDir': os.path.join(tempfile.gettempdir(), 'structjour_profile')}
+_local = threading.local()
+_counter = [0]
+
+
+def configure(log=None, profile=None, profileDir=None):
+    '''
+    Turn on the span log and profiling.
+    :params log: A file name, '-' for stderr, or a logging.Handler.
+    :params profile: A string or list containing 'cprofile' and/or 'tracemalloc'.
+    :params profileDir: The directory for cProfile stats files.
+    '''
+    if log:
+        handler = log
+        if not isinstance(log, logging.Handler):
+            handler = logging.StreamHandler(sys.stderr) if log == '-' \
+                else logging.FileHandler(log)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    if profile is not None:
+        if isinstance(profile, str):
+            profile = [p.strip() for p in profile.split(',')]
+        _config['cprofile'] = 'cprofile' in profile
+        _config['tracemalloc'] = 'tracemalloc' in profile
+        if _config['tracemalloc'] and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    if profileDir:
+        _config['profileDir'] = profileDir
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = list()
+    return _local.stack
+
+
+class Span:
+    '''
+    Time one stage. Use span() to create it. The counts given to span or to set are added to
+    the log record.
+    '''
+
+    def __init__(self, name, **counts):
+        self.name = name
+        self.counts = counts
+        self.record = None
+        self.profile = None
+        self.start = 0.0
+        self.mem = 0
+
+    def set(self, **counts):
+        '''Add counts, for example trades=len(ldf), to the record'''
+        self.counts.update(counts)
+
+    def __enter__(self):
+        stack = _stack()
+        self.outer = not any(s.profile for s in stack)
+        stack.append(self)
+        if _config['tracemalloc'] and tracemalloc.is_tracing():
+            if len(stack) == 1:
+                tracemalloc.reset_peak()
+            self.mem = tracemalloc.get_traced_memory()[0]
+        if _config['cprofile'] and self.outer:
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another thread is profiling. Only one profiler can be active at a time.
+                self.profile = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = _stack()
+        if self.profile:
+            self.profile.disable()
+        stack.pop()
+
+        record = {'span': '/'.join([s.name for s in stack] + [self.name]),
+                  'ms': round(elapsed * 1000, 3)}
+        record.update(self.counts)
+        if exc_type:
+            record['error'] = exc_type.__name__
+        if _config['tracemalloc'] and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record['allocKB'] = round((current - self.mem) / 1024, 1)
+            if not stack:
+                record['peakKB'] = round(peak / 1024, 1)
+        if self.profile:
+            record['profile'] = self.saveProfile()
+        self.record = record
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, default=str))
+        return False
+
+    def saveProfile(self):
+        '''Save the cProfile stats for this span and return the file name'''
+        d = _config['profileDir']
+        if not os.path.exists(d):
+            os.makedirs(d)
+        _counter[0] += 1
+        fname = os.path.join(d, f'{self.name}.{os.getpid()}.{_counter[0]}.prof')
+        self.profile.dump_stats(fname)
+        return fname
+
+
+def span(name, **counts):
+    '''Return a Span context manager for the stage name'''
+    return Span(name, **counts)
+
+
+def timed(name=None):
+    '''
+    Decorate a function or method with a span. The rows count is the length of the first
+    argument (after self) that has a length, normally the DataFrame being processed.
+    '''
+    def decorator(func):
+        spanName = name if name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counts = dict()
+            for arg in args:
+                if hasattr(arg, '__len__') and not isinstance(arg, str):
+                    counts['rows'] = len(arg)
+                    break
+            with Span(spanName, **counts):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+configure(log=os.environ.get('STRUCTJOUR_STAGELOG'), profile=os.environ.get('STRUCTJOUR_PROFILE'),
+          profileDir=os.environ.get('STRUCTJOUR_PROFILEDIR'))
@@ -4,6 +4,8 @@ Created on Oct 18, 2018
 @author: Mike Petersen
 '''
 import os
+from collections import namedtuple
+
 import pandas as pd
 import numpy as np
 import datetime as dt
@@ -15,8 +17,10 @@ from openpyxl.styles import Font, colors
 
 # from inspiration.inspire import Inspire
 from inspiration.inspire import Inspire
+from journal.dailystats import DailyStats
 from journal.dfutil import DataFrameUtil
-from journal.definetrades import FinReqCol
+from journal.definetrades import FinReqCol, formatTimes
+from journal.filltable import FILLSHEET, fillsFrame
 from journal.xlimage import XLImage
 from journal.tradestyle import c as tcell
 from journal.tradestyle import style_range
@@ -33,6 +37,78 @@ def askUser(question):
     return response
 
 
+# The rows of one trade in the sheet. tableRow is the DataFrame row of the first row of the mini
+# trade table. formRow is the Excel row of the top of the trade summary form and its image.
+TradePlacement = namedtuple('TradePlacement', ['tableRow', 'tableLen', 'formRow', 'imageName',
+                                               'name', 'start', 'dur'])
+
+
+def imageNames(tdf, ft='png'):
+    '''
+    Return (image name, deprecated name, start, duration) of the trade tdf
+    '''
+    frq = FinReqCol()
+    start = pd.Timestamp(tdf[frq.start].unique()[-1]).strftime('%H:%M:%S')
+    imageName = '{0}_{1}_{2}_{3}.{4}'.format(tdf[frq.tix].unique()[-1].replace(' ', ''),
+                                             tdf[frq.name].unique()[-1].replace(' ', '-'),
+                                             start, tdf[frq.dur].unique()[-1], ft)
+    name = tdf[frq.tix].unique()[0].replace(' ', '') + '.' + ft
+    return imageName, name, start, tdf[frq.dur].unique()[-1]
+
+
+class LayoutPlan:
+    '''
+    The rows of the sheet. The top margin is followed by the table of all the trades. Then each
+    trade has its mini trade table followed by the space for its summary form and image. Every
+    row is figured from the lengths of the tables.
+    :attribute placements: A list of TradePlacement, one for each trade
+    :attribute numRows: The number of rows in the sheet DataFrame
+    '''
+
+    def __init__(self, topMargin, tableLen, tradeLens, summarySize, spacing, names):
+        '''
+        :params topMargin: The blank rows before the table of all the trades
+        :params tableLen: The length of the table of all the trades
+        :params tradeLens: The length of each mini trade table
+        :params summarySize: The rows after each mini trade table for the summary form
+        :params spacing: The rows between a mini trade table and its summary form
+        :params names: The imageNames of each trade
+        '''
+        self.topMargin = topMargin
+        self.tableLen = tableLen
+        self.placements = list()
+        row = topMargin + tableLen
+        for tradeLen, (imageName, name, start, dur) in zip(tradeLens, names):
+            self.placements.append(TradePlacement(row, tradeLen, row + tradeLen + spacing,
+                                                  imageName, name, start, dur))
+            row += tradeLen + summarySize
+        self.numRows = row
+
+    def imageLocation(self):
+        '''
+        Return the imageLocation list used by runSummaries and populateMistakeForm. Each has:
+        [form row, deprecated name, image name, trade start time, trade duration]
+        '''
+        return [[p.formRow, p.name, p.imageName, p.start, p.dur] for p in self.placements]
+
+    def sheetFrame(self, df, ldf):
+        '''
+        Create the outline of the sheet in one pass. Blank rows are empty strings. The times are
+        written as text.
+        :params df: The table of all the trades
+        :params ldf: The mini trade tables in the order of the placements
+        :return: A DataFrame with numRows rows and the columns of df
+        '''
+        cols = df.columns
+        cells = np.full((self.numRows, len(cols)), '', dtype=object)
+        cells[self.topMargin:self.topMargin + self.tableLen] = formatTimes(df).to_numpy(
+            dtype=object)
+        for p, tdf in zip(self.placements, ldf):
+            cells[p.tableRow:p.tableRow + p.tableLen] = formatTimes(tdf).reindex(
+                columns=cols).to_numpy(dtype=object)
+        return pd.DataFrame(cells, columns=cols)
+
+
 class LayoutSheet:
     '''
     Contains methods to layout the material on the excel page. Uses both
@@ -56,6 +132,19 @@ class LayoutSheet:
         self.inputlen = inputlen
         self.spacing = spacing
         self.DSFAnchor = None
+        self.fillTables = list()
+        self.dailyStats = None
+
+    def plan(self, df, ldf, ft="png"):
+        '''
+        Compute the rows of everything in the sheet from the lengths of the tables alone.
+        :params df: The DataFrame of all the trades from processOutputDframe
+        :params ldf: A list of DataFrames. Each encapsulates a trade.
+        :parmas ft: Image filetype extension.
+        :return: The LayoutPlan
+        '''
+        return LayoutPlan(self.topMargin, len(df), [len(tdf) for tdf in ldf], self.summarySize,
+                          self.spacing, [imageNames(tdf, ft) for tdf in ldf])
 
     def imageData(self, df, ldf, ft="png"):
         '''
@@ -72,38 +161,8 @@ class LayoutSheet:
                     outline used to create the workbook, ImageLocation will be used to stye it
                     and fill in the stuff.
         '''
-        # Add rows and append each trade, leaving space for an image. Create a list of
-        # names and row numbers to place images within the excel file (imageLocation
-        # data structure).
-
-        # Number of rows between trade summaries
-        frq = FinReqCol()
-        newdf = DataFrameUtil.createDf(df, self.topMargin)
-
-        df = newdf.append(df, ignore_index=True)
- 
-        imageLocation = list()
-        count = 0
-        for tdf in ldf:
-            imageName = '{0}_{1}_{2}_{3}.{4}'.format(tdf[frq.tix].unique()[-1].replace(' ', ''),
-                                                     tdf[frq.name].unique()[-1].replace(' ', '-'),
-                                                     tdf[frq.start].unique()[-1],
-                                                     tdf[frq.dur].unique()[-1], ft)
-
-            # Holds location, deprected name, image name, trade start time, trade duration as delta
-            imageLocation.append([len(tdf) + len(df) + self.spacing,
-                                  tdf.Tindex.unique()[0].replace(
-                                      ' ', '') + '.' + ft,
-                                  imageName,
-                                  tdf.Start.unique()[-1],
-                                  tdf.Duration.unique()[-1]])
-            # print(count, imageName, len(imageLocation), len(tdf) + len(df) + 3)
-            count = count + 1
-
-            # Append the mini trade table then add rows to fit the tradeSummary form
-            df = df.append(tdf, ignore_index=True)
-            df = DataFrameUtil.addRows(df, self.summarySize)
-        return imageLocation, df
+        plan = self.plan(df, ldf, ft)
+        return plan.imageLocation(), plan.sheetFrame(df, ldf)
 
     def createWorkbook(self, dframe):
         '''
@@ -167,7 +226,7 @@ class LayoutSheet:
         ws["A6"].style = tf.styles["explain"]
         style_range(ws, "A6:M24", border=tf.styles["explain"].border)
 
-    def runSummaries(self, imageLocation, ldf, jf, ws, tf):
+    def runSummaries(self, imageLocation, ldf, jf, ws, tf, interactive=True):
         '''
         This is a runner script. For each trade DataFrame in the list ldf we will get and place
         the chart image, call TheTradeObject.runSummary to gather the summary data into the
@@ -179,19 +238,23 @@ class LayoutSheet:
         :params jf: The JournalFiles object containing needed path locations
         :params ws: The openpyx Worksheet object to work on
         :params tf: The TradeFormat object with data and methods for creating the Trade Summaries.
+        :params interactive: If False, do not ask for the images or the interview.
         :return tradeSummaries: A list of 1 row DataFrames created by TheTradeObject. Each has 1
                     row representing one trade and contains multiple columns for entries and exits.
         '''
         tradeSummaries = list()
-        XL = XLImage()
+        self.fillTables = list()
+        XL = XLImage() if interactive else None
         srf = SumReqFields()
 
-        response = askUser("Would you like to enter strategy names, targets and stops?   ")
-        interview = True if response.lower().startswith('y') else False
+        interview = False
+        if interactive:
+            response = askUser("Would you like to enter strategy names, targets and stops?   ")
+            interview = True if response.lower().startswith('y') else False
 
         for loc, tdf in zip(imageLocation, ldf):
 
-            img = XL.getAndResizeImage(loc[2], jf.outdir)
+            img = XL.getAndResizeImage(loc[2], jf.outdir) if interactive else None
 
             # Hidden here is the location to place the chart on the page.
             if img:
@@ -204,6 +267,7 @@ class LayoutSheet:
             tto = TheTradeObject(tdf, interview, srf)
             tto.runSummary(None)
             tradeSummaries.append(tto.TheTrade)
+            self.fillTables.append(tto.entries)
 
             #Place the format shapes/styles in the worksheet
             tf.formatTrade(ws, srf, anchor=(1, loc[0]))
@@ -230,6 +294,9 @@ class LayoutSheet:
                 if not tradeval:
                     continue
                 if isinstance(tradeval, (pd.Timestamp, dt.datetime, np.datetime64)):
+                    # HOLD entries have no time
+                    if pd.isnull(tradeval):
+                        continue
                     tradeval = pd.Timestamp(tradeval)
 
 
@@ -310,106 +377,36 @@ class LayoutSheet:
                              is a single row DataFrame containg all the data for trade summaries.
         :params mistke:
         :params ws: The openpyxl Worksheet object
-        :raise Value Error: When pl is misformatted and cannot be used.
+        :return: The DailyStats
         '''
-        srf = SumReqFields()
-        liveWins = list()
-        liveLosses = list()
-        simWins = list()
-        simLosses = list()
-        maxTrade = (0, "notrade")
-        minTrade = (0, "notrade")
-        #Didnot save the Trade number in TheTrade.  These should be the same order...
-        count = 0
-
-        for TheTrade in TheTradeList:
-            pl = TheTrade[srf.pl].unique()[0]
-            live = True if TheTrade[srf.acct].unique()[0] == "Live" else False
-            count = count + 1
-
-            # A bug-ish inspired baby-sitter
-            if isinstance(pl, str):
-                if pl == '':
-                    pl = 0
-                else:
-                    try:
-                        pl = float(pl)
-                    except NameError:
-                        raise ValueError(
-                            'Malformed float for variable pl in createDailySummary')
-
-            # print(pl)
-            if float(pl) > maxTrade[0]:
-                maxTrade = (pl, "Trade{0}, {1}, {2}".format(
-                    count, TheTrade[srf.acct].unique()[0], TheTrade[srf.name].unique()[0]))
-            if pl < minTrade[0]:
-                minTrade = (pl, "Trade{0}, {1}, {2}".format(
-                    count, TheTrade[srf.acct].unique()[0], TheTrade[srf.name].unique()[0]))
-
-            if live:
-                if pl > 0:
-                    liveWins.append(pl)
-                else:
-                    liveLosses.append(pl)
-            else:
-                if pl > 0:
-                    simWins.append(pl)
-                else:
-                    simLosses.append(pl)
-
+        stats = DailyStats(TheTradeList)
+        self.dailyStats = stats
         anchor = (anchor[0], anchor[1] + mistake.numTrades + 5)
         self.DSFAnchor = anchor
 
-        dailySumData = dict()
-        dailySumData['livetot'] = sum([sum(liveWins), sum(liveLosses)])
-
-        numt = len(liveWins) + len(liveLosses)
-        if numt == 0:
-            dailySumData['livetotnote'] = "0 Trades"
-        else:
-            note = "{0} Trade{1}, {2} Winner{3}, {4}, Loser{5}"
-            note = note.format(numt, "" if numt == 1 else "s", len(liveWins),
-                               "" if len(liveWins) == 1 else "s", len(
-                                   liveLosses),
-                               "" if len(liveLosses) == 1 else "s")
-            dailySumData['livetotnote'] = note
-        dailySumData['simtot'] = sum([sum(simWins), sum(simLosses)])
-
-        # 9 trades,  3 Winners, 6 Losers
-        numt = len(simWins) + len(simLosses)
-        if numt == 0:
-            dailySumData['simtotnote'] = "0 Trades"
-        else:  # 4 trades, 1 Winner, 3 Losers
-            note = "{0} Trade{1}, {2} Winner{3}, {4}, Loser{5}"
-            note = note.format(numt, "" if numt == 1 else "s",
-                               len(simWins), "" if len(simWins) == 1 else "s",
-                               len(simLosses), "" if len(simLosses) == 1 else "s")
-            dailySumData['simtotnote'] = note
-
-        dailySumData['highest'] = maxTrade[0]
-        dailySumData['highestnote'] = maxTrade[1]
-        dailySumData['lowest'] = minTrade[0]
-        dailySumData['lowestnote'] = minTrade[1]
-        if (len(liveWins) + len(simWins)) == 0:
-            dailySumData['avgwin'] = 0
-        else:
-            dailySumData['avgwin'] = sum(
-                [sum(liveWins), sum(simWins)]) / (len(liveWins) + len(simWins))
-        dailySumData['avgwinnote'] = "X {} =  ${:.2f}".format(
-            len(liveWins) + len(simWins), sum([sum(liveWins), sum(simWins)]))
-        if len(liveLosses) + len(simLosses) == 0:
-            dailySumData['avgloss'] = 0
-        else:
-            dailySumData['avgloss'] = sum([sum(liveLosses), sum(
-                simLosses)]) / (len(liveLosses) + len(simLosses))
-        dailySumData['avglossnote'] = "X {} =  (${:.2f})".format(
-            len(liveLosses) + len(simLosses), abs(sum([sum(liveLosses), sum(simLosses)])))
-
+        dailySumData = stats.dailySumData()
         for key in dailySumData.keys():
             rng = mistake.dailySummaryFields[key][0]
             if isinstance(rng, list):
                 rng = rng[0]
             ws[tcell(rng, anchor=anchor)] = dailySumData[key]
+        return stats
+
+    def writeFills(self, wb, tradeSummaries):
+        '''
+        Write every fill of every trade to the Fills worksheet. The trade summary forms have room
+        for 8 entries and exits. The Fills sheet has them all.
+        :params wb: The openpyxl Workbook
+        :params tradeSummaries: The TheTrade DataFrames returned by runSummaries
+        :return: The Fills Worksheet
+        '''
+        ws = wb.create_sheet(FILLSHEET)
+        df = fillsFrame(tradeSummaries, self.fillTables)
+        for r in dataframe_to_rows(df, index=False, header=True):
+            ws.append(r)
+        for cell in ws['F'][1:]:
+            cell.number_format = 'h:mm:ss'
+        return ws
 
     def save(self, wb, jf):
         '''
@@ -0,0 +1,187 @@
+'''
+Live mode for a DAS trades export that grows during the session. TailReader reads only the rows
+appended since the last read. LiveTrades keeps the trades of each (ticker, account) by its share
+balance. A trade is closed when its balance returns to 0 and is not computed again. The fills of
+the open trade go through DefineTrades with each new fill, the open shares shown as held after
+the close.
+
+Live mode starts each ticker flat. Shares held before the open are not known until the positions
+file is exported, so run the day with Go after the close to get the holds.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import io
+import os
+
+import pandas as pd
+
+from journal.definetrades import DefineTrades, FinReqCol, ReqCol
+from journal.incremental import IncrementalTrades
+from journal.instrument import span
+from journal.pandasutil import InputDataFrame
+from journal.statement import Statement_DAS
+
+# pylint: disable = C0103
+
+
+class TailReader:
+    '''
+    Read the rows appended to a csv file since the last read. A partly written last line is left
+    for the next read. If the file was replaced by a shorter file or its last read line changed,
+    the file was rewritten and the next read starts over.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.offset = 0
+        self.lastLine = b''
+        self.reset = False
+
+    def rewritten(self, size):
+        '''Return True if the file no longer continues what was read'''
+        if size < self.offset:
+            return True
+        if not self.lastLine:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset - len(self.lastLine))
+            return f.read(len(self.lastLine)) != self.lastLine
+
+    def read(self):
+        '''
+        Return a DataFrame of the complete rows appended since the last read, or None if there are
+        none. After the file was rewritten, self.reset is True and all the rows are returned.
+        '''
+        self.reset = False
+        if not os.path.exists(self.path):
+            return None
+        size = os.path.getsize(self.path)
+        if self.offset and self.rewritten(size):
+            self.header = None
+            self.offset = 0
+            self.lastLine = b''
+            self.reset = True
+        if size == self.offset:
+            return None
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return None
+        lines = data[:end].splitlines(keepends=True)
+        self.offset += end
+        self.lastLine = lines[-1]
+        if self.header is None:
+            self.header = lines.pop(0)
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return None
+        return pd.read_csv(io.BytesIO(self.header + b''.join(lines)))
+
+
+class LiveTrades(IncrementalTrades):
+    '''
+    The trades of the day from DAS fills that arrive during the session. Each group keeps the
+    closed trades, the fills of the open trade and the Cloids of the closed tickets. A new fill
+    recomputes the open trade of its group only. A late fill for a closed ticket recomputes the
+    group.
+    '''
+
+    def __init__(self, theDate=None):
+        super().__init__('DAS')
+        self.theDate = pd.Timestamp(theDate) if theDate else pd.Timestamp.today().normalize()
+
+    def getTickets(self, fills):
+        '''Reduce the fills of one group to tickets the way Statement_DAS.getTrades does'''
+        fills = fills.copy()
+        fills['Date'] = self.theDate
+        sdas = Statement_DAS(None, fills)
+        tickets = pd.concat([sdas.createSingleTicket(t) for t in sdas.getListOfTicketDF()])
+        return tickets.reset_index(drop=True)
+
+    def splitClosed(self, tickets):
+        '''
+        Follow the share balance through the tickets of one group.
+        :params tickets: The tickets from getTickets after InputDataFrame.mkShortsNegative
+        :return: (The number of tickets in closed trades, the balance after all the tickets)
+        '''
+        rc = ReqCol()
+        balance = 0
+        closed = 0
+        for i, qty in enumerate(tickets[rc.shares]):
+            balance += qty
+            if balance == 0:
+                closed = i + 1
+        return closed, balance
+
+    def defineGroup(self, fills):
+        '''
+        Define the trades for the fills of one group. An open balance at the end gets a HOLD row
+        the same as shares held after the close.
+        :return: (trades, closedCloids, openFills). The list of trade DataFrames, the Cloids in the
+                closed trades and the fills of the open trade.
+        '''
+        rc = ReqCol()
+        c = FinReqCol()
+        idf = InputDataFrame()
+        tickets = self.getTickets(fills)
+        tickets = tickets.sort_values([rc.time], kind='mergesort').reset_index(drop=True)
+        tickets = idf.mkShortsNegative(tickets)
+        closed, balance = self.splitClosed(tickets)
+        closedCloids = set(tickets.Cloid[:closed])
+        if balance:
+            swingTrade = [{'ticker': tickets[rc.ticker].iloc[0], 'acct': tickets[rc.acct].iloc[0],
+                           'shares': 0, 'before': 0, 'after': balance}]
+            tickets = idf.insertOvernightRow(tickets, swingTrade)
+        dummy, dummy, ldf = DefineTrades(self.source).processOutputDframe(tickets)
+        if balance:
+            tdf = ldf[-1]
+            tdf.at[tdf.index[-1], c.name] = tdf.at[tdf.index[-1], c.name].replace(
+                ' OVERNIGHT', ' OPEN')
+        openFills = fills[~fills.Cloid.isin(closedCloids)]
+        return ldf, closedCloids, openFills
+
+    def update(self, fills):
+        '''
+        Add the new fills and define the trades that changed.
+        :params fills: The new rows of the DAS trades export
+        :return (inputlen, dframe, ldf): As returned by DefineTrades.processOutputDframe
+        '''
+        rc = ReqCol()
+        self.changed = list()
+        with span('LiveTrades.update', rows=len(fills)) as s:
+            for key, new in fills.groupby([rc.ticker, rc.acct], sort=False):
+                group = self.groups.get(key)
+                if group is None:
+                    group = {'hash': None, 'trades': list(), 'summaries': None,
+                             'fills': new.iloc[:0], 'open': new.iloc[:0],
+                             'closed': list(), 'closedCloids': set()}
+                    self.groups[key] = group
+                group['fills'] = pd.concat([group['fills'], new])
+                summaries = group['summaries'] if group['summaries'] else list()
+                if set(new.Cloid) & group['closedCloids']:
+                    # A late fill for a closed ticket
+                    group['closed'], group['closedCloids'] = list(), set()
+                    group['open'] = group['fills']
+                    summaries = list()
+                else:
+                    group['open'] = pd.concat([group['open'], new])
+                    summaries = summaries[:len(group['closed'])]
+
+                ldf, closedCloids, group['open'] = self.defineGroup(group['open'])
+                numClosed = len(ldf) - (1 if len(group['open']) else 0)
+                group['closed'] = group['closed'] + ldf[:numClosed]
+                group['closedCloids'] = group['closedCloids'] | closedCloids
+                group['trades'] = group['closed'] + ldf[numClosed:]
+                group['summaries'] = summaries + [None] * (len(group['trades']) - len(summaries))
+                self.changed.append(key)
+            s.set(changed=len(self.changed))
+
+            self.groups = {k: self.groups[k] for k in sorted(self.groups)}
+            return self.combine()
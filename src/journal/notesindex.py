@@ -0,0 +1,226 @@
+'''
+A full text index of the explanations, notes and mistake notes of the trades. Each saved trade
+is a row of the table trade_notes in structjour.sqlite with its date, ticker, account, strategy
+and P/L. The FTS5 table notes_fts indexes the three text columns and is kept in sync with
+trade_notes by triggers. Saving a day rewrites only the trades whose text or metadata changed.
+
+Search from the src directory:
+    python -m journal.notesindex vwap reversal
+    python -m journal.notesindex "chased*" --ticker AAPL --limit 20
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import argparse
+import hashlib
+import re
+import sys
+
+import pandas as pd
+
+from journal.dailystats import toMoney
+from journal.database import getPool
+from journal.settings import getDB
+from journal.thetradeobject import SumReqFields
+
+# pylint: disable = C0103
+
+NOTECOLUMNS = ['explain', 'notes', 'mstknote']
+RESULTCOLUMNS = ['theDate', 'ticker', 'name', 'account', 'strategy', 'pl', 'snippet']
+
+
+def ftsQuery(text):
+    '''
+    Turn the words of text into an FTS5 query that matches rows with all of them. Each word is
+    quoted so punctuation is not read as query syntax. A trailing * keeps the prefix search.
+    '''
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = re.sub(r'["*]', '', word)
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _text(val):
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return ''
+    return str(val)
+
+
+def noteRows(ts):
+    '''
+    Return a row for each trade summary: (trade, name, ticker, account, strategy, pl, explain,
+    notes, mstknote).
+    :params ts: The trade summaries. A dict of TheTrade DataFrames keyed by trade name as in
+            LayoutForms.ts or a list of them.
+    '''
+    srf = SumReqFields()
+    if isinstance(ts, dict):
+        items = list(ts.items())
+    else:
+        items = [(None, t) for t in ts]
+    rows = []
+    for i, (key, t) in enumerate(items, 1):
+        vals = t.iloc[0]
+        name = _text(vals.get(srf.name))
+        key = key if key else f'{i} {name}'
+        pl = float(toMoney([vals.get(srf.pl, 0)]).iat[0])
+        rows.append((key, name, name.split()[0] if name else '', _text(vals.get(srf.acct)),
+                     _text(vals.get(srf.strat)), pl, _text(vals.get(srf.explain)),
+                     _text(vals.get(srf.notes)), _text(vals.get(srf.mstknote))))
+    return rows
+
+
+def rowHash(row):
+    return hashlib.sha1(repr(row).encode('utf-8')).hexdigest()
+
+
+class NotesIndex:
+    '''The trade_notes table and its full text index notes_fts in the sqlite db'''
+
+    def __init__(self, db):
+        self.db = db
+        self.createTables()
+
+    def createTables(self):
+        with getPool(self.db).connection() as conn:
+            conn.executescript('''
+            CREATE TABLE if not exists trade_notes (
+            id	INTEGER PRIMARY KEY AUTOINCREMENT,
+            theDate	TEXT NOT NULL,
+            trade	TEXT NOT NULL,
+            name	TEXT,
+            ticker	TEXT,
+            account	TEXT,
+            strategy	TEXT,
+            pl	REAL,
+            explain	TEXT,
+            notes	TEXT,
+            mstknote	TEXT,
+            hash	TEXT NOT NULL,
+            UNIQUE(theDate, trade));
+
+            CREATE INDEX if not exists trade_notes_ticker ON trade_notes(ticker);
+
+            CREATE VIRTUAL TABLE if not exists notes_fts USING fts5(
+                explain, notes, mstknote, content='trade_notes', content_rowid='id');
+
+            CREATE TRIGGER if not exists trade_notes_ai AFTER INSERT ON trade_notes BEGIN
+                INSERT INTO notes_fts(rowid, explain, notes, mstknote)
+                VALUES (new.id, new.explain, new.notes, new.mstknote);
+            END;
+            CREATE TRIGGER if not exists trade_notes_ad AFTER DELETE ON trade_notes BEGIN
+                INSERT INTO notes_fts(notes_fts, rowid, explain, notes, mstknote)
+                VALUES ('delete', old.id, old.explain, old.notes, old.mstknote);
+            END;
+            CREATE TRIGGER if not exists trade_notes_au AFTER UPDATE ON trade_notes BEGIN
+                INSERT INTO notes_fts(notes_fts, rowid, explain, notes, mstknote)
+                VALUES ('delete', old.id, old.explain, old.notes, old.mstknote);
+                INSERT INTO notes_fts(rowid, explain, notes, mstknote)
+                VALUES (new.id, new.explain, new.notes, new.mstknote);
+            END;''')
+
+    def indexDay(self, theDate, ts):
+        '''
+        Bring the rows of theDate up to date with the trade summaries ts. Only the trades that
+        are new or changed are written and the trades no longer in ts are removed.
+        :params theDate: A date or a Timestamp
+        :params ts: The trade summaries as in LayoutForms.ts
+        :return: The number of rows written or deleted
+        '''
+        day = pd.Timestamp(theDate).strftime('%Y-%m-%d')
+        rows = {r[0]: r for r in noteRows(ts)}
+        with getPool(self.db).connection() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT trade, hash FROM trade_notes WHERE theDate = ?', (day,))
+            stored = dict(cur.fetchall())
+            changed = [(day,) + r + (rowHash(r),) for key, r in rows.items()
+                       if stored.get(key) != rowHash(r)]
+            gone = [(day, key) for key in stored if key not in rows]
+            cur.executemany('''
+                INSERT INTO trade_notes
+                    (theDate, trade, name, ticker, account, strategy, pl, explain, notes,
+                     mstknote, hash)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(theDate, trade) DO UPDATE SET
+                    name=excluded.name, ticker=excluded.ticker, account=excluded.account,
+                    strategy=excluded.strategy, pl=excluded.pl, explain=excluded.explain,
+                    notes=excluded.notes, mstknote=excluded.mstknote, hash=excluded.hash;''',
+                            changed)
+            cur.executemany('DELETE FROM trade_notes WHERE theDate = ? AND trade = ?', gone)
+        return len(changed) + len(gone)
+
+    def search(self, text, ticker=None, strategy=None, start=None, end=None, limit=50):
+        '''
+        Return the trades whose notes match all the words of text, best match first, as a
+        DataFrame with RESULTCOLUMNS. The snippet marks the matches with [ ].
+        :params ticker: Limit the search to one ticker
+        :params strategy: Limit the search to one strategy
+        :params start: The first date to include
+        :params end: The last date to include
+        '''
+        query = ftsQuery(text)
+        if not query:
+            return pd.DataFrame(columns=RESULTCOLUMNS)
+        where = ['notes_fts MATCH ?']
+        params = [query]
+        if ticker:
+            where.append('t.ticker = ?')
+            params.append(ticker.upper())
+        if strategy:
+            where.append('t.strategy = ?')
+            params.append(strategy)
+        if start is not None:
+            where.append('t.theDate >= ?')
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            where.append('t.theDate <= ?')
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        params.append(int(limit))
+        sql = f'''
+            SELECT t.theDate, t.ticker, t.name, t.account, t.strategy, t.pl,
+                snippet(notes_fts, -1, '[', ']', '...', 12) AS snippet
+            FROM notes_fts JOIN trade_notes t ON t.id = notes_fts.rowid
+            WHERE {' AND '.join(where)}
+            ORDER BY bm25(notes_fts)
+            LIMIT ?'''
+        with getPool(self.db).connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def rebuild(self):
+        '''Rebuild notes_fts from trade_notes'''
+        with getPool(self.db).connection() as conn:
+            conn.execute("INSERT INTO notes_fts(notes_fts) VALUES('rebuild')")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Search the notes of the journaled trades')
+    parser.add_argument('words', nargs='+', help='Find the trades with all of these words. '
+                        'End a word with * to match its prefix.')
+    parser.add_argument('--db', default=getDB(), help='The sqlite file. Defaults to '
+                        'structjour.sqlite in the journal directory.')
+    parser.add_argument('--ticker')
+    parser.add_argument('--strategy')
+    parser.add_argument('--start', help='The first date to search')
+    parser.add_argument('--end', help='The last date to search')
+    parser.add_argument('--limit', type=int, default=50)
+    opts = parser.parse_args(args)
+    if not opts.db:
+        parser.error('Set the sqlite file with --db')
+
+    df = NotesIndex(opts.db).search(' '.join(opts.words), opts.ticker, opts.strategy,
+                                    opts.start, opts.end, opts.limit)
+    if df.empty:
+        print('No trades found')
+        return 1
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 200):
+        print(df.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,14 +5,11 @@ Created on Sep 2, 2018
 '''
 import pandas as pd
 
-from PyQt5.QtCore import QSettings
-from PyQt5.QtWidgets import QMessageBox
-
-from journal.definetrades import ReqCol
+from journal.definetrades import ReqCol, formatTimes
 from journal.dfutil import DataFrameUtil
-from journal.statement import Statement_IBActivity, Statement_DAS
-from journalfiles import JournalFiles
-from journal.view.unbalancedcontrol import UnbalControl as Ubc
+from journal.positions import Positions, loadPositions, normPositions
+from journal.settings import getSettings
+from journal.instrument import timed
 
 # pylint: disable = C0103
 
@@ -52,6 +49,7 @@ class InputDataFrame:
             raise ValueError
 
 
+    @timed('InputDataFrame.processInputFile')
     def processInputFile(self, trades, theDate=None, jf=None):
         '''
         Run the methods for this object
@@ -59,100 +57,53 @@ class InputDataFrame:
         reqCol = ReqCol()
 
         DataFrameUtil.checkRequiredInputFields(trades, reqCol.columns)
-        trades = self.zeroPadTimeStr(trades)
-        trades = trades.sort_values([reqCol.acct, reqCol.ticker, reqCol.date, reqCol.time])
+        trades = self.addDateField(trades, theDate)
+        trades = trades.sort_values([reqCol.acct, reqCol.ticker, reqCol.time])
         trades = self.mkShortsNegative(trades)
         swingTrade = self.getOvernightTrades(trades)
         swingTrade, success = self.figureOvernightTransactions(trades, jf)
         if not success:
             return None, success
         trades = self.insertOvernightRow(trades, swingTrade)
-        trades = self.addDateField(trades, theDate)
         return trades, True
 
     def addDateField(self, trades, theDate):
         '''
-        Add the date column if it does not already exist and fill it with the date/time from the
-        given date or today and the time column
-        :params trades:
+        Set the Time column to the datetime64 of each transaction and the Date column to its trade
+        date. Times with no date are placed on the Date column or, if there is none, on theDate or
+        today. The statement parsers already give datetime64 times.
+        :params trades: The transactions. HOLD rows, if any, are in place. The index is a
+                        RangeIndex.
+        :return: The same DataFrame with the datetime64 Time and Date columns.
         '''
         c = ReqCol()
-        if not 'Date' in trades.columns:
-            if theDate:
-                theDate = pd.Timestamp(theDate)
-            else:
-                theDate = pd.Timestamp.today()
-            trades['Date'] = theDate
-
-            for i, row in trades.iterrows():
-                dd = row.Date
-                tt = row.Time
-                dadate = pd.Timestamp(dd.year, dd.month, dd.day, tt.hour, tt.minute, tt.second)
-                trades.at[i, 'Date'] = dadate
-            # We need to make up a date for Hold rows. Before holds were assigned an early AM time
-            # and after holds a late PM time. The times were assigned for sorting. Before holds
-            # will be given a date before a second trade date identified because they have been
-            # sorted by [account, ticker, time]. Likewise an an after hold will be given the next
-            # day after the previous trade. There should not be any single hold entries without an
-            # actual trade from this input file but we will assert that fact in order to find
-            # unaccountable weirdnesses.
-
-        for i, row in trades.iterrows():
-            if row[c.side].lower().startswith('hold'):
-
-                # Currently c.time a time string with no date. Compare early and late times
-                datime = row[c.time]
-                d = pd.Timestamp(datime)
-
-                early = pd.Timestamp(d.year, d.month, d.day, 3, 0, 0)
-                late = pd.Timestamp(d.year, d.month, d.day, 10, 59, 0)
-                delt = pd.Timedelta(days=1)
-                if d < early:
-                    assert row[c.side] in ['HOLD+B', 'HOLD-B']
-                    assert len(trades) > i + 1
-                    assert trades.at[i, c.ticker] == trades.at[i+1, c.ticker]
-
-                    # Create the made up date- the day before the first tx from this input for
-                    # this trade.
-                    tradeday = trades.at[i+1, c.date]
-                    tradeday = pd.Timestamp(tradeday)
-                    holdday = tradeday-delt
-                    holdtime = pd.Timestamp(
-                        holdday.year, holdday.month, holdday.day,  d.hour, d.minute, d.second)
-                    trades.at[i, 'Date'] = holdtime
-
-                elif d > late:
-                    assert row[c.side] in ['HOLD+', 'HOLD-']
-                    assert i > 0
-                    assert trades.at[i, c.ticker] == trades.at[i-1, c.ticker]
-
-                    tradeday = trades.at[i-1, c.date]
-                    tradeday = pd.Timestamp(tradeday)
-
-                    holdtime = tradeday + delt
-                    holdtime = pd.Timestamp(
-                        holdtime.year, holdtime.month, holdtime.day, d.hour, d.minute, d.second)
-                    # holdtime = holdtime.strftime('%Y-%m-%d %H:%M:%S')
-                    trades.at[i, c.date] = holdtime
-
+        if c.date in trades.columns:
+            dates = trades[c.date]
+        else:
+            dates = pd.Timestamp(theDate) if theDate else pd.Timestamp.today()
+        times = DataFrameUtil.tradeTimes(trades[c.time], dates)
+
+        # HOLD rows have no time. Their Side tells whether the shares were held before the trades
+        # of the ticker or after them. A before hold gets the day before the next trade and an
+        # after hold gets the day after the previous trade. There should not be any single hold
+        # entries without an actual trade from this input file but we will assert that fact in
+        # order to find unaccountable weirdnesses.
+        side = trades[c.side].astype(str)
+        before = side.isin(['HOLD+B', 'HOLD-B'])
+        after = side.isin(['HOLD+', 'HOLD-'])
+        times[before | after] = pd.NaT
+        day = times.dt.normalize()
+        delt = pd.Timedelta(days=1)
+        if before.any():
+            assert (trades[c.ticker].shift(-1)[before] == trades[c.ticker][before]).all()
+            day[before] = day.shift(-1)[before] - delt
+        if after.any():
+            assert (trades[c.ticker].shift(1)[after] == trades[c.ticker][after]).all()
+            day[after] = day.shift(1)[after] + delt
+        trades[c.time] = times
+        trades[c.date] = day
         return trades
 
-    def zeroPadTimeStr(self, dframe):
-        '''
-        Guarantee that the time format xx:xx:xx
-        '''
-
-        rc = ReqCol()
-        #         time = rc.time
-        for i, row in dframe.iterrows():
-            tm = row[rc.time]
-            tms = tm.split(":")
-            if int(len(tms[0]) < 2):
-                if not tms[0].startswith("0"):
-                    tm = "0" + tm
-                    dframe.at[i, rc.time] = tm
-        return dframe
-
     # Todo.  Doctor an input csv file to include fractional numer of shares for testing.
     #        Make it more modular by checking for 'HOLD'.
     #        It might be useful in a windowed version with menus to do things seperately.
@@ -220,19 +171,23 @@ class InputDataFrame:
                 i = i + 1
         return overnightTrade
 
-    def getOvernightTrades_DAS(self, swingTrade, pos_df):
+    def getOvernightTrades_DAS(self, swingTrade, positions):
         '''
-        Get overnight trades sorted from a statement or DAS positions export-now a DataFrame
+        Get overnight trades sorted from a statement or DAS positions export
         :params swingTrade: The data structure holding information on unbalanced shares for tickers
-        :params pos_df: The DataFrame with the positions information.
+        :params positions: The Positions from journal.positions or a DataFrame with the columns
+                Symb, Account and Shares.
         '''
-        # for i in range(len(swingTrade)):
+        if isinstance(positions, pd.DataFrame):
+            positions = Positions(normPositions(positions))
         for t in swingTrade:
-            if t['ticker'] in list(pos_df.Symb) and (t['acct'] == pos_df[pos_df.Symb == t['ticker']].Account.unique()[0]):
+            # A statement with several accounts may hold the same ticker in more than one
+            held = positions.lookup(t['ticker'], t['acct'])
+            if held is not None:
                 # Some shares were held after close
                 t['after'] = t['shares']
 
-                t['before'] = t['shares'] - int(pos_df[pos_df.Symb == t['ticker']].Shares.unique()[0])
+                t['before'] = t['shares'] - held
                 t['shares'] = 0
             else:
                 t['before'] = t['shares']
@@ -241,24 +196,15 @@ class InputDataFrame:
 
     def getPositions(self, jf):
         '''
-        Open the positions csv. It is either a DAS export or a file created to the same specs.
-        Currently, this file is only used when using a DAS export from the trades window and is
-        only necessary if any trades in the input file have balance trades before or after.
+        Get the positions held after close. For DAS they are in the positions csv, a DAS export
+        or a file created to the same specs. It is only necessary if any trades in the input file
+        have balance trades before or after. For IB they are in the statement.
         :params jf: The JournalFiles object. It may be None and the variable for the location at
                     jf.inpathfile2 may also be None.
-        :return: A DataFrame. If no results were retrieved, return an empty DataFrame.
-        :TODO: getPositions should be a virtual method--not sure how to implement it best
-        This aint java. For now just kludge solidly.
+        :return: A DataFrame with the columns Symb, Account, Shares and Avgcost. It is empty if
+                there are no positions.
         '''
-        if jf and jf.inputType == JournalFiles.inputType['das'] and jf.inpathfile2:
-            st = Statement_DAS(jf)
-            df = st.getPositions()
-            return df
-        elif jf and jf.inputType == JournalFiles.inputType['ib']:
-            st = Statement_IBActivity(jf)
-            df = st.getPositions()
-            return df
-        return pd.DataFrame()
+        return loadPositions(jf).df
 
     def figureOvernightTransactions(self, dframe, jf):
         '''
@@ -274,28 +220,28 @@ class InputDataFrame:
         # rc = ReqCol()
 
         swingTrade = self.getOvernightTrades(dframe)
-        pos = self.getPositions(jf)
-        reqcol = set(['Symb', 'Account', 'Shares'])
-        if not pos.empty:
-            if len(set(reqcol) & set(pos.columns)) == len(set(reqcol)):
-                swingTrade = self.getOvernightTrades_DAS(swingTrade, pos)
-                return swingTrade, True
-            else:
-                msg = '\nthe positions file lacks the correct headings. Required headings are:\n'
-                msg += f'{reqcol}\n'
-                raise ValueError(msg)
-        settings = QSettings('zero_substance', 'structjour')
+        positions = loadPositions(jf)
+        if not positions.empty:
+            swingTrade = self.getOvernightTrades_DAS(swingTrade, positions)
+            return swingTrade, True
+        settings = getSettings('zero_substance', 'structjour')
         runtype = settings.value('runType')
         if runtype == 'CONSOLE':
             swingTrade = self.consoleSwing(swingTrade)
             return swingTrade, True
         elif runtype == 'QT':
             return self.qtSwing(dframe, swingTrade)
-        msg = '\n\nRun Type for structjour must be either CONSOLE or QT as no other types are\n'
+        elif runtype == 'BATCH':
+            return self.batchSwing(swingTrade), True
+        msg = '\n\nRun Type for structjour must be CONSOLE, QT or BATCH as no other types are\n'
         msg += 'currently supported. WEB type is planned for January 2020.\n\n'
         raise TypeError(msg)
 
     def qtSwing(self, df, swingTrade):
+        # The console path does not load Qt
+        from PyQt5.QtWidgets import QMessageBox
+        from journal.view.unbalancedcontrol import UnbalControl as Ubc
+
         c = ReqCol()
         for strade in swingTrade:
             ubc = Ubc()
@@ -303,7 +249,7 @@ class InputDataFrame:
             trade = df[(df[c.ticker] == strade['ticker']) & (df[c.acct] == strade['acct'])]
             keepTrying = True
             while keepTrying:
-                ubc.runDialog(trade, strade['ticker'], strade['shares'], strade )
+                ubc.runDialog(formatTimes(trade), strade['ticker'], strade['shares'], strade )
                 ok = ubc.exec()
                 print(ok)
                 if strade['shares'] != 0:
@@ -371,6 +317,16 @@ class InputDataFrame:
         # # print(swingTrade)
         # return swingTrade
 
+    def batchSwing(self, swingTrade):
+        '''
+        Answer the console interview with its defaults for a run nobody is watching. The
+        unbalanced shares are held after the close.
+        '''
+        for trade in swingTrade:
+            trade['after'] = trade['shares']
+            trade['shares'] = 0
+        return swingTrade
+
     def consoleSwing(self, swingTrade):
         for i in range(len(swingTrade)):
             tryAgain = True
@@ -420,12 +376,14 @@ class InputDataFrame:
     def insertOvernightRow(self, dframe, swTrade):
         '''
         Insert non-transaction rows that show overnight transactions. Set Side to one of:
-        HOLD+, HOLD-, HOLD+B, HOLD_B
+        HOLD+, HOLD-, HOLD+B, HOLD_B. The HOLD rows have no time. A before hold is dated the day
+        before the trades of its ticker and an after hold the day after.
         :params dframe: The trades dataframe.
         :params swTrade: A data structure holding information about tickers with unbalanced shares.
         '''
 
         rc = ReqCol()
+        delt = pd.Timedelta(days=1)
 
         newdf = DataFrameUtil.createDf(dframe, 0)
 
@@ -445,7 +403,8 @@ class InputDataFrame:
                         for j, dummy in newldf.iterrows():
 
                             if j == len(newldf) - 1:
-                                newldf.at[j, rc.time] = '00:00:01'
+                                newldf.at[j, rc.time] = pd.NaT
+                                newldf.at[j, rc.date] = ldf[rc.date].iloc[0] - delt
                                 newldf.at[j, rc.ticker] = trade['ticker']
                                 if trade['before'] > 0:
                                     newldf.at[j, rc.side] = "HOLD-B"
@@ -470,7 +429,8 @@ class InputDataFrame:
                         for j, dummy in ldf.iterrows():
 
                             if j == len(ldf) - 1:
-                                ldf.at[j, rc.time] = '23:59:59'
+                                ldf.at[j, rc.time] = pd.NaT
+                                ldf.at[j, rc.date] = ldf.at[j - 1, rc.date] + delt
                                 ldf.at[j, rc.ticker] = trade['ticker']
 
                                 if trade['after'] > 0:
@@ -487,4 +447,6 @@ class InputDataFrame:
                                 ldf.at[j, rc.PL] = 0
 
             newdf = newdf.append(ldf, ignore_index=True, sort=False)
+        newdf[rc.time] = pd.to_datetime(newdf[rc.time])
+        newdf[rc.date] = pd.to_datetime(newdf[rc.date])
         return newdf
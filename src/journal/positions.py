@@ -0,0 +1,127 @@
+'''
+The shares held at the end of the day from a DAS positions export or an IB Activity Statement.
+Both are normalized to one frame with the columns Symb, Account, Shares and Avgcost. The
+positions of a file are read once and kept until the file changes. Positions.lookup finds the
+shares of a (ticker, account) for the overnight hold logic in InputDataFrame.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# pylint: disable = C0103
+
+POSITIONCOLUMNS = ['Symb', 'Account', 'Shares', 'Avgcost']
+
+_cache = dict()
+
+
+def emptyPositions():
+    return pd.DataFrame({'Symb': pd.Series(dtype=object),
+                         'Account': pd.Series(dtype=object),
+                         'Shares': pd.Series(dtype=np.int64),
+                         'Avgcost': pd.Series(dtype=np.float64)})
+
+
+def normPositions(df, requireCost=False):
+    '''
+    Return the positions in df as a frame with POSITIONCOLUMNS. Shares is int64 and Avgcost is
+    float64, NaN if df has no Avgcost. Rows with no shares are dropped.
+    :params df: A frame with the columns Symb, Account and Shares and maybe Avgcost.
+    :params requireCost: Drop the rows without a nonzero Avgcost. A DAS positions export lists
+            the positions closed today with a 0 cost.
+    :raise ValueError: If a required column is missing
+    '''
+    if df is None or df.empty:
+        return emptyPositions()
+    reqcol = ['Symb', 'Account', 'Shares']
+    if not set(reqcol) <= set(df.columns):
+        msg = '\nthe positions file lacks the correct headings. Required headings are:\n'
+        msg += f'{reqcol}\n'
+        raise ValueError(msg)
+    shares = pd.to_numeric(df['Shares'].astype(str).str.replace(',', ''), errors='coerce')
+    if 'Avgcost' in df.columns:
+        cost = pd.to_numeric(df['Avgcost'], errors='coerce')
+    else:
+        cost = pd.Series(np.nan, index=df.index)
+    keep = shares.notna() & (shares != 0)
+    if requireCost:
+        keep &= cost.notna() & (cost != 0)
+    return pd.DataFrame({'Symb': df['Symb'][keep].astype(str).values,
+                         'Account': df['Account'][keep].astype(str).values,
+                         'Shares': shares[keep].astype(np.int64).values,
+                         'Avgcost': cost[keep].astype(np.float64).values})
+
+
+def readPositions_DAS(path):
+    '''Read a DAS positions export or a file created to the same specs'''
+    return normPositions(pd.read_csv(path), requireCost=True)
+
+
+def readPositions_IBActivity(path):
+    '''Read the open positions of every account in an IB Activity Statement'''
+    from journal.statement import Statement_IBActivity, getSoup
+    return normPositions(Statement_IBActivity(None).getPositions(getSoup(path)))
+
+
+def positionsFile(jf):
+    '''Return (path, inputType) of the positions for jf or (None, None) if there are none'''
+    if not jf:
+        return None, None
+    if jf.inputType == 'DAS' and jf.inpathfile2:
+        return jf.inpathfile2, 'DAS'
+    if jf.inputType == 'IB_HTML':
+        return jf.inpathfile, 'IB_HTML'
+    return None, None
+
+
+def loadPositions(jf):
+    '''
+    Return the Positions for jf. The positions of each file are kept until the file changes.
+    :params jf: The JournalFiles object. It may be None and jf.inpathfile2 may be None.
+    '''
+    path, inputType = positionsFile(jf)
+    if not path or not os.path.exists(path):
+        return Positions(emptyPositions())
+    st = os.stat(path)
+    key = (os.path.realpath(path), inputType)
+    stamp = (st.st_mtime, st.st_size)
+    if key not in _cache or _cache[key][0] != stamp:
+        if inputType == 'DAS':
+            df = readPositions_DAS(path)
+        else:
+            df = readPositions_IBActivity(path)
+        _cache[key] = (stamp, Positions(df))
+    return _cache[key][1]
+
+
+class Positions:
+    '''
+    The positions frame indexed by (ticker, account).
+    :attribute df: The frame with POSITIONCOLUMNS
+    '''
+
+    def __init__(self, df):
+        self.df = df
+        self.index = {key: i for i, key in enumerate(zip(df['Symb'], df['Account']))}
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def lookup(self, ticker, account):
+        '''Return the shares of ticker held by account or None if there are none'''
+        i = self.index.get((str(ticker), str(account)))
+        return None if i is None else int(self.df['Shares'].iat[i])
+
+    def avgcost(self, ticker, account):
+        '''Return the average cost of the position or None if it is not known'''
+        i = self.index.get((str(ticker), str(account)))
+        if i is None or np.isnan(self.df['Avgcost'].iat[i]):
+            return None
+        return float(self.df['Avgcost'].iat[i])
@@ -0,0 +1,202 @@
+'''
+Settings for the non gui modules. With PyQt5 these are QSettings shared with the gui. Without
+it (or with STRUCTJOUR_HEADLESS set) the same groups and keys are kept in a json file and can be
+overridden by environment variables. That lets the console path (import, DefineTrades, xlsx)
+run on a server or in a worker process without loading Qt.
+
+Environment variables
+    STRUCTJOUR_HEADLESS: Any value other than '' or '0' selects the headless settings.
+    STRUCTJOUR_SETTINGS: The json settings file. Selects the headless settings.
+        Defaults to ~/.structjour/settings.json
+    STRUCTJOUR_<GROUP>_<KEY>: Override one setting. The group is the part of the organization
+        after 'zero_substance', for example STRUCTJOUR_JOURNAL for 'journal' in
+        'zero_substance' and STRUCTJOUR_CHART_COLORUP for 'colorup' in 'zero_substance/chart'.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import importlib.util
+import json
+import os
+import threading
+
+# pylint: disable = C0103, W0603
+
+ORGANIZATION = 'zero_substance'
+SETTINGSFILE = os.path.join(os.path.expanduser('~'), '.structjour', 'settings.json')
+
+_headless = None
+_settingsFile = None
+_lock = threading.RLock()
+
+
+def setHeadless(headless=True, path=None):
+    '''
+    Choose the settings backend for this process. Call it before any settings are read. The
+    choice is exported to the environment so worker processes make the same choice.
+    :params headless: If False, use QSettings.
+    :params path: The json settings file for the headless settings.
+    '''
+    global _headless, _settingsFile
+    with _lock:
+        _headless = headless
+        _settingsFile = None
+        os.environ['STRUCTJOUR_HEADLESS'] = '1' if headless else '0'
+        if path:
+            os.environ['STRUCTJOUR_SETTINGS'] = path
+
+
+def isHeadless():
+    '''
+    Return True if the headless settings are used. Decided once, on first use, from the
+    environment and the availability of PyQt5.
+    '''
+    global _headless
+    with _lock:
+        if _headless is None:
+            env = os.environ.get('STRUCTJOUR_HEADLESS', '')
+            _headless = ((env not in ('', '0')) or bool(os.environ.get('STRUCTJOUR_SETTINGS'))
+                         or importlib.util.find_spec('PyQt5') is None)
+        return _headless
+
+
+def getSettings(organization=ORGANIZATION, application='structjour'):
+    '''
+    Return the settings object for organization, for example 'zero_substance/chart'. The
+    object has the QSettings methods used by structjour: value, setValue, contains, remove,
+    allKeys and sync.
+    '''
+    if isHeadless():
+        return HeadlessSettings(organization, application)
+    from PyQt5.QtCore import QSettings
+    return QSettings(organization, application)
+
+
+def getDB():
+    '''
+    Return the location of structjour.sqlite, the dbsqlite setting or else in the journal
+    directory. None if neither is set.
+    '''
+    db = getSettings(ORGANIZATION + '/stockapi').value('dbsqlite')
+    if not db:
+        journal = getSettings().value('journal')
+        if not journal:
+            return None
+        db = os.path.join(journal, 'structjour.sqlite')
+    return db
+
+
+def envName(organization, key):
+    '''Return the name of the environment variable that overrides key'''
+    group = organization[len(ORGANIZATION):] if organization.startswith(ORGANIZATION) \
+        else organization
+    parts = ['STRUCTJOUR'] + [p for p in group.split('/') if p] + [key]
+    return '_'.join(parts).upper()
+
+
+def toType(val, vtype):
+    '''Convert a stored value to vtype the way QSettings.value does for its type argument'''
+    if vtype is None or val is None:
+        return val
+    if vtype is bool:
+        if isinstance(val, str):
+            return val.strip().lower() in ('true', '1', 'yes', 'on')
+        return bool(val)
+    try:
+        return vtype(val)
+    except (TypeError, ValueError):
+        return vtype()
+
+
+class SettingsFile:
+    '''
+    The json file behind the headless settings. It holds a dict of organization: {key: value}.
+    One instance is shared by every HeadlessSettings in the process.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.data = dict()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.data = json.load(f)
+            except (ValueError, OSError) as ex:
+                print(f'Failed to read the settings file {path}: {ex}')
+
+    def save(self):
+        d = os.path.dirname(self.path)
+        if d and not os.path.exists(d):
+            os.makedirs(d)
+        # Workers save the same file. Each writer needs its own temp file.
+        tmp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+
+def getSettingsFile():
+    '''Return the shared SettingsFile, reading it on first use'''
+    global _settingsFile
+    with _lock:
+        if _settingsFile is None:
+            _settingsFile = SettingsFile(os.environ.get('STRUCTJOUR_SETTINGS', SETTINGSFILE))
+        return _settingsFile
+
+
+class HeadlessSettings:
+    '''
+    A stand in for QSettings that reads and writes the json settings file. Environment
+    variables override the file.
+    '''
+
+    def __init__(self, organization=ORGANIZATION, application='structjour'):
+        self.organization = organization
+        self.application = application
+        self.file = getSettingsFile()
+
+    def _group(self, create=False):
+        if create:
+            return self.file.data.setdefault(self.organization, dict())
+        return self.file.data.get(self.organization, dict())
+
+    def value(self, key, defaultValue=None, type=None):     # pylint: disable = W0622
+        '''Return the setting for key converted to type, or defaultValue if it is not set'''
+        env = os.environ.get(envName(self.organization, key))
+        if env is not None:
+            try:
+                val = json.loads(env)
+            except ValueError:
+                val = env
+            return toType(val, type)
+        with _lock:
+            if key not in self._group():
+                return defaultValue
+            return toType(self._group()[key], type)
+
+    def setValue(self, key, value):
+        with _lock:
+            self._group(create=True)[key] = value
+            self.file.save()
+
+    def contains(self, key):
+        if envName(self.organization, key) in os.environ:
+            return True
+        with _lock:
+            return key in self._group()
+
+    def remove(self, key):
+        with _lock:
+            group = self._group()
+            if key in group:
+                del group[key]
+                self.file.save()
+
+    def allKeys(self):
+        with _lock:
+            return list(self._group().keys())
+
+    def sync(self):
+        '''Each setValue is written at once. Nothing to do.'''
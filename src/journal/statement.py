@@ -3,21 +3,22 @@ Encapsulate the various kinds of account statements. To date that includes DAS e
 Activity statements. So far we are interested in trade information for specific accounts. It looks
 like IB Activity statements can report on multiple accounts by using (in HTML file) <div ids like
 id = tbl{table_name}_{account}_Body  
-For examples tblAccountInformation_UXXXXX74Body. So far, this code is written for a single account.
+For examples tblAccountInformation_UXXXXX74Body. getAccountTables finds the tables of each account
+and the trades of all the accounts are read from one parse of the file.
 
 Created on Mar 15, 2019
 
 @author: Mike Petersen
 '''
-# TODO: Revise code to differ multiple accounts (a bit later 03/29/19). For now get this rock solid
-# and maintainably clear for one account. See if I can get IB written specs to find more potential
-# landmines.
+# TODO: See if I can get IB written specs to find more potential landmines.
 
 
+import concurrent.futures
 import csv
 import math
-import sys
+import multiprocessing
 import os
+import re
 # import ssl
 
 from pandas import DataFrame, read_csv
@@ -26,14 +27,12 @@ import numpy as np
 import pandas as pd
 
 import urllib.request, urllib.parse, urllib.error
-from bs4 import BeautifulSoup, __version__ as bs4v
+from bs4 import BeautifulSoup
 
 from journal.definetrades import ReqCol
 from journal.dfutil import DataFrameUtil
-
-print ('Python version ' + sys.version)
-print('Pandas version ' + pd.__version__)
-print('Beautiful Soup ' + bs4v)
+from journal.instrument import span, timed
+from journal.positions import emptyPositions, readPositions_DAS
 
 
 class Statement_DAS(object):
@@ -54,6 +53,9 @@ class Statement_DAS(object):
             self.df['Date'] = jf.theDate
         rc = ReqCol()
         DataFrameUtil.checkRequiredInputFields(self.df, rc.columns)
+        # DAS times have no date. Place them on the trade date.
+        self.df[rc.time] = DataFrameUtil.tradeTimes(self.df[rc.time], self.df[rc.date])
+        self.df[rc.date] = self.df[rc.time].dt.normalize()
 
     def _checkUniqueSIMTX(self):
         '''
@@ -125,6 +127,7 @@ class Statement_DAS(object):
         newDf[rc.PL] = totalPL
         return newDf
 
+    @timed('Statement_DAS.getListOfTicketDF')
     def getListOfTicketDF(self):
         '''
         Take the standard trades.csv DataFrame a list in which each list member is a DataFrame that
@@ -176,19 +179,14 @@ class Statement_DAS(object):
 
 
     def getPositions(self):
+        '''
+        Get the positions held after close from the DAS positions export. The positions with no
+        shares or no average cost are left out.
+        :return: A DataFrame with the columns Symb, Account, Shares and Avgcost
+        '''
         if not self.jf.infile2:
-            return ''
-        df = pd.read_csv(self.jf.inpathfile2)
-        reqcol = ['Symb', 'Account', 'Shares', 'Avgcost', 'Unrealized']
-        df = df[reqcol].copy()
-        newtrades = pd.DataFrame()
-        for i, row in df.iterrows():
-            addme, tval = floatValue(row['Avgcost'])
-            dblchk, tval = floatValue(row['Shares'])
-            if addme and dblchk: 
-                newtrades = newtrades.append(row)
-
-        return newtrades
+            return emptyPositions()
+        return readPositions_DAS(self.jf.inpathfile2)
 
 
     def getTrades(self, listDf=None):
@@ -203,23 +201,61 @@ class Statement_DAS(object):
         '''
         # TODO: Add the date to the saved file name after we get the date sorted out.
         rc = ReqCol()
-        if not listDf:
-            listDf = self.getListOfTicketDF()
-        DataFrameUtil.checkRequiredInputFields(listDf[0], rc.columns)
+        with span('Statement_DAS.getTrades') as s:
+            if not listDf:
+                listDf = self.getListOfTicketDF()
+            DataFrameUtil.checkRequiredInputFields(listDf[0], rc.columns)
 
-        newDF = DataFrameUtil.createDf(listDf[0], 0)
+            newDF = DataFrameUtil.createDf(listDf[0], 0)
 
-        for tick in listDf:
-            t = self.createSingleTicket(tick)
-            newDF = newDF.append(t)
+            for tick in listDf:
+                t = self.createSingleTicket(tick)
+                newDF = newDF.append(t)
+            s.set(tickets=len(listDf), rows=len(newDF))
 
-        outfile = "tradesByTicket.csv"
-        opf = os.path.join(self.jf.indir, outfile)
-        newDF.to_csv(opf)
-        self.jf.resetInfile(outfile)
+            outfile = "tradesByTicket.csv"
+            opf = os.path.join(self.jf.indir, outfile)
+            newDF.to_csv(opf)
+            self.jf.resetInfile(outfile)
 
         return newDF, self.jf
 
+# The div ids of the per account tables, for example tblTransactions_U1234567Body
+ACCOUNTDIV = re.compile(r'^tbl(?P<table>[A-Za-z]+?)(?:_(?P<account>[^_]+?))?_?Body$')
+
+# Smaller Transactions tables (about 1000 trades) are read in this process. Starting the worker
+# processes takes longer.
+PARALLELBYTES = 200000
+
+
+def getAccountTables(soup):
+    '''
+    Find the tables of each account in an IB Activity Statement.
+    :params soup: The parsed statement
+    :return: A dict {account: {table name: div}} in the order of the statement. The account is
+            None for tables whose div id has no account.
+    '''
+    accounts = dict()
+    for div in soup.find_all('div', id=ACCOUNTDIV):
+        m = ACCOUNTDIV.match(div.get('id'))
+        accounts.setdefault(m.group('account'), dict()).setdefault(m.group('table'), div)
+    return accounts
+
+
+def accountTrades_IBActivity(account, tableHtml):
+    '''
+    Read the trades of one account from the html of its Transactions table. A module function
+    so the accounts can be read in worker processes.
+    '''
+    st = Statement_IBActivity(None)
+    df = pd.read_html(tableHtml)
+    assert len(df) == 1
+    df = st.filterTrades_IBActivity(df[0])
+    df['Account'] = account
+    df = st.figurePL_IBActivity(df)
+    return st.normColumns_IBActivity(df)
+
+
 class Statement_IBActivity:
 
     def __init__(self, jf):
@@ -285,6 +321,24 @@ class Statement_IBActivity:
 
 
 
+    def getIds_IBActivity(self, soup):
+        '''
+        Return a dict {key: account} for the accounts in the statement, key as in
+        getAccountTables. The account is from the Account Information table of each account.
+        '''
+        ids = dict()
+        for key, tables in getAccountTables(soup).items():
+            if 'Transactions' not in tables and 'AccountInformation' not in tables:
+                continue
+            account = key
+            if 'AccountInformation' in tables:
+                df = pd.read_html(str(tables['AccountInformation'].find('table')))
+                for dummy, row in df[0].iterrows():
+                    if row[0] == 'Account':
+                        account = row[1]
+            ids[key] = account
+        return ids
+
     def getId_IBActivity(self, soup = None, url=None):
         if url:
             soup = BeautifulSoup(readit(url), 'html.parser')
@@ -305,8 +359,9 @@ class Statement_IBActivity:
         '''
         Get open positions from the IB statement. Will retrieve a table with three columns:
         Symb, Shares and Account. Two possible tables I have found with the info:
-        Ids are startswith('tblOpenPositions') and  startswith('tblLongOpenPositions'). Results and
-        Implementation will change a bit when we incorporate multiple accounts per statement
+        Ids are startswith('tblOpenPositions') and  startswith('tblLongOpenPositions'). A
+        statement with several accounts has the tables for each account and the positions of all
+        the accounts are returned.
         :My Programming Concerns follow:
         IB's Cost Basis accounting still makes no sense to me. It comes up with fantasy numbers
         for Cost_Price/Cost_Basis that never existed. The numbers relate to Loss Disallowed (LD) by
@@ -321,22 +376,35 @@ class Statement_IBActivity:
         day?!?!?!?. It is such basic information and its not there!!!!!!!! (! = anger)
         '''
         if soup == None:
-            soup = BeautifulSoup(readit(self.jf.inpathfile), 'html.parser')
-        tbldivs = soup.find_all("div", id=lambda x: x and x.startswith('tblOpenPositions'))
+            soup = getSoup(self.jf.inpathfile)
+        ids = self.getIds_IBActivity(soup)
+        tables = getAccountTables(soup)
+        if len(ids) > 1:
+            positions = [self.getAccountPositions(tables[key], account)
+                         for key, account in ids.items()]
+            positions = [df for df in positions if not df.empty]
+            return pd.concat(positions, ignore_index=True) if positions else pd.DataFrame()
+
         account = self.getId_IBActivity(soup)
+        tables = {name: div for t in tables.values() for name, div in t.items()}
+        return self.getAccountPositions(tables, account)
 
-        if tbldivs:
+    def getAccountPositions(self, tables, account):
+        '''
+        Get the open positions of one account.
+        :params tables: The {table name: div} of the account from getAccountTables
+        :return: A DataFrame with the columns Symb, Shares and Account
+        '''
+        if 'OpenPositions' in tables:
             # found table tblOpenPositions
 
-            assert len(tbldivs) == 1
-
-            tableTag = tbldivs[0].find("table")
+            tableTag = tables['OpenPositions'].find("table")
             df = pd.read_html(str(tableTag))
             assert len(df) == 1
             df = df[0]
 
             # I believe different versions of bs parse the file differently to get float or str
-            if isinstance(df.Mult.iloc[0], (np.float64, float)):
+            if isinstance(df.Mult.iloc[0], (np.float64, float, np.integer, int)):
                 df = df[df.Mult == 1.0].copy()
             else:
                 assert isinstance(df.Mult.iloc[0], str)
@@ -345,14 +413,10 @@ class Statement_IBActivity:
         else:
             # The Long Open Positions table heirarchical and  pd cannot correctly parse it.
             # Instead we'll get the headers and rows with our favorite soup
-            tbldivs = soup.find_all("div", id=lambda x: x and x.startswith('tblLongOpenPositions'))
-            if not tbldivs:
+            if 'LongOpenPositions' not in tables:
                 return pd.DataFrame()
-            # tbldivs = st.getPositions()
-            assert len(tbldivs) == 1
-            type(tbldivs[0]), len (tbldivs)
-            headers = [h.text for h in tbldivs[0].find_all('th')]
-            trdivs = tbldivs[0].find_all('tr')
+            headers = [h.text for h in tables['LongOpenPositions'].find_all('th')]
+            trdivs = tables['LongOpenPositions'].find_all('tr')
 
             tdlist = list()
             for trs in trdivs:
@@ -398,44 +462,10 @@ class Statement_IBActivity:
         The so called norm will have to become the new norm. 
         This particular method is similar enough between CSV, Daily, and Activity to combine the 3 into one
         '''
-
-        rc = ReqCol()
         if 'PL' not in df.columns:
             df['PL'] = 0
         df = df[['Date/Time', 'Symbol', 'T. Price', 'Quantity', 'Account',  'Proceeds', 'PL', 'Code']].copy()
-
-        df['Date'] = df['Date/Time']
-        df[rc.side] = ''
-        df.Quantity = df.Quantity.astype(int)
-        df['T. Price'] = df['T. Price'].astype(float)
-        df['Proceeds'] = df['Proceeds'].astype(float)
-        df['Code'] = df['Code'].astype(str)
-
-
-        for i, row in df.iterrows():
-            # df.at[i, 'Date'] = df.at[i, 'Date'][:10]
-            cleandate = pd.Timestamp(df.at[i, 'Date'])
-            df.at[i, 'Date'] = cleandate.strftime('%Y-%m-%d %H:%M:%S')
-            df.at[i, 'Date/Time'] = df.at[i, 'Date/Time'][12:]
-            code = df.at[i, 'Code'].split(';')
-
-
-
-            if df.at[i, 'Quantity'] < 0:
-                df.at[i, rc.side] = 'S'
-            else:
-                df.at[i, rc.side] = 'B'
-
-            for c in code:
-                if c in ['O', 'C']:
-                    df.at[i, 'Code'] = c
-                    continue
-
-
-
-        df = df.rename(columns={'Date/Time': rc.time, 'Symbol': rc.ticker, 'T. Price': rc.price,
-                                        'Quantity': rc.shares, 'Account': rc.acct, 'Code': 'O/C', 'PL': rc.PL})
-        return df
+        return normColumns_IB(df)
 
 
     def figurePL_IBActivity(self, df, soup=None, url=None):
@@ -507,33 +537,69 @@ class Statement_IBActivity:
         return newtrade
 
 
-    def getTrades_IBActivity(self, url):
+    def getTradesByAccount_IBActivity(self, url, maxWorkers=1):
+        '''
+        Get the trades of each account from an IB statement that has a Transactions table and an
+        Account Information table for each account. The file is read and parsed once.
+        :params maxWorkers: Read the accounts in this many processes.
+        :return: A dict {account: DataFrame of its trades}
+        '''
+        soup = getSoup(url)
+        tables = getAccountTables(soup)
+        ids = self.getIds_IBActivity(soup)
+        jobs = list()
+        for key, account in ids.items():
+            if 'Transactions' in tables[key]:
+                jobs.append((account, str(tables[key]['Transactions'].find('table'))))
+        assert jobs, 'No Transactions table found'
+
+        if maxWorkers > 1 and len(jobs) > 1 and sum(len(h) for dummy, h in jobs) > PARALLELBYTES:
+            with concurrent.futures.ProcessPoolExecutor(
+                    min(maxWorkers, len(jobs)),
+                    mp_context=multiprocessing.get_context('spawn')) as ex:
+                dfs = list(ex.map(accountTrades_IBActivity, *zip(*jobs)))
+        else:
+            dfs = [accountTrades_IBActivity(account, html) for account, html in jobs]
+        return dict(zip([account for account, dummy in jobs], dfs))
+
+    @timed('Statement_IBActivity.getTrades_IBActivity')
+    def getTrades_IBActivity(self, url, maxWorkers=1):
         '''
         Get trades from an IB statement that has a Transactions table and an Account Information table
+        The trades of all the accounts in the statement are returned in one DataFrame.
         '''
-        soup = BeautifulSoup(readit(url), 'html.parser')
-        tbldivs = soup.find_all("div", id=lambda x: x and x.startswith('tblTransactions'))
-        account = self.getId_IBActivity(soup)
+        accounts = self.getTradesByAccount_IBActivity(url, maxWorkers)
+        if len(accounts) == 1:
+            return list(accounts.values())[0]
+        return pd.concat(accounts.values(), ignore_index=True)
 
-        assert len(tbldivs) == 1
 
-        tableTag = tbldivs[0].find("table")
-        df = pd.read_html(str(tableTag))
-        assert len(df) == 1
+_soup = dict()
 
 
-        df = self.filterTrades_IBActivity(df[0])
-        df['Account'] = account
-        print('fkna')
-        df = self.figurePL_IBActivity(df, soup=soup)
-        df = self.normColumns_IBActivity(df)
+def isURL(url):
+    return url.lower().startswith(('http:', 'https:'))
 
-        return df
+
+def getSoup(url):
+    '''
+    Parse the statement at url. The last statement parsed is kept so the trades and the
+    positions are read from one parse of an unchanged file.
+    '''
+    key = url
+    if not isURL(url):
+        st = os.stat(url)
+        key = (os.path.realpath(url), st.st_mtime, st.st_size)
+    if key not in _soup:
+        soup = BeautifulSoup(readit(url), 'html.parser')
+        _soup.clear()
+        _soup[key] = soup
+    return _soup[key]
 
 
 def readit(url):
     data = ''
-    if url.lower().startswith('http:'):
+    if isURL(url):
         data = urllib.request.urlopen(url).read()
     else:
         assert os.path.exists(url)
@@ -613,43 +679,37 @@ def normColumns_IbCsv(df):
     The so called norm will have to become the new norm. 
     This particular method is similar enough between CSV, Daily, and Activity to combine the 3 into one
     '''
-    
-    rc = ReqCol()
-    
     df = df[['Date/Time', 'Symbol', 'T. Price', 'Quantity', 'Account',  'Proceeds', 'PL', 'Code']].copy()
-    # df['PL'] = 0
-    df['Date'] = df['Date/Time']
-    df[rc.side] = ''
+    return normColumns_IB(df)
+
+
+def normColumns_IB(df):
+    '''
+    Rename the columns of the IB trades to the ReqCol names. Time gets the datetime64 of each
+    trade from the IB Date/Time, like 2019-05-16, 09:30:12, and Date gets the trade date. The
+    side comes from the sign of the quantity and O/C from the codes.
+    '''
+    rc = ReqCol()
+    df[rc.time] = pd.to_datetime(df['Date/Time'].str.replace(',', '', regex=False))
+    df[rc.date] = df[rc.time].dt.normalize()
     df.Quantity = df.Quantity.astype(int)
     df['T. Price'] = df['T. Price'].astype(float)
     df['Proceeds'] = df['Proceeds'].astype(float)
-    df['Code'] = df['Code'].astype(str)
+    df[rc.side] = np.where(df.Quantity < 0, 'S', 'B')
 
+    # The last O or C among the codes, like O;P
+    code = df['Code'].astype(str)
+    oc = code.str.findall(r'(?:^|;)([OC])(?=;|$)').str[-1]
+    df['Code'] = oc.where(oc.notna(), code)
 
-    for i, row in df.iterrows():
-        # df.at[i, 'Date'] = df.at[i, 'Date'][:10]
-        df.at[i, 'Date/Time'] = df.at[i, 'Date/Time'][12:]
-        code = df.at[i, 'Code'].split(';')
-
-
-        
-        if df.at[i, 'Quantity'] < 0:
-            df.at[i, rc.side] = 'S'
-        else:
-            df.at[i, rc.side] = 'B'
-
-        for c in code:
-            if c in ['O', 'C']:
-                df.at[i, 'Code'] = c
-                continue
-
-    
-
-    df = df.rename(columns={'Date/Time': rc.time, 'Symbol': rc.ticker, 'T. Price': rc.price,
-                                    'Quantity': rc.shares, 'Account': rc.acct, 'Code': 'O/C', 'PL': rc.PL})
-    return df
+    df = df.drop(columns=['Date/Time'])
+    df = df.rename(columns={'Symbol': rc.ticker, 'T. Price': rc.price, 'Quantity': rc.shares,
+                            'Account': rc.acct, 'Code': 'O/C', 'PL': rc.PL})
+    return df[[rc.time, rc.ticker, rc.price, rc.shares, rc.acct, 'Proceeds', rc.PL, 'O/C',
+               rc.date, rc.side]]
 
 
+@timed('getTrades_csv')
 def getTrades_csv(infile):
     '''
     This file may contain many tables and eventually we should retrieve all of them.
@@ -0,0 +1,168 @@
+'''
+A cache of parsed statements. A statement is identified by a hash of the input file's contents,
+the input type, the parser version and the date. A repeat run on an unchanged file reads the
+normalized trades DataFrame from the cache and skips parsing. tradesByTicket.csv is only written
+again if it is missing. A changed file, or a change to PARSERVERSION, gets a new key.
+
+The DataFrames are saved as parquet if pyarrow is installed, otherwise they are pickled. The
+cache directory is in the journal directory or, if that is not set, beside the input file.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import hashlib
+import importlib.util
+import os
+
+import pandas as pd
+
+from journal.instrument import timed
+from journal.settings import getSettings
+from journal.statement import Statement_DAS, Statement_IBActivity
+
+# pylint: disable = C0103
+
+# Change the version of a parser when its output changes. That invalidates the cached statements.
+PARSERVERSION = {'DAS': 2, 'IB_HTML': 3}
+CACHEDIRNAME = '.statementcache'
+MAXENTRIES = 100
+
+# The DAS parser writes the trades by ticket here and resets jf.infile to it
+TICKETFILE = 'tradesByTicket.csv'
+
+
+def fileHash(path, blocksize=1 << 20):
+    '''Return the sha1 hex digest of the contents of path'''
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def statementKey(jf):
+    '''Return the cache key for the input file of the JournalFiles object jf'''
+    inputType = jf.inputType if jf.inputType in PARSERVERSION else 'DAS'
+    parts = [fileHash(jf.inpathfile), inputType, str(PARSERVERSION[inputType]),
+             pd.Timestamp(jf.theDate).strftime('%Y%m%d')]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def cacheDir(jf):
+    '''Return the cache directory. It is in the journal directory if that is set.'''
+    journal = getSettings('zero_substance', 'structjour').value('journal')
+    if journal and os.path.isdir(journal):
+        return os.path.join(journal, CACHEDIRNAME)
+    return os.path.join(jf.indir, CACHEDIRNAME)
+
+
+class StatementCache:
+    '''
+    The parsed statements in one directory. Each file is named by its key. The least recently
+    used files beyond maxEntries are removed.
+    '''
+    EXTENSIONS = ['.parquet', '.pkl']
+
+    def __init__(self, cachedir, maxEntries=MAXENTRIES):
+        self.cachedir = cachedir
+        self.maxEntries = maxEntries
+        self.parquet = importlib.util.find_spec('pyarrow') is not None
+
+    def files(self):
+        '''Return the cache files, least recently used first'''
+        if not os.path.exists(self.cachedir):
+            return list()
+        files = [os.path.join(self.cachedir, f) for f in os.listdir(self.cachedir)
+                 if os.path.splitext(f)[1] in self.EXTENSIONS]
+        return sorted(files, key=os.path.getmtime)
+
+    def get(self, key):
+        '''Return the DataFrame for key or None if it is not cached'''
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.cachedir, key + ext)
+            if not os.path.exists(path):
+                continue
+            try:
+                df = pd.read_parquet(path) if ext == '.parquet' else pd.read_pickle(path)
+            except Exception as ex:     # pylint: disable = W0703
+                print(f'Discarding the cached statement {path}: {ex}')
+                os.remove(path)
+                return None
+            os.utime(path)
+            return df
+        return None
+
+    def put(self, key, df):
+        '''Save df for key. Columns parquet cannot represent (mixed types) are pickled instead.'''
+        if not os.path.exists(self.cachedir):
+            os.makedirs(self.cachedir)
+        path = os.path.join(self.cachedir, key)
+        saved = False
+        if self.parquet:
+            try:
+                df.to_parquet(path + '.parquet.tmp')
+                os.replace(path + '.parquet.tmp', path + '.parquet')
+                saved = True
+            except (ValueError, TypeError):
+                if os.path.exists(path + '.parquet.tmp'):
+                    os.remove(path + '.parquet.tmp')
+        if not saved:
+            df.to_pickle(path + '.pkl.tmp')
+            os.replace(path + '.pkl.tmp', path + '.pkl')
+        self.evict()
+
+    def evict(self):
+        '''Remove the least recently used files beyond maxEntries'''
+        files = self.files()
+        for path in files[:max(0, len(files) - self.maxEntries)]:
+            os.remove(path)
+
+    def clear(self):
+        for path in self.files():
+            os.remove(path)
+
+
+def ticketFile(jf, df):
+    '''
+    Make the same changes to jf that Statement_DAS.getTrades makes for the cached trades df.
+    tradesByTicket.csv is only written if it is missing.
+    '''
+    if jf.infile != TICKETFILE:
+        path = os.path.join(jf.indir, TICKETFILE)
+        if not os.path.exists(path):
+            df.to_csv(path)
+        jf.resetInfile(TICKETFILE)
+    return jf
+
+
+@timed('loadStatement')
+def loadStatement(jf, useCache=True, cachedir=None):
+    '''
+    Parse the input file of jf with the parser for jf.inputType. For DAS, tradesByTicket.csv is
+    written and jf.infile is reset to it whether or not the cache hit.
+    :params jf: The JournalFiles object
+    :params useCache: If False, always parse the file.
+    :params cachedir: Override the cache location.
+    :return: (df, jf) The normalized trades and the JournalFiles object
+    '''
+    cache = key = None
+    if useCache:
+        cache = StatementCache(cachedir if cachedir else cacheDir(jf))
+        key = statementKey(jf)
+        df = cache.get(key)
+        if df is not None:
+            if jf.inputType != 'IB_HTML':
+                jf = ticketFile(jf, df)
+            return df, jf
+
+    if jf.inputType == 'IB_HTML':
+        df = Statement_IBActivity(jf).getTrades_IBActivity(jf.inpathfile,
+                                                           maxWorkers=os.cpu_count() or 1)
+    else:
+        df, jf = Statement_DAS(jf).getTrades()
+
+    if cache:
+        cache.put(key, df)
+    return df, jf
@@ -0,0 +1,192 @@
+'''
+A local store of 1 minute bars in structjour.sqlite. The prefetch job (journal.stock.prefetch)
+fills it for every traded symbol and day, and FinPlot draws from it before it calls an api. The
+table bars holds the candles and bar_days records each symbol and day that was requested, with
+the api, the outcome and the number of attempts, so an interrupted prefetch resumes where it
+left off. bar_calls logs each request so the daily call limits are counted across runs. Charts
+older than a provider's retention window stay available. Use BarStore.forDB to share one
+BarStore per db.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import datetime as dt
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from journal.database import getPool
+from journal.stock import tradingcalendar as tcal
+
+# pylint: disable = C0103
+
+BARCOLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# A symbol day with one of these is not requested again
+FINISHED = ['done', 'empty']
+
+# Days of requests kept in bar_calls
+CALLLOGDAYS = 7
+
+
+def dayStr(d):
+    return pd.Timestamp(d).strftime('%Y-%m-%d')
+
+
+def toSeconds(index):
+    '''The times of a DatetimeIndex as int64 seconds. The times are naive New York times.'''
+    return (pd.DatetimeIndex(index).values.astype('datetime64[s]')).astype(np.int64)
+
+
+def resampleBars(df, minutes):
+    '''Resample 1 minute bars to minutes. The candles are labeled by their beginning.'''
+    if minutes <= 1 or df.empty:
+        return df
+    r = df.resample(f'{minutes}T')
+    out = pd.DataFrame({'open': r['open'].first(), 'high': r['high'].max(),
+                        'low': r['low'].min(), 'close': r['close'].last(),
+                        'volume': r['volume'].sum()})
+    return out.dropna(subset=['open'])
+
+
+class BarStore:
+    '''The tables bars, bar_days and bar_calls in the sqlite db'''
+    _stores = dict()
+    _storesLock = threading.Lock()
+
+    def __init__(self, db):
+        self.db = db
+        self.createTables()
+
+    @classmethod
+    def forDB(cls, db):
+        '''
+        Return the shared BarStore for db. The tables are created once for each db file. A db
+        that was replaced gets a new BarStore.
+        '''
+        path = os.path.abspath(db)
+        st = os.stat(path) if os.path.exists(path) else None
+        identity = (st.st_dev, st.st_ino) if st else None
+        with cls._storesLock:
+            known = cls._stores.get(path)
+            if known and known[0] == identity and identity is not None:
+                return known[1]
+        store = cls(db)
+        st = os.stat(path)
+        with cls._storesLock:
+            cls._stores[path] = ((st.st_dev, st.st_ino), store)
+        return store
+
+    def createTables(self):
+        with getPool(self.db).connection() as conn:
+            conn.executescript('''
+            CREATE TABLE if not exists bars (
+            symbol	TEXT NOT NULL,
+            ts	INTEGER NOT NULL,
+            open	REAL,
+            high	REAL,
+            low	REAL,
+            close	REAL,
+            volume	REAL,
+            PRIMARY KEY(symbol, ts)) WITHOUT ROWID;
+
+            CREATE TABLE if not exists bar_days (
+            symbol	TEXT NOT NULL,
+            day	TEXT NOT NULL,
+            api	TEXT,
+            status	TEXT NOT NULL,
+            rows	INTEGER,
+            attempts	INTEGER NOT NULL DEFAULT 0,
+            message	TEXT,
+            fetched	TEXT NOT NULL,
+            PRIMARY KEY(symbol, day));
+
+            CREATE TABLE if not exists bar_calls (
+            api	TEXT,
+            fetched	TEXT NOT NULL);
+
+            CREATE INDEX if not exists bar_calls_fetched ON bar_calls (fetched);''')
+
+    def putBars(self, symbol, day, df, api):
+        '''
+        Store the 1 minute bars in df and record symbol, day as done.
+        :params df: A DataFrame with BARCOLUMNS indexed by time
+        :return: The number of bars stored
+        '''
+        rows = list(zip([symbol] * len(df), toSeconds(df.index).tolist(),
+                        *[df[c].astype(np.float64).tolist() for c in BARCOLUMNS]))
+        with getPool(self.db).connection() as conn:
+            conn.executemany('INSERT OR REPLACE INTO bars VALUES(?, ?, ?, ?, ?, ?, ?)', rows)
+        self.record(symbol, day, api, 'done' if rows else 'empty', len(rows))
+        return len(rows)
+
+    def record(self, symbol, day, api, status, rows=0, message=None):
+        '''Record the outcome of a request for symbol, day and log the request'''
+        now = dt.datetime.now()
+        fetched = now.isoformat(timespec='seconds')
+        with getPool(self.db).connection() as conn:
+            conn.execute('''
+                INSERT INTO bar_days (symbol, day, api, status, rows, attempts, message, fetched)
+                VALUES(?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(symbol, day) DO UPDATE SET
+                    api=excluded.api, status=excluded.status, rows=excluded.rows,
+                    attempts=attempts + 1, message=excluded.message, fetched=excluded.fetched;''',
+                         (symbol, dayStr(day), api, status, rows, message, fetched))
+            conn.execute('INSERT INTO bar_calls VALUES(?, ?)', (api, fetched))
+            expired = now - dt.timedelta(days=CALLLOGDAYS)
+            conn.execute('DELETE FROM bar_calls WHERE fetched < ?',
+                         (expired.isoformat(timespec='seconds'),))
+
+    def getDays(self):
+        '''Return bar_days as a DataFrame'''
+        with getPool(self.db).connection() as conn:
+            return pd.read_sql_query('SELECT * FROM bar_days ORDER BY day, symbol', conn)
+
+    def statuses(self):
+        '''Return a dict {(symbol, day): (status, attempts)}'''
+        with getPool(self.db).connection() as conn:
+            cur = conn.execute('SELECT symbol, day, status, attempts FROM bar_days')
+            return {(symbol, day): (status, attempts) for symbol, day, status, attempts in cur}
+
+    def callsSince(self, api, since):
+        '''
+        Return the number of requests made to api since the datetime since. A repeated request
+        for the same symbol day counts each time.
+        '''
+        with getPool(self.db).connection() as conn:
+            return conn.execute('SELECT count(*) FROM bar_calls WHERE api = ? AND fetched >= ?',
+                                (api, pd.Timestamp(since).isoformat())).fetchone()[0]
+
+    def hasBars(self, symbol, start, end):
+        '''Return True if every trading day from start to end was fetched for symbol'''
+        days = [dayStr(d) for d in tcal.tradingDays(start, end)]
+        if not days:
+            return False
+        with getPool(self.db).connection() as conn:
+            count = conn.execute(f'''
+                SELECT count(*) FROM bar_days WHERE symbol = ? AND status = 'done'
+                AND day IN ({', '.join('?' * len(days))})''', [symbol] + days).fetchone()[0]
+        return count == len(days)
+
+    def getBars(self, symbol, start, end, minutes=1):
+        '''
+        Return the stored bars of symbol from start to end resampled to minutes, indexed by
+        date (the candle beginning) with BARCOLUMNS.
+        '''
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
+        lo = int(toSeconds([start.floor('D')])[0])
+        hi = int(toSeconds([end])[0])
+        with getPool(self.db).connection() as conn:
+            df = pd.read_sql_query('''
+                SELECT ts, open, high, low, close, volume FROM bars
+                WHERE symbol = ? AND ts >= ? AND ts <= ? ORDER BY ts''', conn,
+                                   params=(symbol, lo, hi))
+        df.index = pd.to_datetime(df.pop('ts'), unit='s')
+        df.index.rename('date', inplace=True)
+        df = resampleBars(df, minutes)
+        return df.loc[df.index >= start.floor(f'{max(minutes, 1)}T')]
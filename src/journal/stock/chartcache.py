@@ -0,0 +1,172 @@
+'''
+A content addressed cache of rendered charts. A chart is identified by a hash of everything
+that goes into drawing it: symbol, times, interval, moving average settings, style settings and
+the entry markers. An identical request returns the existing image. Each output directory has its
+own index (.chartcache.json) and the least recently used renders are removed when the index
+grows past its limits. A hit updates its access time in memory. The index is written by put and
+by eviction, and by a hit at most once every FLUSHSECONDS, so a run of hits costs no writes.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+# pylint: disable = C0103
+
+INDEXNAME = '.chartcache.json'
+MAXENTRIES = 500
+MAXBYTES = 256 * 1024 * 1024
+
+# Seconds a hit may leave its access time unsaved
+FLUSHSECONDS = 30
+
+
+def chartKey(*parts):
+    '''
+    Create the cache key from the parts of a chart request. Parts are anything json can
+    represent. Other objects (Timestamps for example) are represented with str.
+    :return: A hex digest
+    '''
+    s = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    '''
+    Manage the rendered charts in a single directory. Use ChartCache.forDir to get the shared
+    instance for a directory. The methods are thread safe.
+    :attribute entries: dict of key: [filename, size, lastused]
+    '''
+    _caches = dict()
+    _cachesLock = threading.Lock()
+
+    def __init__(self, outdir, maxEntries=MAXENTRIES, maxBytes=MAXBYTES):
+        self.outdir = outdir
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.indexfile = os.path.join(outdir, INDEXNAME)
+        self.lock = threading.RLock()
+        self.entries = dict()
+        self.dirty = False
+        self.saved = time.time()
+        self._load()
+
+    @classmethod
+    def forDir(cls, outdir, **kwargs):
+        '''Return the shared ChartCache for outdir'''
+        outdir = os.path.realpath(outdir)
+        with cls._cachesLock:
+            if outdir not in cls._caches:
+                cache = cls(outdir, **kwargs)
+                atexit.register(cache.flush)
+                cls._caches[outdir] = cache
+            return cls._caches[outdir]
+
+    def _load(self):
+        if not os.path.exists(self.indexfile):
+            return
+        try:
+            with open(self.indexfile) as f:
+                self.entries = json.load(f)
+        except (ValueError, OSError) as ex:
+            print(f'Discarding the chart cache index {self.indexfile}: {ex}')
+            self.entries = dict()
+
+    def _save(self):
+        self.dirty = False
+        self.saved = time.time()
+        if not os.path.exists(self.outdir):
+            return
+        tmp = self.indexfile + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.indexfile)
+
+    def flush(self):
+        '''Write the access times of the hits since the last save'''
+        with self.lock:
+            if self.dirty:
+                self._save()
+
+    def _path(self, entry):
+        return os.path.join(self.outdir, entry[0])
+
+    def get(self, key):
+        '''
+        Return the path of the image for key or None. Entries whose file was removed are dropped.
+        The access time is saved with the next write of the index.
+        '''
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            path = self._path(entry)
+            if not os.path.exists(path):
+                del self.entries[key]
+                self._save()
+                return None
+            entry[2] = time.time()
+            self.dirty = True
+            if entry[2] - self.saved >= FLUSHSECONDS:
+                self._save()
+            return path
+
+    def owns(self, path):
+        '''Return True if path was created by this cache. The cache may overwrite it.'''
+        name = os.path.basename(path)
+        with self.lock:
+            return any(e[0] == name for e in self.entries.values())
+
+    def put(self, key, path):
+        '''
+        Record the image at path for key. Any other entry for the same file is replaced. Then
+        evict the least recently used renders beyond the limits.
+        '''
+        name = os.path.basename(path)
+        with self.lock:
+            for k in [k for k, e in self.entries.items() if e[0] == name]:
+                del self.entries[k]
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            self.entries[key] = [name, size, time.time()]
+            self.evict(keep=key)
+            self._save()
+
+    def evict(self, keep=None):
+        '''
+        Remove the least recently used entries and their files until the cache is within
+        maxEntries and maxBytes.
+        :params keep: A key that will not be evicted
+        :return: The list of removed file paths.
+        '''
+        removed = list()
+        with self.lock:
+            total = sum(e[1] for e in self.entries.values())
+            lru = sorted(self.entries.items(), key=lambda x: x[1][2])
+            for k, entry in lru:
+                if len(self.entries) <= self.maxEntries and total <= self.maxBytes:
+                    break
+                if k == keep:
+                    continue
+                path = self._path(entry)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed.append(path)
+                total = total - entry[1]
+                del self.entries[k]
+        return removed
+
+    def clear(self):
+        '''Remove every cached render and the index'''
+        with self.lock:
+            self.maxEntries, saveMax = 0, self.maxEntries
+            self.evict()
+            self.maxEntries = saveMax
+            if os.path.exists(self.indexfile):
+                os.remove(self.indexfile)
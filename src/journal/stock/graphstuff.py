@@ -9,29 +9,39 @@ import datetime as dt
 import os
 import random
 import re
+import threading
 
+import numpy as np
 import pandas as pd
 
 import matplotlib.dates as mdates
 import matplotlib.font_manager as fm
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
 from matplotlib import markers, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
-from mpl_finance import candlestick_ohlc
 
-from PyQt5.QtCore import QSettings
-
-from journal.stock import myalphavantage as mav
-from journal.stock import mybarchart as bc
-from journal.stock import myib as ib
-from journal.stock import myiex as iex
-from journal.stock.utilities import getMASettings
+from journal.stock import providers
+from journal.stock.chartcache import ChartCache, chartKey
+from journal.stock.providerhealth import ProviderHealth, isRateLimit, windowMessage
+from journal.stock import tradingcalendar as tcal
+from journal.stock.barstore import BarStore
+from journal.stock.utilities import getMASettings, movingAverage
+from journal.settings import getDB, getSettings
+from journal.instrument import span, timed
 
 # pylint: disable = C0103, W0603
 
 FILL = 2
 
+# Matplotlib styles are global state. Serialize the drawing of charts from worker threads.
+PLOT_LOCK = threading.RLock()
+
+# Chart settings that change the rendered image. They are part of the chart cache key.
+CHARTKEYS = ['colorup', 'colordown', 'markercolorup', 'markercolordown', 'markersize',
+             'markeredgecolor', 'markeralpha']
+
 
 def dummyName(fp, symb, tradenum, begin, end, outdir='out'):
     '''
@@ -77,6 +87,23 @@ def dummyName(fp, symb, tradenum, begin, end, outdir='out'):
     return name
 
 
+def decimateBars(t, o, h, l, c, v, k):
+    '''
+    Combine every k bars into one bar. Used to draw no more candles than there are pixels.
+    :params t: Array of matplotlib date numbers. The combined bar takes the time of its middle
+            bar. That keeps it on a trading time when the bars span a night or a weekend.
+    :params o, h, l, c, v: Arrays of open, high, low, close and volume
+    :params k: The number of bars per combined bar
+    :return: The tuple (t, o, h, l, c, v) of the combined bars
+    '''
+    if k <= 1 or len(t) == 0:
+        return t, o, h, l, c, v
+    first = np.arange(0, len(t), k)
+    last = np.r_[first[1:] - 1, len(t) - 1]
+    return (t[np.minimum(first + k // 2, last)], o[first], np.maximum.reduceat(h, first),
+            np.minimum.reduceat(l, first), c[last], np.add.reduceat(v, first))
+
+
 class FinPlot:
     '''
     Plot stock charts using single day minute interval charts
@@ -84,8 +111,8 @@ class FinPlot:
 
     def __init__(self, mplstyle='dark_background'):
 
-        self.apiset = QSettings('zero_substance/stockapi', 'structjour')
-        self.chartSet = QSettings('zero_substance/chart', 'structjour')
+        self.apiset = getSettings('zero_substance/stockapi', 'structjour')
+        self.chartSet = getSettings('zero_substance/chart', 'structjour')
         self.style = self.chartSet.value('chart')
         self.style = None if self.style == 'No style' else self.style
         self.gridlines = self.getGridLines()
@@ -115,6 +142,20 @@ class FinPlot:
         self.entries = []
         self.exits = []
 
+        # Errors from the last data request. See getChartData
+        self.errorCode = ''
+        self.errorMessage = ''
+
+        # Set maSettings (from getMASettings) to draw with settings captured on another thread
+        self.maSettings = None
+
+        # Reuse identical charts from the chart cache in the output directory
+        self.useCache = True
+
+        # Draw from the prefetched bars when they cover the chart. barDB None is structjour.sqlite
+        self.useBarStore = True
+        self.barDB = None
+
     def getGridLines(self):
         y = self.chartSet.value('gridh', False, bool)
         x = self.chartSet.value('gridv', False, bool)
@@ -194,44 +235,35 @@ class FinPlot:
         n = pd.Timestamp.now() + dt.timedelta(0, 60*120)        # Adding 2 hours for NY time
 
         violatedRules = []
-        suggestedApis = self.preferences
-        # nopen = dt.datetime(n.year, n.month, n.day, 9, 30)
-        nclose = dt.datetime(n.year, n.month, n.day, 16, 30)
-
-        # Rule 1 Barchart will not return todays data till 16:30
-        # Rule 1a Barchart will not return yesterdays data after 12 till 1630
-        tradeday = pd.Timestamp(start.year, start.month, start.day)
-        todayday = pd.Timestamp(n.year, n.month, n.day)
-        yday = todayday - pd.Timedelta(days=1)
-        y = pd.Timestamp(yday.year, yday.month, yday.day, 11, 59)
-        if tradeday == todayday and n < nclose and 'bc' in suggestedApis:
-            suggestedApis.remove('bc')
-            violatedRules.append(
-                'Barchart free data will not return todays data till 16:30')
-        if tradeday == yday and end > y and n < nclose and 'bc' in suggestedApis:
-            suggestedApis.remove('bc')
-            violatedRules.append(
-                'Barchart free data will not yesterdays data after 12 till today at  16:30')
-
-        # Rule 2 No support any charts greater than 7 days prior till today
-        if n > start:
-            delt = n - start
-            if delt.days > 6 and 'av' in suggestedApis:
-                suggestedApis.remove('av')
-                lastday = n-pd.Timedelta(days=6)
-                violatedRules.append('AlphaVantage data before {} is unavailable.'.format(
-                    lastday.strftime("%b %d")))
-
-        # Rule 3 Don't call ib if its not connected
-        if 'ib' in suggestedApis and not ib.isConnected():
-            suggestedApis.remove('ib')
-            violatedRules.append('IBAPI is not connected.')
-
-        # Rule 4 No data is available for the future
+        suggestedApis = list(self.preferences)
+
+        # Rule 1 Barchart will not return todays data till 16:30 or yesterdays after 12
+        # Rule 2 AlphaVantage has no data more than 6 days old
+        for a in list(suggestedApis):
+            message = windowMessage(a, start, end, n)
+            if message:
+                suggestedApis.remove(a)
+                violatedRules.append(message)
+
+        # Rule 3 No data is available for the future
         if start > n:
             suggestedApis = []
             violatedRules.append('No data is available for the future.')
 
+        # Rule 4 No data is available when the market is closed
+        if start <= n and tcal.clipToSessions(start, end) is None:
+            suggestedApis = []
+            violatedRules.append(tcal.closedMessage(start, end))
+
+        # Rule 5 Don't call an api that is not connected or is over its rate limit. The health
+        # is cached so this costs no network round trip.
+        health = ProviderHealth.instance()
+        for a in list(suggestedApis):
+            message = health.unavailableMessage(a)
+            if message:
+                suggestedApis.remove(a)
+                violatedRules.append(message)
+
         api = api in suggestedApis if api else False
 
         return(api, violatedRules, suggestedApis)
@@ -240,18 +272,9 @@ class FinPlot:
         '''
         Get a data method
         '''
-        # self.api = api
-        if self.api == 'bc':
-            # retrieves previous biz day until about 16:30
-            return bc.getbc_intraday
-        if self.api == 'av':
-            return mav.getmav_intraday
-        if self.api == 'ib':
-            return ib.getib_intraday
-        if self.api == 'iex':
-            return iex.getiex_intraday
-
-        return None
+        # The provider modules are imported on first use. bc retrieves the previous biz day
+        # until about 16:30
+        return providers.getIntraday(self.api)
 
     def setTimeFrame(self, begin, end, interval):
         '''
@@ -279,10 +302,10 @@ class FinPlot:
         begin = begin - dt.timedelta(0, xtime*60)
         end = end + dt.timedelta(0, xtime*60)
 
-        # If beginning is before 10:15-- show the opening
-        mopen = dt.datetime(beginday.year, beginday.month, beginday.day, 9, 30)
+        # If beginning is before 10:15-- show the opening. The close is 13:00 on early close days.
+        mopen = tcal.regularHours(beginday)[0]
         orbu = dt.datetime(beginday.year, beginday.month, beginday.day, 10, 15)
-        mclose = dt.datetime(endday.year, endday.month, endday.day, 16, 0)
+        mclose = tcal.regularHours(endday)[1]
 
         begin = mopen if begin <= orbu else begin
         end = mclose if end >= mclose else end
@@ -295,7 +318,8 @@ class FinPlot:
 
     def setadjust(self, left=.04, bottom=.14, top=.96, right=.89):
         '''
-        Adjust the margins of the graph. Use self.interactive=True to find the correct settings
+        Adjust the margins of the graph. The interactive chart (ChartCanvas) helps find the
+        correct settings
         '''
         self.adjust['left'] = left
         self.adjust['right'] = right
@@ -320,128 +344,312 @@ class FinPlot:
 
         start = pd.Timestamp(start)
         end = pd.Timestamp(end)
-        if self.style:
-            style.use(self.style)
+        cached = self.getCachedChart(symbol, start, end, minutes, save, dtFormat)
+        if cached:
+            return cached
+        df, maDict = self.getChartData(symbol, start, end, minutes)
+        if df is None:
+            return None
+        return self.renderChart(df, maDict, symbol, start, end, minutes, dtFormat, save)
 
-        ################ Prepare data ##############
-        # Get the data and prepare the DtaFrames from some stock api
-        meta, df, maDict = (self.apiChooser())(
-            symbol, start=start, end=end, minutes=minutes)
+    def chartKey(self, symbol, start, end, minutes, dtFormat="%H:%M"):
+        '''
+        Return the chart cache key for a request. The key covers the request, the moving average
+        settings, the style and marker settings and the entry markers.
+        '''
+        maSettings = self.maSettings
+        if not maSettings:
+            try:
+                maSettings = getMASettings()
+            except (TypeError, IndexError):
+                maSettings = None
+        if maSettings:
+            maSettings = [list(maSettings[0].items()), maSettings[1]]
+        chartSettings = [str(self.chartSet.value(k)) for k in CHARTKEYS]
+        return chartKey(symbol, pd.Timestamp(start), pd.Timestamp(end), minutes, dtFormat,
+                        maSettings, self.style, self.gridlines, self.legend, self.adjust,
+                        chartSettings, self.entries)
+
+    def getChartCache(self, save, end):
+        '''
+        Return the ChartCache for the directory of save or None if the chart should not be
+        cached. A chart that ends in the future has incomplete data and is not cached.
+        '''
+        if not self.useCache or pd.Timestamp(end) > pd.Timestamp.now():
+            return None
+        outdir = os.path.dirname(save)
+        return ChartCache.forDir(outdir if outdir else '.')
+
+    def getCachedChart(self, symbol, start, end, minutes, save, dtFormat="%H:%M"):
+        '''
+        Return the name of an identical chart that was already rendered or None.
+        '''
+        cache = self.getChartCache(save, end)
+        if not cache:
+            return None
+        return cache.get(self.chartKey(symbol, start, end, minutes, dtFormat))
+
+    def getChartData(self, symbol, start, end, minutes):
+        '''
+        Retrieve the candle data for a chart from the current api (self.api). This is the network
+        bound half of graph_candlestick. On failure the error is kept in self.errorCode and
+        self.errorMessage. Each FinPlot instance holds its own error so charts can be retrieved
+        concurrently.
+        :return: (df, maDict) or (None, None) if no data was retrieved.
+        '''
+        self.errorCode = ''
+        self.errorMessage = ''
+        clipped = tcal.clipToSessions(start, end)
+        if clipped is None:
+            self.errorCode = 'closed'
+            self.errorMessage = tcal.closedMessage(start, end)
+            return None, None
+        start, end = clipped
+        stored = self.getStoredBars(symbol, start, end, minutes)
+        if stored:
+            return stored
+        health = ProviderHealth.instance()
+        try:
+            with span('FinPlot.getChartData', api=self.api) as s:
+                meta, df, maDict = (self.apiChooser())(
+                    symbol, start=pd.Timestamp(start), end=pd.Timestamp(end), minutes=minutes)
+                s.set(rows=len(df))
+        except Exception as ex:
+            health.reportFailure(self.api, f'{type(ex).__name__}: {ex}')
+            raise
         if df.empty:
             if not isinstance(meta, int):
-                self.apiset.setValue('errorCode', str(meta['code']))
-                self.apiset.setValue('errorMessage', meta['message'])
+                self.errorCode = str(meta['code'])
+                self.errorMessage = meta['message']
+            else:
+                self.errorMessage = 'Failed to retrieve data'
+            if self.errorCode != 'closed':
+                health.reportFailure(self.api, self.errorMessage,
+                                     rateLimited=isRateLimit(self.errorCode))
+            return None, None
+        health.reportSuccess(self.api)
+        return df, maDict
+
+    def getStoredBars(self, symbol, start, end, minutes):
+        '''
+        Return (df, maDict) from the local bar store if every day of the request was prefetched
+        or None.
+        '''
+        if not self.useBarStore:
+            return None
+        db = self.barDB if self.barDB else getDB()
+        if not db or not os.path.exists(db):
             return None
-        df['date'] = df.index
+        store = BarStore.forDB(db)
+        if not store.hasBars(symbol, start, end):
+            return None
+        with span('FinPlot.getStoredBars') as s:
+            df = store.getBars(symbol, start, end, minutes)
+            s.set(rows=len(df))
+        if df.empty:
+            return None
+        try:
+            maDict = movingAverage(df.close, df, start)
+        except (TypeError, IndexError):
+            # No moving average settings
+            maDict = dict()
+        return df, maDict
+
+    @timed('FinPlot.renderChart')
+    def renderChart(self, df, maDict, symbol, start, end, minutes=1, dtFormat="%H:%M",
+                    save='trade'):
+        '''
+        Draw and save the chart for data retrieved by getChartData. The chart is drawn on a
+        Figure with an Agg canvas. Matplotlib styles are global rcParams, so drawing is serialized
+        with PLOT_LOCK. That allows the retrieval of several charts to run at once from worker
+        threads.
+        :return: The name of the saved file.
+        '''
+        with PLOT_LOCK:
+            if self.style:
+                with style.context(self.style):
+                    return self._renderChart(df, maDict, symbol, start, end, minutes, dtFormat,
+                                             save)
+            return self._renderChart(df, maDict, symbol, start, end, minutes, dtFormat, save)
+
+    def candleCollections(self, t, o, h, l, c, width, colup, coldown):
+        '''
+        Create the candle bodies and wicks for all candles as two collections.
+        :params t: Array of matplotlib date numbers
+        :params o, h, l, c: Arrays of open, high, low, close
+        :params width: Candle width in days
+        :return: (PolyCollection, LineCollection) for the bodies and the wicks.
+        '''
+        colors = np.where(c >= o, colup, coldown)
+        w = width / 2
+        lower = np.minimum(o, c)
+        upper = np.maximum(o, c)
+
+        verts = np.empty((len(t), 4, 2))
+        verts[:, :, 0] = np.column_stack([t - w, t - w, t + w, t + w])
+        verts[:, :, 1] = np.column_stack([lower, upper, upper, lower])
+        bodies = PolyCollection(verts, facecolors=colors, edgecolors=colors,
+                                linewidths=0.5, alpha=.99, zorder=3)
+
+        segs = np.empty((len(t), 2, 2))
+        segs[:, 0, 0] = segs[:, 1, 0] = t
+        segs[:, 0, 1] = l
+        segs[:, 1, 1] = h
+        wicks = LineCollection(segs, colors=colors, linewidths=0.5, alpha=.99, zorder=2)
+        return bodies, wicks
+
+    def volumeCollection(self, t, o, c, v, width, colup, coldown):
+        '''
+        Create all the volume bars as a single PolyCollection
+        :params t: Array of matplotlib date numbers
+        :params o, c: Arrays of open and close used to color the bars
+        :params v: Array of volume
+        :params width: Bar width in days
+        '''
+        colors = np.where(c > o, colup, np.where(c == o, 'k', coldown))
+        w = width / 2
+        zero = np.zeros(len(t))
+        verts = np.empty((len(t), 4, 2))
+        verts[:, :, 0] = np.column_stack([t - w, t - w, t + w, t + w])
+        verts[:, :, 1] = np.column_stack([zero, v, v, zero])
+        return PolyCollection(verts, facecolors=colors, edgecolors='none')
+
+    def markEntries(self, ax, t):
+        '''
+        Place the entry and exit markers. All markers for one side are drawn with one scatter.
+        :params ax: The candle Axes
+        :params t: Array of matplotlib date numbers for the candles
+        '''
+        markersize = self.chartSet.value('markersize', 90)
+        edgec = self.chartSet.value('markeredgecolor', '#000000')
+        alpha = float(self.chartSet.value('markeralpha', 0.5))
+        sides = {'B': ([], [], self.chartSet.value('markercolorup', 'g'), '^'),
+                 'S': ([], [], self.chartSet.value('markercolordown', 'r'), 'v')}
+        for entry in self.entries:
+            if entry[1] < 0 or entry[1] > (len(t)-1):
+                continue
+            side = sides['B'] if entry[2] == 'B' else sides['S']
+            side[0].append(t[entry[1]])
+            side[1].append(entry[0])
+
+        for x, y, facec, mark in sides.values():
+            if not x:
+                continue
+            ax.scatter(x, y, color=facec, marker=markers.MarkerStyle(marker=mark,
+                                                                     fillstyle='full'),
+                       s=float(markersize), zorder=10, edgecolors=edgec, alpha=alpha)
+
+    def _renderChart(self, df, maDict, symbol, start, end, minutes, dtFormat, save):
+        '''The drawing half of graph_candlestick. Call renderChart instead.'''
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        self.drawChart(fig, df, maDict, symbol, start, end, minutes, dtFormat)
+
+        # A file the cache created is a previous render of this chart and is replaced
+        cache = self.getChartCache(save, end)
+        count = 1
+        saveorig = save
+        while os.path.exists(save) and not (cache and cache.owns(save)):
+            s, ext = os.path.splitext(saveorig)
+            save = '{}({}){}'.format(s, count, ext)
+            count = count + 1
+
+        fig.savefig(save)
+        if cache:
+            cache.put(self.chartKey(symbol, start, end, minutes, dtFormat), save)
+        return save
 
-        df['date'] = df['date'].map(mdates.date2num)
+    def drawChart(self, fig, df, maDict, symbol, start, end, minutes=1, dtFormat="%H:%M"):
+        '''
+        Draw the candles, volume, entry markers and moving averages on fig. Used for the saved
+        charts and for the interactive ChartCanvas. The caller is responsible for the style.
+        :return: A dict with the Axes (ax1, ax2) and the candle collections (bodies, wicks,
+                volume)
+        '''
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end)
 
-        df_ohlc = df[['date', 'open', 'high', 'low', 'close']]
-        df_volume = df[['date', 'volume']]
+        ################ Prepare data ##############
+        t = mdates.date2num(pd.DatetimeIndex(df.index).to_pydatetime())
+        o = df['open'].to_numpy(dtype=float)
+        h = df['high'].to_numpy(dtype=float)
+        l = df['low'].to_numpy(dtype=float)
+        c = df['close'].to_numpy(dtype=float)
+        v = df['volume'].to_numpy(dtype=float)
         ################ End Prepare data ##############
         ####### PLOT and Graph #######
         colup = self.chartSet.value('colorup', 'g')
         coldown = self.chartSet.value('colordown', 'r')
-        ax1 = plt.subplot2grid((6, 1), (0, 0), rowspan=5, colspan=1)
-        ax1.grid(b=self.gridlines[0], which='major', axis=self.gridlines[1])
 
-        ax2 = plt.subplot2grid((6, 1), (5, 0), rowspan=1,
-                               colspan=1, sharex=ax1)
-        fig = plt.gcf()
+        gs = fig.add_gridspec(6, 1)
+        ax1 = fig.add_subplot(gs[0:5, 0])
+        if self.gridlines[0]:
+            ax1.grid(self.gridlines[0], which='major', axis=self.gridlines[1])
+        ax2 = fig.add_subplot(gs[5, 0], sharex=ax1)
         fig.subplots_adjust(hspace=0)
 
         # candle width is a percentage of a day
         width = (minutes*35)/(3600 * 24)
-        candlestick_ohlc(ax1, df_ohlc.values, width, colorup=colup, colordown=coldown, alpha=.99)
-
-        for date, volume, dopen, close in zip(df_volume.date.values, df_volume.volume.values,
-                                              df_ohlc.open.values, df_ohlc.close.values):
-            color = colup if close > dopen else 'k' if close == dopen else coldown
-            ax2.bar(date, volume, width, color=color)
+        bodies, wicks = self.candleCollections(t, o, h, l, c, width, colup, coldown)
+        ax1.add_collection(wicks)
+        ax1.add_collection(bodies)
+        ax1.autoscale_view()
+
+        volume = self.volumeCollection(t, o, c, v, width, colup, coldown)
+        ax2.add_collection(volume)
+        ax2.autoscale_view()
         ####### END PLOT and Graph #######
-        ####### ENTRY MARKER STUFF #######
-        markersize = self.chartSet.value('markersize', 90)
-        edgec = self.chartSet.value('markeredgecolor', '#000000')
-        alpha = float(self.chartSet.value('markeralpha', 0.5))
-        for entry in self.entries:
-            e = entry[3]
-            if entry[1] < 0 or entry[1] > (len(df_ohlc)-1):
-                continue
-            x = df_ohlc.index[entry[1]]
-            y = entry[0]
-            if entry[2] == 'B':
-                facec = self.chartSet.value('markercolorup', 'g')
-                mark = '^'
-            else:
-                facec = self.chartSet.value('markercolordown', 'r')
-                mark = 'v'
-            l = ax1.scatter(x, y, color=facec, marker=markers.MarkerStyle(
-                marker=mark, fillstyle='full'), s=markersize, zorder=10)
-            l.set_edgecolor(edgec)
-            l.set_alpha(alpha)
-        ####### END MARKER STUFF #######
+        self.markEntries(ax1, t)
         ##### TICKS-and ANNOTATIONS #####
 
         ax1.yaxis.tick_right()
         ax2.yaxis.tick_right()
-        # ax1.grid(True, axis='y')
 
-        plt.setp(ax1.get_xticklabels(), visible=False)
-        for label in ax2.xaxis.get_ticklabels():
-            label.set_rotation(-45)
-            label.set_fontsize(8)
+        ax1.tick_params(axis='x', labelbottom=False)
+        ax2.tick_params(axis='x', labelrotation=-45, labelsize=8)
         ax2.xaxis.set_major_formatter(mdates.DateFormatter(dtFormat))
         ax2.yaxis.set_major_formatter(FuncFormatter(self.volFormat))
-        plt.locator_params(axis='y', tight=True, nbins=2)
+        ax2.locator_params(axis='y', tight=True, nbins=2)
 
         numcand = ((end-start).total_seconds()/60)//minutes
         ax2.xaxis.set_major_locator(mdates.MinuteLocator(
             byminute=self.setticks(minutes, numcand)))
 
-        idx = int(len(df_ohlc.date)*.39)
+        idx = int(len(t)*.39)
 
-        ax1.annotate(f'{symbol} {minutes} minute', (df_ohlc.date[idx], df_ohlc.low.max()),
+        ax1.annotate(f'{symbol} {minutes} minute', (t[idx], l.max()),
                      xytext=(0.4, 0.85), textcoords='axes fraction', alpha=0.35, size=16)
         ##### END TICKS-and ANNOTATIONS #####
         ####### ma, ema and vwap #######
-        MA1 = 9
-        MA2 = 20
-        MA3 = 50
-        MA4 = 200
-        MA5 = 'vwap'
         if maDict:
-            maSetDict = getMASettings()
+            maSetDict = self.maSettings if self.maSettings else getMASettings()
             for ma in maSetDict[0]:
                 if not ma in maDict.keys():
                     continue
-                ax1.plot(df_ohlc.date, maDict[ma], lw=1, color=maSetDict[0][ma][1], label=f'{ma}MA')
+                ax1.plot(*self._maLine(maDict[ma]), lw=1, color=maSetDict[0][ma][1],
+                         label=f'{ma}MA')
             if 'vwap' in maDict.keys():
-                ax1.plot(df_ohlc.date, maDict['vwap'], lw=1, color=maSetDict[1][0][1], label='VWAP')
+                ax1.plot(*self._maLine(maDict['vwap']), lw=1, color=maSetDict[1][0][1],
+                         label='VWAP')
         if self.legend:
             leg = ax1.legend()
             leg.get_frame().set_alpha(0.35)
         ##### Adjust margins and frame
-        top = df_ohlc.high.max()
-        bottom = df_ohlc.low.min()
-        margin=(top-bottom) * .08
+        top = h.max()
+        bottom = l.min()
+        margin = (top-bottom) * .08
         ax1.set_ylim(bottom=bottom-margin, top=top+(margin*2))
 
         ad = self.adjust
-        plt.subplots_adjust(left=ad['left'], bottom=ad['bottom'], right=ad['right'],
+        fig.subplots_adjust(left=ad['left'], bottom=ad['bottom'], right=ad['right'],
                             top=ad['top'], wspace=0.2, hspace=0)
 
-        if self.chartSet.value('interactive', False, bool):
-            # plt.savefig('out/figure_1.png')
-            plt.show()
-        count = 1
-        saveorig = save
-        while os.path.exists(save):
-            s, ext = os.path.splitext(saveorig)
-            save = '{}({}){}'.format(s, count, ext)
-            count = count + 1
+        return {'ax1': ax1, 'ax2': ax2, 'bodies': bodies, 'wicks': wicks, 'volume': volume}
 
-        fig.savefig(save)
-        return save
+    def _maLine(self, ma):
+        '''Return x, y arrays for a moving average Series or one column DataFrame'''
+        x = mdates.date2num(pd.DatetimeIndex(ma.index).to_pydatetime())
+        return x, np.asarray(ma, dtype=float).ravel()
 
 
 def localRun():
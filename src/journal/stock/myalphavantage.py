@@ -18,7 +18,7 @@ import datetime as dt
 import time
 import requests
 import pandas as pd
-from journal.stock.picklekey import getKey as getPickledKey
+from journal.stock.tradingcalendar import clipToSessions, closedMessage
 from journal.stock.utilities import ManageKeys, movingAverage
 # import pickle
 
@@ -64,16 +64,14 @@ OUTPUTSIZE = ('compact', 'full')  # compact is default
 INTERVAL = ('1min', '5min', '15min', '30min',
             '60min', 'daily', 'weekly', 'monthly')
 
-# Deprecated
-APIKEY = getPickledKey('alphavantage')['key']
-
 def getKey():
     mk=ManageKeys()
     return mk.getKey('av')
 
 
 def getkeyPickled():
-    '''My Personal key'''
+    '''Deprecated. My Personal key'''
+    from journal.stock.picklekey import getKey as getPickledKey
     k = getPickledKey('alphavantage')
     return k
 
@@ -171,6 +169,12 @@ def getmav_intraday(symbol, start=None, end=None, minutes=None, showUrl=False):
     print('======= Called alpha =======')
     start = pd.to_datetime(start) if start else None
     end = pd.to_datetime(end) if end else None
+    if start is not None and end is not None:
+        clipped = clipToSessions(start, end)
+        if clipped is None:
+            meta = {'code': 'closed', 'message': closedMessage(start, end)}
+            return meta, pd.DataFrame(), None
+        start, end = clipped
     if not minutes:
         minutes = 1
 
@@ -204,20 +208,23 @@ def getmav_intraday(symbol, start=None, end=None, minutes=None, showUrl=False):
 
     # If we exceed the requests/min, we get a friendly html string sales pitch.
     metaj = result[keys[0]]
+    global R            # pylint: disable = W0603
     if len(keys) < 2:
-        global R            # pylint: disable = W0603
         if not R:
-            R = 1
-            r = Retries()
-        if r.retries > 0:
+            R = Retries()
+        if R.retries > 0:
             print(metaj)
-            print(f'Will retry in 60 seconds: {RETRY - r.retries + 1} of {RETRY} tries.')
-            r.retries = r.retries - 1
+            print(f'Will retry in 60 seconds: {RETRY - R.retries + 1} of {RETRY} tries.')
+            R.retries = R.retries - 1
 
             time.sleep(60)
-            return getmav_intraday(symbol, start=start, end=end, minutes=minutes, showUrl=showUrl)
+            return getmav_intraday(symbol, start=start, end=end, minutes=original_minutes,
+                                   showUrl=showUrl)
         # This tells us we have exceeded the limit and gives the premium link. AARRGH. Yahoo come back
-        return None
+        R = None
+        meta = {'code': 'ratelimit', 'message': str(metaj)}
+        return meta, pd.DataFrame(), None
+    R = None
 
     dataJson = result[keys[1]]
 
@@ -306,7 +313,7 @@ def getmav_intraday(symbol, start=None, end=None, minutes=None, showUrl=False):
     return metaj, df, maDict
 
 def notmain():
-    print (APIKEY)
+    print(getkeyPickled()['key'])
     print(getKey())
 
 if __name__ == '__main__':
@@ -9,15 +9,12 @@ system. I am goingto implement the straight RESTful free API using request.
 import datetime as dt
 import requests
 import pandas as pd
-from journal.stock.picklekey import getKey as getReg
+from journal.stock.tradingcalendar import clipToSessions, closedMessage
 from journal.stock.utilities import ManageKeys, getLastWorkDay, movingAverage
 
 
 # pylint: disable = C0103, R0912, R0914, R0915
 
-# Deprecated
-APIKEY = getReg('barchart')['key']
-
 # https://marketdata.websol.barchart.com/getHistory.json?apikey={APIKEY}&symbol=AAPL&type=minutes&startDate=20181001&maxRecords=100&interval=5&order=asc&sessionFilter=EFK&splits=true&dividends=true&volume=sum&nearby=1&jerq=true
 
 def getApiKeyPickled():
@@ -25,7 +22,8 @@ def getApiKeyPickled():
     Deprecated
     Returns the key for the barchart API
     '''
-    return APIKEY
+    from journal.stock.picklekey import getKey as getReg
+    return getReg('barchart')['key']
 
 def getApiKey():
     '''Returns the key for the barchart API
@@ -82,8 +80,8 @@ TYPE = ['minutes', 'nearbyMinutes', 'formTMinutes',
 ORDER = ['asc', 'desc']
 VOLUME = ['total', 'sum', 'contract', 'sumcontract', 'sumtotal']
 
-# For testing
-DEMO_PARAMS = {'apikey': getApiKey(),
+# For testing. Set apikey with getApiKey()
+DEMO_PARAMS = {'apikey': None,
                'symbol': 'AAPL',
                'type': 'minutes',
                'startDate': '2018-12-03 12:45',
@@ -145,6 +143,11 @@ def getbc_intraday(symbol, start=None, end=None, minutes=5, showUrl=True):
         start = getLastWorkDay(start)
     end = pd.to_datetime(end)
     start = pd.to_datetime(start)
+    clipped = clipToSessions(start, end)
+    if clipped is None:
+        meta = {'code': 'closed', 'message': closedMessage(start, end)}
+        return meta, pd.DataFrame(), None
+    start, end = clipped
     startDay = start.strftime("%Y%m%d")
 
     # Get the maximum data in order to set the 200 MA on a 60 minute chart
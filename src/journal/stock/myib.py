@@ -19,6 +19,7 @@ from ibapi.client import EClient
 from ibapi.common import TickerId
 from ibapi.contract import Contract
 
+from journal.stock.tradingcalendar import clipToSessions, closedMessage
 from journal.stock.utilities import getLastWorkDay, IbSettings, movingAverage
 
 
@@ -267,6 +268,11 @@ def getib_intraday(symbol, start=None, end=None, minutes=1, showUrl='dummy'):
         start = pd.Timestamp(biz.year, biz.month, biz.day, 9, 30)
     start = pd.Timestamp(start)
     end = pd.Timestamp(end)
+    clipped = clipToSessions(start, end)
+    if clipped is None:
+        print(closedMessage(start, end))
+        return 0, pd.DataFrame(), None
+    start, end = clipped
 
     dur = ''
     fullstart = end
@@ -6,6 +6,8 @@ A module to access iex API. From the REStful source. No wrapeere packages
 # import datetime as dt
 import pandas as pd
 import requests
+
+from journal.stock.tradingcalendar import clipToSessions, closedMessage
 # pylint: disable=C0103
 
 
@@ -99,6 +101,12 @@ def getiex_intraday(symbol, start=None, end=None, minutes=None, showUrl=False):
     if startday != endday:
         raise ValueError(
             'start and end parameters must be on the same day for IEX intraday API')
+    if start is not None and end is not None:
+        clipped = clipToSessions(start, end)
+        if clipped is None:
+            print(closedMessage(start, end))
+            return 0, pd.DataFrame(), None
+        start, end = clipped
     df = get_trading_chart(symbol, start=start, end=end,
                            minutes=minutes, showUrl=showUrl)
     if not df.empty:
@@ -0,0 +1,281 @@
+'''
+Prefetch the 1 minute bars of every traded symbol and day into the bar store
+(journal.stock.barstore) so a week of review can be done offline and the charts stay available
+after a provider drops the data. The symbols and days come from a statement or from the
+statements of a range of days in the journal catalog. Each request goes to the first api in the
+preferences that still keeps the day and has calls left in its budget. Closed days are skipped.
+The finished symbol days are recorded, so a stopped or failed prefetch resumes where it left off.
+
+Run it from the src directory:
+    python -m journal.stock.prefetch --start 2019-10-14 --end 2019-10-18
+    python -m journal.stock.prefetch --infile trades.csv --date 2019-10-18
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import argparse
+import collections
+import datetime as dt
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from journal.instrument import span
+from journal.settings import getDB, getSettings
+from journal.stock import providers
+from journal.stock import tradingcalendar as tcal
+from journal.stock.barstore import FINISHED, BarStore
+
+# pylint: disable = C0103
+
+# api: (calls, seconds, calls per day or None). The free tiers of the providers.
+BUDGETS = {'av': (5, 60, 500),
+           'bc': (10, 60, 400),
+           'iex': (5, 1, None),
+           'ib': (60, 600, None)}
+
+# api: The number of days of 1 minute history the provider keeps
+RETENTION = {'av': 6, 'bc': 40, 'iex': 30, 'ib': 180}
+
+MAXATTEMPTS = 3
+
+
+class Budget:
+    '''
+    At most calls requests in any period of seconds and at most perDay requests in a day. The
+    calls made today are counted from the bar store so the daily budget holds across runs.
+    '''
+
+    def __init__(self, calls, seconds, perDay=None, usedToday=0, clock=time.monotonic):
+        self.calls = calls
+        self.seconds = seconds
+        self.perDay = perDay
+        self.usedToday = usedToday
+        self.clock = clock
+        self.recent = collections.deque()
+
+    def exhausted(self):
+        '''Return True if the daily budget is used up'''
+        return self.perDay is not None and self.usedToday >= self.perDay
+
+    def delay(self):
+        '''Return the seconds to wait before the next call is in budget'''
+        now = self.clock()
+        while self.recent and now - self.recent[0] >= self.seconds:
+            self.recent.popleft()
+        if len(self.recent) < self.calls:
+            return 0.0
+        return self.seconds - (now - self.recent[0])
+
+    def spend(self):
+        self.recent.append(self.clock())
+        self.usedToday += 1
+
+
+def tradedSymbolDays(df, theDate=None):
+    '''
+    Return the sorted (symbol, day) pairs of the trades in df.
+    :params df: A statement DataFrame with the columns Symb and Date (or a theDate)
+    '''
+    if df is None or df.empty:
+        return []
+    if 'Date' in df.columns:
+        days = pd.to_datetime(df['Date'], errors='coerce').dt.normalize()
+    else:
+        days = pd.Series(pd.Timestamp(theDate).normalize(), index=df.index)
+    if theDate is not None:
+        days = days.fillna(pd.Timestamp(theDate).normalize())
+    pairs = {(str(s), d) for s, d in zip(df['Symb'], days) if not pd.isnull(d)}
+    return sorted(pairs, key=lambda p: (p[1], p[0]))
+
+
+def statementSymbolDays(path, theDate, useCache=True):
+    '''
+    Return the (symbol, day) pairs of the statement at path for theDate
+    :params useCache: Use and fill the parsed statement cache
+    '''
+    from journalfiles import JournalFiles, statementType
+    from journal.statementcache import loadStatement
+
+    indir, infile = os.path.split(path)
+    jf = JournalFiles(indir=indir, outdir=os.path.join(indir, 'out'), theDate=theDate,
+                      infile=infile, inputType=statementType(infile))
+    df, jf = loadStatement(jf, useCache)
+    return tradedSymbolDays(df, theDate)
+
+
+def journalSymbolDays(journal, start, end, scheme=None, db=None, useCache=True):
+    '''Return the (symbol, day) pairs of the statements in the journal from start to end'''
+    from journal.catalog import DEFAULTSCHEME, Catalog
+
+    catalog = Catalog(journal, scheme if scheme else DEFAULTSCHEME, db)
+    catalog.update()
+    files = catalog.files(start, end, 'statement')
+    pairs = set()
+    for path, theDate in zip(files.path, files.theDate):
+        try:
+            pairs.update(statementSymbolDays(path, theDate, useCache))
+        except Exception as ex:     # pylint: disable = W0703
+            print(f'Skipping {path}: {ex!r}')
+    return sorted(pairs, key=lambda p: (p[1], p[0]))
+
+
+class Prefetcher:
+    '''
+    Fetch the 1 minute bars of (symbol, day) pairs into a BarStore.
+    :params store: The BarStore
+    :params apis: The apis in the order to try them. Defaults to the APIPref setting.
+    :params budgets: dict api: (calls, seconds, perDay)
+    :params retention: dict api: days of history the provider keeps
+    '''
+
+    def __init__(self, store, apis=None, budgets=None, retention=None, now=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.store = store
+        if not apis:
+            p = getSettings('zero_substance/stockapi', 'structjour').value('APIPref')
+            apis = p.replace(' ', '').split(',') if p else ['ib', 'bc', 'av', 'iex']
+        self.apis = [a for a in apis if a in providers.PROVIDERS]
+        self.retention = dict(RETENTION, **(retention if retention else {}))
+        self.now = now
+        self.sleep = sleep
+        budgets = dict(BUDGETS, **(budgets if budgets else {}))
+        today = dt.datetime.combine(dt.date.today(), dt.time())
+        self.budgets = {a: Budget(*budgets.get(a, (1, 1, None)),
+                                  usedToday=store.callsSince(a, today), clock=clock)
+                        for a in self.apis}
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.counts = collections.Counter()
+
+    def getNow(self):
+        return pd.Timestamp(self.now) if self.now is not None else pd.Timestamp.now()
+
+    def pending(self, symbolDays):
+        '''
+        Return the (symbol, day, start, end) requests still to do. Closed days, days whose
+        session has not ended, finished days and days that failed MAXATTEMPTS times are left out.
+        '''
+        statuses = self.store.statuses()
+        now = self.getNow()
+        work = []
+        for symbol, day in symbolDays:
+            sess = tcal.session(day, extended=True)
+            if not sess or sess[1] > now:
+                continue
+            status, attempts = statuses.get((symbol, pd.Timestamp(day).strftime('%Y-%m-%d')),
+                                            (None, 0))
+            if status in FINISHED or attempts >= MAXATTEMPTS:
+                continue
+            work.append((symbol, pd.Timestamp(day), sess[0], sess[1]))
+        return work
+
+    def chooseApi(self, day):
+        '''Return the first api that keeps day and has budget left today or None'''
+        age = (self.getNow().normalize() - pd.Timestamp(day).normalize()).days
+        for api in self.apis:
+            if age <= self.retention.get(api, 0) and not self.budgets[api].exhausted():
+                return api
+        return None
+
+    def fetch(self, symbol, day, start, end, api):
+        '''Request one symbol day from api and store the result. Return the status.'''
+        budget = self.budgets[api]
+        wait = budget.delay()
+        while wait > 0 and not self.stopEvent.is_set():
+            self.sleep(min(wait, 1.0))
+            wait = budget.delay()
+        if self.stopEvent.is_set():
+            return None
+        budget.spend()
+        try:
+            with span('Prefetcher.fetch', api=api, symbol=symbol) as s:
+                meta, df, dummy = providers.getIntraday(api)(symbol, start=start, end=end,
+                                                            minutes=1)
+                s.set(rows=0 if df is None else len(df))
+        except Exception as ex:     # pylint: disable = W0703
+            self.store.record(symbol, day, api, 'failed', message=f'{type(ex).__name__}: {ex}')
+            return 'failed'
+        if df is None or df.empty:
+            message = meta.get('message') if isinstance(meta, dict) else None
+            self.store.record(symbol, day, api, 'failed', message=message)
+            return 'failed'
+        df = df.loc[(df.index >= start) & (df.index <= end)]
+        return 'done' if self.store.putBars(symbol, day, df, api) else 'empty'
+
+    def run(self, symbolDays):
+        '''
+        Fetch the pending symbol days until they are done or stop is called.
+        :return: A Counter of the outcomes: done, empty, failed and unavailable (no api keeps
+                the day or has budget left)
+        '''
+        for symbol, day, start, end in self.pending(symbolDays):
+            if self.stopEvent.is_set():
+                break
+            api = self.chooseApi(day)
+            if not api:
+                self.counts['unavailable'] += 1
+                continue
+            status = self.fetch(symbol, day, start, end, api)
+            if status:
+                self.counts[status] += 1
+        return self.counts
+
+    def start(self, symbolDays):
+        '''Run in a background thread'''
+        self.stopEvent.clear()
+        self.thread = threading.Thread(target=self.run, args=(list(symbolDays),),
+                                       name='Prefetcher', daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self, wait=True):
+        '''Stop after the current request'''
+        self.stopEvent.set()
+        if wait and self.thread:
+            self.thread.join()
+
+
+def main(args=None):
+    settings = getSettings('zero_substance', 'structjour')
+    parser = argparse.ArgumentParser(description='Prefetch 1 minute bars for the traded symbols')
+    parser.add_argument('--journal', default=settings.value('journal'),
+                        help='The journal directory. Defaults to the journal setting.')
+    parser.add_argument('--start', help='The first day of the journal to prefetch')
+    parser.add_argument('--end', help='The last day. Defaults to today.')
+    parser.add_argument('--infile', help='Prefetch the symbols of this statement instead')
+    parser.add_argument('--date', help='The date of --infile. Defaults to today.')
+    parser.add_argument('--apis', help='Comma separated apis to use. Defaults to APIPref.')
+    parser.add_argument('--db', default=getDB(), help='The sqlite file. Defaults to '
+                        'structjour.sqlite in the journal directory.')
+    opts = parser.parse_args(args)
+    if not opts.db:
+        parser.error('Set the sqlite file with --db')
+
+    if opts.infile:
+        symbolDays = statementSymbolDays(opts.infile, pd.Timestamp(opts.date or dt.date.today()))
+    elif opts.start:
+        if not opts.journal or not os.path.isdir(opts.journal):
+            parser.error('Set the journal directory with --journal')
+        symbolDays = journalSymbolDays(opts.journal, opts.start, opts.end or dt.date.today())
+    else:
+        parser.error('Give --start or --infile')
+
+    apis = opts.apis.replace(' ', '').split(',') if opts.apis else None
+    prefetcher = Prefetcher(BarStore(opts.db), apis)
+    try:
+        counts = prefetcher.run(symbolDays)
+    except KeyboardInterrupt:
+        counts = prefetcher.counts
+    print(f'{len(symbolDays)} symbol days: ' +
+          ', '.join(f'{k} {v}' for k, v in sorted(counts.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+'''
+The health and the capabilities of the stock data providers, answered from memory for the api
+chooser. Connectivity (an IB gateway connection) is probed in a background thread at startup,
+after a failed request and when the last answer is older than TTL. The chooser never waits for
+a probe. It uses the last answer and, before the first answer, assumes the provider is up. A
+rate limit reply reported by the chart code takes the provider out of the choice until it
+expires. The time windows of the free data (Barchart publishes today at 16:30, AlphaVantage
+keeps 6 days) are kept as data in CAPABILITIES.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import datetime as dt
+import threading
+import time
+
+import pandas as pd
+
+from journal.stock import providers
+
+# pylint: disable = C0103
+
+# Seconds a connectivity probe is trusted
+TTL = 60
+
+# Seconds to leave a provider alone after it replied with a rate limit
+RATELIMIT = 60
+
+# The error codes of a rate limit reply. Barchart answers 666, AlphaVantage 'ratelimit' once
+# its retries are spent.
+RATELIMITCODES = ('666', 'ratelimit')
+
+# api: (name, days of 1 minute history or None, time of day the day's data is published or None)
+CAPABILITIES = {'bc': ('Barchart', None, dt.time(16, 30)),
+                'av': ('AlphaVantage', 6, None),
+                'ib': ('IBAPI', None, None),
+                'iex': ('IEX', None, None)}
+
+
+def ibConnected():
+    '''Open and close a connection to the IB gateway. This is the network round trip to cache.'''
+    return bool(providers.getModule('ib').isConnected())
+
+
+# api: A function that returns True if the provider can be reached. The others are assumed to be
+# reachable until a request fails.
+PROBES = {'ib': ibConnected}
+
+
+def isRateLimit(code):
+    '''Return True if code is the error code of a rate limit reply from any provider'''
+    return str(code) in RATELIMITCODES
+
+
+def apiName(api):
+    return CAPABILITIES.get(api, (api,))[0]
+
+
+def windowMessage(api, start, end, now):
+    '''
+    Return why api has no data from start to end at the New York time now or None.
+    '''
+    name, days, published = CAPABILITIES.get(api, (api, None, None))
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    now = pd.Timestamp(now)
+    if published:
+        # The current day is not available till published. Nor is yesterday after 12.
+        tradeday = start.normalize()
+        today = now.normalize()
+        yday = today - pd.Timedelta(days=1)
+        before = now < dt.datetime.combine(today.date(), published)
+        if tradeday == today and before:
+            return (f'{name} free data will not return todays data till '
+                    f'{published.strftime("%H:%M")}')
+        if tradeday == yday and end > yday + pd.Timedelta(hours=11, minutes=59) and before:
+            return (f'{name} free data will not yesterdays data after 12 till today at  '
+                    f'{published.strftime("%H:%M")}')
+    if days is not None and now > start and (now - start).days > days:
+        lastday = now - pd.Timedelta(days=days)
+        return f'{name} data before {lastday.strftime("%b %d")} is unavailable.'
+    return None
+
+
+class ProviderState:
+    '''The last known health of one provider'''
+
+    def __init__(self):
+        self.available = None
+        self.checked = None
+        self.limitedUntil = None
+        self.error = ''
+        self.failures = 0
+
+
+class ProviderHealth:
+    '''
+    A thread safe cache of the provider health. Use ProviderHealth.instance() to share one
+    cache between the charts.
+    :params probes: dict api: function returning True if the provider is reachable
+    :params ttl: Seconds a probe is trusted
+    :params clock: A monotonic clock in seconds
+    '''
+    _instance = None
+    _instanceLock = threading.Lock()
+
+    def __init__(self, probes=None, ttl=TTL, clock=time.monotonic):
+        self.probes = dict(PROBES if probes is None else probes)
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.states = dict()
+        self.refreshing = dict()
+
+    @classmethod
+    def instance(cls):
+        '''Return the ProviderHealth shared in this process. Its probes start when created.'''
+        with cls._instanceLock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def start(self):
+        '''
+        Probe every probed api in the background
+        :return: The list of threads
+        '''
+        return [self.refresh(api, wait=False) for api in self.probes]
+
+    def state(self, api):
+        '''Return the ProviderState of api. Call with the lock held.'''
+        if api not in self.states:
+            self.states[api] = ProviderState()
+        return self.states[api]
+
+    def probe(self, api):
+        '''Probe api now and store the result'''
+        try:
+            available = bool(self.probes[api]())
+            error = '' if available else f'{apiName(api)} is not connected.'
+        except Exception as ex:     # pylint: disable = W0703
+            available = False
+            error = f'{apiName(api)} is not connected: {type(ex).__name__}: {ex}'
+        with self.lock:
+            state = self.state(api)
+            state.available = available
+            state.checked = self.clock()
+            state.error = error
+            self.refreshing.pop(api, None)
+        return available
+
+    def refresh(self, api, wait=True):
+        '''
+        Probe api. If not wait, probe it in a background thread unless one is already running.
+        :return: The thread or None
+        '''
+        if api not in self.probes:
+            return None
+        if wait:
+            self.probe(api)
+            return None
+        with self.lock:
+            if api in self.refreshing:
+                return self.refreshing[api]
+            thread = threading.Thread(target=self.probe, args=(api,),
+                                      name=f'ProviderHealth {api}', daemon=True)
+            self.refreshing[api] = thread
+        thread.start()
+        return thread
+
+    def unavailableMessage(self, api):
+        '''
+        Return why api should not be called now or None. This does not wait for a probe. An
+        api that was never probed or whose answer is older than the TTL is probed in the
+        background while the last answer is used. Before the first answer the api is assumed
+        available.
+        '''
+        with self.lock:
+            state = self.state(api)
+            now = self.clock()
+            if state.limitedUntil is not None:
+                if now < state.limitedUntil:
+                    return (f'{apiName(api)} is over its rate limit for '
+                            f'{int(state.limitedUntil - now) + 1} more seconds.')
+                state.limitedUntil = None
+            if api not in self.probes:
+                return None
+            checked = state.checked
+        if checked is None or self.clock() - checked >= self.ttl:
+            self.refresh(api, wait=False)
+        with self.lock:
+            state = self.state(api)
+            return state.error if state.available is False else None
+
+    def isAvailable(self, api):
+        return self.unavailableMessage(api) is None
+
+    def reportSuccess(self, api):
+        '''A request to api returned data. A probed api counts as checked.'''
+        with self.lock:
+            state = self.state(api)
+            state.failures = 0
+            state.error = ''
+            state.limitedUntil = None
+            if api in self.probes:
+                state.available = True
+                state.checked = self.clock()
+
+    def reportFailure(self, api, message='', rateLimited=False, retryAfter=None):
+        '''
+        A request to api failed. A rate limited api is left out of the choice for retryAfter
+        seconds (RATELIMIT by default). A failed probed api is probed again in the background.
+        '''
+        with self.lock:
+            state = self.state(api)
+            state.failures += 1
+            state.error = message if message else f'{apiName(api)} failed.'
+            if rateLimited:
+                state.limitedUntil = self.clock() + (retryAfter if retryAfter else RATELIMIT)
+        self.refresh(api, wait=False)
+
+    def status(self):
+        '''Return a DataFrame of the known provider states'''
+        with self.lock:
+            now = self.clock()
+            rows = [(api, s.available, None if s.checked is None else now - s.checked,
+                     None if s.limitedUntil is None else max(s.limitedUntil - now, 0),
+                     s.failures, s.error) for api, s in sorted(self.states.items())]
+        return pd.DataFrame(rows, columns=['api', 'available', 'age', 'limited', 'failures',
+                                           'error'])
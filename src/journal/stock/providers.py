@@ -0,0 +1,50 @@
+'''
+A registry of the stock data providers. A provider module is imported the first time it is
+used. ibapi, requests and the api key lookups are not loaded until a chart is requested.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import importlib
+import sys
+
+# pylint: disable = C0103
+
+# api: (module, intraday function). The intraday functions share the interface
+# f(symbol, start=None, end=None, minutes=1, showUrl=False) -> (meta, df, maDict)
+PROVIDERS = {'bc': ('journal.stock.mybarchart', 'getbc_intraday'),
+             'av': ('journal.stock.myalphavantage', 'getmav_intraday'),
+             'ib': ('journal.stock.myib', 'getib_intraday'),
+             'iex': ('journal.stock.myiex', 'getiex_intraday')}
+
+
+def register(api, module, intraday):
+    '''
+    Add or replace a provider.
+    :params api: The short name used in the APIPref setting
+    :params module: The module name
+    :params intraday: The name of the intraday function in module
+    '''
+    PROVIDERS[api] = (module, intraday)
+
+
+def getModule(api):
+    '''Import and return the module for api or None if api is not registered'''
+    if api not in PROVIDERS:
+        return None
+    return importlib.import_module(PROVIDERS[api][0])
+
+
+def getIntraday(api):
+    '''Return the intraday data function for api or None if api is not registered'''
+    module = getModule(api)
+    if not module:
+        return None
+    return getattr(module, PROVIDERS[api][1])
+
+
+def isLoaded(api):
+    '''Return True if the module for api has been imported'''
+    return api in PROVIDERS and PROVIDERS[api][0] in sys.modules
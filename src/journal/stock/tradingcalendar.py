@@ -0,0 +1,215 @@
+'''
+An offline NYSE/NASDAQ trading calendar. The holidays and the early closes are computed from
+the exchange rules and a short list of special closings, so nothing is looked up on the network.
+All times are New York times without a timezone as in the rest of structjour. The chart code
+uses the calendar to skip or clip an intraday request before it spends a rate limited api call
+on a closed day.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import datetime as dt
+import functools
+
+import pandas as pd
+
+# pylint: disable = C0103
+
+OPEN = dt.time(9, 30)
+CLOSE = dt.time(16, 0)
+EARLYCLOSE = dt.time(13, 0)
+PREOPEN = dt.time(4, 0)
+POSTCLOSE = dt.time(20, 0)
+EARLYPOSTCLOSE = dt.time(17, 0)
+
+# Closings that no rule predicts
+SPECIALCLOSINGS = {
+    dt.date(2001, 9, 11): 'September 11',
+    dt.date(2001, 9, 12): 'September 11',
+    dt.date(2001, 9, 13): 'September 11',
+    dt.date(2001, 9, 14): 'September 11',
+    dt.date(2004, 6, 11): 'Reagan Day of Mourning',
+    dt.date(2007, 1, 2): 'Ford Day of Mourning',
+    dt.date(2012, 10, 29): 'Hurricane Sandy',
+    dt.date(2012, 10, 30): 'Hurricane Sandy',
+    dt.date(2018, 12, 5): 'Bush Day of Mourning',
+    dt.date(2025, 1, 9): 'Carter Day of Mourning',
+}
+
+
+def easter(year):
+    '''Return the date of Easter Sunday (Anonymous Gregorian algorithm)'''
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(year, month, day + 1)
+
+
+def nthWeekday(year, month, weekday, n):
+    '''Return the nth (1 based, -1 for the last) weekday (Monday is 0) of the month'''
+    if n > 0:
+        first = dt.date(year, month, 1)
+        return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(d):
+    '''A holiday on Saturday is observed on Friday and one on Sunday on Monday'''
+    if d.weekday() == 5:
+        return d - dt.timedelta(days=1)
+    if d.weekday() == 6:
+        return d + dt.timedelta(days=1)
+    return d
+
+
+@functools.lru_cache(maxsize=64)
+def holidays(year):
+    '''Return a dict {date: name} of the weekdays the market is closed in year'''
+    h = dict()
+    newYear = dt.date(year, 1, 1)
+    # A New Year's Day on Saturday is not observed on the Friday before
+    if newYear.weekday() != 5:
+        h[observed(newYear)] = "New Year's Day"
+    if year >= 1998:
+        h[nthWeekday(year, 1, 0, 3)] = 'Martin Luther King Jr. Day'
+    h[nthWeekday(year, 2, 0, 3)] = "Washington's Birthday"
+    h[easter(year) - dt.timedelta(days=2)] = 'Good Friday'
+    h[nthWeekday(year, 5, 0, -1)] = 'Memorial Day'
+    if year >= 2022:
+        h[observed(dt.date(year, 6, 19))] = 'Juneteenth'
+    h[observed(dt.date(year, 7, 4))] = 'Independence Day'
+    h[nthWeekday(year, 9, 0, 1)] = 'Labor Day'
+    h[nthWeekday(year, 11, 3, 4)] = 'Thanksgiving Day'
+    h[observed(dt.date(year, 12, 25))] = 'Christmas Day'
+    h.update({d: name for d, name in SPECIALCLOSINGS.items() if d.year == year})
+    return {d: name for d, name in h.items() if d.year == year and d.weekday() < 5}
+
+
+@functools.lru_cache(maxsize=64)
+def earlyCloses(year):
+    '''Return the set of dates in year the market closes at 13:00'''
+    days = set()
+    july4 = dt.date(year, 7, 4)
+    if 1 <= july4.weekday() <= 4:
+        days.add(july4 - dt.timedelta(days=1))
+    days.add(nthWeekday(year, 11, 3, 4) + dt.timedelta(days=1))
+    xmasEve = dt.date(year, 12, 24)
+    if xmasEve.weekday() < 5:
+        days.add(xmasEve)
+    return {d for d in days if d not in holidays(year)}
+
+
+def asDate(d):
+    '''Return the datetime.date of d'''
+    return pd.Timestamp(d).date()
+
+
+def isTradingDay(d):
+    '''Return True if the market is open on the day of d'''
+    d = asDate(d)
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def isEarlyClose(d):
+    d = asDate(d)
+    return d in earlyCloses(d.year)
+
+
+def holidayName(d):
+    '''Return the name of the holiday on the day of d, 'Weekend' or None if the market is open'''
+    d = asDate(d)
+    if d.weekday() > 4:
+        return 'Weekend'
+    return holidays(d.year).get(d)
+
+
+def session(d, extended=False):
+    '''
+    Return (open, close) Timestamps of the session on the day of d or None if the market is
+    closed.
+    :params extended: Include the pre market from 4:00 and the post market
+    '''
+    day = asDate(d)
+    if not isTradingDay(day):
+        return None
+    early = day in earlyCloses(day.year)
+    if extended:
+        begin, end = PREOPEN, EARLYPOSTCLOSE if early else POSTCLOSE
+    else:
+        begin, end = OPEN, EARLYCLOSE if early else CLOSE
+    return (pd.Timestamp(dt.datetime.combine(day, begin)),
+            pd.Timestamp(dt.datetime.combine(day, end)))
+
+
+def regularHours(d):
+    '''Return the (open, close) of the day of d. A closed day gets the normal hours.'''
+    s = session(d)
+    if s:
+        return s
+    day = asDate(d)
+    return (pd.Timestamp(dt.datetime.combine(day, OPEN)),
+            pd.Timestamp(dt.datetime.combine(day, CLOSE)))
+
+
+def previousTradingDay(d, inclusive=True):
+    '''Return the date of the last trading day on or (if not inclusive) before the day of d'''
+    day = asDate(d)
+    if not inclusive:
+        day -= dt.timedelta(days=1)
+    while not isTradingDay(day):
+        day -= dt.timedelta(days=1)
+    return day
+
+
+def nextTradingDay(d, inclusive=True):
+    '''Return the date of the first trading day on or (if not inclusive) after the day of d'''
+    day = asDate(d)
+    if not inclusive:
+        day += dt.timedelta(days=1)
+    while not isTradingDay(day):
+        day += dt.timedelta(days=1)
+    return day
+
+
+def tradingDays(start, end):
+    '''Return a DatetimeIndex of the trading days from start to end inclusive'''
+    days = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+    return days[[isTradingDay(d) for d in days]]
+
+
+def clipToSessions(start, end, extended=True):
+    '''
+    Clip the request from start to end to the sessions it overlaps. A request that overlaps no
+    session would return no data.
+    :params extended: Clip to the extended hours (4:00 to 20:00) instead of 9:30 to 16:00
+    :return: (start, end) or None if the market is closed for all of it
+    '''
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end)
+    if end < start:
+        return None
+    sessions = [session(d, extended) for d in tradingDays(start, end)]
+    sessions = [(o, c) for o, c in sessions if max(start, o) < min(end, c)]
+    if not sessions:
+        return None
+    return max(start, sessions[0][0]), min(end, sessions[-1][1])
+
+
+def closedMessage(start, end):
+    '''Explain why there is no session from start to end'''
+    start = pd.Timestamp(start)
+    name = holidayName(start)
+    if name and start.normalize() == pd.Timestamp(end).normalize():
+        return f'The market is closed on {start.strftime("%b %d, %Y")} ({name}).'
+    return (f'The market is closed from {start.strftime("%b %d, %Y %H:%M")} to '
+            f'{pd.Timestamp(end).strftime("%b %d, %Y %H:%M")}.')
@@ -10,11 +10,13 @@ import datetime as dt
 from collections import OrderedDict
 import os
 import random
-import sqlite3
 
 import numpy as np
 import pandas as pd
-from PyQt5.QtCore import QSettings
+
+from journal.database import getPool
+from journal.settings import getSettings
+from journal.stock.tradingcalendar import asDate, previousTradingDay
 
 # pylint: disable = C0103
 
@@ -31,7 +33,7 @@ def getMAKeys():
     return cc1, cc2, cc3
 
 def getMASettings():
-    chartSet = QSettings('zero_substance/chart', 'structjour')
+    chartSet = getSettings('zero_substance/chart', 'structjour')
     mas = chartSet.value('getmas', list)
     maDict = OrderedDict()
     for ma in mas[0]:
@@ -137,29 +139,21 @@ def makeupEntries(df, minutes):
 
 def getLastWorkDay(d=None):
     '''
-    Retrieve the last biz day from today or from d if the arg is given. Holidays are ignored
+    Retrieve the last trading day from today or from d if the arg is given. Weekends and exchange
+    holidays are skipped.
     :params d: A datetime object.
-    :return: A datetime object of the last biz day.
+    :return: A datetime object of the last biz day with the time of d.
     '''
     now = dt.datetime.today() if not d else d
-    deltDays = 0
-    if now.weekday() > 4:
-        # deltDays = now.weekday() - 4
-        # Just todauy TODO
-        # if now.weekday() == 5:
-        #     bizday = bizday -dt.timedelta(days=1)
-        # elif now.weekday() == 6:
-        #     bizday = bizday -dt.timedelta(days=2)
-
-        deltDays = now.weekday() - 4
+    deltDays = (asDate(now) - previousTradingDay(now)).days
     bizday = now - dt.timedelta(deltDays)
     return bizday
 
 def getPrevTuesWed(td):
     '''
-    Utility method to get a probable market open day prior to td. The least likely
-    closed days are Tuesday and Wednesday. This will occassionally return  a closed
-    day but wtf.
+    Utility method to get a market open day prior to td. Tuesday and Wednesday are preferred
+    because they are the least likely closed days. If that day is a holiday, the trading day
+    before it is returned.
     :params td: A Datetime object
     '''
     deltdays = 7
@@ -172,12 +166,13 @@ def getPrevTuesWed(td):
     else:
         deltdays = 4
     before = td - dt.timedelta(deltdays)
+    before = before - dt.timedelta((asDate(before) - previousTradingDay(before)).days)
     return before
 
 class ManageKeys:
     def __init__(self, create=False, db=None):
-        self.settings = QSettings('zero_substance', 'structjour') 
-        self.apiset = QSettings('zero_substance/stockapi', 'structjour')
+        self.settings = getSettings('zero_substance', 'structjour') 
+        self.apiset = getSettings('zero_substance/stockapi', 'structjour')
         self.db = db
         if not self.db:
             self.setDB()
@@ -212,60 +207,38 @@ class ManageKeys:
         Creates the api_keys if it doesnt exist then adds a row for each api that requires a key
         if they dont exist
         '''
-        conn = sqlite3.connect(self.db)
-        cur = conn.cursor()
-
-        cur.execute('''
-            CREATE TABLE if not exists api_keys (
-            id	INTEGER PRIMARY KEY AUTOINCREMENT,
-            api	TEXT NOT NULL UNIQUE,
-            key	TEXT);''')
-        conn.commit()
-
-        cur.execute('''
-            SELECT api from api_keys WHERE api = ?;''', ("bc",))
-
-        cursor = cur.fetchone()
-        if not cursor:
-            cur.execute('''
-                INSERT INTO api_keys(api)VALUES(?);''', ("bc",))
-
-        cur.execute('''
-            SELECT api from api_keys WHERE api = ?;''', ("av",))
-
-        cursor = cur.fetchone()
-        if not cursor:
-            cur.execute('''
-                INSERT INTO api_keys(api)VALUES(?);''', ("av",))
-        conn.commit()
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE if not exists api_keys (
+                id	INTEGER PRIMARY KEY AUTOINCREMENT,
+                api	TEXT NOT NULL UNIQUE,
+                key	TEXT);''')
+            conn.executemany('''
+                INSERT OR IGNORE INTO api_keys(api)VALUES(?);''', [("bc",), ("av",)])
+        pool.invalidate('api_keys')
 
     def updateKey(self, api, key):
-        conn = sqlite3.connect(self.db)
-        cur = conn.cursor()
-
-        cur.execute('''UPDATE api_keys
-            SET key = ?
-            WHERE api = ?''', (key, api))
-        conn.commit()
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('''UPDATE api_keys
+                SET key = ?
+                WHERE api = ?''', (key, api))
+        pool.invalidate('api_keys')
+
+    def getKeys(self):
+        '''Return a dict api: key read from the db once and then from memory'''
+        pool = getPool(self.db)
+
+        def load():
+            with pool.connection() as conn:
+                return dict(conn.execute('''SELECT api, key FROM api_keys''').fetchall())
+        return pool.cached('api_keys', load)
 
     def getKey(self, api):
         if not self.db:
             return
-        conn = sqlite3.connect(self.db)
-        cur = conn.cursor()
-
-        cur.execute('''SELECT key
-            FROM api_keys
-            WHERE api = ?''', (api, ))
-        k = cur.fetchone()
-        if k:
-            return k[0]
-        return k
-
-
-
- 
-
+        return self.getKeys().get(api)
 
     def getDB(self):
         '''Get the file location of the sqlite database'''
@@ -277,7 +250,7 @@ class ManageKeys:
 
 class IbSettings:
     def __init__(self):
-        self.apiset = QSettings('zero_substance/stockapi', 'structjour')
+        self.apiset = getSettings('zero_substance/stockapi', 'structjour')
         p = self.apiset.value('APIPref')
         if p:
             p = p.replace(' ', '')
@@ -323,8 +296,8 @@ def notmain():
     movingAverage(None, None, None)
 
 def localstuff():
-    settings = QSettings('zero_substance', 'structjour') 
-    apiset = QSettings('zero_substance/stockapi', 'structjour')
+    settings = getSettings('zero_substance', 'structjour') 
+    apiset = getSettings('zero_substance/stockapi', 'structjour')
     setkeys = settings.allKeys()
     apikeys = apiset.allKeys()
     setval=list()
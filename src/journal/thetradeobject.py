@@ -13,7 +13,7 @@ import pandas as pd
 
 from journal.definetrades import FinReqCol
 from journal.dfutil import DataFrameUtil
-from journal.stock.graphstuff import FinPlot
+from journal.filltable import FORMSLOTS, FillTable
 
 # pylint: disable=C0103
 
@@ -462,7 +462,10 @@ class TheTradeObject:
         return self.TheTrade
 
     def __setStart(self):
-        self.TheTrade[self.srf.start] = self.df.loc[self.ix][frc.start]
+        start = self.df.loc[self.ix][frc.start]
+        if isinstance(start, dt.datetime):
+            start = start.strftime('%H:%M:%S')
+        self.TheTrade[self.srf.start] = start
         return self.TheTrade
 
     # HACK ALERT The duration came out as an empty string on an older file so I added the
@@ -621,9 +624,8 @@ class TheTradeObject:
             # least 1 row (1 row per ticket)
             diff = 0
 
-            tm = pd.Timestamp(row[frc.time])
-            d = row[frc.date]
-            dtime = pd.Timestamp(d.year, d.month, d.day, tm.hour, tm.minute, tm.second)
+            # HOLD rows have no time
+            dtime = row[frc.time]
             price = row[frc.price]
             shares = row[frc.shares]
             if count == 0:
@@ -644,17 +646,11 @@ class TheTradeObject:
             count = count + 1
 
         # Store this bit seperately for use in chart creation. Avoid having to re-constitute the details. We will
-        # add these to a dictionary in LayoutForms using the same key as lf.ts
-        self.entries = entries
+        # add these to a dictionary in LayoutForms using the same key as lf.ts. The form has slots
+        # for the first FORMSLOTS. All of them are in the FillTable.
+        self.entries = FillTable(entries)
 
-        if len(entries) > 8:
-            more = len(entries) - 8
-            self.TheTrade[self.srf.pl8] = "Plus {} more.".format(more)
-            # If this triggered check that the input file processed into tickets.
-            # If not, there are probably fewer ticketts than it appears-- check for repeated
-            # time entries
-            print('Holy cow, save this input file as a test file and finalize setEntries code.')
-        for i, price in zip(range(len(entries)), entries):
+        for i, price in enumerate(entries[:FORMSLOTS]):
 
             # Entry Price
             col = "Entry" + str(i+1) if price[5] == "Entry" else "Exit" + str(i+1)
@@ -675,16 +671,20 @@ class TheTradeObject:
             # Entry diff
             col = "Diff" + str(i+1)
             self.TheTrade[col] = price[4]
+        if len(entries) > FORMSLOTS:
+            more = len(entries) - FORMSLOTS
+            self.TheTrade[self.srf.pl8] = "Plus {} more.".format(more)
         if imageName:
             self.setChartDataDefault(entries, imageName)
         return self.TheTrade
 
     def setChartDataDefault(self, entries, imageName):
         '''Set up default times and intervals for charts'''
-        start = entries[0][1]
-        for entry in entries:
-            if isinstance(entry[1], pd.Timestamp):
-                end = entry[1]
+        times = [entry[1] for entry in entries if not pd.isnull(entry[1])]
+        start, end = times[0], times[-1]
+        # graphstuff loads matplotlib. Import it when it is needed.
+        from journal.stock.graphstuff import FinPlot
+
         defaultIntervals = [1, 5, 15]
         fp = FinPlot()
         for i, di in enumerate(defaultIntervals):
@@ -832,6 +832,25 @@ class TheTradeObject:
         pass
 
 
+def renameCharts(theTrade, oldImage, newImage):
+    '''
+    Return a copy of theTrade with the chart names made from the generic image name oldImage
+    (see setChartDataDefault) made from newImage instead. A kept summary gets the image names
+    of its current position in the day. Other chart names are left alone.
+    '''
+    theTrade = theTrade.copy()
+    oldBase = os.path.splitext(oldImage)[0]
+    newBase = os.path.splitext(newImage)[0]
+    for i in range(1, 4):
+        col = f'chart{i}'
+        if col not in theTrade.columns:
+            continue
+        name = theTrade[col].unique()[0]
+        if isinstance(name, str) and name.startswith(oldBase):
+            theTrade[col] = newBase + name[len(oldBase):]
+    return theTrade
+
+
 def notmain():
     '''Run some local code'''
     srf = SumReqFields()
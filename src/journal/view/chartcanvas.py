@@ -0,0 +1,249 @@
+# Structjour -- a daily trade review helper
+# Copyright (C) 2019 Zero Substance Trading
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+'''
+An interactive candle chart embedded in the summary form. It replaces the static image of a
+chart widget when the 'interactive' chart setting is on.
+
+Created on October 19, 2019
+
+@author: Mike Petersen
+'''
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib import rcParams, style
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+
+from PyQt5.QtCore import QTimer
+
+from journal.stock.graphstuff import PLOT_LOCK, decimateBars
+
+# pylint: disable = C0103
+
+
+class ChartCanvas(FigureCanvasQTAgg):
+    '''
+    Drag to pan, use the wheel to zoom and double click to show the whole chart. While the view
+    moves, the candles, volume, markers and moving averages are blitted over a saved background.
+    When the movement stops the whole figure is drawn with new ticks and with the candles
+    decimated to the visible pixel width.
+    '''
+    # Draw at most one candle per PXPERBAR pixels
+    PXPERBAR = 2
+    # Milliseconds after the last wheel event before the full redraw
+    SETTLE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(Figure())
+        self.setParent(parent)
+        self.fp = None
+        self.artists = None
+        self.bars = None
+        self.drawn = None
+        self.barWidth = 0
+        self.colors = ('g', 'r')
+        self.k = 1
+        self.background = None
+        self.press = None
+
+        self.settle = QTimer(self)
+        self.settle.setSingleShot(True)
+        self.settle.timeout.connect(self.endInteraction)
+
+        self.mpl_connect('button_press_event', self.onPress)
+        self.mpl_connect('motion_notify_event', self.onMotion)
+        self.mpl_connect('button_release_event', self.onRelease)
+        self.mpl_connect('scroll_event', self.onScroll)
+        self.mpl_connect('resize_event', self.onResize)
+
+    def setChart(self, fp, df, maDict, symbol, start, end, minutes=1):
+        '''
+        Draw a new chart using the settings of a FinPlot object.
+        :params fp: FinPlot with entries and styles set. Usually the one that saved the image.
+        :params df: The candle data from FinPlot.getChartData
+        :params maDict: The moving averages from FinPlot.getChartData
+        '''
+        self.endInteraction()
+        fig = self.figure
+        fig.clear()
+        self.fp = fp
+        with PLOT_LOCK:
+            with style.context(fp.style if fp.style else 'default'):
+                fig.set_facecolor(rcParams['figure.facecolor'])
+                self.artists = fp.drawChart(fig, df, maDict, symbol, start, end, minutes)
+        # The chart ticks are set for a fixed range. These follow the pan and zoom.
+        locator = mdates.AutoDateLocator()
+        self.artists['ax2'].xaxis.set_major_locator(locator)
+        self.artists['ax2'].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+        t = mdates.date2num(pd.DatetimeIndex(df.index).to_pydatetime())
+        self.bars = [t] + [df[x].to_numpy(dtype=float)
+                           for x in ['open', 'high', 'low', 'close', 'volume']]
+        self.barWidth = (minutes*35)/(3600 * 24)
+        self.colors = (fp.chartSet.value('colorup', 'g'), fp.chartSet.value('colordown', 'r'))
+        self.resetView()
+
+    def fullRange(self):
+        '''Return the x limits that show every bar'''
+        t = self.bars[0]
+        return t[0] - self.barWidth, t[-1] + self.barWidth
+
+    def resetView(self):
+        '''Show the whole chart'''
+        if not self.artists:
+            return
+        self.artists['ax1'].set_xlim(*self.fullRange())
+        self.refresh()
+
+    def refresh(self):
+        '''Decimate the candles for the current view and schedule a full draw'''
+        if not self.artists:
+            return
+        self.updateBars()
+        self.fitY()
+        self.draw_idle()
+
+    def updateBars(self):
+        '''
+        Replace the candle and volume collections with decimated ones. The visible bars and
+        one view width on each side are drawn so a pan has bars to show.
+        '''
+        ax1 = self.artists['ax1']
+        lo, hi = ax1.get_xlim()
+        t = self.bars[0]
+        span = hi - lo
+        visible = np.searchsorted(t, hi) - np.searchsorted(t, lo)
+        pixels = max(ax1.bbox.width, 1)
+        k = max(1, int(np.ceil(visible * self.PXPERBAR / pixels)))
+
+        # Start on a multiple of k so the combined bars don't shift as the view pans
+        i0 = max(np.searchsorted(t, lo - span) - 1, 0)
+        i0 = i0 - i0 % k
+        i1 = min(np.searchsorted(t, hi + span) + 1, len(t))
+        self.drawn = decimateBars(*[b[i0:i1] for b in self.bars], k)
+        self.k = k
+
+        dt, do, dh, dl, dc, dv = self.drawn
+        colup, coldown = self.colors
+        width = self.barWidth * k
+        bodies, wicks = self.fp.candleCollections(dt, do, dh, dl, dc, width, colup, coldown)
+        volume = self.fp.volumeCollection(dt, do, dc, dv, width, colup, coldown)
+        for name, artist, ax in [('wicks', wicks, ax1), ('bodies', bodies, ax1),
+                                 ('volume', volume, self.artists['ax2'])]:
+            self.artists[name].remove()
+            artist.set_animated(self.background is not None)
+            ax.add_collection(artist, autolim=False)
+            self.artists[name] = artist
+
+    def fitY(self):
+        '''Fit the price and volume axes to the visible bars'''
+        ax1 = self.artists['ax1']
+        lo, hi = ax1.get_xlim()
+        t, dummy, h, l, dummy, v = self.drawn
+        mask = (t >= lo) & (t <= hi)
+        if not mask.any():
+            return
+        top = h[mask].max()
+        bottom = l[mask].min()
+        margin = (top-bottom) * .08
+        if margin:
+            ax1.set_ylim(bottom=bottom-margin, top=top+(margin*2))
+        vmax = v[mask].max()
+        if vmax:
+            self.artists['ax2'].set_ylim(0, vmax * 1.05)
+
+    def dataArtists(self):
+        '''The artists that move with the view'''
+        ax1 = self.artists['ax1']
+        ax2 = self.artists['ax2']
+        return list(ax1.collections) + list(ax1.lines) + list(ax2.collections)
+
+    def startInteraction(self):
+        '''Save the figure without the data artists as the background for blitting'''
+        if self.background is not None:
+            return
+        for artist in self.dataArtists():
+            artist.set_animated(True)
+        self.draw()
+        self.background = self.copy_from_bbox(self.figure.bbox)
+
+    def blitArtists(self):
+        '''Draw the data artists over the background'''
+        if self.background is None:
+            return
+        self.restore_region(self.background)
+        for ax in (self.artists['ax1'], self.artists['ax2']):
+            for artist in list(ax.collections) + list(ax.lines):
+                ax.draw_artist(artist)
+        self.blit(self.figure.bbox)
+
+    def endInteraction(self):
+        '''Stop blitting and draw the whole figure for the new view'''
+        self.settle.stop()
+        if self.background is None:
+            return
+        self.background = None
+        for artist in self.dataArtists():
+            artist.set_animated(False)
+        self.refresh()
+
+    def inAxes(self, event):
+        return self.artists and event.inaxes in (self.artists['ax1'], self.artists['ax2'])
+
+    def onPress(self, event):
+        if not self.inAxes(event) or event.button != 1:
+            return
+        if event.dblclick:
+            self.press = None
+            self.endInteraction()
+            self.resetView()
+            return
+        self.startInteraction()
+        self.press = (event.x, self.artists['ax1'].get_xlim())
+
+    def onMotion(self, event):
+        if not self.press:
+            return
+        x, (lo, hi) = self.press
+        dx = (event.x - x) * (hi - lo) / self.artists['ax1'].bbox.width
+        self.artists['ax1'].set_xlim(lo - dx, hi - dx)
+        self.blitArtists()
+
+    def onRelease(self, event):
+        if not self.press:
+            return
+        self.press = None
+        self.endInteraction()
+
+    def onScroll(self, event):
+        if not self.inAxes(event) or event.xdata is None:
+            return
+        factor = .8 if event.button == 'up' else 1.25
+        ax1 = self.artists['ax1']
+        lo, hi = ax1.get_xlim()
+        x = event.xdata
+        self.startInteraction()
+        ax1.set_xlim(x - (x - lo) * factor, x + (hi - x) * factor)
+        self.blitArtists()
+        self.settle.start(self.SETTLE)
+
+    def onResize(self, event):
+        if self.artists and self.background is None:
+            self.updateBars()
+            self.fitY()
@@ -0,0 +1,216 @@
+# Structjour -- a daily trade review helper
+# Copyright (C) 2019 Zero Substance Trading
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+'''
+Run chart retrieval and rendering off the GUI thread. SumControl submits one job per chart
+widget ('chart1', 'chart2', 'chart3'). A new request for the same widget supersedes the old one,
+and changing the trade or the interval cancels outstanding jobs.
+
+Created on October 19, 2019
+
+@author: Mike Petersen
+'''
+
+import itertools
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QPixmap
+
+# pylint: disable = C0103
+
+
+class ChartResult:
+    '''
+    The outcome of a single chart job. Each job gets its own result so several charts can be
+    retrieved at once without sharing error state.
+    :attribute jobId: The unique id of the job.
+    :attribute ckey: The chart widget name, one of 'chart1', 'chart2' or 'chart3'.
+    :attribute key: The trade name from the tradeList widget.
+    :attribute name: The path of the saved image or None if it failed or was cancelled.
+    :attribute data: The chart data [name, begin, end, interval] to store in the trade object.
+    :attribute fp, df, maDict: For an interactive FinPlot, the FinPlot, candle data and moving
+            averages to draw the embedded chart.
+    '''
+
+    def __init__(self, jobId, ckey, key, data):
+        self.jobId = jobId
+        self.ckey = ckey
+        self.key = key
+        self.data = data
+        self.name = None
+        self.errorCode = ''
+        self.errorMessage = ''
+        self.cancelled = False
+        self.fp = None
+        self.df = None
+        self.maDict = None
+
+    def ok(self):
+        '''Return True if the job produced an image'''
+        return bool(self.name) and not self.cancelled
+
+    def getMessage(self):
+        '''Return a message suitable for the user'''
+        if self.errorCode:
+            return f'{self.errorCode}\n{self.errorMessage}'
+        return self.errorMessage if self.errorMessage else 'Failed to retrieve data'
+
+
+class ChartJobSignals(QObject):
+    '''QRunnable is not a QObject. The job emits its result through this object.'''
+    finished = pyqtSignal(object)
+
+
+class ChartJob(QRunnable):
+    '''
+    Retrieve the data and render one chart. The FinPlot object is created and set up on the GUI
+    thread. An identical chart from the chart cache is used as is unless the FinPlot is
+    interactive. Otherwise the job chooses the api and calls the getChartData and renderChart
+    methods, checking for cancellation between them.
+    '''
+
+    def __init__(self, fp, result, symbol, begin, end, interval, save):
+        super().__init__()
+        self.fp = fp
+        self.result = result
+        self.symbol = symbol
+        self.begin = begin
+        self.end = end
+        self.interval = interval
+        self.save = save
+        self.cancelEvent = threading.Event()
+        self.signals = ChartJobSignals()
+        # ChartJobManager owns the python object until the job reports back
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        '''Mark the job cancelled. The job will stop at its next check.'''
+        self.cancelEvent.set()
+
+    def isCancelled(self):
+        '''Return True if the job has been cancelled.'''
+        return self.cancelEvent.is_set()
+
+    def chooseApi(self):
+        '''
+        Set fp.api to the first api likely to have the data. The choice asks the provider health
+        so it is made here and not on the GUI thread.
+        :return: False if no api will do. The rules it broke are the error message.
+        '''
+        dummy, rules, apis = self.fp.apiChooserList(self.begin, self.end, self.fp.api)
+        if not apis:
+            self.result.errorMessage = '\n'.join(rules) if rules else (
+                'Please choose a stock api to use. Select stockapi from the file menu.')
+            return False
+        self.fp.api = apis[0]
+        return True
+
+    @pyqtSlot()
+    def run(self):
+        '''Retrieve and render the chart. Always emits finished exactly once.'''
+        result = self.result
+        try:
+            # The embedded chart needs the data. The cached image does not have it.
+            if not self.fp.interactive and not self.isCancelled():
+                result.name = self.fp.getCachedChart(self.symbol, self.begin, self.end,
+                                                     self.interval, self.save)
+            if not result.name and not self.isCancelled() and self.chooseApi():
+                df, maDict = self.fp.getChartData(self.symbol, self.begin, self.end,
+                                                  self.interval)
+                if df is None:
+                    result.errorCode = self.fp.errorCode
+                    result.errorMessage = self.fp.errorMessage
+                elif not self.isCancelled():
+                    result.name = self.fp.renderChart(df, maDict, self.symbol, self.begin,
+                                                      self.end, self.interval, save=self.save)
+                    if self.fp.interactive:
+                        result.fp, result.df, result.maDict = self.fp, df, maDict
+        except Exception as ex:   # pylint: disable = W0703
+            # The result is the only way back to the GUI thread. Report anything.
+            result.errorMessage = f'{type(ex).__name__}: {ex}'
+        result.cancelled = self.isCancelled()
+        self.signals.finished.emit(result)
+
+
+class ChartJobManager(QObject):
+    '''
+    Submit chart jobs to a thread pool and deliver the results on the GUI thread. Only the most
+    recent job for each chart widget is delivered. Superseded and cancelled jobs are dropped.
+    :signal chartReady: (ChartResult, QPixmap) when an image is ready.
+    :signal chartFailed: (ChartResult) when retrieval or rendering failed.
+    '''
+    chartReady = pyqtSignal(object, QPixmap)
+    chartFailed = pyqtSignal(object)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool if pool else QThreadPool.globalInstance()
+        self.current = dict()
+        # Keep every started job alive until it reports back, superseded or not
+        self.running = dict()
+
+    def submit(self, ckey, key, fp, symbol, begin, end, interval, save):
+        '''
+        Start a chart job for the widget ckey. An outstanding job for the same widget is
+        cancelled.
+        :params ckey: The chart widget name.
+        :params key: The trade name from the tradeList widget.
+        :params fp: A FinPlot object with entries and styles already set. The job chooses
+            its api.
+        :return: The jobId
+        '''
+        self.cancel(ckey)
+        jobId = next(self._ids)
+        result = ChartResult(jobId, ckey, key, [save, begin, end, interval])
+        job = ChartJob(fp, result, symbol, begin, end, interval, save)
+        job.signals.finished.connect(self._finished)
+        self.current[ckey] = job
+        self.running[jobId] = job
+        self.pool.start(job)
+        return jobId
+
+    def cancel(self, ckey=None):
+        '''
+        Cancel the outstanding job for ckey or all outstanding jobs if ckey is None.
+        '''
+        keys = [ckey] if ckey else list(self.current.keys())
+        for k in keys:
+            job = self.current.pop(k, None)
+            if job:
+                job.cancel()
+
+    def isPending(self, ckey):
+        '''Return True if a job for ckey has been submitted and not delivered'''
+        return ckey in self.current
+
+    @pyqtSlot(object)
+    def _finished(self, result):
+        '''Runs on the GUI thread. Deliver the result if it is still the current job.'''
+        self.running.pop(result.jobId, None)
+        job = self.current.get(result.ckey)
+        if not job or job.result.jobId != result.jobId:
+            return
+        del self.current[result.ckey]
+        if result.cancelled:
+            return
+        if result.ok():
+            result.data[0] = result.name
+            self.chartReady.emit(result, QPixmap(result.name))
+        else:
+            self.chartFailed.emit(result)
@@ -1,7 +1,6 @@
 import os
 import random
 import sys
-from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
@@ -9,6 +8,7 @@ from PyQt5.QtWidgets import QApplication, QDialog, QWidget, QAbstractItemView
 from PyQt5.QtGui import QIntValidator, QStandardItemModel, QStandardItem, QFont
 from PyQt5.QtCore import Qt
 
+from journal.dailystats import DailyStats
 from journal.view.dailyform import  Ui_Form as DailyForm
 from journal.view.dfmodel import PandasModel
 
@@ -31,8 +31,14 @@ class DailyControl(QWidget):
         self.ui = DailyForm()
         self.ui.setupUi(self)
 
-    def runDialog(self, df, tradeSum=None):
+    def runDialog(self, df, tradeSum=None, stats=None):
+        '''
+        :params df: The trades table
+        :params tradeSum: The dict of trade summaries from LayoutForms.ts
+        :params stats: The DailyStats of tradeSum or None to compute them here
+        '''
         self.ts = tradeSum
+        self.stats = stats if stats is not None or not tradeSum else DailyStats(tradeSum)
         self.modelT = PandasModel(df)
         self.ui.tradeTable.setModel(self.modelT)
         self.ui.tradeTable.resizeColumnsToContents()
@@ -57,112 +63,11 @@ class DailyControl(QWidget):
         cell.setFont(QFont('Arial Rounded MT Bold', pointSize=24))
         row = [cell]
         self.modelS.appendRow(row)
-        srf = SumReqFields()
-        liveWins = list()
-        liveLosses = list()
-        simWins = list()
-        simLosses = list()
-        maxTrade = (0, "notrade")
-        minTrade = (0, "notrade")
-        #Didnot save the Trade number in TheTrade.  These should be the same order...
-        count = 0
-
         if not self.ts:
             print('Trade data not found')
             return
 
-        # Gather all the data
-        for key in self.ts:
-            TheTrade = self.ts[key]
-            pl = TheTrade[srf.pl].unique()[0]
-            live = True if TheTrade[srf.acct].unique()[0] == "Live" else False
-            count = count + 1
-
-            # A bug-ish inspired baby-sitter
-            if isinstance(pl, str):
-                if pl == '':
-                    pl = 0
-                else:
-                    try:
-                        pl = float(pl)
-                    except NameError:
-                        raise ValueError(
-                            'Malformed float for variable pl in createDailySummary')
-
-            if float(pl) > maxTrade[0]:
-                maxTrade = (pl, "Trade{0}, {1}, {2}".format(
-                    count, TheTrade[srf.acct].unique()[0], TheTrade[srf.name].unique()[0]))
-            if pl < minTrade[0]:
-                minTrade = (pl, "Trade{0}, {1}, {2}".format(
-                    count, TheTrade[srf.acct].unique()[0], TheTrade[srf.name].unique()[0]))
-
-            if live:
-                if pl > 0:
-                    liveWins.append(pl)
-                else:
-                    liveLosses.append(pl)
-            else:
-                if pl > 0:
-                    simWins.append(pl)
-                else:
-                    simLosses.append(pl)
-
-        dailySumData = OrderedDict()
-
-        #row1
-        dailySumData['livetot'] = fc(sum([sum(liveWins), sum(liveLosses)]))
-
-        numt = len(liveWins) + len(liveLosses)
-        if numt == 0:
-            dailySumData['livetotnote'] = "0 Trades"
-        else:
-            note = "{0} Trade{1}, {2} Winner{3}, {4}, Loser{5}"
-            note = note.format(numt, "" if numt == 1 else "s", len(liveWins),
-                               "" if len(liveWins) == 1 else "s", len(
-                                   liveLosses),
-                               "" if len(liveLosses) == 1 else "s")
-            dailySumData['livetotnote'] = note
-
-        #row2
-        dailySumData['simtot'] = fc(sum([sum(simWins), sum(simLosses)]))
-
-        # 9 trades,  3 Winners, 6 Losers
-        numt = len(simWins) + len(simLosses)
-        if numt == 0:
-            dailySumData['simtotnote'] = "0 Trades"
-        else:  # 4 trades, 1 Winner, 3 Losers
-            note = "{0} Trade{1}, {2} Winner{3}, {4}, Loser{5}"
-            note = note.format(numt, "" if numt == 1 else "s",
-                               len(simWins), "" if len(simWins) == 1 else "s",
-                               len(simLosses), "" if len(simLosses) == 1 else "s")
-            dailySumData['simtotnote'] = note
-
-        # row3
-        dailySumData['highest'] = fc(maxTrade[0])
-        dailySumData['highestnote'] = maxTrade[1]
-
-        # row 4
-        dailySumData['lowest'] = fc(minTrade[0])
-        dailySumData['lowestnote'] = minTrade[1]
-
-        # row 5
-        if (len(liveWins) + len(simWins)) == 0:
-            dailySumData['avgwin'] = '$0.00'
-        else:
-            dailySumData['avgwin'] = fc(sum(
-                [sum(liveWins), sum(simWins)]) / (len(liveWins) + len(simWins)))
-        dailySumData['avgwinnote'] = "X {} =  {}".format(
-            len(liveWins) + len(simWins), fc(sum([sum(liveWins), sum(simWins)])))
-
-        # row 6
-        if len(liveLosses) + len(simLosses) == 0:
-            dailySumData['avgloss'] = '$0.00'
-        else:
-            dailySumData['avgloss'] = fc(sum([sum(liveLosses), sum(
-                simLosses)]) / (len(liveLosses) + len(simLosses)))
-        dailySumData['avglossnote'] = "X {} =  (${:.2f})".format(
-            len(liveLosses) + len(simLosses), abs(sum([sum(liveLosses), sum(simLosses)])))
-
+        dailySumData = self.stats.dailySumData(fc)
 
         ro1 = [QStandardItem('Live Total'), QStandardItem(str(dailySumData['livetot'])), QStandardItem(dailySumData['livetotnote'])]
         ro2 = [QStandardItem('Sim Total'), QStandardItem(str(dailySumData['simtot'])), QStandardItem(dailySumData['simtotnote'])]
@@ -196,7 +101,6 @@ class DailyControl(QWidget):
             row.append(cell)
         self.modelM.appendRow(row)
 
-        totalpl = 0
         if self.ts:
             for trade in self.ts:
                 row = []
@@ -204,7 +108,6 @@ class DailyControl(QWidget):
 
                 pl = self.ts[trade]['P / L'].unique()[0]
                 if pl and isinstance(pl, (np.floating, float)):
-                    totalpl += pl
                     pl = fc(pl)
                 row.append(QStandardItem(pl))
 
@@ -215,6 +118,7 @@ class DailyControl(QWidget):
                 
                 row.append(QStandardItem(self.ts[trade]['MstkNote'].unique()[0]))
                 self.modelM.appendRow(row)
+        totalpl = self.stats.plTotal if self.stats else 0.0
         q = QStandardItem('')
         row = [q, q, QStandardItem(fc(totalpl)), q]
         self.modelM.appendRow(row)
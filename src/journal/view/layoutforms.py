@@ -10,6 +10,7 @@ Created on April 14, 2019
 import datetime as dt
 import os
 import pickle
+import sqlite3
 
 import numpy as np
 import pandas as pd
@@ -18,8 +19,14 @@ from PyQt5.QtCore import QSettings
 
 from journal.view.sumcontrol import qtime2pd
 
-from journal.definetrades import FinReqCol
-from journal.thetradeobject import SumReqFields, TheTradeObject
+from journal.dailystats import DailyStats
+from journal.definetrades import formatTimes
+from journal.filltable import FORMSLOTS, FillTable
+from journal.incremental import imageNames, summarize
+from journal.instrument import span
+from journal.notesindex import NotesIndex
+from journal.settings import getDB
+from journal.thetradeobject import SumReqFields
 
 
 # from journal.view.sumcontrol import SumControl
@@ -48,6 +55,7 @@ class LayoutForms:
 
         self.sc = sc
         self.tradeSummaries = None
+        self.stats = None
 
         # Widget Dictionary. Keys are same keys for TheTradeObject.TheTrade object
         wd = dict()
@@ -122,6 +130,7 @@ class LayoutForms:
         self.rc = rc
         self.wd = wd
         self.imageNames = None
+        self.summaries = list()
         self.sc.loadLayoutForms(self)
 
     def getDF(self):
@@ -157,7 +166,27 @@ class LayoutForms:
         self.df = df
 
         with open(name, "wb") as f:
-            pickle.dump((self.ts, self.entries, df), f)
+            pickle.dump((self.ts, self.entries, df, self.getDailyStats()), f)
+        self.indexNotes()
+
+    def indexNotes(self):
+        '''Update the trades of the day in the full text index of the notes in structjour.sqlite'''
+        db = getDB()
+        if not db or not self.ts or not self.jf:
+            return
+        try:
+            NotesIndex(db).indexDay(self.jf.theDate, self.ts)
+        except sqlite3.Error as ex:
+            print(f'Failed to update the notes index: {ex}')
+
+    def getDailyStats(self):
+        '''
+        Return the DailyStats of the trade summaries. They are computed once and again only after
+        a P/L or a mistake value changes.
+        '''
+        if self.stats is None and self.ts:
+            self.stats = DailyStats(self.ts)
+        return self.stats
 
     def loadSavedFile(self):
         '''
@@ -174,11 +203,14 @@ class LayoutForms:
                 print('Save is in the wrong format. Save and load it again to correct it')
                 (self.ts, self.entries) = test
                 # self.ts = test
-            elif len(test) != 3:
+            elif len(test) == 3:
+                (self.ts, self.entries, self.df) = test
+                self.stats = None
+            elif len(test) == 4:
+                (self.ts, self.entries, self.df, self.stats) = test
+            else:
                 print('Something is wrong with this file')
                 return
-            else:
-                (self.ts, self.entries, self.df) = test
             print()
 
         print('load up the trade names now')
@@ -188,7 +220,7 @@ class LayoutForms:
             self.sc.ui.tradeList.addItem(key)
             tradeSummaries.append(self.ts[key])
         try:
-            self.sc.dControl.runDialog(self.df, self.ts)
+            self.sc.dControl.runDialog(formatTimes(self.df), self.ts, self.getDailyStats())
         except AttributeError as e:
             print(e)
 
@@ -197,26 +229,17 @@ class LayoutForms:
         return tradeSummaries
  
     def reloadit(self):
-        from journal.statement import Statement_DAS as Ticket
-        from journal.statement import Statement_IBActivity
+        from journal.statementcache import loadStatement
         from journal.pandasutil import InputDataFrame
         
         infile = self.jf.inpathfile
         if not os.path.exists(infile):
             print("There is a problem. Unable to fully save this file.")
             return None
-        if self.jf.inputType == 'IB_HTML':
-            statement = Statement_IBActivity(self.jf)
-            df = statement.getTrades_IBActivity(self.jf.inpathfile)
-        elif  self.jf.inputType == 'DAS':
-            tkt = Ticket(self.jf)
-            df, self.jf = tkt.getTrades()
-        # trades = pd.read_csv(self.jf.inpathfile)
-        else:
+        if self.jf.inputType not in ['IB_HTML', 'DAS']:
             #Temporary
             print('Opening a non standard file name in DAS')
-            tkt = Ticket(self.jf)
-            df, self.jf = tkt.getTrades()
+        df, self.jf = loadStatement(self.jf)
 
         idf = InputDataFrame()
         trades,  success = idf.processInputFile(df, self.jf.theDate, self.jf)
@@ -229,21 +252,9 @@ class LayoutForms:
         Create generic image names. Structjour will use this to create specific names that include
         interval info. Up to three images can be saved for each trade.
         '''
-        frq = FinReqCol()
-        imageNames = list()
-        for tdf in ldf:
-            dur = tdf[frq.dur].unique()[-1]
-            if isinstance(dur, pd.Timedelta):
-                dur = dur.__str__()
-            dur = dur.replace(' ', '_')
-            imageName = '{0}_{1}_{2}_{3}.{4}'.format(tdf[frq.tix].unique()[-1].replace(' ', ''),
-                                                     tdf[frq.name].unique()[-1].replace(' ', '-'),
-                                                     tdf[frq.start].unique()[-1], dur, 'png')
-            imageName = imageName.replace(':', '')
-            imageNames.append(imageName)
-        return imageNames
-
-    def runSummaries(self, ldf):
+        return imageNames(ldf)
+
+    def runSummaries(self, ldf, reuse=None):
         '''
         This script creates the tto object for each trade in the input file and appends it to a
         list It also creates a generic name for assoiated images. That name will be altered for
@@ -252,27 +263,30 @@ class LayoutForms:
         retrieve the tto data from the tradeList widget currentText selection.
         :params ldf: A list of DataFrames. Each df is a complete trade from initial purchace or
                     hold to 0 shares or hold.
+        :params reuse: A list parallel to ldf of incremental.Summary from an earlier run for
+                    trades that have not changed, or None. The user entries are kept. The chart
+                    names follow the trade to its current position. Store self.summaries for the
+                    next run.
         '''
 
         tradeSummaries = list()
 
         srf = SumReqFields()
-        self.imageNames = self.imageData(ldf)
-        assert len(ldf) == len(self.imageNames)
-        self.sc.ui.tradeList.clear()
-        for i, (imageName, tdf) in enumerate(zip(self.imageNames, ldf)):
-
-            tto = TheTradeObject(tdf, False, srf)
-            tto.runSummary(imageName)
-            tradeSummaries.append(tto.TheTrade)
-            # for key in self.wd.keys():
-            #     print(key, tto.TheTrade[key].unique()[0])
-            tkey = f'{i+1} {tto.TheTrade[srf.name].unique()[0]}'
-            self.ts[tkey] = tto.TheTrade
-            self.entries[tkey] = tto.entries
-            self.sc.ui.tradeList.addItem(tkey)
+        with span('LayoutForms.runSummaries', trades=len(ldf)):
+            self.imageNames = self.imageData(ldf)
+            assert len(ldf) == len(self.imageNames)
+            self.sc.ui.tradeList.clear()
+            self.summaries = summarize(ldf, self.imageNames, reuse)
+            for i, summary in enumerate(self.summaries):
+                theTrade = summary.theTrade
+                tradeSummaries.append(theTrade)
+                tkey = f'{i+1} {theTrade[srf.name].unique()[0]}'
+                self.ts[tkey] = theTrade
+                self.entries[tkey] = summary.entries
+                self.sc.ui.tradeList.addItem(tkey)
 
         self.tradeSummaries = tradeSummaries
+        self.stats = None
         return tradeSummaries
 
     def populateTradeSumForms(self, key):
@@ -291,13 +305,17 @@ class LayoutForms:
             elif isinstance(daVal, (np.integer, int)):
                 daVal = '{}'.format(daVal)
             elif isinstance(daVal, (pd.Timestamp, dt.datetime, np.datetime64)):
-                daVal = pd.Timestamp(daVal)
-                daVal = daVal.strftime(self.timeFormat)
+                daVal = self.timeText(daVal)
             elif wkey == "Strategy":
                 continue
             self.wd[wkey].setText(daVal)
             # print(wkey)
 
+        # The form has 8 slots. The rest of the fills show in the tooltip of the last one.
+        fills = self.getEntries(key)
+        more = fills.describe(FORMSLOTS, self.timeFormat) if len(fills) > FORMSLOTS else ''
+        self.wd[self.rc.pl8].setToolTip(more)
+
         strat = tto['Strategy'].unique()[0]
         self.sc.loadStrategies(strat)
         
@@ -319,11 +337,15 @@ class LayoutForms:
         '''
         The entries are pickled seperately in the dict self.entries. It uses parallel keys to
         self.ts. This data is trade information, read only and is used currently for chart
-        generation. The data structure is: 
+        generation. The data structure is a FillTable. Each fill is:
         [price, time, share, pl, diff, entryOrExit]. Share is positive for buy, negative for sell.
         :params key: Trade name from the tradeList widget
         '''
         entries = self.entries[key]
+        if not isinstance(entries, FillTable):
+            # Saved before the FillTable
+            entries = FillTable(entries)
+            self.entries[key] = entries
         return entries
 
     def getChartData(self, key, ckey):
@@ -370,6 +392,10 @@ class LayoutForms:
             self.ts[key][ckey + 'End'] = data[2]
             self.ts[key][ckey + 'Interval'] = data[3]
 
+    def timeText(self, daVal):
+        '''Format a trade time for the form. HOLD entries have no time.'''
+        return '' if pd.isnull(daVal) else pd.Timestamp(daVal).strftime(self.timeFormat)
+
     def reloadTimes(self, key):
         '''
         reload the time values for the trade time entries. This is done after toggling the date
@@ -381,8 +407,7 @@ class LayoutForms:
         for i, widg in enumerate(twidgets):
             daVal = tto['Time' + str(i+1)].unique()[0]
             if isinstance(daVal, (pd.Timestamp, dt.datetime, np.datetime64)):
-                daVal = pd.Timestamp(daVal)
-                daVal = daVal.strftime(self.timeFormat)
+                daVal = self.timeText(daVal)
             widg.setText(daVal)
 
         print(tto['Time1'], type(tto['Time1']))
@@ -415,6 +440,7 @@ class LayoutForms:
             tto[rc.rr] = rr
         maxloss = 0.0 if not maxloss else maxloss
         tto[rc.maxloss] = maxloss
+        self.stats = None
 
         lost = 0.0
         note = ''
@@ -451,6 +477,7 @@ class LayoutForms:
         '''
         self.ts[key][self.rc.mstkval] = val
         self.ts[key][self.rc.mstknote] = note
+        self.stats = None
 
     def setExplain(self, key, val):
         '''
@@ -0,0 +1,71 @@
+'''
+A dialog to search the explanations, notes and mistake notes of the journaled trades. The
+search runs against the full text index of journal.notesindex as the words are typed.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import sqlite3
+import sys
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (QApplication, QDialog, QLabel, QLineEdit, QTableView,
+                             QVBoxLayout)
+
+from journal.notesindex import NotesIndex
+from journal.settings import getDB
+from journal.view.dfmodel import PandasModel
+
+# pylint: disable = C0103
+
+TYPEDELAY = 150
+
+
+class NotesSearch(QDialog):
+    '''Search the trade notes of the journal and list the matching trades'''
+
+    def __init__(self, db=None):
+        super().__init__(parent=None)
+        self.setWindowTitle('Search Notes')
+        self.resize(1000, 500)
+        db = db if db else getDB()
+        self.index = NotesIndex(db) if db else None
+
+        self.searchEdit = QLineEdit(self)
+        self.searchEdit.setPlaceholderText('Words to find, e.g. vwap revers*')
+        self.results = QTableView(self)
+        self.status = QLabel(self)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.searchEdit)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.search)
+        self.searchEdit.textChanged.connect(lambda: self.timer.start(TYPEDELAY))
+        self.searchEdit.returnPressed.connect(self.search)
+        if self.index is None:
+            self.status.setText('Please set the location of your journal directory.')
+            self.searchEdit.setEnabled(False)
+
+    def search(self):
+        text = self.searchEdit.text()
+        try:
+            df = self.index.search(text)
+        except sqlite3.Error as ex:
+            self.status.setText(f'Search failed: {ex}')
+            return
+        self.model = PandasModel(df)
+        self.results.setModel(self.model)
+        self.results.resizeColumnsToContents()
+        self.status.setText(f'{len(df)} trades' if text.strip() else '')
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    w = NotesSearch()
+    w.show()
+    sys.exit(app.exec_())
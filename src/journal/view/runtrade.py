@@ -8,15 +8,16 @@ Created on Apr 1, 2019
 import os
 import sys
 
-from PyQt5.QtWidgets import QMainWindow, QApplication, QDialog, QFileDialog, QMessageBox
-from PyQt5.QtCore import QDate, QDateTime
+from PyQt5.QtWidgets import (QMainWindow, QApplication, QDialog, QFileDialog, QMessageBox,
+                             QPushButton)
+from PyQt5.QtCore import QDate, QDateTime, QTimer
 
 import pandas as pd
 
 from journal.pandasutil import InputDataFrame
-from journal.statement import Statement_DAS as Ticket
-from journal.statement import Statement_IBActivity
-from journal.definetrades import DefineTrades
+from journal.statementcache import loadStatement
+from journal.incremental import incrementalFor
+from journal.livetail import LiveTrades, TailReader
 from journal.tradestyle import TradeFormat
 from journal.dailysumforms import MistakeSummary
 from journal.view.layoutforms import LayoutForms
@@ -29,6 +30,9 @@ from journal.view.summaryform import Ui_MainWindow
 
 # pylint: disable = C0103
 
+# Milliseconds between the polls of the DAS export in live mode
+LIVEINTERVAL = 500
+
 
 class runController:
     '''
@@ -40,6 +44,10 @@ class runController:
     def __init__(self, sc):
         self.sc = sc
         self.ui = self.sc.ui
+        self.incremental = None
+        self.live = None
+        self.tail = None
+        self.liveJf = None
 
         self.initialize()
 
@@ -49,6 +57,16 @@ class runController:
         self.ui.goBtn.pressed.connect(self.runnit)
         self.ui.loadBtn.pressed.connect(self.loadit)
 
+        # Live mode polls the DAS export while it grows during the session
+        self.liveBtn = QPushButton('Live', self.ui.centralwidget)
+        self.liveBtn.setCheckable(True)
+        self.liveBtn.setToolTip('Follow the DAS trades export while trading')
+        self.ui.verticalLayout_2.addWidget(self.liveBtn)
+        self.liveBtn.toggled.connect(self.setLive)
+        self.liveTimer = QTimer(self.ui.centralwidget)
+        self.liveTimer.setInterval(LIVEINTERVAL)
+        self.liveTimer.timeout.connect(self.pollLive)
+
     def initialize(self):
         ### Might blitz thes lines if JournalFiles gets an overhaul. For ease of transaiton
         ### We keep JournalFiles till its allworks into the Qt run
@@ -76,7 +94,6 @@ class runController:
         print(self.inpathfile)
 
     def loadit(self):
-        print('gonna loadit gonna loadit')
         daDate = self.ui.dateEdit.date()
         self.settings.setValue('theDate', daDate)
         self.initialize()
@@ -97,7 +114,6 @@ class runController:
         
 
     def runnit(self):
-        print('gonna runnit gonna runnit')
         self.initialize()
         if not self.indir:
             print('What file is supposed to load?')
@@ -109,32 +125,71 @@ class runController:
 
         if self.inputtype == 'IB_HTML':
             jf.inputType = 'IB_HTML'
-            statement = Statement_IBActivity(jf)
-            df = statement.getTrades_IBActivity(jf.inpathfile)
-        elif  self.inputtype == 'DAS':
-            tkt = Ticket(jf)
-            df, jf = tkt.getTrades()
-        # trades = pd.read_csv(jf.inpathfile)
-        else:
+        elif self.inputtype != 'DAS':
             #Temporary
             print('Opening a non standard file name in DAS')
-            tkt = Ticket(jf)
-            df, jf = tkt.getTrades()
+        df, jf = loadStatement(jf)
 
         idf = InputDataFrame()
         trades,  success = idf.processInputFile(df, jf.theDate, jf)
         if not success:
             return
 
-        tu = DefineTrades(self.inputtype)
-        inputlen, dframe, ldf = tu.processOutputDframe(trades)
+        # Running the same day again recomputes only the tickers whose fills changed and keeps
+        # the user entries for the other trades
+        self.incremental = incrementalFor(self.incremental, self.indir, self.infile,
+                                          jf.theDate, self.inputtype)
+        inputlen, dframe, ldf = self.incremental.update(trades)
 
         # Process the openpyxl excel object using the output file DataFrame. Insert
         # images and Trade Summaries.
         margin = 25
 
         lf = LayoutForms(self.sc, jf, dframe)
-        tradeSummaries = lf.runSummaries(ldf)
+        tradeSummaries = lf.runSummaries(ldf, self.incremental.summaries())
+        self.incremental.setSummaries(lf.summaries)
+
+    def setLive(self, on):
+        '''
+        Start or stop following the DAS trades export. Each poll reads the rows appended since the
+        last poll and recomputes only the open trades of their tickers.
+        '''
+        if not on:
+            self.liveTimer.stop()
+            return
+        self.initialize()
+        if not self.indir or self.inputtype != 'DAS':
+            print('Live mode follows a DAS trades export')
+            self.liveBtn.setChecked(False)
+            return
+        try:
+            self.liveJf = JournalFiles(indir=self.indir, outdir=self.outdir,
+                                       theDate=self.theDate, infile=self.infile,
+                                       inputType=self.inputtype, infile2=None, mydevel=True)
+        except NameError as ex:
+            print(ex)
+            self.liveBtn.setChecked(False)
+            return
+        self.tail = TailReader(self.liveJf.inpathfile)
+        self.live = LiveTrades(self.liveJf.theDate)
+        self.pollLive()
+        self.liveTimer.start()
+
+    def pollLive(self):
+        '''Read the new fills and update the tradeList and the daily summary'''
+        fills = self.tail.read()
+        if self.tail.reset:
+            self.live = LiveTrades(self.liveJf.theDate)
+        if fills is None or fills.empty:
+            return
+        inputlen, dframe, ldf = self.live.update(fills)
+
+        current = self.ui.tradeList.currentIndex()
+        lf = LayoutForms(self.sc, self.liveJf, dframe)
+        lf.runSummaries(ldf, self.live.summaries())
+        self.live.setSummaries(lf.summaries)
+        if 0 <= current < self.ui.tradeList.count():
+            self.ui.tradeList.setCurrentIndex(current)
 
 
 if __name__ == '__main__':
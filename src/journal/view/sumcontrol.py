@@ -17,17 +17,20 @@ from PyQt5.QtGui import QDoubleValidator, QPixmap
 
 import pandas as pd
 
+from journal.definetrades import formatTimes
 from journal.stock.utilities import ManageKeys
 from journal.view.summaryform import Ui_MainWindow
 from journal.view.filesettings import Ui_Dialog as FileSettingsDlg
 from journal.xlimage import XLImage
-from journal.stock.graphstuff import FinPlot
-from journal.stock.utilities import getMAKeys
+from journal.stock.utilities import getMAKeys, getMASettings
 
+from journal.stock.providerhealth import ProviderHealth
+from journal.view.chartjob import ChartJobManager
 from journal.view.sapicontrol import StockApi
 from journal.view.stratcontrol import StratControl
 from journal.view.dailycontrol import DailyControl
 from journal.view.ejcontrol import EJControl
+from journal.view.notessearch import NotesSearch
 
 from strategy.strategies import Strategy
 
@@ -119,6 +122,21 @@ class SumControl(QMainWindow):
         self.ui.chart2Interval.editingFinished.connect(self.chart2IntervalChanged)
         self.ui.chart3Interval.editingFinished.connect(self.chart3IntervalChanged)
         self.ui.timeHeadBtn.pressed.connect(self.toggleDate)
+
+        # Charts are retrieved and drawn in a thread pool and delivered to these slots
+        self.chartWidgets = {'chart1': (self.ui.chart1Name, self.ui.chart1),
+                             'chart2': (self.ui.chart2Name, self.ui.chart2),
+                             'chart3': (self.ui.chart3Name, self.ui.chart3)}
+        self.chartJobs = ChartJobManager(self)
+        self.chartJobs.chartReady.connect(self.chartReady)
+        self.chartJobs.chartFailed.connect(self.chartFailed)
+        # Start the provider probes now. The api chooser does not wait for them.
+        ProviderHealth.instance()
+        # Interactive charts are created on first use in place of the chart widgets
+        self.chartCanvas = dict()
+        self.chartLayouts = {'chart1': self.ui.verticalLayout_4,
+                             'chart2': self.ui.verticalLayout_6,
+                             'chart3': self.ui.verticalLayout_5}
         
 
         self.ui.saveBtn.pressed.connect(self.saveTradeObject)
@@ -134,6 +152,7 @@ class SumControl(QMainWindow):
         self.ui.actionFileSettings.triggered.connect(self.fileSetDlg)
         self.ui.actionStock_API.triggered.connect(self.stockAPIDlg)
         self.ui.actionStrategy_Browser.triggered.connect(self.stratBrowseDlg)
+        self.ui.actionSearch_Notes.triggered.connect(self.searchNotesDlg)
 
         # Set the file related widgets
         d = pd.Timestamp.today()
@@ -157,7 +176,7 @@ class SumControl(QMainWindow):
             print('The input file is not loaded')
             return
         self.dControl = DailyControl()
-        self.dControl.runDialog(self.lf.df, self.lf.ts)
+        self.dControl.runDialog(formatTimes(self.lf.df), self.lf.ts, self.lf.getDailyStats())
         self.dControl.show()
 
 
@@ -229,6 +248,7 @@ class SumControl(QMainWindow):
         widg.setPixmap(pixmap)
 
     def chartIntervalChanged(self, val, ckey):
+        self.chartJobs.cancel(ckey)
         key = self.ui.tradeList.currentText()
         data = self.lf.getChartData(key, ckey)
         data[3] = val
@@ -272,16 +292,15 @@ class SumControl(QMainWindow):
         chartSet.setValue('getmas', masl)
 
 
+        # matplotlib is loaded with the first chart
+        from journal.stock.graphstuff import FinPlot
+
         fp = FinPlot()
         fp.randomStyle = False
+        fp.maSettings = getMASettings()
         begin = qtime2pd(swidg.dateTime())
         end = qtime2pd(ewidg.dateTime())
-        (dummy, rules, apilist) = fp.apiChooserList(begin, end, fp.api)
-        if apilist:
-            fp.api = apilist[0]
-        else:
-            print('Another fn pop dialog?. Or pop the dialog here. Please choose a stock api to use. Select stockapi from the file meny.')
-            return
+        # The chart job chooses the api off the GUI thread
         interval = iwidg.value()
         # name = nwidg.text()
         key = self.ui.tradeList.currentText()
@@ -310,49 +329,76 @@ class SumControl(QMainWindow):
 
         fp.entries = fpentries
 
-        pname = fp.graph_candlestick(ticker, begin, end, interval, save=pname)
-        if pname:
-            pixmap = QPixmap(pname)
-            pixmap = pixmap.scaled(widg.width(), widg.height(), Qt.IgnoreAspectRatio)
-            widg.setPixmap(pixmap)
-            data = [pname, begin, end, interval]
-            self.lf.setChartData(key, data, c)
-            p, fname = os.path.split(pname)
-            nwidg.setText(fname)
-            return pname
-        else:
-            apiset = QSettings('zero_substance/stockapi', 'structjour')
-            errorCode = apiset.value('errorCode')
-            errorMessage = apiset.value('errorMessage')
-            if not errorMessage:
-                errorMessate = "Failed to retrieve data"
-            if errorMessage:
-                mbox = QMessageBox()
-                msg = errorCode + '\n' + errorMessage
-                mbox.setText(msg)
-                mbox.exec()
-                apiset.setValue('code', '')
-                apiset.setValue('message', '')
+        self.chartJobs.submit(c, key, fp, ticker, begin, end, interval, pname)
+        nwidg.setText('Retrieving chart ...')
 
-        return None
+    def chartReady(self, result, pixmap):
+        '''
+        Slot for ChartJobManager.chartReady. Runs on the GUI thread when a chart job has saved
+        its image.
+        :params result: The ChartResult
+        :params pixmap: A QPixmap of the saved image
+        '''
+        nwidg, widg = self.chartWidgets[result.ckey]
+        if self.ui.tradeList.currentText() != result.key:
+            return
+        pixmap = pixmap.scaled(widg.width(), widg.height(), Qt.IgnoreAspectRatio)
+        widg.setPixmap(pixmap)
+        if result.df is not None:
+            canvas = self.getChartCanvas(result.ckey)
+            begin, end, interval = result.data[1:]
+            canvas.setChart(result.fp, result.df, result.maDict,
+                            result.key.split(' ')[1], begin, end, interval)
+        self.showChartCanvas(result.ckey, result.df is not None)
+        self.lf.setChartData(result.key, result.data, result.ckey)
+        p, fname = os.path.split(result.name)
+        nwidg.setText(fname)
+        self.settings.setValue(result.ckey, result.name)
+
+    def getChartCanvas(self, ckey):
+        '''Return the interactive chart for ckey. It is created next to the chart widget.'''
+        if ckey not in self.chartCanvas:
+            from journal.view.chartcanvas import ChartCanvas
+            dummy, widg = self.chartWidgets[ckey]
+            canvas = ChartCanvas(self.ui.centralwidget)
+            canvas.setSizePolicy(widg.sizePolicy())
+            canvas.setMinimumSize(widg.minimumSize())
+            canvas.setObjectName(ckey + 'Canvas')
+            canvas.hide()
+            self.chartLayouts[ckey].addWidget(canvas)
+            self.chartCanvas[ckey] = canvas
+        return self.chartCanvas[ckey]
+
+    def showChartCanvas(self, ckey, show=True):
+        '''Show the interactive chart or the static image for ckey'''
+        dummy, widg = self.chartWidgets[ckey]
+        canvas = self.chartCanvas.get(ckey)
+        if not canvas:
+            return
+        canvas.setVisible(show)
+        widg.setVisible(not show)
+
+    def chartFailed(self, result):
+        '''Slot for ChartJobManager.chartFailed. Report the error to the user'''
+        nwidg, dummy = self.chartWidgets[result.ckey]
+        if self.lf and self.ui.tradeList.currentText() == result.key:
+            data = self.lf.getChartData(result.key, result.ckey)
+            nwidg.setText(data[0] if data else '')
+        mbox = QMessageBox()
+        mbox.setText(result.getMessage())
+        mbox.exec()
 
     def chartMagic1(self):
-        pname = self.chartMage(self.ui.chart1Start, self.ui.chart1End, self.ui.chart1Interval,
-                               self.ui.chart1Name, self.ui.chart1, 'chart1')
-        if pname:
-            self.settings.setValue('chart1', pname)
+        self.chartMage(self.ui.chart1Start, self.ui.chart1End, self.ui.chart1Interval,
+                       self.ui.chart1Name, self.ui.chart1, 'chart1')
 
     def chartMagic2(self):
-        pname = self.chartMage(self.ui.chart2Start, self.ui.chart2End, self.ui.chart2Interval,
-                               self.ui.chart2Name, self.ui.chart2, 'chart2')
-        if pname:
-            self.settings.setValue('chart2', pname)
+        self.chartMage(self.ui.chart2Start, self.ui.chart2End, self.ui.chart2Interval,
+                       self.ui.chart2Name, self.ui.chart2, 'chart2')
 
     def chartMagic3(self):
-        pname = self.chartMage(self.ui.chart3Start, self.ui.chart3End, self.ui.chart3Interval,
-                               self.ui.chart3Name, self.ui.chart3, 'chart3')
-        if pname:
-            self.settings.setValue('chart3', pname)
+        self.chartMage(self.ui.chart3Start, self.ui.chart3End, self.ui.chart3Interval,
+                       self.ui.chart3Name, self.ui.chart3, 'chart3')
 
     def toggleDate(self):
         '''
@@ -513,6 +559,9 @@ class SumControl(QMainWindow):
         :params key: The trade name and key for the widget collection in Layout Forms
         :Prerequisites: loadLayoutForm must be called before the box is used
         '''
+        self.chartJobs.cancel()
+        for ckey in self.chartCanvas:
+            self.showChartCanvas(ckey, False)
         if not key:
             print('No Val')
             return
@@ -1189,6 +1238,11 @@ class SumControl(QMainWindow):
         print('back from strat browse')
         self.loadStrategies(None)
 
+    def searchNotesDlg(self):
+        '''Search the notes of the journaled trades'''
+        search = NotesSearch()
+        search.exec()
+
 
 
 if __name__ == '__main__':
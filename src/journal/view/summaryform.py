@@ -1220,10 +1220,13 @@ class Ui_MainWindow(object):
         self.actionStock_API.setObjectName("actionStock_API")
         self.actionStrategy_Browser = QtWidgets.QAction(MainWindow)
         self.actionStrategy_Browser.setObjectName("actionStrategy_Browser")
+        self.actionSearch_Notes = QtWidgets.QAction(MainWindow)
+        self.actionSearch_Notes.setObjectName("actionSearch_Notes")
         self.menuFile.addAction(self.actionFileSettings)
         self.menuFile.addAction(self.actionChart_Settings)
         self.menuFile.addAction(self.actionStock_API)
         self.menuFile.addAction(self.actionStrategy_Browser)
+        self.menuFile.addAction(self.actionSearch_Notes)
         self.menubar.addAction(self.menuFile.menuAction())
 
         self.retranslateUi(MainWindow)
@@ -1298,5 +1301,7 @@ class Ui_MainWindow(object):
         self.actionChart_Settings.setText(_translate("MainWindow", "Chart Settings"))
         self.actionStock_API.setText(_translate("MainWindow", "Stock API"))
         self.actionStrategy_Browser.setText(_translate("MainWindow", "Strategy Browser"))
+        self.actionSearch_Notes.setText(_translate("MainWindow", "Search Notes"))
+        self.actionSearch_Notes.setShortcut(_translate("MainWindow", "Ctrl+F"))
 
 from journal.view.clicklabel import ClickLabel
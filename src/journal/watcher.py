@@ -0,0 +1,251 @@
+'''
+Watch the journal directory for new statements and journal them without asking anything. The
+day directories are found with the directory naming scheme (by default
+_{Year}{month}_{MONTH}/_{month}{day}_{DAY}/) and give the date of the statements in them. A DAS
+export (trades*.csv) or an IB Activity Statement (*activity*.html) is queued once it has not
+changed for a few seconds. A bounded process pool runs trade.run non-interactively and the xlsx
+goes to the out directory of the day. Every file is recorded in the processed_files table of
+structjour.sqlite in the journal directory with its hash, mtime and size, so it is journaled
+again only if it changes. A file is hashed only when its mtime or size changed.
+
+Run it from the src directory:
+    python -m journal.watcher --journal C:/trader/journal
+    python -m journal.watcher --once
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import argparse
+import concurrent.futures
+import datetime as dt
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+
+from journal.catalog import DEFAULTSCHEME, schemeDate, schemeRegex, walkDays
+from journal.database import getPool
+from journal.settings import getSettings, setHeadless
+from journal.statementcache import fileHash
+from journalfiles import statementType
+
+# pylint: disable = C0103
+
+SETTLESECONDS = 5
+SKIPFILES = ['tradesbyticket.csv']
+
+
+def journalStatement(path, theDate):
+    '''
+    Journal one statement without asking any questions. Run in a worker process.
+    :return: The xlsx file name
+    '''
+    import trade
+
+    indir, infile = os.path.split(path)
+    jf = trade.run(infile=infile, indir=indir, outdir=os.path.join(indir, 'out'),
+                   theDate=theDate, infile2='positions.csv', mydevel=False, interactive=False)
+    return jf.outpathfile
+
+
+def initWorker():
+    '''
+    A worker has nobody to answer. Any question fails the statement instead of waiting. The
+    workers use the headless settings so the run type they set is not seen by the Qt window.
+    '''
+    sys.stdin = open(os.devnull)
+    setHeadless(True)
+
+
+class Ledger:
+    '''The processed files in the table processed_files of the sqlite db'''
+
+    def __init__(self, db):
+        self.db = db
+        self.createTables()
+
+    def createTables(self):
+        with getPool(self.db).connection() as conn:
+            conn.execute('''
+                CREATE TABLE if not exists processed_files (
+                id	INTEGER PRIMARY KEY AUTOINCREMENT,
+                path	TEXT NOT NULL UNIQUE,
+                hash	TEXT NOT NULL,
+                theDate	TEXT,
+                status	TEXT NOT NULL,
+                outfile	TEXT,
+                message	TEXT,
+                processed	TEXT NOT NULL,
+                mtime	REAL,
+                size	INTEGER);''')
+            # Ledgers from before the file stamps were kept
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(processed_files)')]
+            for column, ctype in [('mtime', 'REAL'), ('size', 'INTEGER')]:
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE processed_files ADD COLUMN {column} {ctype}')
+
+    def isProcessed(self, path, digest):
+        '''Return True if path was processed (or failed) with the contents digest'''
+        with getPool(self.db).connection() as conn:
+            row = conn.execute('''SELECT hash FROM processed_files WHERE path = ?''',
+                               (path,)).fetchone()
+        return bool(row) and row[0] == digest
+
+    def record(self, path, digest, theDate, status, outfile=None, message=None, mtime=None,
+               size=None):
+        '''
+        Record the outcome for path.
+        :params mtime: The st_mtime of the file that was hashed
+        :params size: The st_size of the file that was hashed
+        '''
+        with getPool(self.db).connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO processed_files
+                    (path, hash, theDate, status, outfile, message, processed, mtime, size)
+                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?);''',
+                         (path, digest, theDate.strftime('%Y-%m-%d'), status, outfile, message,
+                          dt.datetime.now().isoformat(timespec='seconds'), mtime, size))
+
+    def setStamp(self, path, mtime, size):
+        '''Record that path with this mtime and size has the contents already recorded'''
+        with getPool(self.db).connection() as conn:
+            conn.execute('UPDATE processed_files SET mtime = ?, size = ? WHERE path = ?',
+                         (mtime, size, path))
+
+    def stamps(self):
+        '''Return a dict {path: (mtime, size)} of the recorded files'''
+        with getPool(self.db).connection() as conn:
+            cur = conn.execute('SELECT path, mtime, size FROM processed_files')
+            return {path: (mtime, size) for path, mtime, size in cur}
+
+    def getRecords(self):
+        '''Return the ledger as a DataFrame'''
+        with getPool(self.db).connection() as conn:
+            return pd.read_sql_query('SELECT * FROM processed_files', conn)
+
+
+class Watcher:
+    '''
+    Find the statements in the day directories under journal and journal the new or changed ones
+    in a pool of maxWorkers processes. At most maxPending statements are queued at a time. The
+    rest wait for a later poll.
+    '''
+
+    def __init__(self, journal, scheme=DEFAULTSCHEME, db=None, maxWorkers=2, maxPending=None,
+                 settle=SETTLESECONDS, executor=None):
+        self.journal = journal
+        self.scheme = scheme
+        self.ledger = Ledger(db if db else os.path.join(journal, 'structjour.sqlite'))
+        self.maxPending = maxPending if maxPending else maxWorkers * 2
+        self.settle = settle
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                maxWorkers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=initWorker)
+        self.executor = executor
+        self.pending = dict()
+
+    def scan(self):
+        '''Yield (path, theDate) for each statement in a day directory'''
+        for entry, theDate in walkDays(self.journal, self.scheme):
+            for fname in sorted(os.listdir(entry.path)):
+                if fname.lower() not in SKIPFILES and statementType(fname):
+                    yield os.path.join(entry.path, fname), theDate
+
+    def collect(self):
+        '''Record the finished statements in the ledger. Return the number finished.'''
+        done = [f for f in self.pending if f.done()]
+        for future in done:
+            path, digest, theDate, (mtime, size) = self.pending.pop(future)
+            try:
+                outfile = future.result()
+                self.ledger.record(path, digest, theDate, 'done', outfile, mtime=mtime,
+                                   size=size)
+                print(f'Journaled {path} to {outfile}')
+            except Exception as ex:     # pylint: disable = W0703
+                self.ledger.record(path, digest, theDate, 'failed', message=repr(ex),
+                                   mtime=mtime, size=size)
+                print(f'Failed to journal {path}: {ex!r}')
+        return len(done)
+
+    def poll(self):
+        '''
+        Record the finished statements and queue the new ones. Return the number queued. A file
+        is only hashed when its mtime or size differs from the ledger.
+        '''
+        self.collect()
+        queued = 0
+        inProgress = {p[0] for p in self.pending.values()}
+        stamps = self.ledger.stamps()
+        now = time.time()
+        for path, theDate in self.scan():
+            if len(self.pending) >= self.maxPending:
+                break
+            if path in inProgress:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (st.st_mtime, st.st_size)
+            if stamps.get(path) == stamp or now - st.st_mtime < self.settle:
+                continue
+            digest = fileHash(path)
+            if self.ledger.isProcessed(path, digest):
+                self.ledger.setStamp(path, *stamp)
+                continue
+            future = self.executor.submit(journalStatement, path, theDate)
+            self.pending[future] = (path, digest, theDate, stamp)
+            queued += 1
+        return queued
+
+    def run(self, interval=10, once=False):
+        '''
+        Poll every interval seconds. If once, journal what is there now and return.
+        '''
+        try:
+            while True:
+                self.poll()
+                if self.pending:
+                    concurrent.futures.wait(list(self.pending), timeout=interval,
+                                            return_when=concurrent.futures.FIRST_COMPLETED)
+                elif once:
+                    break
+                else:
+                    time.sleep(interval)
+        finally:
+            self.executor.shutdown()
+
+
+def main(args=None):
+    settings = getSettings('zero_substance', 'structjour')
+    parser = argparse.ArgumentParser(description='Journal new statements in the journal directory')
+    parser.add_argument('--journal', default=settings.value('journal'),
+                        help='The journal directory. Defaults to the journal setting.')
+    parser.add_argument('--scheme', default=settings.value('scheme', DEFAULTSCHEME),
+                        help='The day directory naming scheme')
+    parser.add_argument('--db', help='The sqlite file for the ledger. Defaults to '
+                        'structjour.sqlite in the journal directory.')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--interval', type=float, default=10.0)
+    parser.add_argument('--settle', type=float, default=SETTLESECONDS,
+                        help='Seconds a file must be unchanged before it is journaled')
+    parser.add_argument('--once', action='store_true', help='Journal what is there and exit')
+    opts = parser.parse_args(args)
+    if not opts.journal or not os.path.isdir(opts.journal):
+        parser.error('Set the journal directory with --journal')
+
+    watcher = Watcher(opts.journal, opts.scheme, opts.db, opts.workers, settle=opts.settle)
+    try:
+        watcher.run(opts.interval, opts.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
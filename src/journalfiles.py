@@ -10,6 +10,21 @@ import pandas as pd
 
 
 
+def statementType(infile):
+    '''
+    Pick the input type from the file name. An IB Activity Statement web page has 'activity' in
+    its name and ends in .html. A DAS export has 'trades' in its name and ends in .csv.
+    :return: 'IB_HTML', 'DAS' or None for a non standard name
+    '''
+    name, ext = os.path.splitext(os.path.basename(infile).lower())
+    if name.find('activity') > -1 and ext == '.html':
+        return JournalFiles.inputType['ib']
+    if name.find('trades') > -1 and ext == '.csv':
+        # This could be an IB CSV--so this is temporary-- when I enable some sort of IB CSV, will
+        # probably do some kind of class heirarchy here for statements.
+        return JournalFiles.inputType['das']
+    return None
+
 
 class JournalFiles:
     '''
@@ -92,14 +107,15 @@ class JournalFiles:
     def setMyParams(self, indir, outdir):
         '''
         Set the file names for MyDevel. By default this uses a directory structure that we created:
-                        By default indir is at (journal)/_01_January/Week_4/_0125_Friday
+                        By default indir is at (journal)/_201901_January/_0125_Friday
                         Configurable by the infile parameter for JournalFiles
         :params indir:  Location of the input file. If None, set to MyDevel params
         :params outdir: Location to write the output file. If None set to indir/out
         :params infile: The name of the input file.
         '''
-        path="C:/trader/journal/" + self.monthformat + '/' + self.dayformat
-        path = self.theDate.strftime(path)
+        from journal.catalog import DEFAULTSCHEME, schemePath
+
+        path = schemePath("C:/trader/journal/", DEFAULTSCHEME, self.theDate)
         self.indir = indir if indir else os.path.realpath(path)
         self.inpathfile = os.path.join(self.indir, self.infile)
         if self.infile2:
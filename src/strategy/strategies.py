@@ -24,8 +24,8 @@ Created on April 30, 2019
 import os
 import sqlite3
 
-from PyQt5.QtCore import QSettings
-
+from journal.database import getPool
+from journal.settings import getSettings
 from strategy.strat import TheStrategyObject
 
 # pylint: disable = C0103
@@ -33,15 +33,21 @@ from strategy.strat import TheStrategyObject
 
 class Strategy:
     '''
-    Methods to retrieve, add and remove items ffrom the database for strategies
+    Methods to retrieve, add and remove items ffrom the database for strategies. The connections
+    come from the shared pool of the db. The strategy list, descriptions, images and links are
+    read once and then answered from memory till a write through this class changes them.
     '''
 
+    # The cache entries of the strategy tables
+    CACHED = ('strategy', 'description', 'image', 'links')
 
     def __init__(self, create=False, testdb=None):
         # if not db:
-        apiset = QSettings('zero_substance/stockapi', 'structjour')
+        apiset = getSettings('zero_substance/stockapi', 'structjour')
         db = apiset.value('dbsqlite')
         db = db if not testdb else testdb
+        self.db = db
+        self.pool = None
         if not db:
             print('db value is not set')
             return
@@ -50,36 +56,50 @@ class Strategy:
         #     msg = f'db file {db} is not found. '
         #     print(msg)
         #     return
-        self.conn = sqlite3.connect(db)
-        self.cur = self.conn.cursor()
+        self.pool = getPool(db)
         if create:
             self.createTables()
 
+    def execute(self, sql, params=(), invalidate=None):
+        '''
+        Run one statement in a pooled connection and commit it.
+        :params invalidate: Cache names the statement changes. Default all of CACHED.
+        :return: The cursor
+        '''
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+        self.pool.invalidate(*(invalidate if invalidate else self.CACHED))
+        return cursor
+
+    def query(self, key, sql, params=(), fetch='all'):
+        '''Return the rows of sql (or the first row if fetch is 'one') cached under key'''
+        def load():
+            with self.pool.connection() as conn:
+                cursor = conn.execute(sql, params)
+                return cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+        return self.pool.cached(key, load)
+
     def setLink(self, key, url):
         sid = self.getId(key)
-        
-        self.conn.execute('''INSERT INTO links (link, strategy_id)
-            VALUES(?, ?)''', (url, sid))
-        self.conn.commit()
+        self.execute('''INSERT INTO links (link, strategy_id)
+            VALUES(?, ?)''', (url, sid), invalidate=['links'])
 
     def getLinks(self, key):
         sid = self.getId(key)
-        
-        cursor = self.conn.execute('''SELECT link FROM links WHERE strategy_id  = ?''', (sid, ))
-        x = cursor.fetchall()
+        x = self.query(('links', sid),
+                       '''SELECT link FROM links WHERE strategy_id  = ?''', (sid, ))
         xlist = [z[0] for z in x]
         return xlist
-        
+
     def removeLink(self, key, url):
         sid = self.getId(key)
-        self.conn.execute('''delete from links where link = ? and strategy_id = ?''', (url, sid,))
-        self.conn.commit()
+        self.execute('''delete from links where link = ? and strategy_id = ?''', (url, sid,),
+                     invalidate=['links'])
 
     def removeImage(self, key, widget):
         x = self.getId(key)
-        cursor = self.conn.execute('''DELETE FROM images
-            WHERE strategy_id = ? AND widget = ?;''', (x, widget)    )
-
+        self.execute('''DELETE FROM images
+            WHERE strategy_id = ? AND widget = ?;''', (x, widget), invalidate=['image'])
 
     def removeImage1(self, key):
         self.removeImage(key, 'chart1')
@@ -95,14 +115,12 @@ class Strategy:
         '''
         print('setting', key, name)
         sid = self.getId(key)
-        cursor = self.conn.execute('''SELECT name FROM images
-            WHERE strategy_id = ? and widget = ?''', (sid, widget,))
-        if cursor.fetchone():
-            self.removeImage(key, widget)
-        
-        self.conn.execute('''INSERT INTO images (name, widget, strategy_id)
-            VALUES(?, ?, ?)''', (name, widget, sid))
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            conn.execute('''DELETE FROM images
+                WHERE strategy_id = ? AND widget = ?;''', (sid, widget))
+            conn.execute('''INSERT INTO images (name, widget, strategy_id)
+                VALUES(?, ?, ?)''', (name, widget, sid))
+        self.pool.invalidate('image')
 
     def setImage1(self, key, name):
         self.setImage(key, name, 'chart1')
@@ -111,11 +129,10 @@ class Strategy:
         self.setImage(key, name, 'chart2')
 
     def getImage(self, strat, widget):
-        cursor = self.conn.execute('''SELECT images.name, strategy.id FROM images
+        x = self.query(('image', strat, widget), '''SELECT images.name, strategy.id FROM images
             JOIN strategy
             ON strategy_id = strategy.id
-            WHERE strategy.name=? AND widget = ? ''', (strat, widget))
-        x = cursor.fetchone()
+            WHERE strategy.name=? AND widget = ? ''', (strat, widget), fetch='one')
         if x:
             return x[0]
         else:
@@ -128,101 +145,92 @@ class Strategy:
         return self.getImage(strat, 'chart2')
 
     def getConnection(self):
-        return self.conn
+        '''Return a new connection to the db. The caller closes it.'''
+        return self.pool.connect()
 
     def removeStrategy(self, name):
         '''Remove the strategy entry matched by name'''
-        cursor = self.conn.execute('''
+        self.execute('''
             DELETE FROM strategy WHERE name = ?''', (name,))
-        if cursor:
-            self.conn.commit()
-        return cursor.fetchone()
 
     def setPreferred(self, name, pref):
-        x = self.cur.execute('''UPDATE strategy
+        self.execute('''UPDATE strategy
             SET preferred = ?
-            WHERE name = ?''', (0, name))
-        self.conn.commit()
-    
+            WHERE name = ?''', (0, name), invalidate=['strategy'])
+
     def getPreferred(self, pref=1):
         '''
         Returns all strategies marked  preferred by default. Set pref to 0 to get all
         non-preferred strats.
         '''
-        x = self.cur.execute('''SELECT * FROM strategy WHERE preferred = ?''', (pref,))
-        return x.fetchall()
-    
-    def getId(self, name):
-        cursor = self.conn.execute('''
-            select id from strategy 
-            WHERE name = ?''', (name, ))
-        s = cursor.fetchone()
-        return s[0] 
-
+        return [row for row in self.getStrategies() if row[3] == pref]
 
+    def getId(self, name):
+        for row in self.getStrategies():
+            if row[1] == name:
+                return row[0]
+        raise TypeError(f'The strategy {name} is not in the db')
 
     def addStrategy(self, name, preferred=1):
         '''Add the strategy name to table strategy'''
         try:
-            x = self.cur.execute('''INSERT INTO strategy(name, preferred)
-	    			VALUES(?, ?)''', (name, preferred))
+            x = self.execute('''INSERT INTO strategy(name, preferred)
+	    			VALUES(?, ?)''', (name, preferred), invalidate=['strategy'])
         except sqlite3.IntegrityError as e:
             print(f'{name} already exists in DB. No action taken:', e)
             return
         except sqlite3.OperationalError as e:
             print('Close the database browser please:', e)
             return
-        self.conn.commit()
         return x
 
     def getStrategy(self, name=None, sid=None):
         '''Get the strategy using id or name'''
         if name:
-            cursor = self.conn.execute('''
-            select name, preferred from strategy 
-	            WHERE name = ?''', (name,))
+            for row in self.getStrategies():
+                if row[1] == name:
+                    return (row[1], row[3])
         elif sid:
-            cursor = self.conn.execute('SELECT * FROM strategy WHERE id = ?', (sid,))
-        else:
-            return None
-        return cursor.fetchone()
+            for row in self.getStrategies():
+                if row[0] == sid:
+                    return row
+        return None
 
     def getDescription(self, name):
         '''Get the description for strategy.name'''
-        cursor = self.conn.execute('''SELECT strategy.name, description.description FROM strategy
-            LEFT OUTER JOIN description 
-            ON strategy.id = description.strategy_id 
-            WHERE name = ?''', (name, ))
-        return cursor.fetchone()
+        return self.query(('description', name),
+                          '''SELECT strategy.name, description.description FROM strategy
+            LEFT OUTER JOIN description
+            ON strategy.id = description.strategy_id
+            WHERE name = ?''', (name, ), fetch='one')
 
     def setDescription(self, name, desc):
         sid = self.getId(name)
         # Set source to user
-        source = 2 
-        cursor = self.conn.execute('''Select description from description
-            WHERE strategy_id = ?''', (sid,))
-        if not cursor.fetchone():
-            self.conn.execute('''INSERT INTO description (description, source_id, strategy_id)
-                VALUES(?, ?, ?)''', (desc, source,sid))
-        else:
-            self.conn.execute("""UPDATE description
-                SET description=?, source_id=?
-                WHERE strategy_id = ?""", (desc, source, sid))
-        self.conn.commit()
-
-
-
+        source = 2
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''Select description from description
+                WHERE strategy_id = ?''', (sid,))
+            if not cursor.fetchone():
+                conn.execute('''INSERT INTO description (description, source_id, strategy_id)
+                    VALUES(?, ?, ?)''', (desc, source,sid))
+            else:
+                conn.execute("""UPDATE description
+                    SET description=?, source_id=?
+                    WHERE strategy_id = ?""", (desc, source, sid))
+        self.pool.invalidate('description')
 
     def getStrategies(self):
-        cursor = self.conn.execute('SELECT * FROM strategy')
-        return(cursor.fetchall())
+        return list(self.query('strategy', 'SELECT * FROM strategy'))
 
     def dropTables(self):
-        self.cur.execute('DROP TABLE IF EXISTS strategy')
-        self.cur.execute('DROP TABLE IF EXISTS description')
-        self.cur.execute('DROP TABLE IF EXISTS source')
-        self.cur.execute('DROP TABLE IF EXISTS images')
-        self.cur.execute('DROP TABLE IF EXISTS links')
+        with self.pool.connection() as conn:
+            conn.execute('DROP TABLE IF EXISTS strategy')
+            conn.execute('DROP TABLE IF EXISTS description')
+            conn.execute('DROP TABLE IF EXISTS source')
+            conn.execute('DROP TABLE IF EXISTS images')
+            conn.execute('DROP TABLE IF EXISTS links')
+        self.pool.invalidate(*self.CACHED)
 
     def loadDefault(self):
      #####
@@ -231,83 +239,82 @@ class Strategy:
         # I should not have to supply the ID but I get this error without:
         # Incorrect number of bindings supplied. The current statement uses 1, and there are 13 supplied.
         entries = ['default', 'user', 'contrib']
-        for i in range(len(entries)):
-            self.cur.execute('''INSERT INTO source (id, datasource)
-                        VALUES(?, ?)''',
-                        (i+1, entries[i]))
-
         tso = TheStrategyObject()
-        for strat, count in zip(tso.s1, range(len(tso.s1))):
-            count = count + 1
-            if len(strat) > 1:
-                self.cur.execute('''INSERT INTO strategy(id, name, short_name, preferred)
-                        VALUES(?, ?, ?, ?)''',
-                            (count, strat[0], strat[1], 1))
-            else:
-                self.cur.execute('''INSERT INTO strategy(id, name, preferred)
-                        VALUES(?, ?, ?)''',
-                            (count, strat[0], 1))
-
-        self.cur.execute('SELECT id FROM source WHERE datasource = ?', ('default',))
-        source_id = self.cur.fetchone()[0]
-        # cur.execute('SELECT id FROM strategy WHERE name = ?', ('default',))
-        self.conn.commit()
-
-        for key, count in zip(tso.strats.keys(), range(len(tso.strats.keys()))):
-            self.cur.execute('SELECT id FROM strategy WHERE name = ?', (key,))
-            # print(key)
-            strategy_id = self.cur.fetchone()[0]
-            self.cur.execute('''INSERT INTO description(id, description, source_id, strategy_id)
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            for i in range(len(entries)):
+                cur.execute('''INSERT INTO source (id, datasource)
+                            VALUES(?, ?)''',
+                            (i+1, entries[i]))
+
+            for strat, count in zip(tso.s1, range(len(tso.s1))):
+                count = count + 1
+                if len(strat) > 1:
+                    cur.execute('''INSERT INTO strategy(id, name, short_name, preferred)
                             VALUES(?, ?, ?, ?)''',
-                        (count, tso.strats[key][1], source_id, strategy_id))
-            # print(count, key, tso.strats[key])
-        self.conn.commit()
+                                (count, strat[0], strat[1], 1))
+                else:
+                    cur.execute('''INSERT INTO strategy(id, name, preferred)
+                            VALUES(?, ?, ?)''',
+                                (count, strat[0], 1))
+
+            cur.execute('SELECT id FROM source WHERE datasource = ?', ('default',))
+            source_id = cur.fetchone()[0]
+
+            for key, count in zip(tso.strats.keys(), range(len(tso.strats.keys()))):
+                cur.execute('SELECT id FROM strategy WHERE name = ?', (key,))
+                # print(key)
+                strategy_id = cur.fetchone()[0]
+                cur.execute('''INSERT INTO description(id, description, source_id, strategy_id)
+                                VALUES(?, ?, ?, ?)''',
+                            (count, tso.strats[key][1], source_id, strategy_id))
+                # print(count, key, tso.strats[key])
+        self.pool.invalidate(*self.CACHED)
 
+    def createTables(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+            CREATE TABLE if not exists strategy (
+                id	INTEGER PRIMARY KEY AUTOINCREMENT,
+                name	text UNIQUE,
+                short_name	text,
+                preferred	INTEGER DEFAULT 1);''')
+
+            conn.execute('''
+            CREATE TABLE if not exists source (
+                id integer PRIMARY KEY,
+                datasource text
+            );''')
+
+            conn.execute('''
+            CREATE TABLE  if not exists description (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                description text,
+                source_id integer,
+                strategy_id INTEGER UNIQUE,
+                FOREIGN KEY (source_id) REFERENCES source(id),
+                FOREIGN KEY (strategy_id) REFERENCES strategy(id)
+            );''')
+
+            conn.execute('''
+            CREATE TABLE  if not exists images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                widget	INTEGER CHECK(widget="chart1" OR widget="chart2"),
+                strategy_id	INTEGER,
+                FOREIGN KEY(strategy_id) REFERENCES strategy(id)
+            );''')
+
+            conn.execute('''
+            CREATE TABLE  if not exists links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                link text,
+                strategy_id integer,
+                FOREIGN  KEY (strategy_id) REFERENCES strategy(id)
+            );''')
+        self.pool.invalidate(*self.CACHED)
 
 
-    def createTables(self):
-        self.cur.execute('''
-        CREATE TABLE if not exists strategy (
-	        id	INTEGER PRIMARY KEY AUTOINCREMENT,
-            name	text UNIQUE,
-            short_name	text,
-            preferred	INTEGER DEFAULT 1);''')
-
-        self.cur.execute('''
-        CREATE TABLE if not exists source (
-            id integer PRIMARY KEY,
-            datasource text
-        );''')
-
-        self.cur.execute('''
-        CREATE TABLE  if not exists description (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            description text,
-            source_id integer,
-            strategy_id INTEGER UNIQUE,
-            FOREIGN KEY (source_id) REFERENCES source(id),
-            FOREIGN KEY (strategy_id) REFERENCES strategy(id)
-        );''')
-
-        self.cur.execute('''
-        CREATE TABLE  if not exists images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE,
-            widget	INTEGER CHECK(widget="chart1" OR widget="chart2"),
-            strategy_id	INTEGER,
-            FOREIGN KEY(strategy_id) REFERENCES strategy(id)
-        );''')
-
-        self.cur.execute('''
-        CREATE TABLE  if not exists links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            link text,
-            strategy_id integer,
-            FOREIGN  KEY (strategy_id) REFERENCES strategy(id)
-        );''')
-        self.conn.commit()
-
-    
 
 def notmain():
     t = Strategy()
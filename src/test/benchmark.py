@@ -0,0 +1,298 @@
+'''
+Benchmark the import to journal pipeline on statements of 100, 1k, 10k and 50k fills generated
+by test.rtg.StatementGenerator.
+Run it from the src directory:
+    python -m test.benchmark
+    python -m test.benchmark --sizes 100,1000 --stages das,definetrades
+    python -m test.benchmark --json results.json --baseline lastrelease.json
+
+The stages are
+    das:          Statement_DAS.getTrades (read trades.csv and reduce the fills to tickets)
+    ibhtml:       Statement_IBActivity.getTrades_IBActivity on an Activity Statement
+    ibcsv:        getTrades_csv on an Activity Statement csv export
+    input:        InputDataFrame.processInputFile
+    definetrades: DefineTrades.processOutputDframe
+    workbook:     LayoutSheet.imageData, createWorkbook and styleTop
+    save:         LayoutSheet.save
+    chart:        FinPlot.renderChart of one bar per fill with an entry marker every 10 bars
+
+Once a stage takes longer than --maxseconds, its larger sizes are skipped. The json file holds
+the versions and the seconds for each stage and size so results can be compared over releases.
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+SIZES = [100, 1000, 10000, 50000]
+STAGES = ['das', 'ibhtml', 'ibcsv', 'input', 'definetrades', 'workbook', 'save', 'chart']
+THEDATE = pd.Timestamp('2019-10-18')
+
+
+def makeCandles(num, seed=0):
+    '''Generate num one minute candles'''
+    rs = np.random.RandomState(seed)
+    idx = pd.date_range(THEDATE + pd.Timedelta(hours=4), periods=num, freq='1min')
+    close = 50 + rs.standard_normal(num).cumsum() * .1
+    dopen = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({'open': dopen,
+                         'high': np.maximum(dopen, close) + .05,
+                         'low': np.minimum(dopen, close) - .05,
+                         'close': close,
+                         'volume': rs.randint(100, 10000, num)}, index=idx)
+
+
+def timeit(func, repeat=1):
+    '''
+    Run func repeat times.
+    :return: (The least seconds, the return value of the last run)
+    '''
+    best = None
+    for dummy in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Benchmark:
+    '''
+    Run the stages for one size. Each stage uses the output of the stage before it where it can,
+    the same way trade.run does.
+    '''
+
+    def __init__(self, numFills, workdir, repeat=1, seed=0):
+        from journalfiles import JournalFiles
+
+        self.numFills = numFills
+        self.repeat = repeat
+        self.workdir = os.path.join(workdir, str(numFills))
+        self.outdir = os.path.join(self.workdir, 'out')
+        os.makedirs(self.outdir)
+
+        gen = StatementGenerator(numFills, theDate=THEDATE, seed=seed)
+        gen.writeDAS(self.workdir)
+        self.fills = pd.read_csv(os.path.join(self.workdir, 'trades.csv'))
+
+        # The IB statements are for a single account
+        gen = StatementGenerator(numFills, accounts=['U000000'], theDate=THEDATE, seed=seed)
+        gen.writeIBHtml(os.path.join(self.workdir, 'ActivityStatement.html'))
+        gen.writeIBCsv(os.path.join(self.workdir, 'ActivityStatement.csv'))
+        self.jf = lambda infile: JournalFiles(indir=self.workdir, outdir=self.outdir,
+                                              theDate=THEDATE, infile=infile,
+                                              infile2='positions.csv')
+        self.trades = None
+        self.processed = None
+        self.book = None
+
+    def das(self):
+        from journal.statement import Statement_DAS
+        jf = self.jf('trades.csv')
+        return timeit(lambda: Statement_DAS(jf).getTrades()[0], self.repeat)
+
+    def ibhtml(self):
+        from journal.statement import Statement_IBActivity
+        jf = self.jf('ActivityStatement.html')
+        return timeit(lambda: Statement_IBActivity(jf).getTrades_IBActivity(jf.inpathfile),
+                      self.repeat)
+
+    def ibcsv(self):
+        from journal.statement import getTrades_csv
+        path = os.path.join(self.workdir, 'ActivityStatement.csv')
+        return timeit(lambda: getTrades_csv(path), self.repeat)
+
+    def input(self):
+        from journal.pandasutil import InputDataFrame
+        jf = self.jf('trades.csv')
+        fills = self.fills.copy()
+        fills['Date'] = THEDATE
+
+        def run():
+            trades, success = InputDataFrame().processInputFile(fills.copy(), THEDATE, jf)
+            assert success
+            return trades
+        seconds, self.trades = timeit(run, self.repeat)
+        return seconds, self.trades
+
+    def definetrades(self):
+        from journal.definetrades import DefineTrades
+        if self.trades is None:
+            self.input()
+        seconds, self.processed = timeit(
+            lambda: DefineTrades().processOutputDframe(self.trades.copy()), self.repeat)
+        return seconds, self.processed
+
+    def workbook(self):
+        from journal.layoutsheet import LayoutSheet
+        from journal.tradestyle import TradeFormat
+        if self.processed is None:
+            self.definetrades()
+        inputlen, dframe, ldf = self.processed
+
+        def run():
+            ls = LayoutSheet(25, inputlen)
+            dummy, df = ls.imageData(dframe, ldf)
+            wb, ws, nt = ls.createWorkbook(df)
+            ls.styleTop(ws, len(nt.columns), TradeFormat(wb))
+            return ls, wb
+        seconds, self.book = timeit(run, self.repeat)
+        return seconds, self.book
+
+    def save(self):
+        if self.book is None:
+            self.workbook()
+        ls, wb = self.book
+        jf = self.jf('trades.csv')
+        return timeit(lambda: ls.save(wb, jf), self.repeat)
+
+    def chart(self):
+        from journal.stock.graphstuff import FinPlot
+        df = makeCandles(self.numFills)
+        fp = FinPlot()
+        fp.interactive = False
+        fp.useCache = False
+        fp.entries = [[df.close[i], i, 'B' if i % 20 else 'S', df.index[i]]
+                      for i in range(0, len(df), 10)]
+        save = os.path.join(self.outdir, 'chart.png')
+
+        def run():
+            name = fp.renderChart(df, None, 'SQ', df.index[0], df.index[-1], 1, save=save)
+            os.remove(name)
+            return name
+        return timeit(run, self.repeat)
+
+
+def run(sizes=None, stages=None, repeat=1, maxSeconds=120.0, verbose=True):
+    '''
+    Run the benchmarks.
+    :params sizes: A list of fill counts. Defaults to SIZES.
+    :params stages: A list of stage names. Defaults to STAGES.
+    :params repeat: Run each stage repeat times and keep the least time.
+    :params maxSeconds: Skip the larger sizes of a stage that took longer than this.
+    :return: A dict of stage: {size: seconds or None if skipped}
+    '''
+    from journal.settings import getSettings
+
+    sizes = sizes if sizes else SIZES
+    stages = stages if stages else STAGES
+    # The pipeline runs as the console app. Put the user's runType back when done.
+    settings = getSettings('zero_substance', 'structjour')
+    runType = settings.value('runType') if settings.contains('runType') else None
+    settings.setValue('runType', 'CONSOLE')
+    results = {stage: dict() for stage in stages}
+    workdir = tempfile.mkdtemp(prefix='structjour_bench')
+    try:
+        for size in sorted(sizes):
+            bench = Benchmark(size, workdir, repeat)
+            for stage in stages:
+                prev = [v for v in results[stage].values() if v is not None]
+                if len(prev) < len(results[stage]) or (prev and prev[-1] > maxSeconds):
+                    results[stage][size] = None
+                    continue
+                seconds, dummy = getattr(bench, stage)()
+                results[stage][size] = seconds
+                if verbose:
+                    print(f'{stage:>14} {size:>7} {seconds:10.3f} s', flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if runType is None:
+            settings.remove('runType')
+        else:
+            settings.setValue('runType', runType)
+    return results
+
+
+def report(results, baseline=None):
+    '''
+    Return a table of the results with the fills per second. If a baseline (results from an
+    earlier run) is given, include the ratio of the times.
+    '''
+    sizes = sorted({size for r in results.values() for size in r})
+    lines = ['{:>14}'.format('stage') + ''.join(f'{size:>22}' for size in sizes)]
+    for stage, r in results.items():
+        line = f'{stage:>14}'
+        for size in sizes:
+            seconds = r.get(size)
+            if seconds is None:
+                line += '{:>22}'.format('skipped')
+                continue
+            cell = f'{seconds:.3f}s {size / seconds:,.0f}/s'
+            old = baseline.get(stage, dict()).get(size) if baseline else None
+            if old:
+                cell += f' x{seconds / old:.2f}'
+            line += f'{cell:>22}'
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def save(results, path):
+    '''Save the results and the versions to a json file'''
+    out = {'date': dt.datetime.now().isoformat(timespec='seconds'),
+           'python': platform.python_version(),
+           'pandas': pd.__version__,
+           'numpy': np.__version__,
+           'results': results}
+    with open(path, 'w') as f:
+        json.dump(out, f, indent=2)
+
+
+def load(path):
+    '''Load the results saved by save. The sizes are converted back to int.'''
+    with open(path) as f:
+        results = json.load(f)['results']
+    return {stage: {int(size): seconds for size, seconds in r.items()}
+            for stage, r in results.items()}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark the structjour pipeline')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in SIZES),
+                        help='Comma separated fill counts')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='Comma separated stages from ' + ', '.join(STAGES))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--maxseconds', type=float, default=120.0)
+    parser.add_argument('--json', help='Save the results to this file')
+    parser.add_argument('--baseline', help='Compare with results saved by --json')
+    opts = parser.parse_args(args)
+
+    # DataFrame.append and the chained assignments warn on every call
+    warnings.simplefilter('ignore', FutureWarning)
+    warnings.simplefilter('ignore', pd.errors.SettingWithCopyWarning)
+    from journal.settings import setHeadless
+    setHeadless(True, os.path.join(tempfile.gettempdir(), 'structjour_bench_settings.json'))
+
+    sizes = [int(s) for s in opts.sizes.split(',')]
+    stages = [s.strip() for s in opts.stages.split(',')]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f'Unknown stages {unknown}')
+    results = run(sizes, stages, opts.repeat, opts.maxseconds)
+    print()
+    print(report(results, load(opts.baseline) if opts.baseline else None))
+    if opts.json:
+        save(results, opts.json)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
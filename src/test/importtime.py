@@ -0,0 +1,84 @@
+'''
+Measure the cold start import time of the structjour entry points with python -X importtime.
+Run it from the src directory:
+    python -m test.importtime
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+
+import os
+import subprocess
+import sys
+
+# pylint: disable = C0103
+
+SRCDIR = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+
+# name: (statement, extra environment)
+ENTRYPOINTS = {'cli': ('import trade', {'STRUCTJOUR_HEADLESS': '1'}),
+               'qt': ('import journal.view.runtrade', {})}
+
+# The budget in milliseconds for the total import time of each entry point
+BUDGETS = {'cli': 1500, 'qt': 2500}
+
+
+def importTimes(stmt, env=None):
+    '''
+    Run stmt in a new interpreter with -X importtime.
+    :params stmt: The python statement to run, for example 'import trade'
+    :params env: Environment variables to add
+    :return: A dict of module: (self microseconds, cumulative microseconds)
+    :raise ImportError: If stmt fails.
+    '''
+    runenv = dict(os.environ)
+    if env:
+        runenv.update(env)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', stmt], cwd=SRCDIR,
+                         env=runenv, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if out.returncode:
+        raise ImportError(out.stderr.decode().strip().splitlines()[-1])
+    times = dict()
+    for line in out.stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        selfus, cumulative, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(selfus), int(cumulative))
+    return times
+
+
+def totalTime(times):
+    '''Return the total import time in milliseconds'''
+    return sum(t[0] for t in times.values()) / 1000
+
+
+def report(name, top=15):
+    '''
+    Print the total time and the slowest imports for an entry point.
+    :return: True if the entry point is within its budget
+    '''
+    stmt, env = ENTRYPOINTS[name]
+    try:
+        times = importTimes(stmt, env)
+    except ImportError as ex:
+        print(f'{name}: {stmt}  failed: {ex}')
+        return False
+    total = totalTime(times)
+    print(f'{name}: {stmt}  {total:.0f} ms  (budget {BUDGETS[name]} ms)  {len(times)} modules')
+    slowest = sorted(times.items(), key=lambda x: x[1][1], reverse=True)[:top]
+    for module, (selfus, cumulative) in slowest:
+        print(f'    {cumulative/1000:9.1f} {selfus/1000:9.1f}  {module}')
+    return total <= BUDGETS[name]
+
+
+def main():
+    ok = True
+    for name in ENTRYPOINTS:
+        ok = report(name) and ok
+        print()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,8 +7,12 @@ Random Trade Generator to for testing
 '''
 
 
+from collections import namedtuple
+import csv
+import itertools
 import math
 from math import isclose
+import os
 import random
 from unittest import TestCase
 
@@ -16,6 +20,9 @@ import pandas as pd
 
 # pylint: disable = C0103
 
+IBCOLUMNS = ['Symbol', 'Date/Time', 'Quantity', 'T. Price', 'Proceeds', 'Comm/Fee', 'Basis',
+             'Realized P/L', 'Code']
+
 def getSide(firsttrade=False):
     '''
     Get a random distribution of 'B', 'S', 'HOLD+', 'HOLD-'. Set the probabilities here.
@@ -205,6 +212,235 @@ def randomTradeGenerator2(tnum, earliest=pd.Timestamp('2019-01-01 09:30:00'),
         
     return trade, latest
 
+Fill = namedtuple('Fill', ['time', 'symb', 'side', 'price', 'qty', 'acct', 'cloid', 'pl', 'code'])
+
+# The first and last second a fill can have. DAS shows pre and post market fills.
+OPEN_SECOND = 4 * 3600
+CLOSE_SECOND = 20 * 3600
+
+
+class StatementGenerator:
+    '''
+    Generate a day of fills and write them as a DAS export (trades.csv and positions.csv), an IB
+    Activity Statement or an IB Activity Statement csv. The fills are generated one
+    (symbol, account) at a time and written as they are generated so the size of a file is not
+    limited by memory. The same seed always generates the same fills.
+
+    Each trade opens with one or more tickets and closes to a 0 balance. A ticket has one to
+    maxFills fills with the same Cloid. Some trades flip from long to short or short to long
+    before closing. Some (symbol, account) have shares held before the open (the first fills
+    close them) or after the close (the last trade does not close and the shares are listed in
+    positions.csv). Like the DAS positions window, positions.csv also lists untraded positions.
+
+    :Usage:
+        gen = StatementGenerator(numFills=1000000, numSymbols=100, seed=1)
+        gen.writeDAS('data')
+        gen.writeIBHtml('data/ActivityStatement.html')
+    '''
+
+    def __init__(self, numFills=1000, numSymbols=20, accounts=None, holdRate=.1, flipRate=.05,
+                 maxFills=3, untraded=1, theDate='2019-01-02', seed=None):
+        '''
+        :params numFills: About how many fills to generate. Each trade is completed so there may
+                be a few more.
+        :params numSymbols: The number of symbols traded.
+        :params accounts: A list of account names. Defaults to one real and one sim account.
+        :params holdRate: The probability that a (symbol, account) has shares held before the open
+                and, independently, after the close.
+        :params flipRate: The probability a closing ticket reverses the position.
+        :params maxFills: The most fills a ticket is divided into.
+        :params untraded: The number of positions in positions.csv for symbols not traded today.
+        :params theDate: The date of the statement.
+        :params seed: The random seed. Set it to generate the same fills for each writer.
+        :raise ValueError: If a (symbol, account) would need more than one fill per second.
+        '''
+        self.accounts = accounts if accounts else ['U000000', 'TRIB0000']
+        self.numFills = numFills
+        self.numSymbols = numSymbols
+        self.holdRate = holdRate
+        self.flipRate = flipRate
+        self.maxFills = maxFills
+        self.untraded = untraded
+        self.theDate = pd.Timestamp(theDate)
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.positions = list()
+
+        perStream = numFills / (numSymbols * len(self.accounts))
+        if perStream > CLOSE_SECOND - OPEN_SECOND:
+            raise ValueError(f'{numFills} fills needs more than {numSymbols} symbols')
+
+    def symbols(self):
+        '''Return the symbol names. The real tickers from getTicker come first.'''
+        names = ['SQ', 'AAPL', 'TSLA', 'ROKU', 'NVDA', 'NUGT', 'MSFT', 'CAG', 'ACRS', 'FRED',
+                 'PCG', 'AMD', 'GE', 'NIO', 'AMRN', 'FIVE', 'BABA', 'BPTH', 'Z']
+        names = names + ['T{:04}'.format(i) for i in range(self.numSymbols - len(names))]
+        return names[:self.numSymbols]
+
+    def fills(self):
+        '''
+        Generate the fills for every (symbol, account), ordered by symbol, account and time.
+        self.positions is filled with [symbol, account, shares, avgcost, unrealized] for the shares
+        held after the close as the fills are generated.
+        '''
+        rand = random.Random(self.seed)
+        tickets = itertools.count(1)
+        self.positions = list()
+        streams = [(s, a) for s in self.symbols() for a in self.accounts]
+        perStream, extra = divmod(self.numFills, len(streams))
+        for i, (symb, acct) in enumerate(streams):
+            # The positions file gives one account per symbol. Only that account holds overnight
+            canHold = acct == self.accounts[i // len(self.accounts) % len(self.accounts)]
+            count = perStream + (1 if i < extra else 0)
+            yield from self.streamFills(rand, tickets, symb, acct, count, canHold)
+        for i in range(self.untraded):
+            self.positions.append(['H{:03}'.format(i), self.accounts[0],
+                                   rand.randint(1, 10) * 100, round(rand.uniform(5, 200), 4), 0.0])
+
+    def streamFills(self, rand, tickets, symb, acct, count, canHold):
+        '''Generate about count fills for one (symbol, account) with increasing times'''
+        if count <= 0:
+            return
+        # Leave room for the fills that complete the last trade
+        step = max(1, (CLOSE_SECOND - OPEN_SECOND) // (count + 50))
+        state = {'second': OPEN_SECOND, 'price': rand.uniform(5, 200), 'bal': 0, 'avg': 0.0,
+                 'made': 0}
+        if canHold and rand.random() < self.holdRate:
+            state['bal'] = rand.choice([1, -1]) * rand.randint(1, 10) * 100
+            state['avg'] = round(state['price'] * rand.uniform(.9, 1.1), 2)
+        after = canHold and rand.random() < self.holdRate
+
+        def ticketFills(qty):
+            '''Divide a ticket into fills, each at the next time and price'''
+            cloid = 'Tkt{}'.format(next(tickets))
+            side = 'B' if qty > 0 else 'S' if state['bal'] > 0 else 'SS'
+            parts = rand.randint(1, min(self.maxFills, abs(qty)))
+            remaining = qty
+            for j in range(parts):
+                part = remaining if j == parts - 1 else int(qty / parts)
+                remaining -= part
+                state['second'] += rand.randint(1, step)
+                state['price'] = max(1.0, state['price'] + rand.gauss(0, state['price'] * .002))
+                price = round(state['price'], 2)
+                bal, avg = state['bal'], state['avg']
+
+                # The part of the fill that reduces the position closes, the rest opens
+                closing = 0
+                if bal * part < 0:
+                    closing = -bal if abs(part) > abs(bal) else part
+                opening = part - closing
+                pl = round((price - avg) * -closing, 2) if closing else 0.0
+                if opening and bal * part >= 0:
+                    avg = (avg * abs(bal) + price * abs(opening)) / abs(bal + opening)
+                elif opening:
+                    avg = price
+                state['bal'], state['avg'] = bal + part, avg
+                state['made'] += 1
+
+                code = 'C;O' if closing and opening else 'C' if closing else 'O'
+                sec = state['second']
+                tm = '{:02}:{:02}:{:02}'.format(sec // 3600, sec // 60 % 60, sec % 60)
+                yield Fill(tm, symb, side, price, part, acct, cloid, pl, code)
+
+        while True:
+            # Close shares held before the open or left by a flip
+            for dummy in range(rand.randint(1, 2)):
+                bal = state['bal']
+                if bal:
+                    yield from ticketFills(-bal if rand.random() < .5 else -(bal // 2) or -bal)
+            if state['bal']:
+                yield from ticketFills(-state['bal'])
+            done = state['made'] >= count
+            if done and not after:
+                break
+
+            sign = rand.choice([1, -1])
+            for dummy in range(rand.randint(1, 3)):
+                yield from ticketFills(sign * rand.randint(1, 10) * 50)
+            if done:
+                bal, avg = state['bal'], state['avg']
+                self.positions.append([symb, acct, bal, round(avg, 4),
+                                       round((state['price'] - avg) * bal, 2)])
+                break
+
+            closers = rand.randint(1, 3)
+            for j in range(closers):
+                bal = state['bal']
+                qty = -bal if j == closers - 1 else -(bal // closers) or -bal
+                if j == closers - 1 and rand.random() < self.flipRate:
+                    qty = 2 * qty
+                if qty:
+                    yield from ticketFills(qty)
+
+    def writeDAS(self, indir, infile='trades.csv', infile2='positions.csv'):
+        '''
+        Write a DAS trades window export and a positions export.
+        :return: The paths of the trades file and the positions file
+        '''
+        inpath = os.path.join(indir, infile)
+        inpath2 = os.path.join(indir, infile2)
+        with open(inpath, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Time', 'Symb', 'Side', 'Price', 'Qty', 'Route', 'Account', 'Cloid',
+                        'P / L'])
+            for fill in self.fills():
+                w.writerow([fill.time, fill.symb, fill.side, fill.price, abs(fill.qty), 'SMAT',
+                            fill.acct, fill.cloid, fill.pl])
+        with open(inpath2, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Symb', 'Account', 'Shares', 'Avgcost', 'Unrealized'])
+            w.writerows(self.positions)
+        return inpath, inpath2
+
+    def ibRows(self, account=None):
+        '''
+        Generate the Trades table rows of an IB Activity Statement for one account. The columns
+        are IBCOLUMNS.
+        '''
+        account = account if account else self.accounts[0]
+        date = self.theDate.strftime('%Y-%m-%d')
+        for fill in self.fills():
+            if fill.acct != account:
+                continue
+            proceeds = round(-fill.qty * fill.price, 2)
+            yield [fill.symb, f'{date}, {fill.time}', fill.qty, fill.price, proceeds, -1.0,
+                   -proceeds, fill.pl, fill.code]
+
+    def writeIBHtml(self, path, account=None):
+        '''
+        Write an Activity Statement with the Account Information and Transactions tables.
+        :params account: An account or a list of accounts for a multi account statement.
+        '''
+        account = account if account else self.accounts[0]
+        accounts = account if isinstance(account, (list, tuple)) else [account]
+        with open(path, 'w') as f:
+            f.write('<html><body>\n')
+            for account in accounts:
+                f.write(f'<div id="tblAccountInformation_{account}Body"><table>\n'
+                        f'<tr><td>Name</td><td>Generated</td></tr>\n'
+                        f'<tr><td>Account</td><td>{account}</td></tr>\n</table></div>\n')
+                f.write(f'<div id="tblTransactions_{account}Body"><table>\n<thead><tr>')
+                f.write(''.join(f'<th>{c}</th>' for c in IBCOLUMNS))
+                f.write('</tr></thead>\n<tbody>\n')
+                for row in self.ibRows(account):
+                    f.write('<tr>' + ''.join(f'<td>{v}</td>' for v in row) + '</tr>\n')
+                f.write('</tbody></table></div>\n')
+            f.write('</body></html>\n')
+        return path
+
+    def writeIBCsv(self, path, account=None):
+        '''Write an Activity Statement csv with the Account Information and Trades sections'''
+        account = account if account else self.accounts[0]
+        with open(path, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Account Information', 'Header', 'Field Name', 'Field Value'])
+            w.writerow(['Account Information', 'Data', 'Account', account])
+            w.writerow(['Trades', 'Header', 'DataDiscriminator', 'Asset Category', 'Currency']
+                       + IBCOLUMNS)
+            for row in self.ibRows(account):
+                w.writerow(['Trades', 'Data', 'Order', 'Stocks', 'USD'] + row)
+        return path
+
+
 class Test_RandomTradeGen(TestCase):
     '''
     Run all of structjour with a collection of input files and test the outcome. These
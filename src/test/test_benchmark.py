@@ -0,0 +1,63 @@
+'''
+Test the generated statements and the runner in test.benchmark
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from journal.settings import getSettings
+from test.benchmark import STAGES, Benchmark, load, report, run, save
+
+# pylint: disable = C0103
+
+
+class TestBenchmark(TestCase):
+    '''Test the benchmark statements and a small run of every stage'''
+
+    def test_statements(self):
+        '''The DAS, IB html and IB csv statements are generated and parsed'''
+        workdir = tempfile.mkdtemp()
+        try:
+            bench = Benchmark(60, workdir)
+            html = bench.ibhtml()[1]
+            csvdf = bench.ibcsv()[1]
+            self.assertGreater(len(html), 0)
+            self.assertEqual(len(html), len(csvdf))
+            dummy, df = bench.das()
+            self.assertEqual(len(df), bench.fills.Cloid.nunique())
+        finally:
+            shutil.rmtree(workdir)
+
+    def test_run(self):
+        '''Run all the stages, skip the stages over maxSeconds and compare to a baseline'''
+        settings = getSettings('zero_substance', 'structjour')
+        runType = settings.value('runType')
+        results = run([40], verbose=False)
+        self.assertEqual(settings.value('runType'), runType)
+        self.assertEqual(list(results.keys()), STAGES)
+        for stage in STAGES:
+            self.assertGreater(results[stage][40], 0)
+
+        skipped = run([20, 40], ['input'], maxSeconds=0, verbose=False)
+        self.assertGreater(skipped['input'][20], 0)
+        self.assertIsNone(skipped['input'][40])
+
+        fname = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        try:
+            save(results, fname)
+            self.assertEqual(load(fname), results)
+        finally:
+            shutil.rmtree(os.path.dirname(fname))
+        table = report(skipped, {'input': {20: 1.0}})
+        self.assertIn('skipped', table)
+        self.assertIn(' x', table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+'''
+Test the journal catalog in journal.catalog
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.database import closePools
+from journal.catalog import DEFAULTSCHEME, Catalog, artifactKind, schemePath, walkDays
+from journal.discipline import getDevelDailyJournalList
+
+# pylint: disable = C0103
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('x')
+
+
+class TestCatalog(TestCase):
+    '''Test cataloging the day directories and their artifacts'''
+
+    def setUp(self):
+        self.journal = tempfile.mkdtemp()
+        self.db = os.path.join(self.journal, 'structjour.sqlite')
+
+    def tearDown(self):
+        closePools()
+        shutil.rmtree(self.journal)
+
+    def makeDay(self, theDate, statement='trades.csv'):
+        day = schemePath(self.journal, DEFAULTSCHEME, theDate)
+        d = pd.Timestamp(theDate)
+        touch(os.path.join(day, statement))
+        touch(os.path.join(day, 'positions.csv'))
+        touch(os.path.join(day, 'out', d.strftime('trades%A_%m%d.xlsx')))
+        touch(os.path.join(day, 'out', d.strftime('.trades_%m%d_%A.zst')))
+        touch(os.path.join(day, 'out', 'Trade1_AAPL_Long_1min.png'))
+        touch(os.path.join(day, 'out', 'tradesByTicket.csv'))
+        return day
+
+    def test_artifactKind(self):
+        self.assertEqual(artifactKind('trades.csv'), 'statement')
+        self.assertEqual(artifactKind('ActivityStatement.20191018.html'), 'statement')
+        self.assertEqual(artifactKind('positions.csv'), 'positions')
+        self.assertIsNone(artifactKind('tradesByTicket.csv'))
+        self.assertIsNone(artifactKind('trades.csv', inOut=True))
+        self.assertEqual(artifactKind('tradesFriday_0125.xlsx', inOut=True), 'xlsx')
+        self.assertEqual(artifactKind('.trades_0125_Friday.zst', inOut=True), 'summary')
+        self.assertEqual(artifactKind('chart.PNG', inOut=True), 'chart')
+
+    def test_walkDays(self):
+        self.makeDay('2019-01-02')
+        self.makeDay('2019-02-01')
+        os.makedirs(os.path.join(self.journal, '_201903_March', 'notaday'))
+        os.makedirs(os.path.join(self.journal, 'notamonth', '_0301_Friday'))
+        found = sorted(d for e, d in walkDays(self.journal))
+        self.assertEqual(found, [pd.Timestamp('2019-01-02'), pd.Timestamp('2019-02-01')])
+
+    def test_update(self):
+        days = ['2019-01-02', '2019-01-03', '2019-01-05', '2019-02-01']
+        for d in days:
+            self.makeDay(d)
+        catalog = Catalog(self.journal)
+        self.assertEqual(catalog.update(), 4)
+        self.assertEqual(list(catalog.days().theDate), list(pd.to_datetime(days)))
+        self.assertEqual(len(catalog.days('2019-01-03', '2019-01-31')), 2)
+
+        files = catalog.files('2019-01-02', '2019-01-02')
+        self.assertEqual(sorted(files.kind), ['chart', 'positions', 'statement', 'summary', 'xlsx'])
+        self.assertEqual(list(catalog.files(kind='xlsx').name),
+                         ['tradesWednesday_0102.xlsx', 'tradesThursday_0103.xlsx',
+                          'tradesSaturday_0105.xlsx', 'tradesFriday_0201.xlsx'])
+
+        # Nothing changed, nothing listed again
+        self.assertEqual(catalog.update(), 0)
+
+        # A new file, a new day and a removed day
+        day = schemePath(self.journal, DEFAULTSCHEME, '2019-01-03')
+        touch(os.path.join(day, 'out', 'Trade2_AMD_Short_5min.png'))
+        self.makeDay('2019-02-04')
+        shutil.rmtree(schemePath(self.journal, DEFAULTSCHEME, '2019-01-05'))
+        self.assertEqual(catalog.update(), 3)
+        self.assertEqual(len(catalog.files('2019-01-03', '2019-01-03', 'chart')), 2)
+        self.assertEqual(len(catalog.files('2019-01-05', '2019-01-05')), 0)
+        self.assertEqual(len(catalog.days()), 4)
+
+        # Another catalog of the same db reads what is there
+        self.assertEqual(len(Catalog(self.journal, db=self.db).files(kind='statement')), 4)
+
+    def test_getDevelDailyJournalList(self):
+        for d in ['2019-01-02', '2019-01-05', '2019-01-07']:
+            self.makeDay(d)
+        flist = getDevelDailyJournalList(self.journal, datetime.date(2019, 1, 3))
+        self.assertEqual(len(flist), 1)
+        self.assertEqual(flist[0][1], datetime.date(2019, 1, 7))
+        self.assertTrue(flist[0][0].endswith('tradesMonday_0107.xlsx'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+'''
+Test the rendered chart cache in journal.stock.chartcache
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.stock.chartcache import ChartCache, chartKey, FLUSHSECONDS, INDEXNAME
+
+# pylint: disable = C0103
+
+
+class TestChartCache(TestCase):
+    '''Test ChartCache hits, ownership and eviction'''
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def makeImage(self, name, size=10):
+        path = os.path.join(self.outdir, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def test_chartKey(self):
+        '''Identical requests have the same key. Any change makes a new key'''
+        begin = pd.Timestamp('2019-10-18 09:30')
+        k1 = chartKey('SQ', begin, 5, [(9, ['ma1', 'blue'])], [[1, 'B', 60.1]])
+        k2 = chartKey('SQ', pd.Timestamp('2019-10-18 09:30'), 5, [(9, ['ma1', 'blue'])],
+                      [[1, 'B', 60.1]])
+        k3 = chartKey('SQ', begin, 5, [(9, ['ma1', 'blue'])], [[1, 'S', 60.1]])
+        self.assertEqual(k1, k2)
+        self.assertNotEqual(k1, k3)
+
+    def test_getput(self):
+        '''A recorded chart is returned until its file is removed. The index persists.'''
+        cache = ChartCache(self.outdir)
+        self.assertIsNone(cache.get('abc'))
+        path = self.makeImage('SQ_0930_5min.png')
+        cache.put('abc', path)
+        self.assertEqual(cache.get('abc'), path)
+        self.assertTrue(cache.owns(path))
+        self.assertFalse(cache.owns(os.path.join(self.outdir, 'other.png')))
+
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, INDEXNAME)))
+        self.assertEqual(ChartCache(self.outdir).get('abc'), path)
+
+        os.remove(path)
+        self.assertIsNone(cache.get('abc'))
+        self.assertFalse(cache.entries)
+
+    def test_lazyAccessTime(self):
+        '''A hit updates the access time in memory. The index is written by put or flush.'''
+        cache = ChartCache(self.outdir)
+        cache.put('abc', self.makeImage('SQ.png'))
+        index = os.path.join(self.outdir, INDEXNAME)
+        os.utime(index, (0, 0))
+        for dummy in range(3):
+            cache.get('abc')
+        self.assertEqual(os.path.getmtime(index), 0)
+        self.assertTrue(cache.dirty)
+        used = cache.entries['abc'][2]
+        cache.flush()
+        self.assertFalse(cache.dirty)
+        self.assertEqual(ChartCache(self.outdir).entries['abc'][2], used)
+
+        cache.saved -= FLUSHSECONDS
+        os.utime(index, (0, 0))
+        cache.get('abc')
+        self.assertNotEqual(os.path.getmtime(index), 0)
+
+    def test_replace(self):
+        '''A new render to the same file replaces the old entry'''
+        cache = ChartCache(self.outdir)
+        path = self.makeImage('SQ.png')
+        cache.put('abc', path)
+        cache.put('def', path)
+        self.assertIsNone(cache.get('abc'))
+        self.assertEqual(cache.get('def'), path)
+
+    def test_evict(self):
+        '''The least recently used renders are removed beyond maxEntries and maxBytes'''
+        cache = ChartCache(self.outdir, maxEntries=2)
+        paths = [self.makeImage(f'{i}.png') for i in range(3)]
+        cache.put('0', paths[0])
+        cache.put('1', paths[1])
+        cache.get('0')
+        cache.put('2', paths[2])
+        self.assertEqual(set(cache.entries.keys()), {'0', '2'})
+        self.assertFalse(os.path.exists(paths[1]))
+
+        cache = ChartCache(self.outdir, maxBytes=25)
+        cache.put('3', self.makeImage('3.png'))
+        self.assertEqual(len(cache.entries), 2)
+        self.assertIn('3', cache.entries)
+
+        cache.clear()
+        self.assertFalse(cache.entries)
+        self.assertFalse(os.listdir(self.outdir))
+
+    def test_forDir(self):
+        '''Each directory has one shared cache'''
+        self.assertIs(ChartCache.forDir(self.outdir), ChartCache.forDir(self.outdir + '/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
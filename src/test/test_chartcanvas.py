@@ -0,0 +1,91 @@
+'''
+Test the interactive chart in journal.view.chartcanvas
+
+Created on October 19, 2019
+
+@author: Mike Petersen
+'''
+
+import sys
+import unittest
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from PyQt5.QtWidgets import QApplication
+
+from journal.stock.graphstuff import FinPlot
+from journal.view.chartcanvas import ChartCanvas
+
+# pylint: disable = C0103
+
+app = QApplication.instance() if QApplication.instance() else QApplication(sys.argv)
+
+
+def makeCandles(days=5):
+    '''Create several days of 1 minute candles'''
+    idx = pd.DatetimeIndex([])
+    for d in pd.bdate_range('2019-10-14', periods=days):
+        idx = idx.append(pd.date_range(d + pd.Timedelta(hours=9.5), periods=390, freq='1min'))
+    num = len(idx)
+    close = 50 + np.random.standard_normal(num).cumsum() * .1
+    dopen = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({'open': dopen,
+                         'high': np.maximum(dopen, close) + .05,
+                         'low': np.minimum(dopen, close) - .05,
+                         'close': close,
+                         'volume': np.random.randint(100, 10000, num)}, index=idx)
+
+
+class TestChartCanvas(TestCase):
+    '''Test decimation and blitting in ChartCanvas'''
+
+    def setUp(self):
+        self.df = makeCandles()
+        fp = FinPlot()
+        fp.style = None
+        fp.entries = [[self.df.close[100], 100, 'B', self.df.index[100]]]
+        self.canvas = ChartCanvas()
+        self.canvas.resize(800, 400)
+        self.canvas.setChart(fp, self.df, None, 'SQ', self.df.index[0], self.df.index[-1], 1)
+
+    def test_decimate(self):
+        '''The candles drawn follow the visible pixel width'''
+        canvas = self.canvas
+        pixels = canvas.artists['ax1'].bbox.width
+        self.assertGreater(canvas.k, 1)
+        self.assertLessEqual(len(canvas.drawn[0]), pixels)
+        self.assertEqual(len(canvas.artists['bodies'].get_paths()), len(canvas.drawn[0]))
+
+        t = canvas.bars[0]
+        canvas.artists['ax1'].set_xlim(t[400], t[460])
+        canvas.refresh()
+        self.assertEqual(canvas.k, 1)
+        # The visible bars and a view width on each side
+        self.assertLess(len(canvas.drawn[0]), 200)
+        ylim = canvas.artists['ax1'].get_ylim()
+        self.assertLessEqual(ylim[0], self.df.low[400:461].min())
+        self.assertGreaterEqual(ylim[1], self.df.high[400:461].max())
+
+        canvas.resetView()
+        self.assertEqual(canvas.artists['ax1'].get_xlim(), canvas.fullRange())
+
+    def test_interaction(self):
+        '''Blitting uses animated artists until the interaction ends'''
+        canvas = self.canvas
+        canvas.draw()
+        canvas.startInteraction()
+        self.assertIsNotNone(canvas.background)
+        self.assertTrue(all(a.get_animated() for a in canvas.dataArtists()))
+        lo, hi = canvas.artists['ax1'].get_xlim()
+        canvas.artists['ax1'].set_xlim(lo, (lo + hi) / 2)
+        canvas.blitArtists()
+        canvas.endInteraction()
+        self.assertIsNone(canvas.background)
+        self.assertFalse(any(a.get_animated() for a in canvas.dataArtists()))
+        self.assertEqual(canvas.artists['ax1'].get_xlim(), (lo, (lo + hi) / 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+'''
+Test the chart job classes in journal.view.chartjob
+
+Created on October 19, 2019
+
+@author: Mike Petersen
+'''
+
+import sys
+import threading
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication
+
+from journal.view.chartjob import ChartJobManager
+
+# pylint: disable = C0103
+
+app = QApplication.instance() if QApplication.instance() else QApplication(sys.argv)
+
+
+class FakePlot:
+    '''
+    Stand in for FinPlot with the same apiChooserList/getCachedChart/getChartData/renderChart
+    interface
+    '''
+
+    def __init__(self, fail=False, gate=None, cached=None, apis=('bc', 'av')):
+        self.fail = fail
+        self.gate = gate
+        self.cached = cached
+        self.apis = list(apis)
+        self.api = 'ib'
+        self.chooser = None
+        self.interactive = False
+        self.errorCode = ''
+        self.errorMessage = ''
+        self.rendered = False
+
+    def apiChooserList(self, start, end, api=None):
+        self.chooser = threading.current_thread()
+        if not self.apis:
+            return False, ['IBAPI is not connected.'], []
+        return api in self.apis, [], self.apis
+
+    def getCachedChart(self, symbol, start, end, minutes, save, dtFormat="%H:%M"):
+        return self.cached
+
+    def getChartData(self, symbol, start, end, minutes):
+        if self.gate:
+            self.gate.wait(5)
+        if self.fail:
+            self.errorCode = '42'
+            self.errorMessage = 'No data for you'
+            return None, None
+        return pd.DataFrame({'close': [1.0]}), None
+
+    def renderChart(self, df, maDict, symbol, start, end, minutes=1, dtFormat="%H:%M",
+                    save='trade'):
+        self.rendered = True
+        return save
+
+
+class TestChartJob(TestCase):
+    '''Test ChartJobManager delivery and cancellation'''
+
+    def setUp(self):
+        self.pool = QThreadPool()
+        self.cjm = ChartJobManager(pool=self.pool)
+        self.ready = list()
+        self.failed = list()
+        self.cjm.chartReady.connect(lambda r, p: self.ready.append(r))
+        self.cjm.chartFailed.connect(self.failed.append)
+        self.begin = pd.Timestamp('2019-10-18 09:30')
+        self.end = pd.Timestamp('2019-10-18 11:30')
+
+    def wait(self):
+        self.pool.waitForDone(5000)
+        app.processEvents()
+
+    def test_chartReady(self):
+        '''A completed job is delivered once with its chart data'''
+        self.cjm.submit('chart1', '1 SQ Long', FakePlot(), 'SQ', self.begin, self.end, 5,
+                        'out/sq.png')
+        self.wait()
+        self.assertEqual(len(self.ready), 1)
+        self.assertEqual(len(self.failed), 0)
+        result = self.ready[0]
+        self.assertEqual(result.key, '1 SQ Long')
+        self.assertEqual(result.data, ['out/sq.png', self.begin, self.end, 5])
+        self.assertFalse(self.cjm.isPending('chart1'))
+
+    def test_chooseApi(self):
+        '''The job chooses the api in the worker thread and fails if none will do'''
+        fp = FakePlot()
+        self.cjm.submit('chart1', '1 SQ Long', fp, 'SQ', self.begin, self.end, 5, 'out/sq.png')
+        self.wait()
+        self.assertEqual(fp.api, 'bc')
+        self.assertIsNot(fp.chooser, threading.current_thread())
+
+        fp = FakePlot(apis=[])
+        self.cjm.submit('chart2', '1 SQ Long', fp, 'SQ', self.begin, self.end, 5, 'out/sq.png')
+        self.wait()
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.failed[0].getMessage(), 'IBAPI is not connected.')
+        self.assertFalse(fp.rendered)
+
+    def test_chartFailed(self):
+        '''The error belongs to the job result'''
+        self.cjm.submit('chart2', '1 SQ Long', FakePlot(fail=True), 'SQ', self.begin, self.end,
+                        1, 'out/sq.png')
+        self.wait()
+        self.assertEqual(len(self.ready), 0)
+        self.assertEqual(len(self.failed), 1)
+        self.assertEqual(self.failed[0].getMessage(), '42\nNo data for you')
+
+    def test_cached(self):
+        '''A cached chart is delivered without rendering'''
+        fp = FakePlot(cached='out/cached.png')
+        self.cjm.submit('chart1', '1 SQ Long', fp, 'SQ', self.begin, self.end, 5, 'out/sq.png')
+        self.wait()
+        self.assertEqual(len(self.ready), 1)
+        self.assertEqual(self.ready[0].data[0], 'out/cached.png')
+        self.assertFalse(fp.rendered)
+
+    def test_supersede(self):
+        '''Only the latest job for a chart widget is delivered'''
+        gate = threading.Event()
+        slow = FakePlot(gate=gate)
+        self.cjm.submit('chart1', '1 SQ Long', slow, 'SQ', self.begin, self.end, 1, 'out/1.png')
+        self.cjm.submit('chart1', '1 SQ Long', FakePlot(), 'SQ', self.begin, self.end, 5,
+                        'out/5.png')
+        gate.set()
+        self.wait()
+        self.assertEqual(len(self.ready), 1)
+        self.assertEqual(self.ready[0].name, 'out/5.png')
+        self.assertFalse(slow.rendered)
+
+    def test_cancel(self):
+        '''Cancelled jobs are not delivered'''
+        gate = threading.Event()
+        self.cjm.submit('chart3', '1 SQ Long', FakePlot(gate=gate), 'SQ', self.begin, self.end,
+                        1, 'out/1.png')
+        self.cjm.cancel()
+        gate.set()
+        self.wait()
+        self.assertEqual(len(self.ready), 0)
+        self.assertEqual(len(self.failed), 0)
+        self.assertFalse(self.cjm.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+'''
+Test the daily statistics in journal.dailystats
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.dailystats import DailyStats, summaryTable
+from journal.view.dailycontrol import fc
+
+# pylint: disable = C0103
+
+
+def summary(name, acct, pl, mstk=''):
+    return pd.DataFrame({'Name': [name], 'Account': [acct], 'P / L': [pl], 'MstkVal': [mstk]})
+
+
+class TestDailyStats(TestCase):
+    '''Test the totals, counts, averages and the largest win and loss'''
+
+    def setUp(self):
+        self.summaries = [summary('AAPL Long', 'Live', 120.0),
+                          summary('AMD Short', 'Live', -40.0, 15.5),
+                          summary('MU Long', 'SIM', ''),
+                          summary('SQ Short', 'SIM', '30.5'),
+                          summary('ROKU Long', 'Live', -90.0, 20.0)]
+
+    def test_summaryTable(self):
+        df = summaryTable(self.summaries)
+        self.assertEqual(list(df.Trade), [1, 2, 3, 4, 5])
+        self.assertEqual(list(df.PL), [120.0, -40.0, 0.0, 30.5, -90.0])
+        self.assertEqual(list(df.Mistake), [0.0, 15.5, 0.0, 0.0, 20.0])
+
+    def test_stats(self):
+        stats = DailyStats(self.summaries)
+        d = stats.dailySumData()
+        self.assertEqual(d['livetot'], -10.0)
+        self.assertEqual(d['livetotnote'], '3 Trades, 1 Winner, 2, Losers')
+        self.assertEqual(d['simtot'], 30.5)
+        # A trade with no P/L counts as a loss
+        self.assertEqual(d['simtotnote'], '2 Trades, 1 Winner, 1, Loser')
+        self.assertEqual((d['highest'], d['highestnote']), (120.0, 'Trade1, Live, AAPL Long'))
+        self.assertEqual((d['lowest'], d['lowestnote']), (-90.0, 'Trade5, Live, ROKU Long'))
+        self.assertAlmostEqual(d['avgwin'], 75.25)
+        self.assertEqual(d['avgwinnote'], 'X 2 =  $150.50')
+        self.assertAlmostEqual(d['avgloss'], -130.0 / 3)
+        self.assertEqual(d['avglossnote'], 'X 3 =  ($130.00)')
+        self.assertEqual(stats.mistakeTotal, 35.5)
+        self.assertEqual(stats.plTotal, 20.5)
+
+        self.assertEqual(stats.dailySumData(fc)['lowest'], '($90.00)')
+
+    def test_empty(self):
+        d = DailyStats([summary('AAPL Long', 'SIM', -5.0)]).dailySumData(fc)
+        self.assertEqual((d['highest'], d['highestnote']), ('$0.00', 'notrade'))
+        self.assertEqual(d['avgwin'], '$0.00')
+        self.assertEqual(d['livetotnote'], '0 Trades')
+        self.assertEqual(DailyStats(dict()).dailySumData()['livetotnote'], '0 Trades')
+
+
+if __name__ == '__main__':
+    unittest.main()
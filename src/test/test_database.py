@@ -0,0 +1,151 @@
+'''
+Test the shared sqlite pool in journal.database and the cached reads of ManageKeys and Strategy
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+
+from journal.database import closePools, getPool, removeDB
+from journal.stock.utilities import ManageKeys
+from strategy.strategies import Strategy
+
+# pylint: disable = C0103
+
+
+class TestDatabase(TestCase):
+    '''Test Pool and the users of its cache'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmpdir, 'structjour.sqlite')
+
+    def tearDown(self):
+        closePools()
+        shutil.rmtree(self.tmpdir)
+
+    def test_connection(self):
+        '''The connections are reused, in WAL mode, and a failed block is rolled back'''
+        pool = getPool(self.db)
+        self.assertIs(pool, getPool(self.db))
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            first = conn
+        with pool.connection() as conn:
+            self.assertIs(conn, first)
+            conn.execute('INSERT INTO t VALUES(1)')
+        with self.assertRaises(ZeroDivisionError):
+            with pool.connection() as conn:
+                conn.execute('INSERT INTO t VALUES(2)')
+                raise ZeroDivisionError
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute('SELECT x FROM t').fetchall(), [(1,)])
+
+    def test_threads(self):
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+
+        def write(n):
+            for i in range(20):
+                with pool.connection() as conn:
+                    conn.execute('INSERT INTO t VALUES(?)', (n * 100 + i,))
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute('SELECT count(*) FROM t').fetchone()[0], 160)
+        self.assertLessEqual(len(pool.idle), pool.size)
+
+    def test_cache(self):
+        pool = getPool(self.db)
+        loads = []
+
+        def load():
+            loads.append(1)
+            return len(loads)
+        self.assertEqual(pool.cached('a', load), 1)
+        self.assertEqual(pool.cached('a', load), 1)
+        self.assertEqual(pool.cached(('b', 'x'), load), 2)
+        pool.invalidate('b')
+        self.assertEqual(pool.cached('a', load), 1)
+        self.assertEqual(pool.cached(('b', 'x'), load), 3)
+        pool.invalidate()
+        self.assertEqual(pool.cached('a', load), 4)
+
+    def test_replacedFile(self):
+        '''A deleted and recreated db is not read through the old connections or cache'''
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+        pool.cached('t', lambda: 'old')
+        closePools()
+        os.remove(self.db)
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('CREATE TABLE u (x INTEGER)')
+        other = getPool(self.db)
+        os.remove(self.db)
+        for ext in ['-wal', '-shm']:
+            if os.path.exists(self.db + ext):
+                os.remove(self.db + ext)
+        sqlite3.connect(self.db).close()
+        with other.connection() as conn:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            self.assertEqual(tables.fetchall(), [])
+        self.assertEqual(other.cached('t', lambda: 'new'), 'new')
+
+    def test_removeDB(self):
+        '''removeDB closes the pooled connections and leaves no WAL files'''
+        pool = getPool(self.db)
+        with pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+        self.assertTrue(os.path.exists(self.db + '-wal'))
+        removeDB(self.db)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        self.assertIsNot(getPool(self.db), pool)
+        removeDB(self.db)
+
+    def test_manageKeys(self):
+        mk = ManageKeys(create=True, db=self.db)
+        self.assertIsNone(mk.getKey('bc'))
+        mk.updateKey('bc', 'abc')
+        self.assertEqual(mk.getKey('bc'), 'abc')
+        with getPool(self.db).connection() as conn:
+            conn.execute("UPDATE api_keys SET key = 'behind' WHERE api = 'bc'")
+        # Read from memory till a write through ManageKeys
+        self.assertEqual(ManageKeys(db=self.db).getKey('bc'), 'abc')
+        mk.updateKey('av', 'def')
+        self.assertEqual(mk.getKeys(), {'bc': 'behind', 'av': 'def'})
+
+    def test_strategy(self):
+        strat = Strategy(create=True, testdb=self.db)
+        strat.loadDefault()
+        self.assertEqual(strat.getStrategy('ABCD'), ('ABCD', 1))
+        strat.addStrategy('CUT LOSERS')
+        self.assertIn('CUT LOSERS', [s[1] for s in Strategy(testdb=self.db).getStrategies()])
+        strat.setDescription('CUT LOSERS', 'Cut them')
+        self.assertEqual(strat.getDescription('CUT LOSERS'), ('CUT LOSERS', 'Cut them'))
+        strat.setImage1('CUT LOSERS', 'a.png')
+        strat.setImage1('CUT LOSERS', 'b.png')
+        self.assertEqual(strat.getImage1('CUT LOSERS'), 'b.png')
+        strat.setLink('CUT LOSERS', 'http://a')
+        self.assertEqual(strat.getLinks('CUT LOSERS'), ['http://a'])
+        strat.removeLink('CUT LOSERS', 'http://a')
+        self.assertEqual(strat.getLinks('CUT LOSERS'), [])
+        strat.removeStrategy('CUT LOSERS')
+        self.assertIsNone(strat.getStrategy('CUT LOSERS'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -283,6 +283,31 @@ class TestDefineTrades(TestCase):
                     assert diff == row.Duration
                     assert row.Duration == tdf_gen.loc[xl_gen].Duration
 
+    def test_holdRows(self):
+        '''
+        HOLD rows have no time. DefineTrades sorts the shares held before ahead of the trades of
+        their ticker and the shares held after last. An overnight trade lasts until its last
+        transaction.
+        '''
+        day = pd.Timestamp('2019-05-16')
+        trades = pd.DataFrame({
+            'Time': [pd.NaT, day + pd.Timedelta('10:15:00'), pd.NaT,
+                     day + pd.Timedelta('09:45:00')],
+            'Symb': ['AMD'] * 4, 'Side': ['HOLD+', 'S', 'HOLD+B', 'B'],
+            'Price': [0.0, 20.5, 0.0, 20.0], 'Qty': [0, -100, 100, 50],
+            'Account': ['U1'] * 4, 'P / L': [0.0, 50.0, 0.0, 0.0],
+            'Date': [day + pd.Timedelta(days=1), day, day - pd.Timedelta(days=1), day]})
+
+        dtrades = DefineTrades()
+        dummy, dummy, ldf = dtrades.processOutputDframe(trades)
+        frc = FinReqCol()
+        self.assertEqual(len(ldf), 1)
+        tdf = ldf[0]
+        self.assertEqual(list(tdf[frc.side]), ['HOLD+B', 'B', 'S', 'HOLD+'])
+        self.assertTrue((tdf[frc.start] == day + pd.Timedelta('09:45:00')).all())
+        self.assertEqual(tdf[frc.dur].iloc[-1], pd.Timedelta(minutes=30))
+        self.assertTrue(tdf[frc.name].iloc[-1].endswith('OVERNIGHT'))
+
     def test_addTradePL(self):
         '''
         Test the method DefineTrades.addTradePL. Create random trade and remove the sum val
@@ -156,6 +156,39 @@ class Test_DfUtil(unittest.TestCase):
             for ii in y.iloc[i]:
                 self.assertEqual(ii, fill2)
 
+    def test_timeOfDay(self):
+        '''Test time strings, Timestamps and blank cells'''
+        times = DataFrameUtil.timeOfDay(pd.Series(['9:30:01', '23:59:59', '']))
+        self.assertEqual(list(times[:2]), [pd.Timedelta('09:30:01'), pd.Timedelta('23:59:59')])
+        self.assertTrue(pd.isnull(times[2]))
+
+        stamps = pd.Series([pd.Timestamp('2019-01-02 09:30:01'), pd.Timestamp('2019-01-03 16:00')])
+        dtimes = DataFrameUtil.toDatetime(stamps)
+        self.assertEqual(dtimes.dtype, 'datetime64[ns]')
+        self.assertEqual(list(dtimes), list(stamps))
+        self.assertEqual(list(DataFrameUtil.timeOfDay(stamps)),
+                         [pd.Timedelta('09:30:01'), pd.Timedelta('16:00:00')])
+
+    def test_tradeTimes(self):
+        '''Test that times with no date get their trade date and datetimes keep theirs'''
+        times = pd.Series(['9:30:01', '2019-01-03 16:00:00', ''])
+        dtimes = DataFrameUtil.tradeTimes(times, '2019-01-02')
+        self.assertEqual(list(dtimes[:2]), [pd.Timestamp('2019-01-02 09:30:01'),
+                                            pd.Timestamp('2019-01-03 16:00')])
+        self.assertTrue(pd.isnull(dtimes[2]))
+
+        dates = pd.Series(['2019-01-02', '2019-01-03'])
+        dtimes = DataFrameUtil.tradeTimes(pd.Series(['9:30:01', '10:00:00']), dates)
+        self.assertEqual(list(dtimes), [pd.Timestamp('2019-01-02 09:30:01'),
+                                        pd.Timestamp('2019-01-03 10:00')])
+
+    def test_timeStrings(self):
+        '''Test that the times are formatted and NaT and blank cells are empty'''
+        times = pd.Series([pd.Timestamp('2019-01-02 09:30:01'), pd.NaT, ''], dtype=object)
+        self.assertEqual(list(DataFrameUtil.timeStrings(times)), ['09:30:01', '', ''])
+        self.assertEqual(list(DataFrameUtil.timeStrings(times, '%m/%d %H:%M')),
+                         ['01/02 09:30', '', ''])
+
 
 
 def main():
@@ -0,0 +1,67 @@
+'''
+Test the FillTable in journal.filltable
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+from openpyxl import Workbook
+
+from journal.discipline import getAvgExit
+from journal.filltable import FillTable, fillsFrame, loadFillTables
+from journal.layoutsheet import LayoutSheet
+
+# pylint: disable = C0103
+
+
+def scalpEntries(numExits=12):
+    '''A long entry of 100 * numExits shares and numExits exits of 100 at rising prices'''
+    start = pd.Timestamp('2019-01-02 09:30:00')
+    entries = [[10.0, start, 100 * numExits, 0, 0, 'Entry']]
+    for i in range(numExits):
+        price = 10.0 + (i + 1) / 100
+        entries.append([price, start + pd.Timedelta(seconds=10 * (i + 1)), -100,
+                        round((price - 10) * 100, 2), round(price - 10, 2), 'Exit'])
+    return entries
+
+
+class TestFillTable(TestCase):
+    '''Test storing, reading back and averaging more fills than the form has slots'''
+
+    def test_entries(self):
+        entries = scalpEntries()
+        fills = FillTable(entries)
+        self.assertEqual(len(fills), 13)
+        self.assertEqual(list(fills), entries)
+        self.assertEqual(fills[-1][1], pd.Timestamp('2019-01-02 09:32:00'))
+        self.assertEqual(len(FillTable()), 0)
+
+        # All 12 exits, not only the first 7 in the form
+        self.assertAlmostEqual(fills.avgExit(), 10.065)
+        self.assertEqual(len(fills.describe().splitlines()), 5)
+
+    def test_workbook(self):
+        '''Write the Fills sheet and read it back for the trade log'''
+        names = ['AAPL Long', 'AMD Long']
+        summaries = [pd.DataFrame({'Name': [n], 'Account': ['U1']}) for n in names]
+        ls = LayoutSheet(25, 10)
+        ls.fillTables = [FillTable(scalpEntries(12)), FillTable(scalpEntries(3))]
+        wb = Workbook()
+        ls.writeFills(wb, summaries)
+
+        df = fillsFrame(summaries, ls.fillTables)
+        self.assertEqual(list(df.Trade.unique()), [1, 2])
+        loaded = loadFillTables(wb)
+        self.assertEqual(list(loaded.keys()), [1, 2])
+        self.assertEqual(list(loaded[1]), list(ls.fillTables[0]))
+        self.assertAlmostEqual(getAvgExit(None, loaded[1]), 10.065)
+        self.assertAlmostEqual(getAvgExit(None, loaded[2]), 10.02)
+        self.assertEqual(loadFillTables(Workbook()), dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
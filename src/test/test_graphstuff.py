@@ -6,13 +6,15 @@
 import datetime as dt
 import os
 import random
+import shutil
+import tempfile
 import types
 import unittest
 
 import numpy as np
 import pandas as pd
 
-from journal.stock.graphstuff import FinPlot, dummyName
+from journal.stock.graphstuff import FinPlot, decimateBars, dummyName
 from journal.stock import myib as ib
 
 from journal.stock import utilities as util
@@ -202,6 +204,106 @@ class TestGraphstuff(unittest.TestCase):
                 msg = 'error creating ' + name + " IN ", cwd
                 self.assertTrue(os.path.exists(name), msg)
 
+    def makeCandles(self, num=390):
+        '''Create a day of 1 minute candles'''
+        idx = pd.date_range('2019-10-18 09:30', periods=num, freq='1min')
+        close = 50 + np.random.standard_normal(num).cumsum() * .1
+        dopen = np.r_[close[0], close[:-1]]
+        df = pd.DataFrame({'open': dopen,
+                           'high': np.maximum(dopen, close) + .05,
+                           'low': np.minimum(dopen, close) - .05,
+                           'close': close,
+                           'volume': np.random.randint(100, 10000, num)}, index=idx)
+        return df
+
+    def test_candleCollections(self):
+        '''
+        Test FinPlot.candleCollections and volumeCollection create one artist for all candles
+        '''
+        fp = FinPlot()
+        df = self.makeCandles(20)
+        t = np.arange(20, dtype=float)
+        o, h, l, c = [df[x].values for x in ['open', 'high', 'low', 'close']]
+        bodies, wicks = fp.candleCollections(t, o, h, l, c, .5, 'g', 'r')
+        self.assertEqual(len(bodies.get_paths()), 20)
+        self.assertEqual(len(wicks.get_segments()), 20)
+        for i, seg in enumerate(wicks.get_segments()):
+            self.assertEqual(seg[0][1], l[i])
+            self.assertEqual(seg[1][1], h[i])
+        vol = fp.volumeCollection(t, o, c, df.volume.values, .5, 'g', 'r')
+        self.assertEqual(len(vol.get_paths()), 20)
+
+    def test_renderChart(self):
+        '''
+        Test FinPlot.renderChart saves a chart without pyplot state and keeps existing files
+        '''
+        fp = FinPlot()
+        fp.interactive = False
+        fp.useCache = False
+        df = self.makeCandles()
+        fp.entries = [[df.close[10], 10, 'B', df.index[10]],
+                      [df.close[50], 50, 'S', df.index[50]],
+                      [df.close[60], 60, 'B', df.index[60]],
+                      [df.close[60], 1000, 'S', df.index[60]]]
+        save = os.path.join('out', 'test_renderChart.png')
+        if not os.path.exists('out'):
+            os.mkdir('out')
+        if os.path.exists(save):
+            os.remove(save)
+        name = fp.renderChart(df, None, 'SQ', df.index[0], df.index[-1], 1, save=save)
+        self.assertEqual(name, save)
+        self.assertTrue(os.path.exists(name))
+        name2 = fp.renderChart(df, None, 'SQ', df.index[0], df.index[-1], 1, save=save)
+        self.assertNotEqual(name, name2)
+        self.assertTrue(os.path.exists(name2))
+        os.remove(name)
+        os.remove(name2)
+
+    def test_decimateBars(self):
+        '''
+        Test decimateBars combines each k bars into one with the right open, high, low, close
+        and volume
+        '''
+        df = self.makeCandles(10)
+        t = np.arange(10, dtype=float)
+        bars = [t] + [df[x].values for x in ['open', 'high', 'low', 'close', 'volume']]
+        dt_, o, h, l, c, v = decimateBars(*bars, 4)
+        self.assertEqual(len(dt_), 3)
+        self.assertEqual(list(dt_), [2, 6, 9])
+        self.assertEqual(o[1], df.open[4])
+        self.assertEqual(c[1], df.close[7])
+        self.assertEqual(c[2], df.close[9])
+        self.assertEqual(h[0], df.high[:4].max())
+        self.assertEqual(l[2], df.low[8:].min())
+        self.assertEqual(v.sum(), df.volume.sum())
+        self.assertIs(decimateBars(*bars, 1)[0], t)
+
+    def test_renderChartCache(self):
+        '''
+        Test an identical chart request is found in the chart cache and a changed request
+        replaces the cached render instead of adding a numbered file
+        '''
+        fp = FinPlot()
+        fp.interactive = False
+        fp.maSettings = (dict(), [])
+        df = self.makeCandles(60)
+        begin, end = df.index[0], df.index[-1]
+        outdir = tempfile.mkdtemp()
+        save = os.path.join(outdir, 'SQ_0930_1min.png')
+        try:
+            self.assertIsNone(fp.getCachedChart('SQ', begin, end, 1, save))
+            name = fp.renderChart(df, None, 'SQ', begin, end, 1, save=save)
+            self.assertEqual(fp.getCachedChart('SQ', begin, end, 1, save), name)
+            self.assertIsNone(fp.getCachedChart('SQ', begin, end, 5, save))
+
+            fp.entries = [[df.close[10], 10, 'B', df.index[10]]]
+            self.assertIsNone(fp.getCachedChart('SQ', begin, end, 1, save))
+            name2 = fp.renderChart(df, None, 'SQ', begin, end, 1, save=save)
+            self.assertEqual(name, name2)
+            self.assertEqual(fp.getCachedChart('SQ', begin, end, 1, save), name2)
+        finally:
+            shutil.rmtree(outdir)
+
     def test_setTimeFrame(self):
         '''
         setTimeFrame will require usage to figure out the right settings. Its purpose is to frame
@@ -0,0 +1,54 @@
+'''
+Test the console entry point imports without plotting, Qt or the stock api providers
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+
+from journal.stock import providers
+from test.importtime import ENTRYPOINTS, SRCDIR, importTimes, totalTime
+
+# pylint: disable = C0103
+
+
+class TestImportTime(TestCase):
+    '''Test the lazy imports of the structjour entry points'''
+
+    def test_cli(self):
+        '''import trade loads no plotting, Qt or provider modules'''
+        stmt, env = ENTRYPOINTS['cli']
+        times = importTimes(stmt, env)
+        self.assertIn('journal.definetrades', times)
+        self.assertGreater(totalTime(times), 0)
+        for module in ['matplotlib', 'PyQt5', 'ibapi', 'requests', 'journal.stock.graphstuff',
+                       'journal.stock.myib', 'journal.stock.mybarchart',
+                       'journal.stock.myalphavantage']:
+            self.assertNotIn(module, times)
+
+    def test_quietImport(self):
+        '''journal.statement prints nothing when imported'''
+        out = subprocess.run([sys.executable, '-c', 'import journal.statement'], cwd=SRCDIR,
+                             env=dict(os.environ, STRUCTJOUR_HEADLESS='1'),
+                             stdout=subprocess.PIPE, check=True)
+        self.assertEqual(out.stdout, b'')
+
+    def test_providers(self):
+        '''Providers are looked up in the registry'''
+        self.assertIsNone(providers.getIntraday('nope'))
+        providers.register('test', 'journal.stock.utilities', 'movingAverage')
+        try:
+            from journal.stock.utilities import movingAverage
+            self.assertTrue(providers.isLoaded('test'))
+            self.assertIs(providers.getIntraday('test'), movingAverage)
+        finally:
+            del providers.PROVIDERS['test']
+
+
+if __name__ == '__main__':
+    unittest.main()
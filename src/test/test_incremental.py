@@ -0,0 +1,158 @@
+'''
+Test the incremental reprocessing in journal.incremental
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+import pandas as pd
+
+from journal import settings
+from journal.definetrades import DefineTrades, ReqCol
+from journal.incremental import IncrementalTrades, groupHashes, incrementalFor
+from journal.pandasutil import InputDataFrame
+from journal.statementcache import loadStatement
+from journal.thetradeobject import renameCharts
+from journalfiles import JournalFiles
+from test.benchmark import Benchmark
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+
+class TestIncrementalTrades(TestCase):
+    '''Test the changed groups are recomputed and the result matches a full run'''
+
+    @classmethod
+    def setUpClass(cls):
+        workdir = tempfile.mkdtemp()
+        try:
+            cls.trades = Benchmark(120, workdir).input()[1]
+        finally:
+            shutil.rmtree(workdir)
+
+    def assertSameAsFullRun(self, trades, result):
+        inputlen, dframe, ldf = DefineTrades().processOutputDframe(trades.copy())
+        self.assertEqual(result[0], inputlen)
+        pd.testing.assert_frame_equal(result[1].reset_index(drop=True),
+                                      dframe.reset_index(drop=True), check_dtype=False)
+        self.assertEqual(len(result[2]), len(ldf))
+        for tdf, expected in zip(result[2], ldf):
+            pd.testing.assert_frame_equal(tdf.reset_index(drop=True),
+                                          expected.reset_index(drop=True), check_dtype=False)
+
+    def test_groupHashes(self):
+        '''Test a change to a fill changes the hash of its group only'''
+        rc = ReqCol()
+        hashes = groupHashes(self.trades)
+        self.assertEqual(len(hashes), len(self.trades[[rc.ticker, rc.acct]].drop_duplicates()))
+        changed = self.trades.copy()
+        changed.loc[changed.index[0], rc.price] += .01
+        key = (changed[rc.ticker].iloc[0], changed[rc.acct].iloc[0])
+        newHashes = groupHashes(changed)
+        self.assertEqual([k for k in hashes if hashes[k] != newHashes[k]], [key])
+
+    def test_update(self):
+        '''Test the first update, an unchanged rerun, a changed fill and a removed group'''
+        rc = ReqCol()
+        inc = IncrementalTrades()
+        result = inc.update(self.trades.copy())
+        self.assertEqual(len(inc.changed), len(inc.groups))
+        self.assertSameAsFullRun(self.trades, result)
+
+        inc.update(self.trades.copy())
+        self.assertEqual(inc.changed, [])
+
+        changed = self.trades.copy()
+        changed.loc[changed.index[0], rc.price] += .01
+        key = (changed[rc.ticker].iloc[0], changed[rc.acct].iloc[0])
+        result = inc.update(changed.copy())
+        self.assertEqual(inc.changed, [key])
+        self.assertSameAsFullRun(changed, result)
+
+        removed = changed[changed[rc.ticker] != key[0]]
+        result = inc.update(removed.copy())
+        self.assertEqual(inc.changed, [])
+        self.assertNotIn(key, inc.groups)
+        self.assertSameAsFullRun(removed, result)
+
+    def test_summaries(self):
+        '''Test the summaries are kept for the unchanged groups'''
+        rc = ReqCol()
+        inc = IncrementalTrades()
+        dummy, dummy, ldf = inc.update(self.trades.copy())
+        self.assertEqual(inc.summaries(), [None] * len(ldf))
+        inc.setSummaries([f'note {i}' for i in range(len(ldf))])
+
+        changed = self.trades.copy()
+        changed.loc[changed.index[0], rc.price] += .01
+        key = (changed[rc.ticker].iloc[0], changed[rc.acct].iloc[0])
+        dummy, dummy, ldf = inc.update(changed)
+        summaries = inc.summaries()
+        self.assertEqual(len(summaries), len(ldf))
+        numChanged = len(inc.groups[key]['trades'])
+        self.assertEqual(summaries.count(None), numChanged)
+        for tdf, summary in zip(ldf, summaries):
+            self.assertEqual(summary is None, (tdf.Symb.iloc[-1], tdf.Account.iloc[-1]) == key)
+
+    def test_renameCharts(self):
+        '''A kept summary gets the chart names of its new position. Other names are kept.'''
+        theTrade = pd.DataFrame({'Name': ['SQ Long'], 'chart1': ['Trade2_SQ_Long_0930_01min.png'],
+                                 'chart2': ['Trade2_SQ_Long_0930_05min.png'],
+                                 'chart3': ['mychart.png']})
+        renamed = renameCharts(theTrade, 'Trade2_SQ_Long_0930.png', 'Trade3_SQ_Long_0930.png')
+        self.assertEqual(list(renamed.loc[0, ['chart1', 'chart2', 'chart3']]),
+                         ['Trade3_SQ_Long_0930_01min.png', 'Trade3_SQ_Long_0930_05min.png',
+                          'mychart.png'])
+        self.assertEqual(theTrade.loc[0, 'chart1'], 'Trade2_SQ_Long_0930_01min.png')
+
+
+class TestIncrementalDay(TestCase):
+    '''The same day run again is the same day whether or not the statement cache hit'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        StatementGenerator(60, numSymbols=3, seed=4).writeDAS(self.tmpdir)
+        # Run as the console app without reading or writing the user's settings
+        path = os.path.join(self.tmpdir, 'settings.json')
+        for patch in [mock.patch.object(settings, '_headless', True),
+                      mock.patch.object(settings, '_settingsFile', None),
+                      mock.patch.dict(os.environ, {'STRUCTJOUR_SETTINGS': path,
+                                                   'STRUCTJOUR_RUNTYPE': 'CONSOLE'})]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_day(self, incremental):
+        jf = JournalFiles(indir=self.tmpdir, outdir=self.tmpdir, theDate='2019-01-02',
+                          infile='trades.csv', infile2=None)
+        df, jf = loadStatement(jf, cachedir=self.cachedir)
+        trades, success = InputDataFrame().processInputFile(df, jf.theDate, jf)
+        self.assertTrue(success)
+        incremental = incrementalFor(incremental, self.tmpdir, 'trades.csv', jf.theDate, 'DAS')
+        dummy, dummy, ldf = incremental.update(trades)
+        return incremental, ldf
+
+    def test_coldThenWarm(self):
+        inc, ldf = self.run_day(None)
+        inc.setSummaries([f'note {i}' for i in range(len(ldf))])
+        again, ldf = self.run_day(inc)
+        self.assertIs(again, inc)
+        self.assertEqual(inc.changed, [])
+        self.assertEqual(inc.summaries(), [f'note {i}' for i in range(len(ldf))])
+
+        other = incrementalFor(inc, self.tmpdir, 'trades.csv', '2019-01-03', 'DAS')
+        self.assertIsNot(other, inc)
+
+
+if __name__ == '__main__':
+    unittest.main()
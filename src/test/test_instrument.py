@@ -0,0 +1,101 @@
+'''
+Test the stage spans in journal.instrument
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import json
+import logging
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from journal import instrument
+from journal.instrument import configure, span, timed
+
+# pylint: disable = C0103
+
+
+class ListHandler(logging.Handler):
+    '''Keep the log records'''
+
+    def __init__(self):
+        super().__init__()
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+class TestInstrument(TestCase):
+    '''Test Span, timed and the profiling options'''
+
+    def setUp(self):
+        self.saveConfig = dict(instrument._config)
+        self.saveLevel = instrument.logger.level
+        self.handler = ListHandler()
+        self.tmpdir = tempfile.mkdtemp()
+        configure(log=self.handler, profile='', profileDir=self.tmpdir)
+
+    def tearDown(self):
+        instrument.logger.removeHandler(self.handler)
+        instrument.logger.setLevel(self.saveLevel)
+        instrument._config.update(self.saveConfig)
+        shutil.rmtree(self.tmpdir)
+
+    def test_span(self):
+        '''Test the record has the nested name, the time and the counts'''
+        with span('outer', rows=10) as s:
+            with span('inner'):
+                pass
+            s.set(trades=3)
+        inner, outer = self.handler.records
+        self.assertEqual(inner['span'], 'outer/inner')
+        self.assertEqual(outer['span'], 'outer')
+        self.assertEqual(outer['rows'], 10)
+        self.assertEqual(outer['trades'], 3)
+        self.assertGreaterEqual(outer['ms'], inner['ms'])
+        self.assertEqual(s.record, outer)
+
+    def test_spanError(self):
+        '''Test an exception is recorded and raised'''
+        with self.assertRaises(KeyError):
+            with span('fail'):
+                raise KeyError('x')
+        self.assertEqual(self.handler.records[0]['error'], 'KeyError')
+        self.assertEqual(instrument._stack(), [])
+
+    def test_timed(self):
+        '''Test the decorator counts the rows of the first argument with a length'''
+        class Stage:
+            @timed('Stage.run')
+            def run(self, rows, factor):
+                return len(rows) * factor
+
+        self.assertEqual(Stage().run(list(range(7)), 2), 14)
+        self.assertEqual(self.handler.records[0]['span'], 'Stage.run')
+        self.assertEqual(self.handler.records[0]['rows'], 7)
+
+    def test_profile(self):
+        '''Test the outer span is profiled and tracemalloc reports allocations'''
+        configure(profile='cprofile,tracemalloc')
+        with span('outer'):
+            with span('inner'):
+                data = [list(range(100)) for dummy in range(100)]
+        inner, outer = self.handler.records
+        self.assertNotIn('profile', inner)
+        self.assertTrue(os.path.exists(outer['profile']))
+        pstats.Stats(outer['profile'])
+        self.assertIn('allocKB', inner)
+        self.assertIn('peakKB', outer)
+        self.assertNotIn('peakKB', inner)
+        self.assertGreater(outer['peakKB'], 0)
+        del data
+
+
+if __name__ == '__main__':
+    unittest.main()
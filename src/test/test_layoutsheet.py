@@ -8,6 +8,8 @@ Test the methods in the module layoutsheet
 
 import datetime as dt
 import os
+import shutil
+import tempfile
 from random import randint
 from unittest import TestCase
 import unittest
@@ -30,6 +32,7 @@ from journal.layoutsheet import LayoutSheet
 from journal.dailysumforms import MistakeSummary
 from journal.tradestyle import TradeFormat, c as tcell
 from journal.thetradeobject import SumReqFields
+from test.rtg import StatementGenerator
 ########: disable = C0103, W0613, W0603, W0212, R0914
 # pylint: disable = C0103, W0613, W0603, W0212, R0914
 
@@ -668,6 +671,37 @@ class TestLayoutSheet(TestCase):
                         self.assertEqual(wsval, tval)
 
 
+class TestLayoutPlan(TestCase):
+    '''Test the LayoutPlan figures the same rows as placing the tables one at a time'''
+
+    def test_plan(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            StatementGenerator(60, holdRate=.5, theDate='2019-01-02', seed=6).writeDAS(tmpdir)
+            jf = JournalFiles(indir=tmpdir, outdir=tmpdir, theDate='2019-01-02')
+            trades, jf = Statement_DAS(jf).getTrades()
+            trades, success = InputDataFrame().processInputFile(trades.reset_index(drop=True),
+                                                                jf.theDate, jf)
+            inputlen, dframe, ldf = DefineTrades().processOutputDframe(trades)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        ls = LayoutSheet(25, inputlen, spacing=3)
+        plan = ls.plan(dframe, ldf)
+        imageLocation, sheet = ls.imageData(dframe, ldf)
+        self.assertEqual(len(sheet), plan.numRows)
+        self.assertEqual(plan.numRows, 25 + len(dframe) + sum(len(t) + ls.summarySize
+                                                             for t in ldf))
+        row = 25 + len(dframe)
+        for p, loc, tdf in zip(plan.placements, imageLocation, ldf):
+            self.assertEqual(p.tableRow, row)
+            self.assertEqual(loc[0], row + len(tdf) + 3)
+            self.assertEqual(list(sheet.Tindex[p.tableRow:p.tableRow + p.tableLen]),
+                             list(tdf.Tindex))
+            self.assertEqual(sheet.Tindex[p.tableRow - 1], '')
+            row += len(tdf) + ls.summarySize
+
+
 def notmain():
     '''Run some local code'''
         # pylint: disable = E1120
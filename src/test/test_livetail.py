@@ -0,0 +1,200 @@
+'''
+Test the live mode in journal.livetail
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+import pandas as pd
+
+from journal import settings
+from journal.definetrades import DefineTrades
+from journal.incremental import Summary, imageNames, summarize
+from journal.livetail import LiveTrades, TailReader
+from journal.pandasutil import InputDataFrame
+from journal.statement import Statement_DAS
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+THEDATE = pd.Timestamp('2019-01-02')
+
+
+class TestTailReader(TestCase):
+    '''Test appended, partial and rewritten files'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'trades.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text, mode='a'):
+        with open(self.path, mode) as f:
+            f.write(text)
+
+    def test_read(self):
+        tr = TailReader(self.path)
+        self.assertIsNone(tr.read())
+        self.write('Time,Symb,Qty\n09:30:01,AAPL,100\n09:30:02,AA')
+        df = tr.read()
+        self.assertEqual(list(df.columns), ['Time', 'Symb', 'Qty'])
+        self.assertEqual(list(df.Symb), ['AAPL'])
+
+        # The partly written line is read when it is complete
+        self.assertIsNone(tr.read())
+        self.write('PL,-100\n09:30:03,AMD,50\n')
+        df = tr.read()
+        self.assertEqual(list(df.Symb), ['AAPL', 'AMD'])
+        self.assertFalse(tr.reset)
+        self.assertIsNone(tr.read())
+
+    def test_rewritten(self):
+        tr = TailReader(self.path)
+        self.write('Time,Symb,Qty\n09:30:01,AAPL,100\n09:30:02,AAPL,-100\n')
+        self.assertEqual(len(tr.read()), 2)
+
+        # A new export of the same day is longer but its lines are not the lines read
+        self.write('Time,Symb,Qty\n09:30:01,AMD,100\n09:30:02,AMD,-100\n09:30:03,AMD,5\n', 'w')
+        df = tr.read()
+        self.assertTrue(tr.reset)
+        self.assertEqual(list(df.Symb), ['AMD'] * 3)
+
+
+class TestLiveTrades(TestCase):
+    '''Test the fills fed a few at a time make the same trades as a run on the whole file'''
+
+    @classmethod
+    def setUpClass(cls):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            gen = StatementGenerator(200, numSymbols=5, holdRate=0, untraded=0,
+                                     theDate=THEDATE, seed=3)
+            trades, dummy = gen.writeDAS(tmpdir)
+            cls.fills = pd.read_csv(trades)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        # Run as the console app without reading or writing the user's settings
+        path = os.path.join(self.tmpdir, 'settings.json')
+        for patch in [mock.patch.object(settings, '_headless', True),
+                      mock.patch.object(settings, '_settingsFile', None),
+                      mock.patch.dict(os.environ, {'STRUCTJOUR_SETTINGS': path,
+                                                   'STRUCTJOUR_RUNTYPE': 'CONSOLE'})]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def fullRun(self, fills):
+        fills = fills.copy()
+        fills['Date'] = THEDATE
+        sdas = Statement_DAS(None, fills)
+        tickets = pd.concat([sdas.createSingleTicket(t) for t in sdas.getListOfTicketDF()])
+        trades, success = InputDataFrame().processInputFile(tickets.reset_index(drop=True),
+                                                            THEDATE, None)
+        self.assertTrue(success)
+        return DefineTrades().processOutputDframe(trades)
+
+    def assertSameTrades(self, expected, result):
+        self.assertEqual(result[0], expected[0])
+        self.assertEqual(len(result[2]), len(expected[2]))
+        for tdf, exp in zip(result[2], expected[2]):
+            pd.testing.assert_frame_equal(tdf.reset_index(drop=True), exp.reset_index(drop=True),
+                                          check_dtype=False)
+        pd.testing.assert_frame_equal(result[1].reset_index(drop=True),
+                                      expected[1].reset_index(drop=True), check_dtype=False)
+
+    def test_update(self):
+        '''Test the open trades and the final result'''
+        lt = LiveTrades(THEDATE)
+        sawOpen = False
+        for i in range(0, len(self.fills), 7):
+            result = lt.update(self.fills.iloc[i:i + 7])
+            for key in lt.changed:
+                group = lt.groups[key]
+                isOpen = len(group['open']) > 0
+                name = group['trades'][-1].Name.iloc[-1]
+                self.assertEqual(name.endswith(' OPEN'), isOpen)
+                self.assertEqual(len(group['trades']), len(group['closed']) + isOpen)
+                sawOpen = sawOpen or isOpen
+        self.assertTrue(sawOpen)
+        self.assertSameTrades(self.fullRun(self.fills), result)
+
+    def test_closedKept(self):
+        '''Test closed trades keep their summaries and a late fill recomputes the group'''
+        half = len(self.fills) // 2
+        lt = LiveTrades(THEDATE)
+        dummy, dummy, ldf = lt.update(self.fills.iloc[:half])
+        lt.setSummaries(list(range(len(ldf))))
+        closed = {k: list(g['closed']) for k, g in lt.groups.items()}
+
+        lt.update(self.fills.iloc[half:])
+        for key, trades in closed.items():
+            for tdf, kept in zip(trades, lt.groups[key]['closed']):
+                self.assertIs(tdf, kept)
+        summaries = lt.summaries()
+        self.assertEqual(len(summaries), len(lt.tradeList()))
+        self.assertEqual(len([s for s in summaries if s is not None]),
+                         sum(len(t) for t in closed.values()))
+
+        # Late fills for the opening and a closing ticket of a closed trade
+        key = next(k for k, t in closed.items() if t)
+        first = lt.groups[key]['closed'][0]
+        group = self.fills[(self.fills.Symb == key[0]) & (self.fills.Account == key[1])]
+        isBuy = group.Side == 'B'
+        late = pd.concat([group.head(1), group[isBuy != isBuy.iloc[0]].head(1)])
+        late['Qty'] = 1
+        result = lt.update(late)
+        self.assertEqual(lt.changed, [key])
+        self.assertIsNot(lt.groups[key]['trades'][0], first)
+        self.assertSameTrades(self.fullRun(pd.concat([self.fills, late])), result)
+
+    def test_polls(self):
+        '''
+        Poll like runController.pollLive: update, summarize with the stored summaries, store
+        them. The user entries of a kept summary survive and its charts follow its position.
+        '''
+        lt = LiveTrades(THEDATE)
+        marked = 0
+        step = len(self.fills) // 4 + 1
+        for poll, i in enumerate(range(0, len(self.fills), step)):
+            dummy, dummy, ldf = lt.update(self.fills.iloc[i:i + step])
+            stored = lt.summaries()
+            if poll:
+                self.assertTrue(any(stored))
+            names = imageNames(ldf)
+            summaries = summarize(ldf, names, stored)
+            lt.setSummaries(summaries)
+
+            kept = 0
+            for summary, name in zip(summaries, names):
+                self.assertIsInstance(summary, Summary)
+                self.assertEqual(summary.imageName, name)
+                chart = summary.theTrade['chart1'].unique()[0]
+                self.assertTrue(chart.startswith(os.path.splitext(name)[0]), (chart, name))
+                if summary.theTrade['Notes'].unique()[0] == 'kept':
+                    kept += 1
+            self.assertEqual(kept, marked)
+            for group in lt.groups.values():
+                for summary in group['summaries'][:len(group['closed'])]:
+                    if summary.theTrade['Notes'].unique()[0] != 'kept':
+                        summary.theTrade['Notes'] = 'kept'
+                        marked += 1
+        self.assertGreater(poll, 1)
+        self.assertGreater(marked, 0)
+
+        with self.assertRaises(TypeError):
+            summarize(ldf, names, [(s.theTrade, s.entries) for s in summaries])
+
+
+if __name__ == '__main__':
+    unittest.main()
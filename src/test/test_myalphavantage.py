@@ -7,6 +7,7 @@ import datetime as dt
 import unittest
 from time import time, sleep
 import types
+from unittest import mock
 
 import pandas as pd
 
@@ -125,6 +126,23 @@ class TestMyalphavantage(unittest.TestCase):
                 #     delt = quittingTime - df.index[-1]
                 #     self.assertLess(delt.seconds, 60*5)
 
+    def test_rateLimit(self):
+        '''After the retries, a rate limit reply returns the provider neutral ratelimit code'''
+        note = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5'}
+        response = mock.Mock(status_code=200)
+        response.json.return_value = note
+        with mock.patch.object(mav.requests, 'get', return_value=response) as get, \
+                mock.patch.object(mav.time, 'sleep') as snooze, \
+                mock.patch.object(mav, 'getKey', return_value='key'):
+            meta, df, maDict = mav.getmav_intraday('SQ', '2019-10-15 09:30', '2019-10-15 11:00', 3)
+        self.assertEqual(meta['code'], 'ratelimit')
+        self.assertIn('Alpha Vantage', meta['message'])
+        self.assertTrue(df.empty)
+        self.assertIsNone(maDict)
+        self.assertEqual(get.call_count, mav.RETRY + 1)
+        self.assertEqual(snooze.call_count, mav.RETRY)
+        self.assertIsNone(mav.R)
+
     def test_ni(self):
         '''
         Test the utility for mav
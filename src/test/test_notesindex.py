@@ -0,0 +1,99 @@
+'''
+Test the full text index of the trade notes in journal.notesindex
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.database import closePools
+from journal.notesindex import NotesIndex, ftsQuery, main
+
+# pylint: disable = C0103
+
+
+def summary(name, strat, pl, explain='', notes='', mstknote=''):
+    return pd.DataFrame({'Name': [name], 'Account': ['Live'], 'Strategy': [strat],
+                         'P / L': [pl], 'Explain': [explain], 'Notes': [notes],
+                         'MstkNote': [mstknote]})
+
+
+class TestNotesIndex(TestCase):
+    '''Test the incremental update of the index and the search'''
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'structjour.sqlite')
+        self.index = NotesIndex(self.db)
+        self.ts = {
+            '1 AAPL Long': summary('AAPL Long', 'VWAP Reversal', 120.0,
+                                   'Bought the reversal off the VWAP', 'Held the trend'),
+            '2 AMD Short': summary('AMD Short', 'ORB', -40.0, 'Chased the breakout',
+                                   mstknote='Chased it'),
+            '3 MU Long': summary('MU Long', 'VWAP Reversal', '', 'Chased the VWAP bounce')}
+
+    def tearDown(self):
+        closePools()
+        shutil.rmtree(self.dir)
+
+    def test_ftsQuery(self):
+        self.assertEqual(ftsQuery('vwap  revers*'), '"vwap" "revers"*')
+        self.assertEqual(ftsQuery('"AND" -x'), '"AND" "-x"')
+        self.assertEqual(ftsQuery(' * '), '')
+
+    def test_search(self):
+        self.assertEqual(self.index.indexDay('2019-01-02', self.ts), 3)
+        df = self.index.search('chased vwap')
+        self.assertEqual(list(df.name), ['MU Long'])
+        self.assertEqual(df.theDate[0], '2019-01-02')
+        self.assertEqual(df.pl[0], 0.0)
+        self.assertIn('[Chased]', df.snippet[0])
+
+        df = self.index.search('chase*')
+        self.assertEqual(sorted(df.ticker), ['AMD', 'MU'])
+        self.assertEqual(list(self.index.search('chased', strategy='ORB').ticker), ['AMD'])
+        self.assertEqual(list(self.index.search('vwap', ticker='aapl').pl), [120.0])
+        self.assertTrue(self.index.search('vwap', start='2019-01-03').empty)
+        self.assertTrue(self.index.search('').empty)
+
+    def test_indexDay(self):
+        '''Only the changed trades are written and the removed ones are deleted'''
+        self.index.indexDay('2019-01-02', self.ts)
+        self.assertEqual(self.index.indexDay('2019-01-02', self.ts), 0)
+
+        self.ts['1 AAPL Long']['Explain'] = 'Faded the gap'
+        del self.ts['3 MU Long']
+        self.assertEqual(self.index.indexDay('2019-01-02', self.ts), 2)
+        self.assertEqual(list(self.index.search('vwap').ticker), [])
+        self.assertEqual(list(self.index.search('faded').ticker), ['AAPL'])
+        self.assertEqual(list(self.index.search('chased').ticker), ['AMD'])
+
+        # Another day is kept apart
+        self.index.indexDay(pd.Timestamp('2019-01-03'), [summary('MU Long', 'ORB', 5, 'Faded')])
+        self.assertEqual(sorted(self.index.search('faded').theDate), ['2019-01-02', '2019-01-03'])
+        self.assertEqual(len(self.index.search('chased')), 1)
+
+    def test_speed(self):
+        for day in pd.bdate_range('2019-01-01', periods=250):
+            self.index.indexDay(day, self.ts)
+        start = time.perf_counter()
+        df = self.index.search('chased vwap', limit=20)
+        self.assertEqual(len(df), 20)
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_main(self):
+        self.index.indexDay('2019-01-02', self.ts)
+        self.assertEqual(main(['held', '--db', self.db]), 0)
+        self.assertEqual(main(['nothere', '--db', self.db]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
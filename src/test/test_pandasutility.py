@@ -46,39 +46,56 @@ class Test_Pandasutility(unittest.TestCase):
 
     
 
-    def testZeroPad(self):
+    def testTradeTimes(self):
         '''
-        Test the method pandasutil.InputDataFrame.zeroPadTimeStr.
+        Test that pandasutil.InputDataFrame.addDateField places the DAS times, like 9:30:01, on
+        their trade date.
         '''
 
         indir = 'data/'
+        theDate = pd.Timestamp('2019-01-25')
         for infile  in self.infiles:
 
             inpathfile = os.path.join(indir, infile)
 
             t = pd.read_csv(inpathfile)
+            times = pd.to_timedelta(t['Time'])
 
             idf = InputDataFrame()
-            t = idf.zeroPadTimeStr(t)
-
-            for x in t['Time']:
-                self.assertIsInstance(x, str, 'Excel time in {infile} is a {type(x)}')
-                self.assertEqual(len(x), 8)
-                self.assertEqual(x[2], ':')
-                self.assertEqual(x[5], ':')
-                self.assertEqual(len(x), 8)
-                (h, m, s) = x.split(':')
-                try:
-                    h = int(h)
-                    m = int(m)
-                    s = int(s)
-                    self.assertLess(h, 24)
-                    self.assertLess(m, 60)
-                    self.assertLess(s, 60)
-                except NameError:
-                    self.fail('Time has a wrong value')
+            t = idf.addDateField(t, theDate)
 
-    
+            self.assertTrue(pd.api.types.is_datetime64_dtype(t['Time']), infile)
+            for x, day, tod in zip(t['Time'], t['Date'], times):
+                self.assertEqual(x.normalize(), day)
+                self.assertEqual(x - day, tod)
+
+    def test_insertOvernightRow(self):
+        '''
+        HOLD rows have no time. A before hold is dated the day before the trades of its ticker and
+        an after hold the day after.
+        '''
+        day = pd.Timestamp('2019-05-16')
+        trades = pd.DataFrame({'Time': ['9:30:01', '10:15:00'], 'Symb': ['AMD', 'AMD'],
+                               'Side': ['B', 'S'], 'Price': [20.0, 20.5], 'Qty': [100, -50],
+                               'Account': ['U1', 'U1'], 'P / L': [0.0, 25.0],
+                               'Date': ['2019-05-16', '2019-05-16']})
+        idf = InputDataFrame()
+        trades = idf.addDateField(trades, None)
+        swing = [{'ticker': 'AMD', 'acct': 'U1', 'shares': 0, 'before': 20, 'after': 70}]
+        df = idf.insertOvernightRow(trades, swing)
+
+        self.assertEqual(list(df.Side), ['HOLD-B', 'B', 'S', 'HOLD+'])
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df.Time))
+        self.assertTrue(df.Time[[0, 3]].isnull().all())
+        self.assertEqual(list(df.Time[1:3]), [pd.Timestamp('2019-05-16 09:30:01'),
+                                              pd.Timestamp('2019-05-16 10:15:00')])
+        delt = pd.Timedelta(days=1)
+        self.assertEqual(list(df.Date), [day - delt, day, day, day + delt])
+
+        # addDateField leaves them as they are
+        df2 = idf.addDateField(df.copy(), None)
+        self.assertTrue(df2.Time.equals(df.Time))
+        self.assertTrue(df2.Date.equals(df.Date))
 
     def testGetOvernightTrades(self):
         '''
@@ -212,9 +229,10 @@ class Test_Pandasutility(unittest.TestCase):
             rnext = df2.iloc[i+1] if i < (len(df2)-1) else ''
             daydelt = pd.Timedelta(days=1)
             # print(row.Side, type(rprev), type(rnext))
-            rt = pd.Timestamp(row.Time)
-            rd = pd.Timestamp(row.Date)
-            assert rt.time() == rd.time()
+            if row.Side.startswith('HOLD'):
+                assert pd.isnull(row.Time)
+            else:
+                assert row.Time.normalize() == row.Date
 
             if row.Side == 'HOLD-B' or row.Side == 'HOLD+B':
                 assert row.Date.date() == rnext.Date.date() - daydelt
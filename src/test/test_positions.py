@@ -0,0 +1,92 @@
+'''
+Test the positions loader in journal.positions
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from journal import positions
+from journal.pandasutil import InputDataFrame
+from journal.positions import Positions, loadPositions, normPositions
+from journalfiles import JournalFiles
+
+# pylint: disable = C0103
+
+
+class TestPositions(TestCase):
+    '''Test the positions frame, the lookup and the cache'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'positions.csv')
+        self.writeCsv([['AAPL', 'TR1', 100, 150.25, 12],
+                       ['AMD', 'TR1', 0, 0, 0],
+                       ['AMD', 'TR2', -200, 25.5, -3],
+                       ['MU', 'TR1', 50, 0, 0],
+                       ['SQ', 'TR1', 'n/a', 10, 0]])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def writeCsv(self, rows):
+        df = pd.DataFrame(rows, columns=['Symb', 'Account', 'Shares', 'Avgcost', 'Unrealized'])
+        df.to_csv(self.path, index=False)
+
+    def getJf(self):
+        open(os.path.join(self.tmpdir, 'trades.csv'), 'w').close()
+        return JournalFiles(indir=self.tmpdir, outdir=self.tmpdir, infile2='positions.csv',
+                            theDate='2019-01-02', mydevel=False)
+
+    def test_normPositions(self):
+        df = normPositions(pd.read_csv(self.path), requireCost=True)
+        self.assertEqual(list(df.columns), positions.POSITIONCOLUMNS)
+        self.assertEqual(list(df.Symb), ['AAPL', 'AMD'])
+        self.assertEqual(list(df.Account), ['TR1', 'TR2'])
+        self.assertEqual(df.Shares.dtype, np.int64)
+        self.assertEqual(df.Avgcost.dtype, np.float64)
+
+        # The IB positions have no cost and may have a thousands separator
+        df = normPositions(pd.DataFrame({'Symb': ['AAPL'], 'Account': ['U1'],
+                                         'Shares': ['-1,200']}))
+        self.assertEqual(list(df.Shares), [-1200])
+        self.assertTrue(np.isnan(df.Avgcost[0]))
+        self.assertTrue(normPositions(pd.DataFrame()).empty)
+        with self.assertRaises(ValueError):
+            normPositions(pd.DataFrame({'Symb': ['AAPL'], 'Shares': [5]}))
+
+    def test_lookup(self):
+        pos = Positions(normPositions(pd.read_csv(self.path), requireCost=True))
+        self.assertEqual(pos.lookup('AMD', 'TR2'), -200)
+        self.assertIsNone(pos.lookup('AMD', 'TR1'))
+        self.assertEqual(pos.avgcost('AAPL', 'TR1'), 150.25)
+
+        swingTrade = [{'ticker': 'AMD', 'shares': -300, 'before': 0, 'after': 0, 'acct': 'TR2'},
+                      {'ticker': 'AMD', 'shares': 400, 'before': 0, 'after': 0, 'acct': 'TR1'}]
+        swingTrade = InputDataFrame().getOvernightTrades_DAS(swingTrade, pos)
+        self.assertEqual((swingTrade[0]['before'], swingTrade[0]['after']), (-100, -300))
+        self.assertEqual((swingTrade[1]['before'], swingTrade[1]['after']), (400, 0))
+
+    def test_loadPositions(self):
+        jf = self.getJf()
+        pos = loadPositions(jf)
+        self.assertIs(loadPositions(jf), pos)
+        self.assertEqual(len(pos.df), 2)
+
+        self.writeCsv([['AAPL', 'TR1', 300, 150.25, 12]])
+        os.utime(self.path, (0, 0))
+        pos = loadPositions(jf)
+        self.assertEqual(pos.lookup('AAPL', 'TR1'), 300)
+        self.assertTrue(loadPositions(None).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+'''
+Test the bar store in journal.stock.barstore and the prefetch job in journal.stock.prefetch
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from journal.stock import providers
+from journal.database import closePools
+from journal.stock.barstore import BarStore, resampleBars
+from journal.stock.graphstuff import FinPlot
+from journal.catalog import DEFAULTSCHEME, schemePath
+from journal.stock.prefetch import Budget, Prefetcher, journalSymbolDays, tradedSymbolDays
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+CALLS = []
+
+
+def fakeBars(start, end):
+    index = pd.date_range(start, end, freq='1T', name='date')
+    close = 10 + np.arange(len(index)) * .01
+    return pd.DataFrame({'open': close, 'high': close + .05, 'low': close - .05, 'close': close,
+                         'volume': 100.0}, index=index)
+
+
+def fakeIntraday(symbol, start=None, end=None, minutes=1, showUrl=False):
+    '''A provider that fails for the symbol FAIL'''
+    CALLS.append((symbol, start, end))
+    if symbol == 'FAIL':
+        return {'code': 500, 'message': 'No data'}, pd.DataFrame(), None
+    return {'code': 200}, fakeBars(start, end), None
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.t += seconds
+
+
+class TestPrefetch(TestCase):
+    '''Test fetching, budgeting and resuming'''
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, 'structjour.sqlite')
+        self.store = BarStore(self.db)
+        providers.register('fake', __name__, 'fakeIntraday')
+        providers.register('fake2', __name__, 'fakeIntraday')
+        del CALLS[:]
+
+    def tearDown(self):
+        del providers.PROVIDERS['fake']
+        del providers.PROVIDERS['fake2']
+        closePools()
+        shutil.rmtree(self.dir)
+
+    def test_tradedSymbolDays(self):
+        df = pd.DataFrame({'Symb': ['SQ', 'AMD', 'SQ'],
+                           'Date': ['2019-01-03 09:31:00', '2019-01-02 10:00:00',
+                                    '2019-01-03 11:00:00']})
+        self.assertEqual(tradedSymbolDays(df), [('AMD', pd.Timestamp('2019-01-02')),
+                                                ('SQ', pd.Timestamp('2019-01-03'))])
+        df = pd.DataFrame({'Symb': ['SQ'], 'Time': ['09:31:00']})
+        self.assertEqual(tradedSymbolDays(df, '2019-01-04'), [('SQ', pd.Timestamp('2019-01-04'))])
+
+    def test_journalSymbolDays(self):
+        for theDate in ['2019-01-02', '2019-01-03']:
+            day = schemePath(self.dir, DEFAULTSCHEME, theDate)
+            os.makedirs(day)
+            StatementGenerator(10, theDate=theDate, seed=3).writeDAS(day)
+        pairs = journalSymbolDays(self.dir, '2019-01-03', '2019-01-31', db=self.db,
+                                  useCache=False)
+        self.assertTrue(pairs)
+        self.assertEqual({d for s, d in pairs}, {pd.Timestamp('2019-01-03')})
+
+    def test_barStore(self):
+        bars = fakeBars('2019-01-02 09:30', '2019-01-02 10:29')
+        self.assertEqual(self.store.putBars('SQ', '2019-01-02', bars, 'fake'), 60)
+        self.assertTrue(self.store.hasBars('SQ', '2019-01-02 09:30', '2019-01-02 10:00'))
+        self.assertFalse(self.store.hasBars('SQ', '2019-01-02', '2019-01-03'))
+        self.assertFalse(self.store.hasBars('AMD', '2019-01-02', '2019-01-02'))
+
+        df = self.store.getBars('SQ', '2019-01-02 09:40', '2019-01-02 09:49')
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df.index[0], pd.Timestamp('2019-01-02 09:40'))
+        self.assertAlmostEqual(df.close.iloc[-1], bars.close.iloc[19])
+
+        df = self.store.getBars('SQ', '2019-01-02 09:32', '2019-01-02 10:29', 5)
+        self.assertEqual(df.index[0], pd.Timestamp('2019-01-02 09:30'))
+        self.assertEqual(len(df), 12)
+        self.assertEqual(df.volume.iloc[0], 500.0)
+        pd.testing.assert_frame_equal(df, resampleBars(bars, 5), check_freq=False)
+
+        store = BarStore.forDB(self.db)
+        self.assertIs(BarStore.forDB(self.db), store)
+        self.assertTrue(store.hasBars('SQ', '2019-01-02 09:30', '2019-01-02 10:00'))
+
+    def test_run(self):
+        '''Closed and unfinished days are skipped, a failure is retried, a finished day is not'''
+        now = pd.Timestamp('2019-01-22 12:00')
+        symbolDays = [('SQ', pd.Timestamp('2019-01-18')), ('AMD', pd.Timestamp('2019-01-18')),
+                      ('SQ', pd.Timestamp('2019-01-21')),     # MLK day
+                      ('SQ', pd.Timestamp('2019-01-22')),     # Not over yet
+                      ('FAIL', pd.Timestamp('2019-01-17')),
+                      ('SQ', pd.Timestamp('2018-10-01'))]     # Older than the retention
+        prefetcher = Prefetcher(self.store, ['fake'], retention={'fake': 30}, now=now)
+        counts = prefetcher.run(symbolDays)
+        self.assertEqual(dict(counts), {'done': 2, 'failed': 1, 'unavailable': 1})
+        self.assertEqual(len(CALLS), 3)
+        self.assertEqual(CALLS[0][1:], (pd.Timestamp('2019-01-18 04:00'),
+                                        pd.Timestamp('2019-01-18 20:00')))
+        self.assertTrue(self.store.hasBars('AMD', '2019-01-18 09:30', '2019-01-18 16:00'))
+
+        # Resume: only the failed day is requested again
+        del CALLS[:]
+        counts = Prefetcher(self.store, ['fake'], retention={'fake': 30}, now=now).run(
+            symbolDays)
+        self.assertEqual([c[0] for c in CALLS], ['FAIL'])
+        days = self.store.getDays()
+        self.assertEqual(list(days[days.symbol == 'FAIL'].attempts), [2])
+        # Each request counts against the daily limit, the retry too
+        self.assertEqual(self.store.callsSince('fake', pd.Timestamp.today().normalize()), 4)
+        self.assertEqual(self.store.callsSince('fake2', pd.Timestamp.today().normalize()), 0)
+
+    def test_budget(self):
+        clock = FakeClock()
+        budget = Budget(2, 60, perDay=3, clock=clock)
+        budget.spend()
+        budget.spend()
+        self.assertEqual(budget.delay(), 60)
+        clock.t = 45
+        self.assertEqual(budget.delay(), 15)
+        clock.t = 60
+        self.assertEqual(budget.delay(), 0)
+        budget.spend()
+        self.assertTrue(budget.exhausted())
+
+        # The second api takes over when the first is out of calls for the day
+        symbolDays = [(s, pd.Timestamp('2019-01-18')) for s in ['A', 'B', 'C', 'D', 'E']]
+        prefetcher = Prefetcher(self.store, ['fake', 'fake2'],
+                                budgets={'fake': (2, 60, 3), 'fake2': (1, 10, None)},
+                                retention={'fake': 30, 'fake2': 30},
+                                now='2019-01-22', clock=clock, sleep=clock.sleep)
+        clock.t = 0
+        self.assertEqual(prefetcher.run(symbolDays)['done'], 5)
+        apis = self.store.getDays().api
+        self.assertEqual(list(apis), ['fake'] * 3 + ['fake2'] * 2)
+        # Two calls per minute for fake then one per 10 seconds for fake2
+        self.assertEqual(clock.t, 70)
+
+    def test_finPlot(self):
+        '''FinPlot draws from the store and does not call the api'''
+        self.store.putBars('SQ', '2019-01-18', fakeBars('2019-01-18 04:00', '2019-01-18 20:00'),
+                           'fake')
+        fp = FinPlot()
+        fp.api = 'fake2'
+        fp.barDB = self.db
+        fp.maSettings = None
+        df, dummy = fp.getChartData('SQ', '2019-01-18 09:30', '2019-01-18 11:00', 5)
+        self.assertEqual(len(df), 19)
+        self.assertEqual(df.index[0], pd.Timestamp('2019-01-18 09:30'))
+        self.assertEqual(CALLS, [])
+
+        # A day that was not prefetched goes to the api
+        fp.getChartData('SQ', '2019-01-17 09:30', '2019-01-17 11:00', 5)
+        self.assertEqual(len(CALLS), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
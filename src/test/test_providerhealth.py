@@ -0,0 +1,180 @@
+'''
+Test the provider health cache in journal.stock.providerhealth
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import threading
+import unittest
+from unittest import TestCase, mock
+
+import pandas as pd
+
+from journal.stock.graphstuff import FinPlot
+from journal.stock.providerhealth import ProviderHealth, isRateLimit, windowMessage
+
+# pylint: disable = C0103
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProbe:
+    '''Count the probes and answer with self.result or raise it'''
+    def __init__(self, result=True):
+        self.result = result
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class TestProviderHealth(TestCase):
+    '''Test ProviderHealth and windowMessage'''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.probe = FakeProbe()
+        self.health = ProviderHealth(probes={'ib': self.probe}, ttl=60, clock=self.clock)
+
+    def settle(self):
+        '''Wait for the background probes'''
+        with self.health.lock:
+            threads = list(self.health.refreshing.values())
+        for thread in threads:
+            thread.join()
+
+    def test_windowMessage(self):
+        now = pd.Timestamp('2019-10-16 14:00')
+        self.assertIn('todays data', windowMessage('bc', '2019-10-16 09:30', '2019-10-16 11:00',
+                                                   now))
+        self.assertIn('yesterdays data', windowMessage('bc', '2019-10-15 09:30',
+                                                       '2019-10-15 15:00', now))
+        self.assertIsNone(windowMessage('bc', '2019-10-15 09:30', '2019-10-15 11:00', now))
+        self.assertIsNone(windowMessage('bc', '2019-10-16 09:30', '2019-10-16 11:00',
+                                        pd.Timestamp('2019-10-16 17:00')))
+        self.assertIn('AlphaVantage data before Oct 10',
+                      windowMessage('av', '2019-10-08 09:30', '2019-10-08 11:00', now))
+        self.assertIsNone(windowMessage('av', '2019-10-14 09:30', '2019-10-14 11:00', now))
+        self.assertIsNone(windowMessage('ib', '2019-01-14 09:30', '2019-01-14 11:00', now))
+
+    def test_probeIsCached(self):
+        '''No question waits for the probe. A stale answer is refreshed behind.'''
+        self.probe.result = False
+        self.probe.release.clear()
+        self.assertIsNone(self.health.unavailableMessage('ib'))
+        self.probe.release.set()
+        self.settle()
+        self.assertEqual(self.health.unavailableMessage('ib'), 'IBAPI is not connected.')
+
+        self.probe.result = True
+        self.health.refresh('ib')
+        self.assertTrue(self.health.isAvailable('ib'))
+        self.clock.now += 59
+        self.assertTrue(self.health.isAvailable('ib'))
+        self.assertEqual(self.probe.calls, 2)
+
+        self.clock.now += 1
+        self.probe.result = False
+        self.probe.release.clear()
+        self.assertTrue(self.health.isAvailable('ib'))
+        thread = self.health.refresh('ib', wait=False)
+        self.assertIsNotNone(thread)
+        self.probe.release.set()
+        thread.join()
+        self.assertEqual(self.probe.calls, 3)
+        self.assertEqual(self.health.unavailableMessage('ib'), 'IBAPI is not connected.')
+
+    def test_probeFails(self):
+        self.probe.result = ConnectionRefusedError('gateway down')
+        threads = self.health.start()
+        self.assertEqual(len(threads), 1)
+        threads[0].join()
+        self.assertIn('gateway down', self.health.unavailableMessage('ib'))
+        self.health.reportSuccess('ib')
+        self.assertTrue(self.health.isAvailable('ib'))
+        self.assertEqual(self.probe.calls, 1)
+
+    def test_rateLimit(self):
+        '''A rate limited api is unavailable till the limit expires. Unprobed apis are not probed'''
+        self.assertTrue(self.health.isAvailable('bc'))
+        self.health.reportFailure('bc', 'You have reached', rateLimited=True, retryAfter=30)
+        self.assertIn('rate limit', self.health.unavailableMessage('bc'))
+        self.clock.now += 30
+        self.assertTrue(self.health.isAvailable('bc'))
+        self.health.reportFailure('bc', 'No data')
+        self.assertTrue(self.health.isAvailable('bc'))
+        status = self.health.status().set_index('api')
+        self.assertEqual(status.at['bc', 'failures'], 2)
+        self.assertEqual(self.probe.calls, 0)
+
+    def test_failureReprobes(self):
+        '''A failure starts a probe. The last answer is used till it returns.'''
+        self.health.refresh('ib')
+        self.probe.result = False
+        self.probe.release.clear()
+        self.health.reportFailure('ib', 'socket closed')
+        self.assertTrue(self.health.isAvailable('ib'))
+        self.probe.release.set()
+        self.settle()
+        self.assertFalse(self.health.isAvailable('ib'))
+        self.assertEqual(self.probe.calls, 2)
+
+    def test_apiChooserList(self):
+        '''The chooser asks the shared health and leaves the preferences alone'''
+        saved = ProviderHealth._instance
+        ProviderHealth._instance = self.health
+        try:
+            self.probe.result = False
+            self.health.refresh('ib')
+            fp = FinPlot()
+            fp.preferences = ['ib', 'bc', 'av']
+            self.health.reportFailure('bc', 'You have reached', rateLimited=True)
+            api, rules, apis = fp.apiChooserList('2019-10-15 09:30', '2019-10-15 11:00', 'ib')
+            self.assertFalse(api)
+            self.assertEqual(apis, [])
+            self.assertEqual(fp.preferences, ['ib', 'bc', 'av'])
+            self.assertIn('IBAPI is not connected.', rules)
+            self.assertEqual(self.probe.calls, 1)
+            fp.apiChooserList('2019-10-15 09:30', '2019-10-15 11:00', 'ib')
+            self.assertEqual(self.probe.calls, 1)
+        finally:
+            ProviderHealth._instance = saved
+
+    def test_chartRateLimit(self):
+        '''A rate limit reply from any provider takes it out of the choice'''
+        self.assertTrue(isRateLimit(666))
+        self.assertTrue(isRateLimit('ratelimit'))
+        self.assertFalse(isRateLimit('closed'))
+        saved = ProviderHealth._instance
+        ProviderHealth._instance = self.health
+        try:
+            fp = FinPlot()
+            fp.api = 'av'
+            fp.useBarStore = False
+            meta = {'code': 'ratelimit', 'message': 'Our standard API call frequency is 5'}
+            with mock.patch.object(fp, 'apiChooser',
+                                   return_value=lambda *a, **kw: (meta, pd.DataFrame(), None)):
+                self.assertEqual(fp.getChartData('SQ', '2019-10-15 09:30', '2019-10-15 11:00', 1),
+                                 (None, None))
+            self.assertEqual(fp.errorCode, 'ratelimit')
+            self.assertFalse(self.health.isAvailable('av'))
+            self.assertIn('rate limit', self.health.unavailableMessage('av'))
+        finally:
+            ProviderHealth._instance = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
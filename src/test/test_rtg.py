@@ -0,0 +1,86 @@
+'''
+Test the statement generator in test.rtg
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.statement import getTrades_csv
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+
+class TestStatementGenerator(TestCase):
+    '''Test the generated fills and the statement files'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fills(self):
+        '''Test the times, tickets and balances of the generated fills'''
+        gen = StatementGenerator(2000, numSymbols=10, holdRate=0, flipRate=.5, untraded=0,
+                                 seed=5)
+        df = pd.DataFrame(gen.fills())
+        self.assertGreaterEqual(len(df), 2000)
+        self.assertEqual(df.symb.nunique(), 10)
+        for dummy, stream in df.groupby(['symb', 'acct']):
+            self.assertTrue(stream.time.is_monotonic_increasing)
+            self.assertEqual(stream.qty.sum(), 0)
+        for dummy, ticket in df.groupby('cloid'):
+            self.assertEqual(len(ticket[['symb', 'acct', 'side']].drop_duplicates()), 1)
+        self.assertIn('C;O', list(df.code))
+        self.assertEqual(gen.positions, [])
+
+        # The same seed makes the same fills
+        self.assertTrue(pd.DataFrame(gen.fills()).equals(df))
+        self.assertFalse(pd.DataFrame(
+            StatementGenerator(2000, numSymbols=10, seed=6).fills()).equals(df))
+
+    def test_holds(self):
+        '''Test the shares held after the close are written to positions.csv'''
+        gen = StatementGenerator(400, numSymbols=10, holdRate=1, seed=5)
+        trades, positions = gen.writeDAS(self.tmpdir)
+        df = pd.read_csv(trades)
+        pos = pd.read_csv(positions)
+        self.assertEqual(list(pos.columns), ['Symb', 'Account', 'Shares', 'Avgcost',
+                                             'Unrealized'])
+        self.assertEqual(len(pos), 11)
+        self.assertEqual(pos.Symb.nunique(), 11)
+        self.assertEqual(set(pos.Symb) - set(df.Symb), {'H000'})
+        self.assertEqual(df.Qty.min() > 0, True)
+        self.assertTrue(set(df.Side) <= {'B', 'S', 'SS'})
+
+    def test_ib(self):
+        '''Test the IB csv statement parses to the generated rows for one account'''
+        gen = StatementGenerator(300, numSymbols=5, seed=2)
+        rows = list(gen.ibRows('TRIB0000'))
+        path = gen.writeIBCsv(os.path.join(self.tmpdir, 'ActivityStatement.csv'), 'TRIB0000')
+        df = getTrades_csv(path)
+        self.assertEqual(len(df), len(rows))
+        self.assertEqual(set(df.Account), {'TRIB0000'})
+        self.assertEqual(list(df.Qty), [r[2] for r in rows])
+
+        path = gen.writeIBHtml(os.path.join(self.tmpdir, 'ActivityStatement.html'))
+        with open(path) as f:
+            self.assertEqual(f.read().count('<tr><td>'), len(list(gen.ibRows())) + 2)
+
+    def test_tooMany(self):
+        '''More than a fill per second for a symbol and account is an error'''
+        with self.assertRaises(ValueError):
+            StatementGenerator(1000000, numSymbols=2, accounts=['U1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+'''
+Test the headless settings in journal.settings
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+
+from journal import settings
+from journal.settings import (HeadlessSettings, SettingsFile, envName, getSettings,
+                              setHeadless)
+
+# pylint: disable = C0103
+
+
+class TestSettings(TestCase):
+    '''Test HeadlessSettings and the backend choice'''
+
+    def setUp(self):
+        self.saveHeadless = settings._headless
+        self.saveEnv = {k: os.environ.get(k) for k in ['STRUCTJOUR_HEADLESS',
+                                                       'STRUCTJOUR_SETTINGS']}
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'settings.json')
+        setHeadless(True, self.path)
+
+    def tearDown(self):
+        settings._headless = self.saveHeadless
+        settings._settingsFile = None
+        for k, v in self.saveEnv.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        os.environ.pop('STRUCTJOUR_CHART_COLORUP', None)
+        os.environ.pop('STRUCTJOUR_STOCKAPI_IBREALPORT', None)
+        shutil.rmtree(self.tmpdir)
+
+    def test_envName(self):
+        '''The variables are named for the group and key'''
+        self.assertEqual(envName('zero_substance', 'journal'), 'STRUCTJOUR_JOURNAL')
+        self.assertEqual(envName('zero_substance/chart', 'colorup'), 'STRUCTJOUR_CHART_COLORUP')
+
+    def test_value(self):
+        '''Values are kept by group, converted by type and saved to the file'''
+        s = getSettings('zero_substance/stockapi', 'structjour')
+        self.assertIsInstance(s, HeadlessSettings)
+        self.assertEqual(s.value('ibRealPort', 7496, int), 7496)
+        self.assertFalse(s.contains('ibRealCb'))
+        s.setValue('ibRealPort', '7497')
+        s.setValue('ibRealCb', 'true')
+        s.setValue('APIPref', 'bc, av')
+        self.assertEqual(s.value('ibRealPort', 7496, int), 7497)
+        self.assertIs(s.value('ibRealCb', False, bool), True)
+        self.assertIsNone(getSettings('zero_substance').value('APIPref'))
+        self.assertEqual(set(s.allKeys()), {'ibRealPort', 'ibRealCb', 'APIPref'})
+
+        settings._settingsFile = None
+        s = getSettings('zero_substance/stockapi')
+        self.assertEqual(s.value('APIPref'), 'bc, av')
+        s.remove('APIPref')
+        self.assertFalse(s.contains('APIPref'))
+
+    def test_concurrentSave(self):
+        '''Workers saving the same file do not collide on the temp file'''
+        errors = list()
+
+        def save(n):
+            sf = SettingsFile(self.path)
+            sf.data = {'zero_substance': {'runType': 'BATCH', 'n': n}}
+            try:
+                for dummy in range(50):
+                    sf.save()
+            except OSError as ex:
+                errors.append(ex)
+        threads = [threading.Thread(target=save, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(SettingsFile(self.path).data['zero_substance']['runType'], 'BATCH')
+        self.assertEqual(os.listdir(self.tmpdir), ['settings.json'])
+
+    def test_environment(self):
+        '''Environment variables override the file'''
+        s = getSettings('zero_substance/chart')
+        s.setValue('colorup', 'g')
+        os.environ['STRUCTJOUR_CHART_COLORUP'] = '#00ff00'
+        os.environ['STRUCTJOUR_STOCKAPI_IBREALPORT'] = '4002'
+        self.assertEqual(s.value('colorup', 'b'), '#00ff00')
+        self.assertEqual(getSettings('zero_substance/stockapi').value('ibRealPort', 7496, int),
+                         4002)
+
+    def test_noQt(self):
+        '''The console path modules import without PyQt5'''
+        code = ('import sys\n'
+                'import journalfiles, journal.pandasutil, journal.definetrades\n'
+                'import journal.stock.utilities, strategy.strategies\n'
+                'print(any(m.startswith("PyQt5") for m in sys.modules))\n')
+        env = dict(os.environ, STRUCTJOUR_HEADLESS='1', STRUCTJOUR_SETTINGS=self.path)
+        srcdir = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+        out = subprocess.run([sys.executable, '-c', code], cwd=srcdir, env=env,
+                             stdout=subprocess.PIPE, check=True)
+        self.assertEqual(out.stdout.decode().strip().splitlines()[-1], 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
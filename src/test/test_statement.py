@@ -9,14 +9,19 @@ from math import isclose
 import unittest
 import os
 import random
+import shutil
+import tempfile
 import types
+from unittest import mock
 
 import pandas as pd
 
 from journal.pandasutil import InputDataFrame
-from journal.statement import Statement_DAS, Statement_IBActivity
+from journal import statement
+from journal.statement import Statement_DAS, Statement_IBActivity, getAccountTables, getSoup
 from journal.definetrades import ReqCol
 from journalfiles import JournalFiles
+from test.rtg import StatementGenerator
 
 
 
@@ -271,6 +276,89 @@ class Test_Statements(unittest.TestCase):
 
 
 
+class Test_IBAccounts(unittest.TestCase):
+    '''Test reading the trades and positions of every account from one parse of a statement'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.accounts = ['U111', 'U222', 'U333']
+        self.gen = StatementGenerator(90, numSymbols=5, accounts=self.accounts, holdRate=0,
+                                      seed=4)
+        self.path = self.gen.writeIBHtml(os.path.join(self.tmpdir, 'ActivityStatement.html'),
+                                         self.accounts)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_getAccountTables(self):
+        tables = getAccountTables(getSoup(self.path))
+        self.assertEqual(list(tables.keys()), self.accounts)
+        for t in tables.values():
+            self.assertEqual(set(t.keys()), {'AccountInformation', 'Transactions'})
+        self.assertIs(getSoup(self.path), getSoup(self.path))
+
+    def test_getSoupURL(self):
+        '''An http or https statement is read from the url, not stat'ed as a file'''
+        with open(self.path, 'rb') as f:
+            page = f.read()
+        for url in ['http://example.com/a.html', 'HTTPS://example.com/b.html']:
+            with mock.patch('urllib.request.urlopen') as urlopen:
+                urlopen.return_value.read.return_value = page
+                tables = getAccountTables(getSoup(url))
+                urlopen.assert_called_once_with(url)
+            self.assertEqual(list(tables.keys()), self.accounts)
+
+    def test_getTradesByAccount(self):
+        '''Each account matches a statement of that account alone'''
+        st = Statement_IBActivity(None)
+        byAccount = st.getTradesByAccount_IBActivity(self.path)
+        self.assertEqual(list(byAccount.keys()), self.accounts)
+        for account, df in byAccount.items():
+            single = self.gen.writeIBHtml(os.path.join(self.tmpdir, account + '.html'), account)
+            self.assertTrue(st.getTrades_IBActivity(single).equals(df))
+            self.assertEqual(list(df.Account.unique()), [account])
+
+        df = st.getTrades_IBActivity(self.path)
+        self.assertEqual(len(df), sum(len(d) for d in byAccount.values()))
+        self.assertTrue(df.index.is_unique)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df.Time))
+        self.assertTrue((df.Time.dt.normalize() == df.Date).all())
+
+    def test_parallel(self):
+        '''The accounts read in worker processes are the same'''
+        st = Statement_IBActivity(None)
+        save = statement.PARALLELBYTES
+        statement.PARALLELBYTES = 0
+        try:
+            parallel = st.getTradesByAccount_IBActivity(self.path, maxWorkers=2)
+        finally:
+            statement.PARALLELBYTES = save
+        for account, df in st.getTradesByAccount_IBActivity(self.path).items():
+            self.assertTrue(parallel[account].equals(df))
+
+    def test_getPositions(self):
+        '''The positions of each account are found. The same ticker may be in both.'''
+        html = '<html><body>'
+        for account, qty in [('U111', 100), ('U222', -300)]:
+            html += (f'<div id="tblAccountInformation_{account}Body"><table>'
+                     f'<tr><td>Account</td><td>{account}</td></tr></table></div>'
+                     f'<div id="tblOpenPositions_{account}Body"><table>'
+                     '<thead><tr><th>Symbol</th><th>Quantity</th><th>Mult</th></tr></thead>'
+                     f'<tbody><tr><td>AAPL</td><td>{qty}</td><td>1</td></tr></tbody>'
+                     '</table></div>')
+        path = os.path.join(self.tmpdir, 'positions.html')
+        with open(path, 'w') as f:
+            f.write(html + '</body></html>')
+        df = Statement_IBActivity(None).getPositions(getSoup(path))
+        self.assertEqual(list(df.Account), ['U111', 'U222'])
+        self.assertEqual(list(df.Symb), ['AAPL', 'AAPL'])
+        self.assertEqual([int(x) for x in df.Shares], [100, -300])
+
+        swingTrade = [{'ticker': 'AAPL', 'shares': -300, 'before': 0, 'after': 0, 'acct': 'U222'}]
+        swingTrade = InputDataFrame().getOvernightTrades_DAS(swingTrade, df)
+        self.assertEqual(swingTrade[0]['before'], 0)
+
+
 def notmain():
     t = Test_Statements()
     t.test_getPositionsIB()
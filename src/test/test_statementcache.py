@@ -0,0 +1,99 @@
+'''
+Test the parsed statement cache in journal.statementcache
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal import statementcache
+from journal.statementcache import StatementCache, loadStatement, statementKey
+from journalfiles import JournalFiles
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+
+class TestStatementCache(TestCase):
+    '''Test loadStatement reads an unchanged statement from the cache'''
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        StatementGenerator(60, numSymbols=3, seed=4).writeDAS(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def jf(self):
+        return JournalFiles(indir=self.tmpdir, outdir=self.tmpdir, theDate='2019-01-02',
+                            infile='trades.csv', infile2=None)
+
+    def test_loadStatement(self):
+        '''The second load skips parsing. The jf is the same either way.'''
+        df, jf = loadStatement(self.jf(), cachedir=self.cachedir)
+        ticketfile = os.path.join(self.tmpdir, 'tradesByTicket.csv')
+        self.assertEqual(jf.infile, 'tradesByTicket.csv')
+        self.assertTrue(os.path.exists(ticketfile))
+        self.assertEqual(len(StatementCache(self.cachedir).files()), 1)
+
+        mtime = os.path.getmtime(ticketfile)
+        df2, jf2 = loadStatement(self.jf(), cachedir=self.cachedir)
+        self.assertEqual(os.path.getmtime(ticketfile), mtime)
+        self.assertEqual((jf2.infile, jf2.inpathfile), (jf.infile, jf.inpathfile))
+        pd.testing.assert_frame_equal(df, df2)
+
+        os.remove(ticketfile)
+        df2, jf2 = loadStatement(self.jf(), cachedir=self.cachedir)
+        self.assertTrue(os.path.exists(ticketfile))
+        self.assertEqual((jf2.infile, jf2.inpathfile), (jf.infile, jf.inpathfile))
+
+        df3, dummy = loadStatement(self.jf(), useCache=False, cachedir=self.cachedir)
+        self.assertTrue(os.path.exists(ticketfile))
+        pd.testing.assert_frame_equal(df, df3)
+
+    def test_invalidate(self):
+        '''A changed file, date or parser version gets a new key'''
+        key = statementKey(self.jf())
+        self.assertEqual(key, statementKey(self.jf()))
+
+        jf = self.jf()
+        jf.theDate = pd.Timestamp('2019-01-03')
+        self.assertNotEqual(key, statementKey(jf))
+
+        save = dict(statementcache.PARSERVERSION)
+        try:
+            statementcache.PARSERVERSION['DAS'] += 1
+            self.assertNotEqual(key, statementKey(self.jf()))
+        finally:
+            statementcache.PARSERVERSION.update(save)
+
+        with open(os.path.join(self.tmpdir, 'trades.csv'), 'a') as f:
+            f.write('\n')
+        self.assertNotEqual(key, statementKey(self.jf()))
+
+    def test_evict(self):
+        '''The least recently used entries are removed'''
+        cache = StatementCache(self.cachedir, maxEntries=2)
+        df = pd.DataFrame({'a': [1, 2]})
+        for key in ['k1', 'k2']:
+            cache.put(key, df)
+        for path in cache.files():
+            os.utime(path, (0, 0))
+        cache.get('k2')
+        cache.put('k3', df)
+        self.assertIsNone(cache.get('k1'))
+        pd.testing.assert_frame_equal(cache.get('k3'), df)
+        cache.clear()
+        self.assertEqual(cache.files(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+'''
+Test the offline trading calendar in journal.stock.tradingcalendar
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import datetime as dt
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from journal.stock import tradingcalendar as tcal
+from journal.stock.graphstuff import FinPlot
+from journal.stock.utilities import getLastWorkDay, getPrevTuesWed
+
+# pylint: disable = C0103
+
+
+class TestTradingCalendar(TestCase):
+    '''Test the holidays, early closes, sessions and the clipping of requests'''
+
+    def test_holidays(self):
+        nyse2019 = ['2019-01-01', '2019-01-21', '2019-02-18', '2019-04-19', '2019-05-27',
+                    '2019-07-04', '2019-09-02', '2019-11-28', '2019-12-25']
+        self.assertEqual(sorted(tcal.holidays(2019)), [pd.Timestamp(d).date() for d in nyse2019])
+        nyse2022 = ['2022-01-17', '2022-02-21', '2022-04-15', '2022-05-30', '2022-06-20',
+                    '2022-07-04', '2022-09-05', '2022-11-24', '2022-12-26']
+        self.assertEqual(sorted(tcal.holidays(2022)), [pd.Timestamp(d).date() for d in nyse2022])
+        self.assertEqual(tcal.holidayName('2018-12-05'), 'Bush Day of Mourning')
+        self.assertEqual(tcal.holidayName('2019-01-19'), 'Weekend')
+        self.assertIsNone(tcal.holidayName('2019-01-22'))
+
+    def test_earlyCloses(self):
+        self.assertEqual(sorted(tcal.earlyCloses(2019)),
+                         [dt.date(2019, 7, 3), dt.date(2019, 11, 29), dt.date(2019, 12, 24)])
+        # July 3 2020 was the observed Independence Day
+        self.assertEqual(sorted(tcal.earlyCloses(2020)),
+                         [dt.date(2020, 11, 27), dt.date(2020, 12, 24)])
+        self.assertEqual(tcal.session('2019-11-29 10:00'),
+                         (pd.Timestamp('2019-11-29 09:30'), pd.Timestamp('2019-11-29 13:00')))
+        self.assertEqual(tcal.session('2019-11-29', extended=True)[1],
+                         pd.Timestamp('2019-11-29 17:00'))
+        self.assertIsNone(tcal.session('2019-11-28'))
+
+    def test_tradingDays(self):
+        self.assertEqual(tcal.previousTradingDay('2019-01-21 12:00'), dt.date(2019, 1, 18))
+        self.assertEqual(tcal.previousTradingDay('2019-01-22', inclusive=False),
+                         dt.date(2019, 1, 18))
+        self.assertEqual(tcal.nextTradingDay('2019-12-24', inclusive=False), dt.date(2019, 12, 26))
+        self.assertEqual(len(tcal.tradingDays('2019-01-01', '2019-12-31')), 252)
+
+    def test_clipToSessions(self):
+        self.assertIsNone(tcal.clipToSessions('2019-01-21 09:30', '2019-01-21 16:00'))
+        self.assertIsNone(tcal.clipToSessions('2019-01-22 20:30', '2019-01-22 23:00'))
+        self.assertEqual(tcal.clipToSessions('2019-01-19 09:00', '2019-01-22 10:00'),
+                         (pd.Timestamp('2019-01-22 04:00'), pd.Timestamp('2019-01-22 10:00')))
+        self.assertEqual(tcal.clipToSessions('2019-11-29 12:00', '2019-11-29 16:00', False),
+                         (pd.Timestamp('2019-11-29 12:00'), pd.Timestamp('2019-11-29 13:00')))
+        self.assertIn('Martin Luther King',
+                      tcal.closedMessage('2019-01-21 09:30', '2019-01-21 16:00'))
+
+    def test_getLastWorkDay(self):
+        self.assertEqual(getLastWorkDay(dt.datetime(2019, 1, 21, 14, 5)),
+                         dt.datetime(2019, 1, 18, 14, 5))
+        self.assertEqual(getLastWorkDay(dt.datetime(2019, 1, 22, 9)), dt.datetime(2019, 1, 22, 9))
+        self.assertEqual(getPrevTuesWed(pd.Timestamp('2019-12-27')), pd.Timestamp('2019-12-24'))
+        # Wednesday July 4 2018 is a holiday
+        self.assertEqual(getPrevTuesWed(pd.Timestamp('2018-07-06')), pd.Timestamp('2018-07-03'))
+
+    def test_finPlot(self):
+        '''A chart of a closed day does not call the api. The early close ends the time frame'''
+        fp = FinPlot()
+        fp.api = 'notanapi'
+        self.assertEqual(fp.getChartData('SQ', '2019-01-21 09:30', '2019-01-21 11:00', 1),
+                         (None, None))
+        self.assertEqual(fp.errorCode, 'closed')
+        begin, end = fp.setTimeFrame('2019-11-29 10:40', '2019-11-29 12:50', 1)
+        self.assertEqual((begin, end), (pd.Timestamp('2019-11-29 10:20'),
+                                        pd.Timestamp('2019-11-29 13:00')))
+        fp.preferences = ['bc', 'av']
+        api, rules, apis = fp.apiChooserList('2019-01-21 09:30', '2019-01-21 11:00', 'bc')
+        self.assertFalse(api)
+        self.assertEqual(apis, [])
+        self.assertIn('closed', rules[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
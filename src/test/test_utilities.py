@@ -6,6 +6,8 @@
 import datetime as dt
 import os
 import pickle
+import shutil
+import tempfile
 import types
 import unittest
 
@@ -15,6 +17,7 @@ from PyQt5.QtCore import QSettings
 
 from test.rtg import randomTradeGenerator2
 
+from journal.database import removeDB
 from journal.stock import mybarchart as bc
 
 from journal.stock import utilities as util
@@ -146,18 +149,21 @@ class TestUtilities(unittest.TestCase):
         settings = QSettings('zero_substance', 'structjour')
         apiset = QSettings('zero_substance/stockapi', 'structjour')
 
-        settings.setValue('journal', self.p)
+        journal = tempfile.mkdtemp()
+        settings.setValue('journal', journal)
         mk = util.ManageKeys(create=True)
         l = apiset.value('dbsqlite')
         self.assertTrue(os.path.exists(l))
-        os.remove(l)
+        removeDB(l)
 
         t.initializeSettings()
-        settings.setValue('journal', self.p)
+        settings.setValue('journal', journal)
         mk = util.ManageKeys(create=True)
         ll = apiset.value('dbsqlite')
         self.assertTrue(l == ll)
-        os.remove(ll)
+        removeDB(ll)
+        self.assertEqual(os.listdir(journal), [])
+        shutil.rmtree(journal)
         # self.assertEqual(l, ll)
 
         t.initializeSettings()
@@ -179,7 +185,8 @@ class TestUtilities(unittest.TestCase):
         settings = QSettings('zero_substance', 'structjour')
         apiset = QSettings('zero_substance/stockapi', 'structjour')
 
-        settings.setValue('journal', self.p)
+        journal = tempfile.mkdtemp()
+        settings.setValue('journal', journal)
         mk = util.ManageKeys(create=True)
         mk.updateKey('bc', 'Its the end of the world')
         mk.updateKey('av', 'as we know it')
@@ -190,14 +197,17 @@ class TestUtilities(unittest.TestCase):
 
         l = apiset.value('dbsqlite')
 
+        # Forget the temp journal before it is removed
+        t.initializeSettings()
         t.restoreSettings()
         print(apiset.allKeys())
         print(settings.allKeys())
-        os.remove(l)
 
         # self.assertTrue(os)
         mk = util.ManageKeys()
         print(mk.getKey('bc'))
+        removeDB(l)
+        shutil.rmtree(journal)
 
     def test_ibSettings(self):
         t = PickleSettings()
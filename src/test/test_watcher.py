@@ -0,0 +1,132 @@
+'''
+Test the watch folder daemon in journal.watcher
+
+@author: Mike Petersen
+
+@creation_date: 2019-10-19
+'''
+import os
+import shutil
+import tempfile
+import sqlite3
+import unittest
+from unittest import TestCase, mock
+
+import pandas as pd
+
+from journal.database import closePools
+from journal.statementcache import fileHash
+from journal.watcher import DEFAULTSCHEME, Ledger, Watcher, schemeDate, schemeRegex
+from journalfiles import statementType
+from test.rtg import StatementGenerator
+
+# pylint: disable = C0103
+
+
+class TestWatcher(TestCase):
+    '''Test finding the day directories and journaling their statements once'''
+
+    def setUp(self):
+        self.journal = tempfile.mkdtemp()
+        self.saveEnv = os.environ.get('STRUCTJOUR_SETTINGS')
+        os.environ['STRUCTJOUR_SETTINGS'] = os.path.join(self.journal, 'settings.json')
+
+    def tearDown(self):
+        if self.saveEnv is None:
+            del os.environ['STRUCTJOUR_SETTINGS']
+        else:
+            os.environ['STRUCTJOUR_SETTINGS'] = self.saveEnv
+        closePools()
+        shutil.rmtree(self.journal)
+
+    def dayDir(self, theDate):
+        d = os.path.join(self.journal, pd.Timestamp(theDate).strftime('_%Y%m_%B/_%m%d_%A'))
+        os.makedirs(d)
+        return d
+
+    def test_schemeDate(self):
+        regex = schemeRegex(DEFAULTSCHEME)
+        self.assertEqual(schemeDate(regex, '_201901_January/_0102_Wednesday'),
+                         pd.Timestamp('2019-01-02'))
+        self.assertEqual(schemeDate(regex, '_201901_January\\_0102_Wednesday/'),
+                         pd.Timestamp('2019-01-02'))
+        # The month in the day directory must match
+        self.assertIsNone(schemeDate(regex, '_201901_January/_0202_Saturday'))
+        self.assertIsNone(schemeDate(regex, '_201901_January'))
+        self.assertEqual(schemeDate(schemeRegex('{Year}-{month}-{day}'), '2019-10-18'),
+                         pd.Timestamp('2019-10-18'))
+
+    def test_statementType(self):
+        self.assertEqual(statementType('trades.csv'), 'DAS')
+        self.assertEqual(statementType('/x/Trades.1018.CSV'), 'DAS')
+        self.assertEqual(statementType('ActivityStatement.20191018.html'), 'IB_HTML')
+        self.assertIsNone(statementType('positions.csv'))
+
+    def test_ledger(self):
+        ledger = Ledger(os.path.join(self.journal, 'structjour.sqlite'))
+        theDate = pd.Timestamp('2019-01-02')
+        self.assertFalse(ledger.isProcessed('a.csv', 'h1'))
+        ledger.record('a.csv', 'h1', theDate, 'failed', message='ValueError()')
+        self.assertTrue(ledger.isProcessed('a.csv', 'h1'))
+        ledger.record('a.csv', 'h2', theDate, 'done', 'a.xlsx')
+        self.assertFalse(ledger.isProcessed('a.csv', 'h1'))
+        self.assertTrue(ledger.isProcessed('a.csv', 'h2'))
+        records = ledger.getRecords()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records.status[0], 'done')
+        ledger.setStamp('a.csv', 12.5, 100)
+        self.assertEqual(ledger.stamps(), {'a.csv': (12.5, 100)})
+
+    def test_ledgerUpgrade(self):
+        '''A ledger without the file stamps gets the columns'''
+        db = os.path.join(self.journal, 'old.sqlite')
+        conn = sqlite3.connect(db)
+        conn.execute('''CREATE TABLE processed_files (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL UNIQUE, hash TEXT NOT NULL, theDate TEXT, status TEXT NOT NULL,
+            outfile TEXT, message TEXT, processed TEXT NOT NULL)''')
+        conn.close()
+        ledger = Ledger(db)
+        ledger.record('a.csv', 'h1', pd.Timestamp('2019-01-02'), 'done', mtime=1.0, size=2)
+        self.assertEqual(ledger.stamps(), {'a.csv': (1.0, 2)})
+
+    def test_run(self):
+        '''Journal a DAS and an IB statement, then nothing until one changes'''
+        das = self.dayDir('2019-01-02')
+        StatementGenerator(40, holdRate=.5, theDate='2019-01-02', seed=1).writeDAS(das)
+        ib = self.dayDir('2019-01-03')
+        StatementGenerator(40, accounts=['U1'], theDate='2019-01-03', seed=2).writeIBHtml(
+            os.path.join(ib, 'ActivityStatement.20190103.html'))
+        os.makedirs(os.path.join(self.journal, 'notaday'))
+        shutil.copy(os.path.join(das, 'trades.csv'), os.path.join(self.journal, 'notaday'))
+
+        watcher = Watcher(self.journal, maxWorkers=2, settle=0)
+        found = sorted(p for p, dummy in watcher.scan())
+        self.assertEqual(found, [os.path.join(das, 'trades.csv'),
+                                 os.path.join(ib, 'ActivityStatement.20190103.html')])
+        watcher.run(interval=.1, once=True)
+
+        records = watcher.ledger.getRecords()
+        self.assertEqual(list(records.status), ['done', 'done'], list(records.message))
+        for outfile in records.outfile:
+            self.assertTrue(os.path.exists(outfile))
+        # tradesByTicket.csv, written by the DAS parser, is not a statement
+        self.assertEqual(sorted(p for p, dummy in watcher.scan()), found)
+
+        watcher = Watcher(self.journal, settle=0)
+        with mock.patch('journal.watcher.fileHash', side_effect=fileHash) as hashed:
+            self.assertEqual(watcher.poll(), 0)
+            self.assertEqual(hashed.call_count, 0)
+            # A touched file is hashed once and not journaled again
+            os.utime(os.path.join(das, 'trades.csv'))
+            self.assertEqual(watcher.poll(), 0)
+            self.assertEqual(watcher.poll(), 0)
+            self.assertEqual(hashed.call_count, 1)
+        with open(os.path.join(das, 'trades.csv'), 'a') as f:
+            f.write('\n')
+        self.assertEqual(watcher.poll(), 1)
+        watcher.run(interval=.1, once=True)
+        self.assertEqual(len(watcher.ledger.getRecords()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,24 +3,26 @@
 Top level module currently.
 '''
 # from PyQt5.QtWidgets import QApplication
+import copy
 import os
-from PyQt5.QtCore import QSettings
 
-from journalfiles import JournalFiles
+from journalfiles import JournalFiles, statementType
 from journal.pandasutil import InputDataFrame
-from journal.statement import Statement_DAS as Ticket
-from journal.statement import Statement_IBActivity
+from journal.statementcache import loadStatement
 from journal.definetrades import DefineTrades
 from journal.layoutsheet import LayoutSheet
 from journal.tradestyle import TradeFormat
 from journal.dailysumforms import MistakeSummary
+from journal.settings import getSettings
+from journal.instrument import span
 # from journal.qtform import QtForm
 # pylint: disable=C0103
 
 # jf = JournalFiles(theDate=dt.date(2019, 1, 25), mydevel=True)
 
 
-def run(infile='trades.csv', outdir=None, theDate=None, indir=None, infile2=None, mydevel=True):
+def run(infile='trades.csv', outdir=None, theDate=None, indir=None, infile2=None, mydevel=True,
+        useCache=True, interactive=True, byAccount=False):
     '''
     Run structjour. Temporary picker for input type based on filename. If infile has 'activity' in
     it and ends in .html, then its IB Activity Statement web page (as a file on this system)
@@ -34,30 +36,45 @@ def run(infile='trades.csv', outdir=None, theDate=None, indir=None, infile2=None
     :parmas infile2: Name of the DAS positions file. Will default to indir/positions.csv  
     :params mydevel: If True, use a specific file structure and let structjour create it. All can 
                      be overriden by using the specific parameters above.
+    :params useCache: If False, parse the input file even if it is in the statement cache.
+    :params interactive: If False, ask no questions. Unbalanced shares are taken as held after the
+                    close and the trades get no images.
+    :params byAccount: If True, write a journal for each account in the statement. The file is
+                    read once.
+    :return: The JournalFiles object, or a list of them, one per account, if byAccount
     '''
-    settings = QSettings('zero_substance', 'structjour')
-    settings.setValue('runType', 'CONSOLE')
+    settings = getSettings('zero_substance', 'structjour')
+    settings.setValue('runType', 'CONSOLE' if interactive else 'BATCH')
     #  indir=None, outdir=None, theDate=None, infile='trades.csv', mydevel=False
     jf = JournalFiles(indir=indir, outdir=outdir,
                       theDate=theDate, infile=infile, infile2=infile2, mydevel=mydevel)
 
-    name, ext = os.path.splitext(jf.infile.lower())
-    if name.find('activity') > -1 and ext == '.html':
-        jf.inputType = 'IB_HTML'
-        statement = Statement_IBActivity(jf)
-        df = statement.getTrades_IBActivity(jf.inpathfile)
-    elif  name.find('trades') > -1 and ext == '.csv':
-        # This could be an IB CSV--so this is temporary-- when I enable some sort of IB CSV, will
-        # probably do some kind of class heirarchy here for statements. 
-        tkt = Ticket(jf)
-        df, jf = tkt.getTrades()
-    # trades = pd.read_csv(jf.inpathfile)
-    else:
+    inputType = statementType(jf.infile)
+    if inputType == 'IB_HTML':
+        jf.inputType = inputType
+    elif inputType is None:
         #Temporary
         print('Opening a non standard file name in DAS')
-        tkt = Ticket(jf)
-        df, jf = tkt.getTrades()
+    df, jf = loadStatement(jf, useCache=useCache)
 
+    if byAccount:
+        jfs = list()
+        for account in df['Account'].unique():
+            ajf = copy.copy(jf)
+            name, ext = os.path.splitext(jf.outfile)
+            ajf.outfile = f'{name}_{account}{ext}'
+            ajf.outpathfile = os.path.join(jf.outdir, ajf.outfile)
+            jfs.append(journalTrades(df[df['Account'] == account].copy(), ajf, interactive))
+        return jfs
+    return journalTrades(df, jf, interactive)
+
+
+def journalTrades(df, jf, interactive=True):
+    '''
+    Define the trades of the statement df and write the journal to jf.outpathfile.
+    :params df: The trades from loadStatement.
+    :return: jf
+    '''
     idf = InputDataFrame()
     trades, success = idf.processInputFile(df, jf.theDate, jf)
     if not success:
@@ -74,28 +91,34 @@ def run(infile='trades.csv', outdir=None, theDate=None, indir=None, infile2=None
     # Create the space in dframe to add the summary information for each trade.
     # Then create the Workbook.
     ls = LayoutSheet(margin, inputlen)
-    imageLocation, dframe = ls.imageData(dframe, ldf)
-    wb, ws, nt = ls.createWorkbook(dframe)
-
-    tf = TradeFormat(wb)
-    ls.styleTop(ws, len(nt.columns), tf)
-    assert len(ldf) == len(imageLocation)
-
-    mstkAnchor = (len(dframe.columns) + 2, 1)
-    mistake = MistakeSummary(numTrades=len(ldf), anchor=mstkAnchor)
-    mistake.mstkSumStyle(ws, tf, mstkAnchor)
-    mistake.dailySumStyle(ws, tf, mstkAnchor)
-
-    tradeSummaries = ls.runSummaries(imageLocation, ldf, jf, ws, tf)
-    # app = QApplication(sys.argv)
-    # qtf = QtForm()
-    # qtf.fillForm(tradeSummaries[1])
-    # app.exec_()
-
-    ls.populateMistakeForm(tradeSummaries, mistake, ws, imageLocation)
-    ls.populateDailySummaryForm(tradeSummaries, mistake, ws, mstkAnchor)
-
-    ls.save(wb, jf)
+    with span('layout', rows=len(dframe), trades=len(ldf)):
+        plan = ls.plan(dframe, ldf)
+        imageLocation, dframe = plan.imageLocation(), plan.sheetFrame(dframe, ldf)
+        wb, ws, nt = ls.createWorkbook(dframe)
+
+    with span('style', trades=len(ldf)):
+        tf = TradeFormat(wb)
+        ls.styleTop(ws, len(nt.columns), tf)
+        assert len(ldf) == len(imageLocation)
+
+        mstkAnchor = (len(dframe.columns) + 2, 1)
+        mistake = MistakeSummary(numTrades=len(ldf), anchor=mstkAnchor)
+        mistake.mstkSumStyle(ws, tf, mstkAnchor)
+        mistake.dailySumStyle(ws, tf, mstkAnchor)
+
+    with span('summaries', trades=len(ldf)):
+        tradeSummaries = ls.runSummaries(imageLocation, ldf, jf, ws, tf, interactive)
+        # app = QApplication(sys.argv)
+        # qtf = QtForm()
+        # qtf.fillForm(tradeSummaries[1])
+        # app.exec_()
+
+        ls.populateMistakeForm(tradeSummaries, mistake, ws, imageLocation)
+        ls.populateDailySummaryForm(tradeSummaries, mistake, ws, mstkAnchor)
+        ls.writeFills(wb, tradeSummaries)
+
+    with span('save', trades=len(ldf)):
+        ls.save(wb, jf)
     print("Processing complete. Saved {}".format(jf.outpathfile))
     return jf
 